@@ -0,0 +1,82 @@
+"""
+Hot-path microbenchmark suite.
+
+    python -m benchmarks run [--filter NAME] [--output PATH] [--quick]
+    python -m benchmarks compare BASE.json HEAD.json [--threshold 0.10]
+
+`run` writes results to benchmarks/results/<git revision>.json by default; `compare`
+exits non-zero when any benchmark's median got slower than the threshold allows.
+Everything runs offline: Redis, providers and Gemini are stubbed.
+"""
+import argparse
+import importlib
+import logging
+import os
+import sys
+
+from benchmarks import harness
+from common.logging import configure_logging
+
+SUITES = ["benchmarks.bench_cache", "benchmarks.bench_clients", "benchmarks.bench_financial", "benchmarks.bench_budget", "benchmarks.bench_gemini", "benchmarks.bench_logging", "benchmarks.bench_encoding"]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _run(args: argparse.Namespace) -> int:
+    for suite in SUITES:
+        importlib.import_module(suite)
+    if not args.with_logging:
+        # Services configure INFO logging on import; keep log rendering out of the timings
+        configure_logging(service="benchmarks", level=logging.WARNING)
+    benchmarks = harness.registered(args.filter)
+    if not benchmarks:
+        print(f"No benchmarks match {args.filter!r}", file=sys.stderr)
+        return 1
+
+    result = harness.run(
+        benchmarks,
+        min_sample_time=0.01 if args.quick else 0.05,
+        repeats=3 if args.quick else 5,
+    )
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{result['meta']['revision'] or 'local'}.json")
+    harness.save(result, output)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    rows = harness.compare(harness.load(args.base), harness.load(args.head), threshold=args.threshold)
+    regressions = 0
+    for row in rows:
+        marker = "REGRESSION" if row["regression"] else ""
+        regressions += row["regression"]
+        print(f"{row['name']:<55} {harness.format_seconds(row['base_s']):>12} -> {harness.format_seconds(row['head_s']):>12}  {row['ratio']:6.2f}x  {marker}")
+    print(f"\n{len(rows)} benchmarks compared, {regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Hot-path microbenchmark suite.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", help="Run benchmarks and store results as JSON.")
+    run_parser.add_argument("--filter", help="Only run benchmarks whose name contains this string.")
+    run_parser.add_argument("--output", help="Result file (default: benchmarks/results/<revision>.json).")
+    run_parser.add_argument("--quick", action="store_true", help="Fewer, shorter samples for a fast smoke run.")
+    run_parser.add_argument("--with-logging", action="store_true", help="Keep service INFO logging enabled while timing.")
+    run_parser.set_defaults(handler=_run)
+
+    compare_parser = subcommands.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown as a fraction (default: 0.10).")
+    compare_parser.set_defaults(handler=_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""
+analyze_spending handler from 10 to 100k spending items.
+"""
+import random
+from benchmarks.harness import benchmark, sync_runner
+from budget_agent.main import analyze_spending
+from budget_agent.schemas import SpendingAnalysisInput, SpendingCategory
+
+CATEGORIES = ["Rent", "Groceries", "Utilities", "Dining Out", "Entertainment", "Shopping", "Travel", "Insurance"]
+
+
+@benchmark("analyze_spending", items=[10, 1000, 100000])
+def analyze_spending_items(items: int):
+    rng = random.Random(items)
+    analysis_input = SpendingAnalysisInput(
+        monthly_income=5000,
+        spending=[SpendingCategory(name=rng.choice(CATEGORIES), amount=rng.uniform(1, 100)) for _ in range(items)],
+    )
+    return sync_runner(lambda: analyze_spending(analysis_input))
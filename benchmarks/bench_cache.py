@@ -0,0 +1,81 @@
+"""
+CacheManager.cache hit (Redis and local tier) and miss paths.
+"""
+from typing import List
+from benchmarks.harness import benchmark, sync_runner
+from benchmarks.stubs import FakeRedis, make_bars
+from financial_analysis_agent.clients.data_provider import HistoricalData, Quote
+from financial_analysis_agent.utils.cache import CacheManager
+
+
+@benchmark("cache.quote.hit")
+def quote_hit():
+    cache_manager = CacheManager(redis_client=FakeRedis())
+
+    async def fetch_quote(symbol: str) -> Quote:
+        return Quote(symbol=symbol, price=100.0, currency="USD")
+
+    cached = cache_manager.cache(key_prefix="bench:quote", ttl=300)(fetch_quote)
+    run = sync_runner(lambda: cached("AAPL"))
+    run() # Populate the cache
+    return run
+
+
+@benchmark("cache.quote.local_hit")
+def quote_local_hit():
+    cache_manager = CacheManager(redis_client=FakeRedis(), local_ttl=30)
+
+    async def fetch_quote(symbol: str) -> Quote:
+        return Quote(symbol=symbol, price=100.0, currency="USD")
+
+    cached = cache_manager.cache(key_prefix="bench:quote", ttl=300)(fetch_quote)
+    run = sync_runner(lambda: cached("AAPL"))
+    run()
+    return run
+
+
+@benchmark("cache.quote.miss")
+def quote_miss():
+    redis = FakeRedis()
+    cache_manager = CacheManager(redis_client=redis)
+
+    async def fetch_quote(symbol: str) -> Quote:
+        return Quote(symbol=symbol, price=100.0, currency="USD")
+
+    cached = cache_manager.cache(key_prefix="bench:quote", ttl=300)(fetch_quote)
+
+    async def miss():
+        redis.clear()
+        return await cached("AAPL")
+    return sync_runner(miss)
+
+
+@benchmark("cache.history.hit", bars=[100, 5000])
+def history_hit(bars: int):
+    cache_manager = CacheManager(redis_client=FakeRedis())
+    data = make_bars(bars)
+
+    async def fetch_history(symbol: str, period: str) -> List[HistoricalData]:
+        return data
+
+    cached = cache_manager.cache(key_prefix="bench:historical", ttl=3600)(fetch_history)
+    run = sync_runner(lambda: cached("AAPL", "1y"))
+    run()
+    return run
+
+
+@benchmark("cache.history.miss", bars=[100, 5000])
+def history_miss(bars: int):
+    redis = FakeRedis()
+    cache_manager = CacheManager(redis_client=redis)
+    data = make_bars(bars)
+
+    async def fetch_history(symbol: str, period: str) -> List[HistoricalData]:
+        return data
+
+    cached = cache_manager.cache(key_prefix="bench:historical", ttl=3600)(fetch_history)
+
+    async def miss():
+        redis.clear()
+        return await cached("AAPL", "1y")
+    return sync_runner(miss)
@@ -0,0 +1,63 @@
+"""
+Provider response conversion: yfinance DataFrames and (streamed) Alpha Vantage JSON into HistoricalData.
+"""
+import json
+from unittest.mock import patch
+import httpx
+import pandas as pd
+from benchmarks.harness import benchmark, sync_runner, with_cleanup
+from benchmarks.stubs import ChunkedStream, make_bars
+from financial_analysis_agent.clients.alpha_vantage import AlphaVantageClient
+from financial_analysis_agent.clients.yahoo_finance import YahooFinanceClient
+
+BAR_COUNTS = [100, 5000, 20000]
+
+
+class _StubTicker:
+    def __init__(self, frame: pd.DataFrame):
+        self._frame = frame
+
+    def history(self, period: str) -> pd.DataFrame:
+        return self._frame
+
+
+@benchmark("yahoo.history_to_models", bars=BAR_COUNTS)
+def yahoo_history(bars: int):
+    data = list(reversed(make_bars(bars)))
+    frame = pd.DataFrame(
+        {
+            "Open": [b.open for b in data],
+            "High": [b.high for b in data],
+            "Low": [b.low for b in data],
+            "Close": [b.close for b in data],
+            "Volume": [b.volume for b in data],
+        },
+        index=pd.to_datetime([b.date for b in data]),
+    )
+    patcher = patch("yfinance.Ticker", new=lambda symbol: _StubTicker(frame))
+    patcher.start()
+    client = YahooFinanceClient()
+    # Stopped once timed, so the stub does not leak into later benchmarks
+    return with_cleanup(sync_runner(lambda: client.get_historical_data("AAPL", "max")), patcher.stop)
+
+
+@benchmark("alpha_vantage.history_to_models", bars=BAR_COUNTS, period=["1y", "max"])
+def alpha_vantage_history(bars: int, period: str):
+    latest = make_bars(bars)
+    payload = {
+        "Meta Data": {"2. Symbol": "AAPL"},
+        "Time Series (Daily)": {
+            b.date: {
+                "1. open": f"{b.open:.4f}",
+                "2. high": f"{b.high:.4f}",
+                "3. low": f"{b.low:.4f}",
+                "4. close": f"{b.close:.4f}",
+                "5. volume": str(b.volume),
+            }
+            for b in latest
+        },
+    }
+    body = json.dumps(payload).encode()
+    client = AlphaVantageClient(api_key="bench")
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, stream=ChunkedStream(body))))
+    return sync_runner(lambda: client.get_historical_data("AAPL", period))
@@ -0,0 +1,39 @@
+"""
+Encoding and decoding a five-year /financial/stock-data payload in each negotiated format.
+"""
+import json
+
+import msgpack
+import orjson
+
+from benchmarks.harness import benchmark
+from benchmarks.stubs import make_bars
+from common.encoding import columns_from_rows
+
+FORMATS = {
+    "json": (lambda content: json.dumps(content).encode(), json.loads),
+    "orjson": (orjson.dumps, orjson.loads),
+    "msgpack": (lambda content: msgpack.packb(content, use_bin_type=True), lambda body: msgpack.unpackb(body, raw=False)),
+}
+
+
+def stock_data(layout: str, bars: int = 1260):
+    rows = [bar.model_dump() for bar in make_bars(bars)]
+    return {
+        "quote": {"symbol": "AAPL", "price": 189.5, "currency": "USD"},
+        "historical_data": columns_from_rows(rows) if layout == "columnar" else rows,
+    }
+
+
+@benchmark("encoding.stock_data.encode", layout=["rows", "columnar"], format=list(FORMATS))
+def encode(layout: str, format: str):
+    content = stock_data(layout)
+    dumps, _ = FORMATS[format]
+    return lambda: dumps(content)
+
+
+@benchmark("encoding.stock_data.decode", layout=["rows", "columnar"], format=list(FORMATS))
+def decode(layout: str, format: str):
+    dumps, loads = FORMATS[format]
+    body = dumps(stock_data(layout))
+    return lambda: loads(body)
@@ -0,0 +1,90 @@
+"""
+FinancialDataService.compare_stocks with stubbed providers and an in-memory Redis, and
+the portfolio projection simulation, efficient frontier solver, backtest and
+technical indicators, and symbol search.
+"""
+import numpy as np
+
+from benchmarks.harness import benchmark, sync_runner
+from benchmarks.stubs import FakeRedis, StubProvider, StubProviderFactory, make_listings
+from financial_analysis_agent.schemas import IndicatorParams
+from financial_analysis_agent.services.backtest_service import run_backtest
+from financial_analysis_agent.services.financial_data_service import FinancialDataService
+from financial_analysis_agent.services.indicator_service import IndicatorState, indicator_series
+from financial_analysis_agent.services.optimizer_service import FRONTIER_RISK_AVERSIONS, solve_frontier
+from financial_analysis_agent.services.projection_service import assumed_moments, band_years, simulate_bands
+from financial_analysis_agent.services.symbol_directory import SymbolDirectory
+from financial_analysis_agent.utils.symbols import SymbolUniverse
+
+
+@benchmark("compare_stocks.cold", symbols=[2, 10, 100])
+def compare_stocks_cold(symbols: int):
+    redis = FakeRedis()
+    service = FinancialDataService(StubProviderFactory({"yahoo_finance": StubProvider(bars=252)}), redis)
+    tickers = [f"SYM{i}" for i in range(symbols)]
+
+    async def compare():
+        redis.clear()
+        service.cache_manager.clear_local()
+        return await service.compare_stocks(tickers, "1y")
+    return sync_runner(compare)
+
+
+@benchmark("compare_stocks.cached", symbols=[2, 10, 100])
+def compare_stocks_cached(symbols: int):
+    service = FinancialDataService(StubProviderFactory({"yahoo_finance": StubProvider(bars=252)}), FakeRedis())
+    tickers = [f"SYM{i}" for i in range(symbols)]
+    run = sync_runner(lambda: service.compare_stocks(tickers, "1y"))
+    run()
+    return run
+
+
+@benchmark("projection.simulate", years=[10, 30, 50], paths=[20_000])
+def projection_simulate(years: int, paths: int):
+    rng = np.random.default_rng(0)
+    reported = band_years(years)
+    weights = np.array([0.4, 0.2, 0.1, 0.3])
+    mean, covariance = assumed_moments(["VTI", "VEA", "VWO", "BND"])
+    return lambda: simulate_bands(weights, mean, covariance, reported, paths, rng)
+
+
+@benchmark("optimizer.frontier", assets=[4, 20])
+def optimizer_frontier(assets: int):
+    rng = np.random.default_rng(0)
+    factors = rng.normal(0.0, 0.1, (assets, 3))
+    covariance = factors @ factors.T + np.diag(rng.uniform(0.01, 0.04, assets))
+    mean = rng.uniform(0.02, 0.09, assets)
+    return lambda: solve_frontier(mean, covariance, FRONTIER_RISK_AVERSIONS, max_weight=0.6)
+
+
+@benchmark("backtest.run", assets=[20], years=[20], rebalance=["daily", "monthly"])
+def backtest_run(assets: int, years: int, rebalance: str):
+    rng = np.random.default_rng(0)
+    dates = np.arange(np.datetime64("2004-01-01"), np.datetime64("2004-01-01") + years * 365).astype(str).tolist()
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, (len(dates), assets)), axis=0))
+    weights = np.full(assets, 1.0 / assets)
+    return lambda: run_backtest(dates, closes, weights, rebalance)
+
+
+@benchmark("indicators.series", bars=[252, 1260])
+def indicators_series(bars: int):
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, bars)))
+    return lambda: indicator_series(closes, IndicatorParams())
+
+
+@benchmark("indicators.update", bars=[1])
+def indicators_update(bars: int):
+    state = IndicatorState(params=IndicatorParams())
+    for day in range(300):
+        state.update(str(day), 100.0 + day % 7)
+    return lambda: state.update("next", 101.0)
+
+
+@benchmark("symbols.search", listings=[12_000], query=["prefix", "exact", "fuzzy", "miss"])
+def symbols_search(listings: int, query: str):
+    data = make_listings(listings)
+    directory = SymbolDirectory(SymbolUniverse(data))
+    directory.index()
+    name = data[len(data) // 2].name.split()[0].lower()
+    text = {"prefix": name[:3], "exact": name, "fuzzy": name[0] + name[2:] + "x", "miss": "qzxwvutsrq"}[query]
+    return lambda: directory.search(text, 10)
@@ -0,0 +1,20 @@
+"""
+GeminiClient._extract_json on fenced and bare model output.
+"""
+from benchmarks.harness import benchmark
+from orchestrator.gemini import GeminiClient
+
+FENCED = 'Here is the result:\n```json\n{"intent": "compare_stocks", "entities": {"symbols": ["GOOGL", "MSFT"], "period": "1y"}}\n```\n'
+BARE = '{"intent": "get_stock_data", "entities": {"symbol": "AAPL"}}'
+
+
+def _client() -> GeminiClient:
+    # _extract_json does not touch the model, so skip API configuration
+    return GeminiClient.__new__(GeminiClient)
+
+
+@benchmark("gemini.extract_json", shape=["fenced", "bare"])
+def extract_json(shape: str):
+    client = _client()
+    text = FENCED if shape == "fenced" else BARE
+    return lambda: client._extract_json(text)
@@ -0,0 +1,72 @@
+"""
+Logging cost per orchestrated request: the shared queued pipeline against the previous
+synchronous per-service configuration (JSONRenderer on stdout, rendered on the request path).
+"""
+import logging
+import os
+import queue
+
+import structlog
+
+from benchmarks.harness import benchmark
+from benchmarks.stubs import make_bars
+from common import logging as shared_logging
+
+TOOL_RESULTS = {
+    "quote": {"symbol": "AAPL", "price": 189.5, "currency": "USD"},
+    "historical_data": [bar.model_dump() for bar in make_bars(252)],
+    "errors": [],
+}
+
+
+def _sync_json_logger():
+    # The configure_logging that each service used to carry, writing to /dev/null
+    stdlib_logger = logging.getLogger("benchmarks.sync_json")
+    stdlib_logger.propagate = False
+    stdlib_logger.setLevel(logging.INFO)
+    stdlib_logger.handlers = [logging.StreamHandler(open(os.devnull, "w"))]
+    return structlog.wrap_logger(
+        stdlib_logger,
+        processors=[
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer(),
+        ],
+        wrapper_class=structlog.stdlib.BoundLogger,
+    )
+
+
+def _queued_logger():
+    events = queue.Queue()
+    writer = shared_logging._Writer(events)
+    writer.stream = open(os.devnull, "w")
+    writer.start()
+    return structlog.wrap_logger(
+        shared_logging._QueueLogger(events),
+        processors=shared_logging.build_processors("benchmarks"),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    )
+
+
+PIPELINES = {"sync_json": _sync_json_logger, "queued": _queued_logger}
+
+
+@benchmark("logging.orchestrate_request", pipeline=list(PIPELINES))
+def orchestrate_request(pipeline: str):
+    logger = PIPELINES[pipeline]()
+
+    def request():
+        logger.info("Orchestrating query", user_query="How has AAPL performed over the last 1y?")
+        logger.info("Intent recognized", intent="get_stock_data", entities={"symbol": "AAPL", "period": "1y"})
+        logger.info("Tool results", results=TOOL_RESULTS)
+        logger.info("Response synthesized")
+    return request
+
+
+@benchmark("logging.health_check", pipeline=list(PIPELINES))
+def health_check(pipeline: str):
+    logger = PIPELINES[pipeline]()
+    return lambda: logger.info("Health check endpoint called")
@@ -0,0 +1,64 @@
+"""
+Compares one `/budget/analyze-spending/batch` call against N `/budget/analyze-spending` calls.
+
+Usage:
+    python -m benchmarks.bench_spending_batch --users 2000 --items-per-user 12
+"""
+import argparse
+import random
+import time
+from fastapi.testclient import TestClient
+from budget_agent.main import app
+
+CATEGORIES = ["Rent", "Groceries", "Utilities", "Dining Out", "Entertainment", "Shopping", "Travel", "Insurance"]
+
+def make_users(num_users: int, items_per_user: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        {
+            "monthly_income": rng.choice([2500, 4000, 5000, 8000]),
+            "spending": [
+                {"name": rng.choice(CATEGORIES), "amount": round(rng.uniform(10, 1500), 2)}
+                for _ in range(items_per_user)
+            ],
+        }
+        for _ in range(num_users)
+    ]
+
+def to_columnar(users):
+    payload = {"user_ids": [], "monthly_incomes": [], "item_user_index": [], "item_names": [], "item_amounts": []}
+    for index, user in enumerate(users):
+        payload["user_ids"].append(str(index))
+        payload["monthly_incomes"].append(user["monthly_income"])
+        for item in user["spending"]:
+            payload["item_user_index"].append(index)
+            payload["item_names"].append(item["name"])
+            payload["item_amounts"].append(item["amount"])
+    return payload
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--items-per-user", type=int, default=12)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    users = make_users(args.users, args.items_per_user)
+    payload = to_columnar(users)
+
+    start = time.perf_counter()
+    for user in users:
+        client.post("/budget/analyze-spending", json=user).raise_for_status()
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.post("/budget/analyze-spending/batch", json=payload).raise_for_status()
+    batch_seconds = time.perf_counter() - start
+
+    print(f"users={args.users} items_per_user={args.items_per_user}")
+    print(f"{args.users} single calls: {single_seconds * 1000:.1f} ms")
+    print(f"1 batch call:      {batch_seconds * 1000:.1f} ms")
+    print(f"speedup:           {single_seconds / batch_seconds:.1f}x")
+
+if __name__ == "__main__":
+    main()
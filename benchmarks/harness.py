@@ -0,0 +1,206 @@
+"""
+Minimal benchmark harness: a registry of benchmark factories, auto-calibrated timing,
+and JSON result files that can be compared between commits.
+"""
+import asyncio
+import datetime
+import gc
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# A benchmark factory does its setup and returns a zero-argument callable that performs one operation.
+Factory = Callable[..., Callable[[], Any]]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    factory: Factory
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def full_name(self) -> str:
+        if not self.params:
+            return self.name
+        return f"{self.name}[{','.join(f'{key}={value}' for key, value in self.params.items())}]"
+
+
+_REGISTRY: List[Benchmark] = []
+
+
+def benchmark(name: str, **param_grid: List[Any]) -> Callable[[Factory], Factory]:
+    """
+    Registers a benchmark factory, once per combination of the given parameter values.
+
+        @benchmark("cache.miss", payload_items=[1, 100])
+        def cache_miss(payload_items):
+            ...setup...
+            return lambda: ...one operation...
+    """
+    def decorator(factory: Factory) -> Factory:
+        keys = list(param_grid)
+        for values in itertools.product(*(param_grid[key] for key in keys)):
+            _REGISTRY.append(Benchmark(name=name, factory=factory, params=dict(zip(keys, values))))
+        return factory
+    return decorator
+
+
+def registered(name_filter: Optional[str] = None) -> List[Benchmark]:
+    return [b for b in _REGISTRY if not name_filter or name_filter in b.full_name]
+
+
+def sync_runner(coroutine_factory: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    Wraps an async operation so the harness can time it like a sync one, on a persistent event
+    loop that is closed once the benchmark has been timed.
+    """
+    loop = asyncio.new_event_loop()
+
+    def close() -> None:
+        # Runs what the last operation left scheduled, such as closing the async generators it
+        # dropped mid-iteration (httpx's, when a read stops early), so no task is destroyed pending
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        while pending := asyncio.all_tasks(loop):
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+    return with_cleanup(lambda: loop.run_until_complete(coroutine_factory()), close)
+
+
+def with_cleanup(operation: Callable[[], Any], cleanup: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    Attaches `cleanup` to `operation`; the harness calls it once the benchmark has been timed,
+    even if timing fails, after any cleanup `operation` already had.
+    """
+    previous = getattr(operation, "cleanup", None)
+
+    def timed() -> Any:
+        return operation()
+
+    def cleanup_all() -> None:
+        try:
+            if previous is not None:
+                previous()
+        finally:
+            cleanup()
+    timed.cleanup = cleanup_all
+    return timed
+
+
+@dataclass
+class Timing:
+    loops: int
+    samples: List[float] # seconds per operation, one per repeat
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "loops": self.loops,
+            "repeats": len(self.samples),
+            "min_s": min(self.samples),
+            "median_s": statistics.median(self.samples),
+            "mean_s": statistics.fmean(self.samples),
+            "stdev_s": statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0,
+        }
+
+
+def time_operation(operation: Callable[[], Any], min_sample_time: float = 0.05, repeats: int = 5) -> Timing:
+    """
+    Times `operation`, picking a loop count so each sample takes at least `min_sample_time`.
+    """
+    operation() # Warm-up
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_sample_time / elapsed) + 1))
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(loops):
+                operation()
+            samples.append((time.perf_counter() - start) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return Timing(loops=loops, samples=samples)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(benchmarks: List[Benchmark], min_sample_time: float = 0.05, repeats: int = 5, report: Callable[[str], None] = print) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for bench in benchmarks:
+        operation = bench.factory(**bench.params)
+        try:
+            timing = time_operation(operation, min_sample_time=min_sample_time, repeats=repeats)
+        finally:
+            cleanup = getattr(operation, "cleanup", None)
+            if cleanup is not None:
+                cleanup()
+        results[bench.full_name] = timing.to_dict()
+        report(f"{bench.full_name:<55} {format_seconds(results[bench.full_name]['median_s']):>12}  (±{format_seconds(results[bench.full_name]['stdev_s'])})")
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Compares median times of benchmarks present in both result files.
+    A benchmark regresses when head is slower than base by more than `threshold` (a fraction).
+    """
+    rows = []
+    for name in sorted(set(base["results"]) & set(head["results"])):
+        base_median = base["results"][name]["median_s"]
+        head_median = head["results"][name]["median_s"]
+        ratio = head_median / base_median if base_median else float("inf")
+        rows.append({
+            "name": name,
+            "base_s": base_median,
+            "head_s": head_median,
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(result: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
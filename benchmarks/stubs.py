@@ -0,0 +1,207 @@
+"""
+Offline stand-ins for Redis and the market data providers so benchmarks never touch the network.
+"""
+import asyncio
+import datetime
+import fnmatch
+import random
+import string
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from financial_analysis_agent.clients.data_provider import DataProvider, Quote, HistoricalData
+from financial_analysis_agent.services.quote_hub import RELEASE_LEASE_SCRIPT, RENEW_LEASE_SCRIPT
+from financial_analysis_agent.utils.symbols import Listing
+
+
+class FakeRedis:
+    """
+    In-memory subset of the redis.asyncio.Redis API used by the services.
+    """
+    def __init__(self):
+        self.store: Dict[str, Any] = {}
+        self.expiry: Dict[str, float] = {}
+        self.subscribers: Set["FakePubSub"] = set()
+
+    async def get(self, key: str) -> Optional[Any]:
+        expires_at = self.expiry.get(key)
+        if expires_at is not None and expires_at < time.monotonic():
+            self.store.pop(key, None)
+            self.expiry.pop(key, None)
+            return None
+        return self.store.get(key)
+
+    async def mget(self, keys: List[str], *args: str) -> List[Optional[Any]]:
+        return [await self.get(key) for key in [*keys, *args]]
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False, **kwargs) -> Optional[bool]:
+        if nx and await self.get(key) is not None:
+            return None
+        self.store[key] = value
+        if ex:
+            self.expiry[key] = time.monotonic() + ex
+        return True
+
+    async def setex(self, key: str, ttl: int, value: Any) -> bool:
+        return await self.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            removed += self.store.pop(key, None) is not None
+            self.expiry.pop(key, None)
+        return removed
+
+    async def scan_iter(self, match: str = "*", count: Optional[int] = None):
+        for key in list(self.store):
+            if fnmatch.fnmatchcase(key, match) and await self.get(key) is not None:
+                yield key
+
+    async def publish(self, channel: str, message: Any) -> int:
+        receivers = [pubsub for pubsub in self.subscribers if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub.messages.put_nowait({"type": "message", "channel": channel.encode(), "data": message.encode() if isinstance(message, str) else message})
+        return len(receivers)
+
+    async def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        """
+        Runs the Python equivalent of one of the Lua scripts in _SCRIPTS.
+        """
+        return await _SCRIPTS[script](self, list(keys_and_args[:numkeys]), list(keys_and_args[numkeys:]))
+
+    def pubsub(self) -> "FakePubSub":
+        return FakePubSub(self)
+
+    def clear(self) -> None:
+        self.store.clear()
+        self.expiry.clear()
+
+
+async def _renew_lease(redis: FakeRedis, keys: List[str], args: List[Any]) -> int:
+    if await redis.get(keys[0]) != args[0]:
+        return 0
+    return int(bool(await redis.set(keys[0], args[0], ex=int(args[1]))))
+
+
+async def _release_lease(redis: FakeRedis, keys: List[str], args: List[Any]) -> int:
+    if await redis.get(keys[0]) != args[0]:
+        return 0
+    return await redis.delete(keys[0])
+
+
+_SCRIPTS: Dict[str, Callable[[FakeRedis, List[str], List[Any]], Awaitable[Any]]] = {
+    RENEW_LEASE_SCRIPT: _renew_lease,
+    RELEASE_LEASE_SCRIPT: _release_lease,
+}
+
+
+class FakePubSub:
+    """
+    In-memory subset of redis.asyncio.client.PubSub; messages published on the parent FakeRedis are delivered in order.
+    """
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.channels: Set[str] = set()
+        self.messages: asyncio.Queue = asyncio.Queue()
+        redis.subscribers.add(self)
+
+    async def subscribe(self, *channels: str) -> None:
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels: str) -> None:
+        self.channels.difference_update(channels)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self) -> None:
+        self.redis.subscribers.discard(self)
+
+
+def make_bars(count: int, start_price: float = 100.0) -> List[HistoricalData]:
+    """
+    Synthetic daily bars, most recent first (the order Alpha Vantage returns).
+    """
+    bars = []
+    price = start_price
+    first_day = datetime.date(2000, 1, 3)
+    for day in range(count):
+        price *= 1.0005 if day % 3 else 0.999
+        bars.append(HistoricalData(
+            date=(first_day + datetime.timedelta(days=day)).isoformat(),
+            open=price, high=price * 1.01, low=price * 0.99, close=price, volume=1_000_000 + day,
+        ))
+    bars.reverse()
+    return bars
+
+
+def make_listings(count: int, seed: int = 1) -> List[Listing]:
+    """
+    Synthetic listings with one to three word names drawn from a shared vocabulary, about the
+    size and shape of a full LISTING_STATUS file at count=12000.
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(count // 3)]
+    return [
+        Listing(
+            f"{''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(1, 4)))}{i}",
+            " ".join(rng.choice(words).title() for _ in range(rng.randint(1, 3))) + " Inc",
+            rng.choice(["NYSE", "NASDAQ", "NYSE ARCA"]),
+            rng.choice(["Stock", "Stock", "ETF"]),
+        )
+        for i in range(count)
+    ]
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    """
+    Response body delivered in fixed-size chunks, as a network read would; counts the bytes read.
+    """
+    def __init__(self, body: bytes, chunk_size: int = 65536):
+        self._chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        self._next = 0
+        self.bytes_read = 0
+
+    def __aiter__(self) -> "ChunkedStream":
+        return self
+
+    async def __anext__(self) -> bytes:
+        if self._next == len(self._chunks):
+            raise StopAsyncIteration
+        chunk = self._chunks[self._next]
+        self._next += 1
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+class StubProvider(DataProvider):
+    """
+    Data provider that answers instantly from precomputed data.
+    """
+    def __init__(self, bars: int = 252):
+        self._bars = make_bars(bars)
+
+    async def get_quote(self, symbol: str) -> Quote:
+        return Quote(symbol=symbol, price=self._bars[0].close, currency="USD")
+
+    async def get_historical_data(self, symbol: str, period: str) -> List[HistoricalData]:
+        return self._bars
+
+
+class StubProviderFactory:
+    """
+    Stand-in for DataProviderFactory exposing the same lookup methods.
+    """
+    def __init__(self, providers: Dict[str, DataProvider]):
+        self._providers = providers
+
+    def get_provider(self, provider_name: str) -> DataProvider:
+        return self._providers[provider_name]
+
+    def get_all_providers(self) -> Dict[str, DataProvider]:
+        return self._providers
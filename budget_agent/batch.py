@@ -0,0 +1,169 @@
+from typing import List
+import numpy as np
+
+from budget_agent.schemas import SpendingBatchInput, SpendingBatchResult, SpendingRecommendation
+from budget_agent.categorization import BUCKETS, NEEDS, WANTS, SAVINGS, get_classifier
+from budget_agent.spending import (
+    NEEDS_SHARE,
+    WANTS_SHARE,
+    SAVINGS_SHARE,
+    HIGH_CATEGORY_SHARE,
+    DISCRETIONARY_CATEGORY_SHARE,
+    overspend_advice,
+    high_category_recommendation,
+    within_allocation_summary,
+    well_within_summary,
+    wants_overage_recommendation,
+    discretionary_recommendation,
+)
+
+_BUCKET_CODES = {bucket: code for code, bucket in enumerate(BUCKETS)}
+_NEEDS, _WANTS, _SAVINGS = _BUCKET_CODES[NEEDS], _BUCKET_CODES[WANTS], _BUCKET_CODES[SAVINGS]
+
+
+def _first_per_user(group_users: np.ndarray, order_keys: tuple, num_users: int, candidates: np.ndarray) -> np.ndarray:
+    """
+    Returns, per user, the position of the first candidate group under `order_keys`
+    (a np.lexsort key tuple whose last key is the user), or -1 if the user has none.
+    """
+    positions = np.full(num_users, -1, dtype=np.int64)
+    candidate_positions = np.flatnonzero(candidates)
+    if len(candidate_positions):
+        order = candidate_positions[np.lexsort(tuple(key[candidate_positions] for key in order_keys))]
+        users, first = np.unique(group_users[order], return_index=True)
+        positions[users] = order[first]
+    return positions
+
+
+def analyze_spending_batch(batch: SpendingBatchInput) -> List[SpendingBatchResult]:
+    """
+    Runs the spending analysis for every user in a columnar batch.
+
+    Aggregation, 50/30/20 adherence and recommendation thresholds are computed as
+    NumPy group-by operations over all items at once; only the final assembly of
+    each user's response is done per user. Results are returned in the order of
+    `batch.user_ids` and match what `/budget/analyze-spending` returns for each user.
+    """
+    num_users = len(batch.user_ids)
+    incomes = np.asarray(batch.monthly_incomes, dtype=np.float64)
+    item_users = np.asarray(batch.item_user_index, dtype=np.int64)
+    amounts = np.asarray(batch.item_amounts, dtype=np.float64)
+
+    # np.bincount accumulates in item order, so per-user and per-category sums are
+    # bit-for-bit identical to the sequential sums of the single-user endpoint.
+    totals = np.bincount(item_users, weights=amounts, minlength=num_users)
+
+    category_names, category_codes = np.unique(np.asarray(batch.item_names, dtype=str), return_inverse=True)
+    num_categories = max(len(category_names), 1)
+
+    # Group by (user, category)
+    group_keys = item_users * num_categories + category_codes
+    unique_keys, first_index, group_codes = np.unique(group_keys, return_index=True, return_inverse=True)
+    group_sums = np.bincount(group_codes, weights=amounts)
+    group_users = unique_keys // num_categories
+    group_categories = unique_keys % num_categories
+
+    # Order groups by user, then by first appearance, to mirror dict insertion order
+    group_order = np.lexsort((first_index, group_users))
+    group_users = group_users[group_order]
+    group_categories = group_categories[group_order]
+    group_sums = group_sums[group_order]
+    first_index = first_index[group_order]
+    group_bounds = np.searchsorted(group_users, np.arange(num_users + 1))
+
+    # 50/30/20 limits and branch selection
+    needs_limits = incomes * NEEDS_SHARE
+    wants_limits = incomes * WANTS_SHARE
+    savings_targets = incomes * SAVINGS_SHARE
+    income_percentages = (totals / incomes) * 100
+    over_budget = totals > (needs_limits + wants_limits)
+    within_allocation = ~over_budget & (totals > needs_limits)
+
+    # Needs/wants/savings bucket per group: classify each distinct category name once,
+    # then re-classify only the groups of users that have overrides
+    classifier = get_classifier()
+    category_buckets = np.array([_BUCKET_CODES[classifier.classify(name)] for name in category_names.tolist()], dtype=np.int64)
+    group_buckets = category_buckets[group_categories] if len(category_buckets) else np.zeros(0, dtype=np.int64)
+    if batch.category_overrides:
+        for user, user_id in enumerate(batch.user_ids):
+            overrides = batch.category_overrides.get(user_id)
+            if overrides:
+                user_classifier = get_classifier(user_id, overrides)
+                for g in range(group_bounds[user], group_bounds[user + 1]):
+                    group_buckets[g] = _BUCKET_CODES[user_classifier.classify(category_names[group_categories[g]])]
+    bucket_sums = np.bincount(group_users * len(BUCKETS) + group_buckets, weights=group_sums, minlength=num_users * len(BUCKETS)).reshape(num_users, len(BUCKETS))
+
+    # Top category per user (largest amount, ties broken by first appearance), overall and among wants
+    ranking = (first_index, -group_sums, group_users)
+    top_positions = _first_per_user(group_users, ranking, num_users, np.ones(len(group_sums), dtype=bool))
+    top_amounts = np.where(top_positions >= 0, group_sums[top_positions.clip(min=0)] if len(group_sums) else 0.0, 0.0)
+    flag_top_category = within_allocation & (top_positions >= 0) & (top_amounts > incomes * HIGH_CATEGORY_SHARE)
+
+    flag_wants_overage = bucket_sums[:, _WANTS] > wants_limits
+    top_wants_positions = _first_per_user(group_users, ranking, num_users, group_buckets == _WANTS)
+
+    # Individual discretionary categories that are high relative to income
+    flag_discretionary = (group_buckets == _WANTS) & (group_sums > incomes[group_users] * DISCRETIONARY_CATEGORY_SHARE)
+
+    # Assemble responses; convert to Python scalars once
+    names = category_names.tolist()
+    group_categories_list = group_categories.tolist()
+    group_sums_list = group_sums.tolist()
+    flag_discretionary_list = flag_discretionary.tolist()
+    bounds = group_bounds.tolist()
+    top_positions_list = top_positions.tolist()
+    top_wants_positions_list = top_wants_positions.tolist()
+    bucket_sums_list = bucket_sums.tolist()
+    needs_percentages = (bucket_sums[:, _NEEDS] / needs_limits * 100).tolist()
+    wants_percentages = (bucket_sums[:, _WANTS] / wants_limits * 100).tolist()
+
+    results: List[SpendingBatchResult] = []
+    for user, (user_id, total, needs_limit, wants_limit, savings_target, percentage, over, within, flag_top, flag_wants) in enumerate(zip(
+        batch.user_ids, totals.tolist(), needs_limits.tolist(), wants_limits.tolist(),
+        savings_targets.tolist(), income_percentages.tolist(), over_budget.tolist(), within_allocation.tolist(),
+        flag_top_category.tolist(), flag_wants_overage.tolist(),
+    )):
+        start, end = bounds[user], bounds[user + 1]
+        spending_by_category = {names[group_categories_list[g]]: group_sums_list[g] for g in range(start, end)}
+
+        recommendations: List[SpendingRecommendation] = []
+        flagged = set() # Groups that already have a savings recommendation
+        if over:
+            summary, recommendation = overspend_advice(total, needs_limit, wants_limit)
+            recommendations.append(recommendation)
+        elif within:
+            if flag_top:
+                top = top_positions_list[user]
+                recommendations.append(high_category_recommendation(names[group_categories_list[top]], group_sums_list[top]))
+                flagged.add(top)
+            summary = within_allocation_summary(total)
+        else:
+            summary = well_within_summary(total)
+        needs_spending, wants_spending, savings_contributions = bucket_sums_list[user]
+        if flag_wants:
+            top_wants = top_wants_positions_list[user]
+            recommendations.append(wants_overage_recommendation(wants_spending, wants_limit, names[group_categories_list[top_wants]]))
+            flagged.add(top_wants)
+        for g in range(start, end):
+            if flag_discretionary_list[g] and g not in flagged:
+                recommendations.append(discretionary_recommendation(names[group_categories_list[g]], group_sums_list[g]))
+
+        results.append(SpendingBatchResult(
+            user_id=user_id,
+            total_spending=total,
+            spending_by_category=spending_by_category,
+            budget_adherence={
+                "needs_limit": needs_limit,
+                "wants_limit": wants_limit,
+                "savings_target": savings_target,
+                "total_spending_vs_income_percentage": percentage,
+                "needs_spending": needs_spending,
+                "wants_spending": wants_spending,
+                "savings_contributions": savings_contributions,
+                "needs_vs_limit_percentage": needs_percentages[user],
+                "wants_vs_limit_percentage": wants_percentages[user],
+            },
+            recommendations=recommendations,
+            summary=summary,
+        ))
+    return results
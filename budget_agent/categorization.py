@@ -0,0 +1,192 @@
+from collections import OrderedDict, deque
+import functools
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+NEEDS = "needs"
+WANTS = "wants"
+SAVINGS = "savings"
+BUCKETS = (NEEDS, WANTS, SAVINGS)
+
+# Spending that matches no keyword is treated as discretionary
+DEFAULT_BUCKET = WANTS
+
+# Keywords are matched as substrings of the normalized merchant or category name;
+# keywords of up to SHORT_KEYWORD_LENGTH characters must match whole words ("ira" but not "pirate").
+# When several keywords match, the longest one wins (e.g. "gas station" over "tax").
+SHORT_KEYWORD_LENGTH = 3
+
+DEFAULT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    NEEDS: (
+        "rent", "mortgage", "housing", "property tax", "hoa",
+        "grocer", "supermarket", "costco", "walmart", "aldi", "kroger", "safeway", "whole foods", "trader joe",
+        "utilit", "electric", "water bill", "sewer", "gas bill", "heating", "internet", "phone", "mobile", "verizon", "at&t", "t-mobile", "comcast",
+        "insurance", "medical", "doctor", "dentist", "hospital", "pharmacy", "cvs", "walgreens", "prescription", "health",
+        "childcare", "daycare", "tuition", "school",
+        "transport", "transit", "bus", "train", "subway", "metro", "fuel", "gas station", "shell", "chevron", "exxon", "parking", "car payment", "auto loan",
+        "loan payment", "student loan", "minimum payment", "debt", "tax",
+    ),
+    WANTS: (
+        "dining", "restaurant", "takeout", "take-out", "doordash", "uber eats", "grubhub", "cafe", "coffee", "starbucks", "bar", "pub", "fast food", "mcdonald",
+        "entertainment", "movie", "cinema", "concert", "theater", "netflix", "spotify", "hulu", "disney+", "streaming", "gaming", "steam", "playstation", "xbox",
+        "shopping", "amazon", "clothing", "apparel", "fashion", "electronics", "target", "best buy",
+        "travel", "vacation", "hotel", "airbnb", "airline", "flight",
+        "gym", "fitness", "hobby", "subscription", "beauty", "salon", "spa", "gift", "alcohol", "liquor",
+    ),
+    SAVINGS: (
+        "saving", "emergency fund", "investment", "invest", "brokerage", "401k", "401(k)", "ira", "roth", "retirement",
+        "index fund", "etf", "certificate of deposit", "extra debt payment",
+    ),
+}
+
+
+_PUNCTUATION = str.maketrans({char: " " for char in "!\"#$%*,-./:;<=>?@[\\]^_`{|}~"})
+
+
+def normalize_name(name: str) -> str:
+    """
+    Lower-cases, strips punctuation and pads with spaces so whole-word keywords can match at the edges.
+    """
+    return " " + " ".join(name.lower().translate(_PUNCTUATION).split()) + " "
+
+
+def _normalize_keyword(keyword: str) -> str:
+    normalized = normalize_name(keyword).strip()
+    return f" {normalized} " if len(normalized) <= SHORT_KEYWORD_LENGTH else normalized
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over bucket keywords.
+
+    All keywords are matched in a single pass over the input, so the cost per lookup
+    depends on the length of the name, not on the number of keywords.
+    """
+    def __init__(self, keywords: Mapping[str, Iterable[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Longest keyword ending at each state (following failure links): (length, bucket)
+        self._output: List[Optional[Tuple[int, str]]] = [None]
+
+        for bucket, bucket_keywords in keywords.items():
+            for keyword in bucket_keywords:
+                self._add(_normalize_keyword(keyword), bucket)
+        self._build_failure_links()
+
+    def _add(self, keyword: str, bucket: str) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+            state = next_state
+        current = self._output[state]
+        if current is None or len(keyword) > current[0]:
+            self._output[state] = (len(keyword), bucket)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                if state:
+                    fallback = self._fail[state]
+                    while fallback and char not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    self._fail[next_state] = self._goto[fallback].get(char, 0)
+                inherited = self._output[self._fail[next_state]]
+                own = self._output[next_state]
+                if own is None or (inherited is not None and inherited[0] > own[0]):
+                    self._output[next_state] = inherited
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Returns the bucket of the longest keyword found in `text`, or None.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        best: Optional[Tuple[int, str]] = None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = output[state]
+            if found is not None and (best is None or found[0] > best[0]):
+                best = found
+        return best[1] if best else None
+
+
+class CategoryClassifier:
+    """
+    Maps free-text merchant or category names to needs, wants and savings buckets.
+
+    User overrides (exact, case-insensitive names) take precedence over keyword matches.
+    Results are memoized per name, since real transaction data repeats the same few
+    hundred merchants over and over.
+    """
+    MAX_MEMO_SIZE = 50_000
+
+    def __init__(self, automaton: KeywordAutomaton, overrides: Optional[Mapping[str, str]] = None):
+        self._automaton = automaton
+        self._overrides = {normalize_name(name): bucket for name, bucket in (overrides or {}).items()}
+        self._memo: Dict[str, str] = {}
+
+    def classify(self, name: str) -> str:
+        bucket = self._memo.get(name)
+        if bucket is not None:
+            return bucket
+
+        normalized = normalize_name(name)
+        bucket = self._overrides.get(normalized) or self._automaton.match(normalized) or DEFAULT_BUCKET
+        if len(self._memo) >= self.MAX_MEMO_SIZE:
+            self._memo.clear()
+        self._memo[name] = bucket
+        return bucket
+
+    def classify_many(self, names: Iterable[str]) -> List[str]:
+        classify = self.classify
+        return [classify(name) for name in names]
+
+
+@functools.lru_cache(maxsize=1)
+def default_automaton() -> KeywordAutomaton:
+    """
+    Builds the keyword automaton once per process.
+    """
+    return KeywordAutomaton(DEFAULT_KEYWORDS)
+
+
+class ClassifierCache:
+    """
+    LRU cache of per-user classifiers, keyed by user and override set, so each user's
+    memoized lookups survive across requests.
+    """
+    def __init__(self, max_users: int = 10_000):
+        self._max_users = max_users
+        self._classifiers: "OrderedDict[Tuple[Optional[str], frozenset], CategoryClassifier]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Optional[str] = None, overrides: Optional[Mapping[str, str]] = None) -> CategoryClassifier:
+        key = (user_id, frozenset((overrides or {}).items()))
+        with self._lock:
+            classifier = self._classifiers.get(key)
+            if classifier is not None:
+                self._classifiers.move_to_end(key)
+                return classifier
+            classifier = CategoryClassifier(default_automaton(), overrides)
+            self._classifiers[key] = classifier
+            if len(self._classifiers) > self._max_users:
+                self._classifiers.popitem(last=False)
+            return classifier
+
+
+classifier_cache = ClassifierCache()
+
+
+def get_classifier(user_id: Optional[str] = None, overrides: Optional[Mapping[str, str]] = None) -> CategoryClassifier:
+    return classifier_cache.get(user_id, overrides)
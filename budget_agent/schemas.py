@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Dict, Optional, Literal
+
+Bucket = Literal["needs", "wants", "savings"]
 
 class IncomeInput(BaseModel):
     monthly_income: float = Field(..., gt=0, description="User's monthly income.")
@@ -20,15 +22,56 @@ class SpendingCategory(BaseModel):
 class SpendingAnalysisInput(BaseModel):
     monthly_income: float = Field(..., gt=0, description="User's monthly income.")
     spending: List[SpendingCategory] = Field(..., description="List of spending categories and amounts.")
+    user_id: Optional[str] = Field(None, description="User identifier, used to cache the user's categorization.")
+    category_overrides: Optional[Dict[str, Bucket]] = Field(None, description="User-specific mapping of category or merchant names to 'needs', 'wants' or 'savings'.")
 
 class SpendingRecommendation(BaseModel):
     category: str = Field(..., description="The spending category for the recommendation.")
     recommendation: str = Field(..., description="Actionable advice for the category.")
     potential_savings: float = Field(..., ge=0, description="Estimated potential savings from this recommendation.")
 
+class MonthlySpending(BaseModel):
+    month: str = Field(..., description="Month in YYYY-MM format.")
+    total_spending: float
+    transaction_count: int
+    change_percent: Optional[float] = Field(None, description="Change versus the previous month with spending.")
+
 class SpendingAnalysisOutput(BaseModel):
     total_spending: float
     spending_by_category: Dict[str, float]
     budget_adherence: Dict[str, float]
     recommendations: List[SpendingRecommendation]
     summary: str
+    trends: Optional[List[MonthlySpending]] = Field(None, description="Month-by-month spending, for transaction uploads.")
+
+class SpendingBatchInput(BaseModel):
+    """
+    Columnar spending payload for many users. Spending items are flattened across users,
+    with `item_user_index` pointing each item at its user in `user_ids`.
+    """
+    user_ids: List[str] = Field(..., description="Identifier of each user in the batch.")
+    monthly_incomes: List[float] = Field(..., description="Monthly income of each user, aligned with user_ids.")
+    item_user_index: List[int] = Field(..., description="Index into user_ids of the user each spending item belongs to.")
+    item_names: List[str] = Field(..., description="Spending category name of each item.")
+    item_amounts: List[float] = Field(..., description="Amount spent for each item.")
+    category_overrides: Optional[Dict[str, Dict[str, Bucket]]] = Field(None, description="Per-user categorization overrides, keyed by user ID.")
+
+    @model_validator(mode="after")
+    def check_columns(self) -> "SpendingBatchInput":
+        if len(self.monthly_incomes) != len(self.user_ids):
+            raise ValueError("monthly_incomes must have one entry per user.")
+        if not (len(self.item_user_index) == len(self.item_names) == len(self.item_amounts)):
+            raise ValueError("item_user_index, item_names and item_amounts must have the same length.")
+        if any(income <= 0 for income in self.monthly_incomes):
+            raise ValueError("monthly_incomes must be greater than 0.")
+        if any(amount <= 0 for amount in self.item_amounts):
+            raise ValueError("item_amounts must be greater than 0.")
+        if self.item_user_index and (min(self.item_user_index) < 0 or max(self.item_user_index) >= len(self.user_ids)):
+            raise ValueError("item_user_index must point into user_ids.")
+        return self
+
+class SpendingBatchResult(SpendingAnalysisOutput):
+    user_id: str
+
+class SpendingBatchOutput(BaseModel):
+    results: List[SpendingBatchResult]
@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional, Tuple
+from budget_agent.schemas import SpendingAnalysisOutput, SpendingRecommendation
+from budget_agent.categorization import CategoryClassifier, NEEDS, WANTS, SAVINGS, BUCKETS, get_classifier
+
+# 50/30/20 rule shares
+NEEDS_SHARE = 0.50
+WANTS_SHARE = 0.30
+SAVINGS_SHARE = 0.20
+
+# A single category above this share of income is flagged as a high spending category
+HIGH_CATEGORY_SHARE = 0.10
+# A discretionary ("wants") category above this share of income gets its own recommendation
+DISCRETIONARY_CATEGORY_SHARE = 0.05
+
+
+def bucket_totals(spending_by_category: Dict[str, float], buckets: Dict[str, str]) -> Dict[str, float]:
+    """
+    Sums category totals per needs/wants/savings bucket, in category order.
+    """
+    totals = {bucket: 0.0 for bucket in BUCKETS}
+    for name, amount in spending_by_category.items():
+        totals[buckets[name]] += amount
+    return totals
+
+
+def budget_adherence(monthly_income: float, total_spending: float, spending_by_bucket: Dict[str, float]) -> Dict[str, float]:
+    """
+    Compares total and per-bucket spending against the 50/30/20 limits for the given income.
+    """
+    return {
+        "needs_limit": monthly_income * NEEDS_SHARE,
+        "wants_limit": monthly_income * WANTS_SHARE,
+        "savings_target": monthly_income * SAVINGS_SHARE,
+        "total_spending_vs_income_percentage": (total_spending / monthly_income) * 100 if monthly_income > 0 else 0,
+        "needs_spending": spending_by_bucket[NEEDS],
+        "wants_spending": spending_by_bucket[WANTS],
+        "savings_contributions": spending_by_bucket[SAVINGS],
+        "needs_vs_limit_percentage": (spending_by_bucket[NEEDS] / (monthly_income * NEEDS_SHARE)) * 100 if monthly_income > 0 else 0,
+        "wants_vs_limit_percentage": (spending_by_bucket[WANTS] / (monthly_income * WANTS_SHARE)) * 100 if monthly_income > 0 else 0,
+    }
+
+
+def overspend_advice(total_spending: float, needs_limit: float, wants_limit: float) -> Tuple[str, SpendingRecommendation]:
+    overspend_amount = total_spending - (needs_limit + wants_limit)
+    summary = f"Your total spending of ${total_spending:.2f} exceeds your combined needs and wants budget of ${needs_limit + wants_limit:.2f} by ${overspend_amount:.2f}. This leaves no room for savings."
+    recommendation = SpendingRecommendation(
+        category="General Spending",
+        recommendation="Review all discretionary spending to find areas to cut back to meet your savings goals.",
+        potential_savings=overspend_amount
+    )
+    return summary, recommendation
+
+
+def high_category_recommendation(category: str, amount: float) -> SpendingRecommendation:
+    return SpendingRecommendation(
+        category=category,
+        recommendation=f"Your spending in '{category}' is ${amount:.2f}. Consider reducing this by 10-20% to free up funds for savings or other goals.",
+        potential_savings=amount * 0.15 # Example potential saving
+    )
+
+
+def within_allocation_summary(total_spending: float) -> str:
+    return f"Your total spending is ${total_spending:.2f}. You are within your 'needs' and 'wants' allocation, but could optimize further to maximize savings."
+
+
+def well_within_summary(total_spending: float) -> str:
+    return f"Your spending of ${total_spending:.2f} is well within your 'needs' and 'wants' budget. Great job! Consider allocating more to savings or investments."
+
+
+def wants_overage_recommendation(wants_spending: float, wants_limit: float, top_wants_category: str) -> SpendingRecommendation:
+    return SpendingRecommendation(
+        category="Wants",
+        recommendation=f"Your discretionary ('wants') spending of ${wants_spending:.2f} is above the 30% guideline of ${wants_limit:.2f}. Start with '{top_wants_category}', your largest discretionary category.",
+        potential_savings=wants_spending - wants_limit
+    )
+
+
+def discretionary_recommendation(category: str, amount: float) -> SpendingRecommendation:
+    return SpendingRecommendation(
+        category=category,
+        recommendation=f"Your '{category}' spending is ${amount:.2f}. Try reducing it by 25% to save an estimated ${amount * 0.25:.2f}.",
+        potential_savings=amount * 0.25
+    )
+
+
+def build_spending_analysis(
+    monthly_income: float,
+    spending_by_category: Dict[str, float],
+    total_spending: Optional[float] = None,
+    classifier: Optional[CategoryClassifier] = None,
+) -> SpendingAnalysisOutput:
+    """
+    Builds the spending analysis for one user from per-category totals.
+
+    `spending_by_category` must preserve the order in which categories were first seen,
+    since ties between equally large categories are broken by that order. Categories are
+    assigned to needs, wants and savings buckets with `classifier` (the shared default
+    classifier if not given).
+    """
+    if total_spending is None:
+        total_spending = sum(spending_by_category.values())
+    if classifier is None:
+        classifier = get_classifier()
+
+    buckets = {name: classifier.classify(name) for name in spending_by_category}
+    spending_by_bucket = bucket_totals(spending_by_category, buckets)
+    adherence = budget_adherence(monthly_income, total_spending, spending_by_bucket)
+    budget_needs_limit = adherence["needs_limit"]
+    budget_wants_limit = adherence["wants_limit"]
+
+    recommendations: List[SpendingRecommendation] = []
+    summary_messages: List[str] = []
+    flagged_categories = set() # Categories that already have a savings recommendation
+
+    if total_spending > (budget_needs_limit + budget_wants_limit):
+        summary, recommendation = overspend_advice(total_spending, budget_needs_limit, budget_wants_limit)
+        summary_messages.append(summary)
+        recommendations.append(recommendation)
+    elif total_spending > budget_needs_limit:
+        # Check if "Wants" categories are contributing to high spending
+        # This is a very basic example; a real system would need more intelligence
+        sorted_spending = sorted(spending_by_category.items(), key=lambda item: item[1], reverse=True)
+        top_category, top_amount = sorted_spending[0] if sorted_spending else ("", 0)
+
+        if top_category and top_amount > (monthly_income * HIGH_CATEGORY_SHARE):
+            recommendations.append(high_category_recommendation(top_category, top_amount))
+            flagged_categories.add(top_category)
+        summary_messages.append(within_allocation_summary(total_spending))
+    else:
+        summary_messages.append(well_within_summary(total_spending))
+
+    # Discretionary spending above the 30% guideline
+    if spending_by_bucket[WANTS] > budget_wants_limit:
+        wants_categories = [(name, amount) for name, amount in spending_by_category.items() if buckets[name] == WANTS]
+        top_wants_category = max(wants_categories, key=lambda item: item[1])[0]
+        recommendations.append(wants_overage_recommendation(spending_by_bucket[WANTS], budget_wants_limit, top_wants_category))
+        flagged_categories.add(top_wants_category)
+
+    # Individual discretionary categories that are high relative to income, unless already
+    # flagged above; repeating them would count the same potential savings twice
+    for name, amount in spending_by_category.items():
+        if name in flagged_categories:
+            continue
+        if buckets[name] == WANTS and amount > (monthly_income * DISCRETIONARY_CATEGORY_SHARE):
+            recommendations.append(discretionary_recommendation(name, amount))
+
+    return SpendingAnalysisOutput(
+        total_spending=total_spending,
+        spending_by_category=spending_by_category,
+        budget_adherence=adherence,
+        recommendations=recommendations,
+        summary=" ".join(summary_messages)
+    )
@@ -0,0 +1,220 @@
+import csv
+import datetime
+import json
+import math
+from typing import AsyncIterable, Dict, Iterable, List, Optional
+
+from budget_agent.schemas import MonthlySpending, SpendingAnalysisOutput
+from budget_agent.spending import build_spending_analysis
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError: # orjson is an optional speed-up
+    _json_loads = json.loads
+
+# Longest record accepted; keeps memory bounded even if a client never sends a newline
+MAX_LINE_BYTES = 64 * 1024
+# Distinct categories kept per upload; later new names are added to OVERFLOW_CATEGORY
+MAX_CATEGORIES = 1000
+MAX_CATEGORY_NAME_CHARS = 100
+OVERFLOW_CATEGORY = "Other"
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+
+
+class TransactionParseError(ValueError):
+    """Raised when an uploaded transaction record cannot be parsed."""
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"Line {line_number}: {message}")
+        self.line_number = line_number
+
+
+class SpendingAggregator:
+    """
+    Aggregates transactions per category and per month as they arrive.
+
+    Memory does not grow with the number of transactions. Categories are capped at
+    MAX_CATEGORIES names of at most MAX_CATEGORY_NAME_CHARS characters; once the cap is
+    reached, new names are totalled under OVERFLOW_CATEGORY. Months are one entry per
+    calendar month the upload spans.
+    Each transaction has an ISO `date` (YYYY-MM-DD, optionally followed by a time), a
+    category `name` and an `amount`. Negative amounts are treated as refunds. The parsers
+    validate both before calling add().
+    """
+    def __init__(self):
+        self.category_totals: Dict[str, float] = {}
+        self.month_totals: Dict[str, float] = {}
+        self.month_counts: Dict[str, int] = {}
+        self.transaction_count = 0
+
+    def add(self, date: str, name: str, amount: float) -> None:
+        month = date[:7]
+        name = name[:MAX_CATEGORY_NAME_CHARS]
+        if name not in self.category_totals and len(self.category_totals) >= MAX_CATEGORIES:
+            name = OVERFLOW_CATEGORY
+        self.category_totals[name] = self.category_totals.get(name, 0.0) + amount
+        self.month_totals[month] = self.month_totals.get(month, 0.0) + amount
+        self.month_counts[month] = self.month_counts.get(month, 0) + 1
+        self.transaction_count += 1
+
+    def trends(self) -> List[MonthlySpending]:
+        trends: List[MonthlySpending] = []
+        previous: Optional[float] = None
+        for month in sorted(self.month_totals):
+            total = self.month_totals[month]
+            change_percent = ((total - previous) / previous) * 100 if previous else None
+            trends.append(MonthlySpending(
+                month=month,
+                total_spending=total,
+                transaction_count=self.month_counts[month],
+                change_percent=change_percent,
+            ))
+            previous = total
+        return trends
+
+    def analysis(self, monthly_income: float) -> SpendingAnalysisOutput:
+        """
+        Builds the analysis on the average month, so it is comparable to the monthly
+        income, and attaches the month-by-month trend.
+        """
+        num_months = max(len(self.month_totals), 1)
+        monthly_by_category = {name: total / num_months for name, total in self.category_totals.items()}
+        analysis = build_spending_analysis(monthly_income, monthly_by_category)
+        analysis.trends = self.trends()
+        return analysis
+
+
+class _LineSplitter:
+    """Splits a stream of byte chunks into complete text lines."""
+    def __init__(self):
+        self._pending = b""
+        self._line_count = 0
+
+    def feed(self, chunk: bytes) -> List[str]:
+        data = self._pending + chunk
+        lines = data.split(b"\n")
+        self._pending = lines.pop()
+        self._line_count += len(lines)
+        if len(self._pending) > MAX_LINE_BYTES:
+            raise TransactionParseError(self._line_count + 1, f"record exceeds {MAX_LINE_BYTES} bytes")
+        return [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+
+    def flush(self) -> List[str]:
+        pending, self._pending = self._pending, b""
+        return [pending.decode("utf-8", errors="replace").rstrip("\r")] if pending else []
+
+
+def _parse_amount(value, line_number: int) -> float:
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise TransactionParseError(line_number, f"invalid amount {value!r}")
+    if not math.isfinite(amount):
+        raise TransactionParseError(line_number, f"invalid amount {value!r}")
+    return amount
+
+
+def _parse_date(value, line_number: int) -> str:
+    date = str(value).strip()
+    try:
+        datetime.date.fromisoformat(date[:10])
+    except ValueError:
+        raise TransactionParseError(line_number, f"invalid date {value!r}; expected YYYY-MM-DD")
+    if len(date) > 10 and date[10] not in "T ":
+        raise TransactionParseError(line_number, f"invalid date {value!r}; expected YYYY-MM-DD")
+    return date
+
+
+class _NdjsonParser:
+    def __init__(self, aggregator: SpendingAggregator):
+        self.aggregator = aggregator
+        self.line_number = 0
+
+    def feed_lines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = _json_loads(line)
+                date, name, amount = record["date"], record["name"], record["amount"]
+            except (ValueError, KeyError, TypeError) as e:
+                raise TransactionParseError(self.line_number, f"invalid transaction record: {e}")
+            self.aggregator.add(_parse_date(date, self.line_number), str(name), _parse_amount(amount, self.line_number))
+
+    def close(self) -> None:
+        pass
+
+
+class _CsvParser:
+    """
+    Parses CSV lines into transactions. A quoted field may contain newlines, so lines are
+    buffered until the quotes of the record are balanced before it is parsed.
+    """
+    REQUIRED_COLUMNS = ("date", "name", "amount")
+
+    def __init__(self, aggregator: SpendingAggregator):
+        self.aggregator = aggregator
+        self.line_number = 0
+        self._columns: Optional[List[int]] = None
+        self._record: List[str] = []
+        self._record_size = 0
+        self._in_quotes = False
+
+    def feed_lines(self, lines: List[str]) -> None:
+        for line in lines:
+            self._record.append(line)
+            self._record_size += len(line) + 1
+            # Escaped quotes are doubled, so an odd count opens or closes a quoted field
+            if line.count('"') % 2:
+                self._in_quotes = not self._in_quotes
+            if self._in_quotes:
+                if self._record_size > MAX_LINE_BYTES:
+                    raise TransactionParseError(self.line_number + 1, f"record exceeds {MAX_LINE_BYTES} bytes")
+                continue
+            record, self._record, self._record_size = self._record, [], 0
+            self._parse_record(next(csv.reader(["\n".join(record)]), []))
+            self.line_number += len(record) - 1
+
+    def close(self) -> None:
+        if self._record:
+            raise TransactionParseError(self.line_number + 1, "unterminated quoted field")
+
+    def _parse_record(self, row: List[str]) -> None:
+        self.line_number += 1
+        if not row:
+            return
+        if self._columns is None:
+            header = [column.strip().lower() for column in row]
+            missing = [column for column in self.REQUIRED_COLUMNS if column not in header]
+            if missing:
+                raise TransactionParseError(self.line_number, f"CSV header is missing columns: {', '.join(missing)}")
+            self._columns = [header.index(column) for column in self.REQUIRED_COLUMNS]
+            return
+        try:
+            date, name, amount = (row[index] for index in self._columns)
+        except IndexError:
+            raise TransactionParseError(self.line_number, "row has fewer columns than the header")
+        self.aggregator.add(_parse_date(date, self.line_number), name, _parse_amount(amount, self.line_number))
+
+
+async def aggregate_transactions(chunks: AsyncIterable[bytes], media_type: str) -> SpendingAggregator:
+    """
+    Consumes an NDJSON or CSV upload chunk by chunk and returns the aggregated totals.
+    """
+    aggregator = SpendingAggregator()
+    if media_type in NDJSON_MEDIA_TYPES:
+        parser = _NdjsonParser(aggregator)
+    elif media_type in CSV_MEDIA_TYPES:
+        parser = _CsvParser(aggregator)
+    else:
+        raise ValueError(f"Unsupported media type '{media_type}'. Use one of: {', '.join(NDJSON_MEDIA_TYPES + CSV_MEDIA_TYPES)}.")
+
+    splitter = _LineSplitter()
+    async for chunk in chunks:
+        parser.feed_lines(splitter.feed(chunk))
+    parser.feed_lines(splitter.flush())
+    parser.close()
+    return aggregator
@@ -136,3 +136,10 @@ def test_analyze_spending_with_zero_income():
     )
     assert response.status_code == 422 # income must be gt=0
 
+
+def test_metrics_endpoint_reports_requests_by_route():
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
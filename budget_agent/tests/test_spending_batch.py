@@ -0,0 +1,85 @@
+import random
+from fastapi.testclient import TestClient
+from budget_agent.main import app
+from budget_agent.schemas import SpendingBatchOutput
+
+client = TestClient(app)
+
+CATEGORIES = ["Rent", "Groceries", "Utilities", "Dining Out", "Entertainment", "Shopping", "Travel", "Roth IRA", "Gym"]
+
+def _random_users(num_users: int, seed: int = 7):
+    rng = random.Random(seed)
+    users = []
+    for i in range(num_users):
+        income = rng.choice([2500, 4000, 5000, 8000])
+        spending = [
+            {"name": rng.choice(CATEGORIES), "amount": round(rng.uniform(10, 2500), 2)}
+            for _ in range(rng.randint(0, 8))
+        ]
+        user = {"user_id": f"user-{i}", "monthly_income": income, "spending": spending}
+        if i % 5 == 0:
+            user["category_overrides"] = {"gym": "needs", "travel": "savings"}
+        users.append(user)
+    return users
+
+def _to_columnar(users):
+    payload = {"user_ids": [], "monthly_incomes": [], "item_user_index": [], "item_names": [], "item_amounts": [], "category_overrides": {}}
+    for index, user in enumerate(users):
+        if "category_overrides" in user:
+            payload["category_overrides"][user["user_id"]] = user["category_overrides"]
+        payload["user_ids"].append(user["user_id"])
+        payload["monthly_incomes"].append(user["monthly_income"])
+        for item in user["spending"]:
+            payload["item_user_index"].append(index)
+            payload["item_names"].append(item["name"])
+            payload["item_amounts"].append(item["amount"])
+    return payload
+
+def test_batch_matches_single_calls():
+    users = _random_users(200)
+    response = client.post("/budget/analyze-spending/batch", json=_to_columnar(users))
+    assert response.status_code == 200
+    output = SpendingBatchOutput(**response.json())
+    assert [result.user_id for result in output.results] == [user["user_id"] for user in users]
+
+    for user, result in zip(users, response.json()["results"]):
+        if not user["spending"]:
+            continue
+        single = client.post("/budget/analyze-spending", json=user).json()
+        result.pop("user_id")
+        assert result == single
+
+def test_batch_tie_breaks_on_first_appearance():
+    users = [{"user_id": "u", "monthly_income": 5000, "spending": [
+        {"name": "Groceries", "amount": 700}, {"name": "Rent", "amount": 1400}, {"name": "Groceries", "amount": 700},
+    ]}]
+    result = client.post("/budget/analyze-spending/batch", json=_to_columnar(users)).json()["results"][0]
+    assert list(result["spending_by_category"]) == ["Groceries", "Rent"]
+    assert result["recommendations"][0]["category"] == "Groceries"
+
+def test_batch_user_without_items():
+    users = [{"user_id": "empty", "monthly_income": 3000, "spending": []}]
+    result = client.post("/budget/analyze-spending/batch", json=_to_columnar(users)).json()["results"][0]
+    assert result["total_spending"] == 0
+    assert result["spending_by_category"] == {}
+    assert result["recommendations"] == []
+
+def test_batch_rejects_misaligned_columns():
+    response = client.post("/budget/analyze-spending/batch", json={
+        "user_ids": ["a", "b"],
+        "monthly_incomes": [1000],
+        "item_user_index": [],
+        "item_names": [],
+        "item_amounts": [],
+    })
+    assert response.status_code == 422
+
+def test_batch_rejects_out_of_range_user_index():
+    response = client.post("/budget/analyze-spending/batch", json={
+        "user_ids": ["a"],
+        "monthly_incomes": [1000],
+        "item_user_index": [1],
+        "item_names": ["Rent"],
+        "item_amounts": [500],
+    })
+    assert response.status_code == 422
@@ -0,0 +1,128 @@
+import pytest
+import json
+from fastapi.testclient import TestClient
+from budget_agent.main import app
+from budget_agent.schemas import SpendingAnalysisOutput
+from budget_agent.streaming import MAX_CATEGORIES, OVERFLOW_CATEGORY, SpendingAggregator
+
+client = TestClient(app)
+
+TRANSACTIONS = [
+    {"date": "2024-01-03", "name": "Rent", "amount": 2000},
+    {"date": "2024-01-10", "name": "Dining Out", "amount": 150},
+    {"date": "2024-01-21", "name": "Dining Out", "amount": 150},
+    {"date": "2024-02-03", "name": "Rent", "amount": 2000},
+    {"date": "2024-02-14", "name": "Dining Out", "amount": 600},
+]
+
+def _chunked(data: bytes, size: int):
+    # Small chunks make records straddle chunk boundaries
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def test_stream_ndjson_aggregates_per_month():
+    body = "\n".join(json.dumps(t) for t in TRANSACTIONS).encode()
+    response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=5000",
+        content=_chunked(body, 7),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    output = SpendingAnalysisOutput(**response.json())
+
+    # Analysis is on the average month
+    assert output.total_spending == 2450.0
+    assert output.spending_by_category == {"Rent": 2000.0, "Dining Out": 450.0}
+    assert any(rec.category == "Dining Out" for rec in output.recommendations)
+
+    assert [trend.month for trend in output.trends] == ["2024-01", "2024-02"]
+    assert output.trends[0].total_spending == 2300.0
+    assert output.trends[0].transaction_count == 3
+    assert output.trends[0].change_percent is None
+    assert round(output.trends[1].change_percent, 2) == 13.04
+
+def test_stream_csv_matches_ndjson():
+    rows = ["date,name,amount"] + [f"{t['date']},\"{t['name']}\",{t['amount']}" for t in TRANSACTIONS]
+    response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=5000",
+        content=_chunked("\r\n".join(rows).encode(), 5),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    ndjson_response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=5000",
+        content="\n".join(json.dumps(t) for t in TRANSACTIONS).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json() == ndjson_response.json()
+
+def test_stream_reports_bad_line():
+    body = b'{"date": "2024-01-03", "name": "Rent", "amount": 2000}\n{"date": "2024-01-04", "name": "Rent"}\n'
+    response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=5000",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Line 2:")
+
+@pytest.mark.parametrize("record, message", [
+    ('{"date": "01/03/2024", "name": "Rent", "amount": 2000}', "invalid date"),
+    ('{"date": "2024-13-01", "name": "Rent", "amount": 2000}', "invalid date"),
+    ('{"date": "2024-01-03", "name": "Rent", "amount": "nan"}', "invalid amount"),
+    ('{"date": "2024-01-03", "name": "Rent", "amount": "inf"}', "invalid amount"),
+])
+def test_stream_rejects_invalid_dates_and_amounts(record, message):
+    body = b'{"date": "2024-01-03T09:30:00", "name": "Rent", "amount": 2000}\n' + record.encode() + b"\n"
+    response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=5000",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith(f"Line 2: {message}")
+
+def test_stream_rejects_unknown_media_type():
+    response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=5000",
+        content=b"<xml/>",
+        headers={"Content-Type": "application/xml"},
+    )
+    assert response.status_code == 415
+
+def test_stream_requires_positive_income():
+    response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=0",
+        content=b"",
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 422
+
+def test_stream_csv_quoted_newline_across_chunks():
+    body = 'date,name,amount\n2024-01-03,"Rent\nand utilities",2000\n2024-01-10,Dining Out,150\n'.encode()
+    response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=5000",
+        content=_chunked(body, 3),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    assert response.json()["spending_by_category"] == {"Rent\nand utilities": 2000.0, "Dining Out": 150.0}
+
+def test_stream_csv_reports_unterminated_quote():
+    body = b'date,name,amount\n2024-01-03,Rent,2000\n2024-01-10,"Dining\nOut,150\n'
+    response = client.post(
+        "/budget/analyze-spending/stream?monthly_income=5000",
+        content=body,
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Line 3: unterminated quoted field"
+
+def test_aggregator_caps_distinct_categories():
+    aggregator = SpendingAggregator()
+    for i in range(MAX_CATEGORIES + 10):
+        aggregator.add("2024-01-03", f"Merchant {i}", 1.0)
+    aggregator.add("2024-01-04", "Merchant 0", 1.0)
+    assert len(aggregator.category_totals) == MAX_CATEGORIES + 1
+    assert aggregator.category_totals[OVERFLOW_CATEGORY] == 10.0
+    assert aggregator.category_totals["Merchant 0"] == 2.0
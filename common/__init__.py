@@ -0,0 +1,3 @@
+"""
+Code shared by the orchestrator and the agents.
+"""
@@ -0,0 +1,231 @@
+"""
+Response encoding negotiated between the agents and their callers.
+
+- JSON is rendered with orjson when it is installed.
+- A request with `Accept: application/msgpack` gets a MessagePack body (when msgpack is installed).
+- A request with `X-History-Layout: columnar` gets row lists such as `historical_data`
+  as one list per column, `{"date": [...], "close": [...], ...}`. The response echoes the header.
+- Bodies above MIN_COMPRESS_BYTES are compressed with brotli or gzip, following Accept-Encoding.
+
+`ServiceClient` in the orchestrator uses `request_headers()` and `decode_response()` to
+take advantage of all of this, and `rows_from_columns()` converts a columnar layout back.
+"""
+import contextvars
+import gzip
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError: # orjson is an optional speed-up
+    orjson = None
+try:
+    import msgpack
+except ImportError: # MessagePack is only offered when installed
+    msgpack = None
+try:
+    import brotli
+except ImportError: # Falls back to gzip
+    brotli = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+LAYOUT_HEADER = "x-history-layout"
+COLUMNAR = "columnar"
+
+# Response fields holding lists of uniform row objects that may be sent column by column
+COLUMNAR_FIELDS = ("historical_data",)
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4 # Fast enough for per-request compression, still well ahead of gzip on size
+
+_COMPRESSIBLE_TYPES = (b"application/json", b"application/msgpack", b"text/")
+
+_negotiated: contextvars.ContextVar[Optional["_Negotiation"]] = contextvars.ContextVar("negotiated_encoding", default=None)
+
+
+class _Negotiation:
+    __slots__ = ("msgpack", "columnar")
+
+    def __init__(self, msgpack: bool, columnar: bool):
+        self.msgpack = msgpack
+        self.columnar = columnar
+
+
+def columns_from_rows(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Turns a list of uniform dicts into a dict of equal-length lists (keys from the first row).
+    """
+    if not rows:
+        return {}
+    return {key: [row.get(key) for row in rows] for key in rows[0]}
+
+
+def rows_from_columns(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Inverse of columns_from_rows.
+    """
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*(columns[key] for key in keys))]
+
+
+def to_columnar(content: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `content` with each non-empty COLUMNAR_FIELDS row list turned into columns.
+    """
+    for field in COLUMNAR_FIELDS:
+        rows = content.get(field)
+        if isinstance(rows, list) and rows and isinstance(rows[0], dict):
+            content = {**content, field: columns_from_rows(rows)}
+    return content
+
+
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    Default response class for the services: fast JSON, or MessagePack and/or the columnar
+    layout when the request asked for them.
+    """
+    def __init__(self, content: Any, *args: Any, **kwargs: Any):
+        negotiation = _negotiated.get()
+        self._columnar_applied = False
+        if negotiation is not None and negotiation.msgpack:
+            self.media_type = MSGPACK_MEDIA_TYPE
+        super().__init__(content, *args, **kwargs)
+        if self._columnar_applied:
+            self.raw_headers.append((LAYOUT_HEADER.encode(), COLUMNAR.encode()))
+
+    def render(self, content: Any) -> bytes:
+        negotiation = _negotiated.get()
+        if negotiation is None:
+            return dumps_json(content)
+        if negotiation.columnar and isinstance(content, dict):
+            content = self._to_columnar(content)
+        if negotiation.msgpack:
+            return msgpack.packb(content, use_bin_type=True)
+        return dumps_json(content)
+
+    def _to_columnar(self, content: Dict[str, Any]) -> Dict[str, Any]:
+        columnar = to_columnar(content)
+        self._columnar_applied = columnar is not content
+        return columnar
+
+
+def _header(scope, name: bytes) -> bytes:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return b""
+
+
+class EncodingMiddleware:
+    """
+    ASGI middleware that records the requested encoding for NegotiatedResponse and
+    compresses eligible response bodies.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope, b"accept")
+        token = _negotiated.set(_Negotiation(
+            msgpack=msgpack is not None and MSGPACK_MEDIA_TYPE.encode() in accept,
+            columnar=_header(scope, LAYOUT_HEADER.encode()).strip().lower() == COLUMNAR.encode(),
+        ))
+        accept_encoding = _header(scope, b"accept-encoding")
+        if brotli is not None and b"br" in accept_encoding:
+            encoding = "br"
+        elif b"gzip" in accept_encoding:
+            encoding = "gzip"
+        else:
+            encoding = None
+
+        try:
+            if encoding is None:
+                await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, _Compressor(send, encoding))
+        finally:
+            _negotiated.reset(token)
+
+
+class _Compressor:
+    """
+    Wraps `send` to compress single-message bodies; streamed responses pass through untouched.
+    """
+    def __init__(self, send, encoding: str):
+        self.send = send
+        self.encoding = encoding
+        self.start_message: Optional[Dict[str, Any]] = None
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.start_message is None:
+            await self.send(message)
+            return
+
+        start, self.start_message = self.start_message, None
+        body = message.get("body", b"")
+        headers = start.get("headers", [])
+        content_type = next((value for key, value in headers if key == b"content-type"), b"")
+        eligible = (
+            not message.get("more_body", False)
+            and len(body) >= MIN_COMPRESS_BYTES
+            and content_type.startswith(_COMPRESSIBLE_TYPES)
+            and not any(key == b"content-encoding" for key, _ in headers)
+        )
+        if eligible:
+            body = brotli.compress(body, quality=BROTLI_QUALITY) if self.encoding == "br" else gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers = [(key, value) for key, value in headers if key != b"content-length"]
+            headers += [
+                (b"content-encoding", self.encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            start = {**start, "headers": headers}
+            message = {**message, "body": body}
+        await self.send(start)
+        await self.send(message)
+
+
+def install_encoding(app: FastAPI) -> None:
+    """
+    Enables response negotiation and compression; pair with
+    `FastAPI(default_response_class=NegotiatedResponse)`.
+    """
+    app.add_middleware(EncodingMiddleware)
+
+
+def request_headers(columnar: bool = False) -> Dict[str, str]:
+    """
+    Headers for a client that can decode everything this module produces.
+    """
+    headers = {"accept": f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.9" if msgpack is not None else "application/json"}
+    if columnar:
+        headers[LAYOUT_HEADER] = COLUMNAR
+    return headers
+
+
+def decode_response(content_type: str, body: bytes) -> Any:
+    """
+    Decodes a (decompressed) response body according to its content type.
+    """
+    if content_type.startswith(MSGPACK_MEDIA_TYPE):
+        return msgpack.unpackb(body, raw=False)
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
@@ -0,0 +1,130 @@
+"""
+Cold-start profile of a service: where import time goes, and how long a fresh process
+takes to serve its first request.
+
+    python -m common.importprofile financial_analysis_agent.main [--runs 5] [--top 15]
+
+Each run starts a new interpreter, as a scale-from-zero instance would. The import
+profile parses `python -X importtime` output. Time to first request runs the app's
+lifespan startup and serves GET /health in-process (no socket), timed from the moment
+the interpreter is spawned.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+_FIRST_REQUEST = """
+import asyncio, importlib, sys, time
+import httpx
+module, attribute, path = sys.argv[1:4]
+app = getattr(importlib.import_module(module), attribute)
+
+async def first_request():
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://service") as client:
+            response = await client.get(path)
+            print(f"STATUS {response.status_code} {time.perf_counter()}", flush=True)
+
+asyncio.run(first_request())
+"""
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """
+    Records from `python -X importtime` output, in the order they were printed.
+    """
+    records = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def profile_imports(module: str) -> List[ImportRecord]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, "PYTHONWARNINGS": "ignore"},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def time_to_first_request(app: str, path: str = "/health") -> float:
+    """
+    Milliseconds from spawning an interpreter to the app answering `path`.
+    """
+    module, _, attribute = app.partition(":")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", _FIRST_REQUEST, module, attribute or "app", path],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    for line in process.stdout:
+        if line.startswith("STATUS"):
+            # perf_counter is system-wide on Linux, so the child's reading is comparable
+            served_at = float(line.split()[2])
+            process.wait()
+            return (served_at - start) * 1000
+    process.wait()
+    raise RuntimeError(f"{app} did not serve {path} (exit code {process.returncode})")
+
+
+def top_level_packages(records: List[ImportRecord]) -> Dict[str, int]:
+    """
+    Cumulative microseconds per top-level package, counting each package's outermost imports.
+    """
+    totals: Dict[str, int] = {}
+    inside: List[str] = []
+    # importtime prints children before their parent, so walk backwards to see parents first
+    for record in reversed(records):
+        del inside[record.depth:]
+        package = record.module.split(".")[0]
+        if package not in inside:
+            totals[package] = totals.get(package, 0) + record.cumulative_us
+        inside.append(package)
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m common.importprofile", description="Profile a service's import time and time to first request.")
+    parser.add_argument("module", help="Module holding the FastAPI app, e.g. financial_analysis_agent.main.")
+    parser.add_argument("--app", default="app", help="Attribute of the module holding the app (default: app).")
+    parser.add_argument("--path", default="/health", help="Path of the first request (default: /health).")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to time (default: 5).")
+    parser.add_argument("--top", type=int, default=15, help="Rows per table (default: 15).")
+    args = parser.parse_args(argv)
+
+    records = profile_imports(args.module)
+    total_ms = sum(record.cumulative_us for record in records if record.depth == 0) / 1000
+    print(f"Import of {args.module}: {total_ms:.0f} ms, {len(records)} modules\n")
+    print("Top-level packages by cumulative time:")
+    for package, us in sorted(top_level_packages(records).items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:>8.1f} ms  {package}")
+    print("\nModules by self time:")
+    for record in sorted(records, key=lambda r: r.self_us, reverse=True)[:args.top]:
+        print(f"  {record.self_us / 1000:>8.1f} ms  {record.module}")
+
+    timings = [time_to_first_request(f"{args.module}:{args.app}", args.path) for _ in range(args.runs)]
+    print(f"\nTime to first request ({args.path}, {args.runs} cold starts): median {statistics.median(timings):.0f} ms, min {min(timings):.0f} ms, max {max(timings):.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""
+Structured logging shared by the orchestrator and the agents.
+
+Events are processed cheaply on the calling thread: noisy events are sampled or rate
+limited, large payloads are capped, and the event dict is queued. A background thread
+renders it as JSON (with orjson when available) and writes batches to stdout. Records
+from stdlib loggers (uvicorn, httpx) go through the same queue. The queue is bounded
+(LOG_QUEUE_SIZE): when stdout cannot keep up, new events are dropped and counted in
+log_events_dropped_total rather than buffered without limit.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+from prometheus_client import Counter
+
+from common.tracing import add_trace_context
+
+try:
+    import orjson
+except ImportError: # orjson is an optional speed-up
+    orjson = None
+
+# Payload caps applied before an event is queued
+MAX_STRING_CHARS = 1000
+MAX_CONTAINER_ITEMS = 10
+MAX_DEPTH = 4
+
+MAX_QUEUED_EVENTS = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+DROPPED_EVENTS = Counter("log_events_dropped_total", "Log events dropped because the writer queue was full.")
+
+
+@dataclass
+class EventPolicy:
+    """
+    Keeps a `sample_rate` fraction of an event, and at most `max_per_interval` per `interval_s`.
+    Warnings and errors are never dropped.
+    """
+    sample_rate: float = 1.0
+    max_per_interval: Optional[int] = None
+    interval_s: float = 60.0
+
+
+DEFAULT_POLICIES: Dict[str, EventPolicy] = {
+    "Health check endpoint called": EventPolicy(max_per_interval=1, interval_s=60.0),
+}
+
+_ALWAYS_KEEP = {"warning", "error", "critical", "exception"}
+
+
+class EventSampler:
+    """
+    structlog processor applying per-event EventPolicy sampling and rate limits.
+    """
+    def __init__(self, policies: Dict[str, EventPolicy]):
+        self.policies = policies
+        self._windows: Dict[str, list] = {} # event -> [window start, count in window]
+        self._lock = threading.Lock()
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        policy = self.policies.get(event_dict.get("event"))
+        if policy is None or method_name in _ALWAYS_KEEP:
+            return event_dict
+        if policy.sample_rate < 1.0 and random.random() >= policy.sample_rate:
+            raise structlog.DropEvent
+        if policy.max_per_interval is not None:
+            now = time.monotonic()
+            with self._lock:
+                window = self._windows.setdefault(event_dict["event"], [now, 0])
+                if now - window[0] >= policy.interval_s:
+                    window[0], window[1] = now, 0
+                if window[1] >= policy.max_per_interval:
+                    raise structlog.DropEvent
+                window[1] += 1
+        return event_dict
+
+
+_SCALARS = {int, float, bool, type(None)}
+
+
+def _cap(value: Any, depth: int) -> Any:
+    if type(value) in _SCALARS:
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= MAX_STRING_CHARS else f"{value[:MAX_STRING_CHARS]}... ({len(value)} chars)"
+    if isinstance(value, dict):
+        if depth >= MAX_DEPTH:
+            return f"<dict with {len(value)} keys>"
+        capped = {key: item if type(item) in _SCALARS else _cap(item, depth + 1) for key, item in itertools.islice(value.items(), MAX_CONTAINER_ITEMS)}
+        if len(value) > MAX_CONTAINER_ITEMS:
+            capped["..."] = f"{len(value) - MAX_CONTAINER_ITEMS} more keys"
+        return capped
+    if isinstance(value, (list, tuple)):
+        if depth >= MAX_DEPTH:
+            return f"<{type(value).__name__} of {len(value)} items>"
+        capped = [item if type(item) in _SCALARS else _cap(item, depth + 1) for item in value[:MAX_CONTAINER_ITEMS]]
+        if len(value) > MAX_CONTAINER_ITEMS:
+            capped.append(f"... {len(value) - MAX_CONTAINER_ITEMS} more items")
+        return capped
+    return value
+
+
+def cap_payload_sizes(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    structlog processor that truncates long strings and containers (e.g. tool results with
+    full price histories). It also copies containers, so the background thread never renders
+    an object the request is still mutating.
+    """
+    for key, value in event_dict.items():
+        if key != "exc_info" and isinstance(value, (str, dict, list, tuple)):
+            event_dict[key] = _cap(value, 0)
+    return event_dict
+
+
+def _capture_exc_info(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    # exc_info=True must be resolved on the thread that is handling the exception
+    if event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+
+def _add_service(service: str):
+    def add_service(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        event_dict.setdefault("service", service)
+        return event_dict
+    return add_service
+
+
+def _enqueue(logger, method_name: str, event_dict: Dict[str, Any]):
+    # Final processor: hand the event dict itself to the logger, unrendered
+    return (event_dict,), {}
+
+
+def _queue_put(events: queue.Queue) -> Callable[[Any], None]:
+    """
+    Non-blocking put for `events`: a full queue drops the event instead of stalling the caller.
+    """
+    put_nowait = events.put_nowait
+
+    def put(event_dict: Any) -> None:
+        try:
+            put_nowait(event_dict)
+        except queue.Full:
+            DROPPED_EVENTS.inc()
+    return put
+
+
+def render_json(event_dict: Dict[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(event_dict, default=str).decode()
+    return json.dumps(event_dict, default=str)
+
+
+class _Writer(threading.Thread):
+    """
+    Background thread that renders queued events and writes them in batches.
+    """
+    _STOP = object()
+
+    def __init__(self, events: queue.Queue):
+        super().__init__(name="log-writer", daemon=True)
+        self.events = events
+        self.stream = sys.stdout
+
+    def _render(self, event_dict: Dict[str, Any]) -> str:
+        exc_info = event_dict.pop("exc_info", None)
+        if exc_info:
+            event_dict["exception"] = "".join(traceback.format_exception(*exc_info)) if isinstance(exc_info, tuple) else str(exc_info)
+        try:
+            return render_json(event_dict)
+        except Exception as e: # Never let one bad event stop the writer
+            return render_json({"event": "Unrenderable log event", "level": "error", "error": repr(e)})
+
+    def run(self) -> None:
+        while True:
+            batch = [self.events.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(event is self._STOP for event in batch)
+            lines = [self._render(event) for event in batch if event is not self._STOP]
+            if lines:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            if stop:
+                return
+
+    def stop(self) -> None:
+        try:
+            self.events.put(self._STOP, timeout=5)
+        except queue.Full:
+            return
+        self.join(timeout=5)
+
+
+class _QueueLogger:
+    """
+    structlog logger that queues event dicts for the writer thread.
+    """
+    def __init__(self, events: queue.Queue):
+        self._put = _queue_put(events)
+
+    def msg(self, event_dict: Dict[str, Any]) -> None:
+        self._put(event_dict)
+
+    debug = info = warning = warn = error = critical = exception = fatal = log = msg
+
+
+class _StdlibHandler(logging.Handler):
+    """
+    Routes records from stdlib loggers (uvicorn, httpx, ...) into the same queue.
+    """
+    def __init__(self, events: queue.Queue, service: str):
+        super().__init__()
+        self._put = _queue_put(events)
+        self.service = service
+
+    def emit(self, record: logging.LogRecord) -> None:
+        event_dict = {"event": record.getMessage(), "level": record.levelname.lower(), "logger": record.name, "service": self.service}
+        if record.exc_info:
+            event_dict["exc_info"] = record.exc_info
+        self._put(event_dict)
+
+
+def build_processors(service: str, policies: Optional[Dict[str, EventPolicy]] = None) -> List[Callable]:
+    """
+    The structlog processor chain run on the calling thread; the last one hands the event to the queue.
+    """
+    return [
+        EventSampler(DEFAULT_POLICIES if policies is None else policies),
+        structlog.processors.add_log_level,
+        add_trace_context,
+        structlog.processors.StackInfoRenderer(),
+        _capture_exc_info,
+        cap_payload_sizes,
+        _add_service(service),
+        _enqueue,
+    ]
+
+
+_events: queue.Queue = queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+_writer: Optional[_Writer] = None
+
+
+def configure_logging(service: str, level: int = logging.INFO, policies: Optional[Dict[str, EventPolicy]] = None) -> None:
+    """
+    Configures structlog and the stdlib root logger for a service. Safe to call repeatedly.
+    """
+    global _writer
+    if _writer is None:
+        _writer = _Writer(_events)
+        _writer.start()
+    _writer.stream = sys.stdout
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_StdlibHandler(_events, service))
+    root.setLevel(level)
+
+    structlog.configure(
+        processors=build_processors(service, policies),
+        context_class=dict,
+        logger_factory=lambda *args: _QueueLogger(_events),
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        cache_logger_on_first_use=True,
+    )
+
+
+@atexit.register
+def _flush() -> None:
+    if _writer is not None and _writer.is_alive():
+        _writer.stop()
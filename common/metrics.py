@@ -0,0 +1,148 @@
+"""
+Prometheus metrics shared by the orchestrator and the agents.
+
+Stages are the units we want latency for: a Gemini call, an agent HTTP hop, a provider
+call, a cache get or set. Instrument them with `stage(name)`; it resolves the labelled
+metric children once, so timing a call costs a couple of microseconds. Each timed stage
+is also recorded as a tracing span (see common.tracing).
+"""
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from common.tracing import start_span
+
+R = TypeVar('R')
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds",
+    "Duration of an instrumented stage (Gemini call, agent request, provider call, cache operation).",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter("stage_errors_total", "Instrumented stage calls that raised.", ["stage"])
+STAGE_IN_FLIGHT = Gauge("stage_in_flight", "Instrumented stage calls currently running.", ["stage"])
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by key prefix and result (hit or miss).", ["prefix", "result"])
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests served, by route template and status code.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+
+
+class _StageTimer:
+    __slots__ = ("_stage", "_start", "_span")
+
+    def __init__(self, stage: "Stage", attributes: Dict[str, Any]):
+        self._stage = stage
+        self._span = start_span(stage.name, **attributes)
+
+    def __enter__(self) -> "_StageTimer":
+        if self._stage._in_flight is not None:
+            self._stage._in_flight.inc()
+        self._span.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stage._duration.observe(time.perf_counter() - self._start)
+        self._span.__exit__(exc_type, exc, tb)
+        if self._stage._in_flight is not None:
+            self._stage._in_flight.dec()
+        if exc_type is not None:
+            self._stage._errors.inc()
+
+
+class Stage:
+    """
+    Metric children for one stage. Use `with stage.time(**span_attributes):` around sync or
+    async code, or `stage.wrap(func)` for a coroutine function.
+    """
+    __slots__ = ("name", "_duration", "_errors", "_in_flight")
+
+    def __init__(self, name: str, track_in_flight: bool = True):
+        self.name = name
+        self._duration = STAGE_DURATION.labels(name)
+        self._errors = STAGE_ERRORS.labels(name)
+        self._in_flight = STAGE_IN_FLIGHT.labels(name) if track_in_flight else None
+
+    def time(self, **attributes: Any) -> _StageTimer:
+        return _StageTimer(self, attributes)
+
+    def wrap(self, func: Callable[..., Awaitable[R]]) -> Callable[..., Awaitable[R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> R:
+            with _StageTimer(self, {}):
+                return await func(*args, **kwargs)
+        return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def stage(name: str, track_in_flight: bool = True) -> Stage:
+    """
+    Returns the (shared) Stage for `name`. Keep names low-cardinality: no symbols or user input.
+    Sub-millisecond stages such as cache operations can skip the in-flight gauge.
+    """
+    return Stage(name, track_in_flight)
+
+
+@functools.lru_cache(maxsize=None)
+def cache_counters(prefix: str) -> Tuple[Any, Any]:
+    """
+    Returns the (hit, miss) counters for a cache key prefix.
+    """
+    return CACHE_REQUESTS.labels(prefix, "hit"), CACHE_REQUESTS.labels(prefix, "miss")
+
+
+class HttpMetricsMiddleware:
+    """
+    ASGI middleware recording request duration per route template and the in-flight count.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+def instrument_app(app: FastAPI) -> None:
+    """
+    Adds HTTP request metrics and a Prometheus `/metrics` endpoint to a service.
+    """
+    app.add_middleware(HttpMetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
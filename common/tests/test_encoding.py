@@ -0,0 +1,76 @@
+import gzip
+import brotli
+import httpx
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from common.encoding import NegotiatedResponse, columns_from_rows, install_encoding, rows_from_columns
+from orchestrator.clients import ServiceClient
+
+ROWS = [{"date": f"2024-01-{day:02d}", "close": 100.0 + day, "volume": 1000 * day} for day in range(1, 31)]
+
+
+def _app() -> FastAPI:
+    app = FastAPI(default_response_class=NegotiatedResponse)
+    install_encoding(app)
+
+    @app.post("/history")
+    async def history():
+        return {"symbol": "IBM", "historical_data": ROWS}
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+    return app
+
+
+client = TestClient(_app())
+
+
+def test_columns_round_trip():
+    columns = columns_from_rows(ROWS)
+    assert columns["close"][:2] == [101.0, 102.0]
+    assert rows_from_columns(columns) == ROWS
+    assert columns_from_rows([]) == {}
+
+
+def test_json_by_default():
+    response = client.post("/history", headers={"accept-encoding": "identity"})
+    assert response.headers["content-type"] == "application/json"
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"symbol": "IBM", "historical_data": ROWS}
+
+
+def test_msgpack_and_columnar_negotiated():
+    response = client.post("/history", headers={"accept": "application/msgpack", "x-history-layout": "columnar", "accept-encoding": "identity"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["x-history-layout"] == "columnar"
+    body = msgpack.unpackb(response.content)
+    assert body["symbol"] == "IBM"
+    assert rows_from_columns(body["historical_data"]) == ROWS
+
+
+@pytest.mark.parametrize("encoding, decompress", [("gzip", gzip.decompress), ("br", brotli.decompress)])
+def test_large_bodies_compressed(encoding, decompress):
+    with client.stream("POST", "/history", headers={"accept-encoding": encoding}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["content-length"] == str(len(raw))
+    assert len(raw) < 1024
+    assert decompress(raw).startswith(b'{"symbol":"IBM"')
+
+
+def test_small_bodies_not_compressed():
+    response = client.get("/small", headers={"accept-encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_service_client_decodes_negotiated_response():
+    service_client = ServiceClient(base_url="http://agent", columnar=True)
+    service_client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=_app()))
+    result = await service_client.post("/history", data={})
+    assert result["symbol"] == "IBM"
+    assert rows_from_columns(result["historical_data"]) == ROWS
@@ -0,0 +1,25 @@
+from common.importprofile import parse_importtime, top_level_packages
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     pandas._libs
+import time:       200 |        200 |     numpy
+import time:       300 |        600 |   pandas.core
+import time:        50 |        650 | pandas
+import time:        40 |         40 |   numpy
+import time:        10 |         50 | yfinance
+not an importtime line
+"""
+
+
+def test_parse_importtime_reads_times_and_depth():
+    records = parse_importtime(IMPORTTIME)
+    assert [record.module for record in records] == ["pandas._libs", "numpy", "pandas.core", "pandas", "numpy", "yfinance"]
+    assert records[2].self_us == 300 and records[2].cumulative_us == 600 and records[2].depth == 1
+    assert records[3].depth == 0
+
+
+def test_top_level_packages_counts_outermost_imports_only():
+    totals = top_level_packages(parse_importtime(IMPORTTIME))
+    # pandas' own submodules are inside its 650 us; numpy imported under pandas and yfinance still counts for numpy
+    assert totals == {"pandas": 650, "numpy": 240, "yfinance": 50}
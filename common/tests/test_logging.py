@@ -0,0 +1,84 @@
+import io
+import json
+import logging
+import queue
+import pytest
+import structlog
+from prometheus_client import REGISTRY
+from common.logging import EventPolicy, EventSampler, MAX_CONTAINER_ITEMS, MAX_STRING_CHARS, _QueueLogger, _Writer, build_processors, cap_payload_sizes
+from common.tracing import start_span
+
+
+def test_sampler_rate_limits_events_but_keeps_errors():
+    sampler = EventSampler({"Health check endpoint called": EventPolicy(max_per_interval=2, interval_s=60.0)})
+    kept = 0
+    for _ in range(5):
+        try:
+            sampler(None, "info", {"event": "Health check endpoint called"})
+            kept += 1
+        except structlog.DropEvent:
+            pass
+    assert kept == 2
+    assert sampler(None, "error", {"event": "Health check endpoint called"})
+    assert sampler(None, "info", {"event": "Something else"})
+
+
+def test_sampler_sample_rate_zero_drops_everything():
+    sampler = EventSampler({"noisy": EventPolicy(sample_rate=0.0)})
+    with pytest.raises(structlog.DropEvent):
+        sampler(None, "info", {"event": "noisy"})
+
+
+def test_cap_payload_sizes_truncates_and_copies():
+    history = [{"date": f"2024-01-{i:02d}", "close": float(i)} for i in range(1, 31)]
+    tool_results = {"historical_data": history, "note": "x" * (MAX_STRING_CHARS + 500)}
+    event = cap_payload_sizes(None, "info", {"event": "Tool results", "results": tool_results, "count": 3})
+
+    capped = event["results"]
+    assert len(capped["historical_data"]) == MAX_CONTAINER_ITEMS + 1
+    assert capped["historical_data"][0] == history[0]
+    assert capped["historical_data"][0] is not history[0]
+    assert capped["historical_data"][-1] == f"... {30 - MAX_CONTAINER_ITEMS} more items"
+    assert capped["note"].endswith(f"... ({MAX_STRING_CHARS + 500} chars)")
+    assert event["count"] == 3
+    assert len(tool_results["historical_data"]) == 30 # Caller's payload untouched
+
+
+def test_pipeline_renders_json_off_thread_with_trace_context():
+    events = queue.Queue()
+    writer = _Writer(events)
+    writer.stream = io.StringIO()
+    writer.start()
+    logger = structlog.wrap_logger(
+        _QueueLogger(events),
+        processors=build_processors("test_service"),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    )
+
+    with start_span("request", service="test_service") as span:
+        logger.info("Tool results", results={"historical_data": list(range(100))})
+    logger.debug("Filtered out")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+    writer.stop()
+
+    first, second = [json.loads(line) for line in writer.stream.getvalue().splitlines()]
+    assert first["event"] == "Tool results"
+    assert first["service"] == "test_service"
+    assert first["level"] == "info"
+    assert first["trace_id"] == span.trace_id
+    assert len(first["results"]["historical_data"]) == MAX_CONTAINER_ITEMS + 1
+    assert second["level"] == "error"
+    assert "ValueError: boom" in second["exception"]
+
+
+def test_full_queue_drops_and_counts_events_without_blocking():
+    events = queue.Queue(maxsize=2)
+    logger = _QueueLogger(events)
+    dropped = REGISTRY.get_sample_value("log_events_dropped_total") or 0.0
+    for i in range(5):
+        logger.info({"event": f"event {i}"})
+    assert events.qsize() == 2
+    assert REGISTRY.get_sample_value("log_events_dropped_total") == dropped + 3
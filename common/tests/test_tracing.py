@@ -0,0 +1,113 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from common import tracing
+from common.tracing import InMemoryExporter, add_trace_context, critical_path, parse_traceparent, start_span, trace_app
+from orchestrator.clients import ServiceClient
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def exporter():
+    previous = tracing.get_exporter()
+    exporter = InMemoryExporter()
+    tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(previous)
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+    assert parse_traceparent("00-" + "0" * 32 + f"-{PARENT_ID}-01") is None
+    assert parse_traceparent("garbage") is None
+
+
+def test_spans_are_dropped_unless_an_exporter_is_configured(monkeypatch):
+    monkeypatch.delenv("TRACE_EXPORT", raising=False)
+    assert isinstance(tracing._exporter_from_env(), tracing._NoopExporter)
+    monkeypatch.setenv("TRACE_EXPORT", "memory")
+    assert isinstance(tracing._exporter_from_env(), InMemoryExporter)
+
+
+def test_nested_spans_share_trace_and_tag_log_events(exporter):
+    with start_span("outer", service="test") as outer:
+        assert add_trace_context(None, "info", {})["span_id"] == outer.span_id
+        with start_span("inner", symbol="IBM") as inner:
+            assert add_trace_context(None, "info", {"event": "x"}) == {"event": "x", "trace_id": outer.trace_id, "span_id": inner.span_id}
+    assert add_trace_context(None, "info", {}) == {}
+
+    inner_span, outer_span = exporter.spans()
+    assert inner_span["parent_id"] == outer_span["span_id"]
+    assert inner_span["trace_id"] == outer_span["trace_id"]
+    assert inner_span["service"] == "test"
+    assert inner_span["attributes"] == {"symbol": "IBM"}
+
+
+def test_span_records_errors(exporter):
+    with pytest.raises(ValueError):
+        with start_span("failing", service="test"):
+            raise ValueError("boom")
+    span, = exporter.spans()
+    assert span["status"] == "error"
+    assert span["attributes"]["error"] == "ValueError: boom"
+
+
+def test_middleware_continues_incoming_trace(exporter):
+    app = FastAPI()
+    trace_app(app, service="agent")
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        with start_span("lookup"):
+            return {"item_id": item_id}
+
+    response = TestClient(app).get("/items/42", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    assert response.status_code == 200
+    assert response.headers["x-trace-id"] == TRACE_ID
+
+    lookup, server = exporter.spans(TRACE_ID)
+    assert server["name"] == "GET /items/{item_id}"
+    assert server["parent_id"] == PARENT_ID
+    assert server["attributes"]["http.status_code"] == 200
+    assert lookup["parent_id"] == server["span_id"]
+    assert lookup["service"] == "agent"
+
+
+@pytest.mark.asyncio
+async def test_service_client_injects_traceparent(exporter):
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["traceparent"] = request.headers.get("traceparent")
+        return httpx.Response(200, json={"ok": True})
+
+    client = ServiceClient(base_url="http://agent")
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with start_span("POST /orchestrate", service="orchestrator") as root:
+        assert await client.post("/budget/calculate-50-30-20", data={"monthly_income": 100}) == {"ok": True}
+
+    agent_span = next(s for s in exporter.spans() if s["name"] == "agent:/budget/calculate-50-30-20")
+    assert seen["traceparent"] == f"00-{root.trace_id}-{agent_span['span_id']}-01"
+
+
+def _span(span_id, parent_id, start_ms, duration_ms, name=None):
+    return {"trace_id": TRACE_ID, "span_id": span_id, "parent_id": parent_id, "name": name or span_id,
+            "service": "test", "start_ns": int(start_ms * 1e6), "duration_ms": duration_ms, "status": "ok", "attributes": {}}
+
+
+def test_critical_path_follows_last_finishing_children():
+    spans = [
+        _span("root", None, 0, 100),
+        _span("intent", "root", 5, 40),
+        _span("fast_fetch", "root", 50, 10), # Runs alongside slow_fetch, so it is not on the path
+        _span("slow_fetch", "root", 50, 30),
+        _span("remote", "slow_fetch", 52, 29), # Ends 1 ms after its caller: clamped, not dropped
+        _span("synthesis", "root", 85, 15),
+    ]
+    path = {span["name"]: round(self_ms, 3) for span, self_ms in critical_path(spans)}
+    assert list(path) == ["root", "synthesis", "slow_fetch", "remote", "intent"]
+    assert path == {"root": 15.0, "synthesis": 15.0, "slow_fetch": 2.0, "remote": 29.0, "intent": 40.0}
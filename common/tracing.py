@@ -0,0 +1,373 @@
+"""
+Lightweight distributed tracing shared by the orchestrator and the agents.
+
+Trace context travels between services in the W3C `traceparent` header, so traces can
+later be continued by any standard tracer. Finished spans are dropped unless an exporter is
+configured: set TRACE_EXPORT=memory to keep the most recent ones in a bounded buffer, or
+TRACE_EXPORT=jsonl (and TRACE_EXPORT_PATH) to append them to a file that every service
+can share, then rebuild a query's critical path with:
+
+    python -m common.tracing traces.jsonl [--trace-id ID]
+
+Add `add_trace_context` to a service's structlog processors and every log line written
+while a span is active carries its trace and span IDs.
+"""
+import argparse
+import collections
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+TRACEPARENT_HEADER = "traceparent"
+TRACE_ID_HEADER = "x-trace-id"
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits) or 1:0{bits // 4}x}"
+
+
+class Span:
+    """
+    One timed operation in a trace. Create spans with `start_span`, not directly.
+    """
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "service", "sampled", "attributes", "start_ns", "duration_ms", "status", "_start")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], service: str, sampled: bool, attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.service = service
+        self.sampled = sampled
+        self.attributes = attributes
+        self.start_ns = 0
+        self.duration_ms = 0.0
+        self.status = "ok"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start_ns": self.start_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+# --- Exporters ----------------------------------------------------------------
+
+class InMemoryExporter:
+    """
+    Keeps the most recent finished spans in a bounded buffer.
+    """
+    def __init__(self, max_spans: int = 10_000):
+        self._spans: Deque[Span] = collections.deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [s.to_dict() for s in list(self._spans) if trace_id is None or s.trace_id == trace_id]
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+class JsonlExporter:
+    """
+    Appends finished spans as JSON lines; safe to share one file between services.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+
+class _NoopExporter:
+    def export(self, span: Span) -> None:
+        pass
+
+
+def _exporter_from_env():
+    kind = os.getenv("TRACE_EXPORT", "off")
+    if kind == "jsonl":
+        return JsonlExporter(os.getenv("TRACE_EXPORT_PATH", "traces.jsonl"))
+    if kind == "memory":
+        return InMemoryExporter()
+    return _NoopExporter()
+
+
+_exporter = _exporter_from_env()
+_sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+
+def get_exporter():
+    return _exporter
+
+
+def set_exporter(exporter) -> None:
+    global _exporter
+    _exporter = exporter
+
+
+# --- Spans --------------------------------------------------------------------
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def add_trace_context(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    structlog processor that adds the active span's trace_id and span_id to each event.
+    """
+    span = _current_span.get()
+    if span is not None:
+        event_dict.setdefault("trace_id", span.trace_id)
+        event_dict.setdefault("span_id", span.span_id)
+    return event_dict
+
+
+class _SpanScope:
+    """
+    Context manager that activates a span and exports it on exit.
+    """
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self.span)
+        self.span.start_ns = time.time_ns()
+        self.span._start = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        span = self.span
+        span.duration_ms = (time.perf_counter() - span._start) * 1000
+        if exc_type is not None:
+            span.status = "error"
+            span.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        if span.sampled:
+            _exporter.export(span)
+
+
+def start_span(name: str, service: Optional[str] = None, traceparent: Optional[str] = None, **attributes: Any) -> _SpanScope:
+    """
+    Starts a span as a child of the active span, of an incoming `traceparent`, or as a new root.
+
+        with start_span("provider:alpha_vantage:quote", symbol=symbol):
+            ...
+    """
+    parent = _current_span.get()
+    remote = parse_traceparent(traceparent) if traceparent else None
+    if remote:
+        trace_id, parent_id, sampled = remote
+    elif parent:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        trace_id, parent_id, sampled = _new_id(128), None, random.random() < _sample_rate
+    if service is None:
+        service = parent.service if parent else "unknown"
+    return _SpanScope(Span(name, trace_id, parent_id, service, sampled, attributes))
+
+
+def parse_traceparent(value: str) -> Optional[Tuple[str, str, bool]]:
+    """
+    Returns (trace_id, parent_span_id, sampled) from a W3C traceparent header, or None if invalid.
+    """
+    match = _TRACEPARENT.match(value.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Adds the active span's `traceparent` to outgoing request headers.
+    """
+    headers = dict(headers or {})
+    span = _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.traceparent
+    return headers
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that continues (or starts) a trace for every HTTP request.
+    The trace ID is returned to the caller in an `X-Trace-Id` response header.
+    """
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with start_span(f"{scope['method']} {scope['path']}", service=self.service, traceparent=traceparent) as span:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(TRACE_ID_HEADER.encode(), span.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{scope['method']} {route.path}"
+
+
+def trace_app(app, service: str) -> None:
+    """
+    Continues incoming traces for every request served by `app`.
+    """
+    app.add_middleware(TracingMiddleware, service=service)
+
+
+# --- Critical path --------------------------------------------------------------
+
+def critical_path(spans: Iterable[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], float]]:
+    """
+    Returns the critical path of one trace as (span, self time in ms) pairs, root first.
+
+    Starting from the root, each span's time is attributed to the child that finished last
+    before the span ended, then to the child that finished last before that one started,
+    and so on; the time not covered by any such child is the span's own (self) time.
+    """
+    spans = list(spans)
+    if not spans:
+        return []
+    children: Dict[Optional[str], List[Dict[str, Any]]] = collections.defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    roots = []
+    for s in spans:
+        if s["parent_id"] in ids:
+            children[s["parent_id"]].append(s)
+        else:
+            roots.append(s)
+    root = min(roots, key=lambda s: s["start_ns"])
+
+    def end_ns(s: Dict[str, Any]) -> float:
+        return s["start_ns"] + s["duration_ms"] * 1e6
+
+    path: List[Tuple[Dict[str, Any], float]] = []
+
+    def walk(span: Dict[str, Any]) -> None:
+        path.append((span, 0.0))
+        index = len(path) - 1
+        cursor = end_ns(span)
+        covered_ns = 0.0
+        for child in sorted(children.get(span["span_id"], []), key=end_ns, reverse=True):
+            if child["start_ns"] >= cursor:
+                continue # Runs entirely alongside the child already on the path
+            # Clamp to the cursor: a remote child can appear to end after its caller because of
+            # clock skew between processes or work done after the response was sent
+            covered_ns += min(end_ns(child), cursor) - max(child["start_ns"], span["start_ns"])
+            walk(child)
+            cursor = child["start_ns"]
+            if cursor <= span["start_ns"]:
+                break
+        path[index] = (span, max(0.0, span["duration_ms"] - covered_ns / 1e6))
+
+    walk(root)
+    return path
+
+
+def _load_spans(paths: List[str]) -> List[Dict[str, Any]]:
+    spans = []
+    for path in paths:
+        with open(path) as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m common.tracing", description="Print a trace's span tree and critical path.")
+    parser.add_argument("files", nargs="+", help="JSON-lines span files written with TRACE_EXPORT=jsonl.")
+    parser.add_argument("--trace-id", help="Trace to show (default: the slowest trace in the files).")
+    args = parser.parse_args(argv)
+
+    spans = _load_spans(args.files)
+    if not spans:
+        print("No spans found.", file=sys.stderr)
+        return 1
+    by_trace: Dict[str, List[Dict[str, Any]]] = collections.defaultdict(list)
+    for s in spans:
+        by_trace[s["trace_id"]].append(s)
+    if args.trace_id:
+        trace_id = args.trace_id
+        if trace_id not in by_trace:
+            print(f"Trace {trace_id} not found.", file=sys.stderr)
+            return 1
+    else:
+        trace_id = max(by_trace, key=lambda t: max(s["duration_ms"] for s in by_trace[t]))
+
+    trace = by_trace[trace_id]
+    path = critical_path(trace)
+    on_path = {s["span_id"]: self_ms for s, self_ms in path}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = collections.defaultdict(list)
+    for s in trace:
+        children[s["parent_id"]].append(s)
+    root = path[0][0]
+    origin = root["start_ns"]
+
+    print(f"Trace {trace_id}: {root['duration_ms']:.1f} ms, {len(trace)} spans (* = critical path)\n")
+
+    def show(span: Dict[str, Any], depth: int) -> None:
+        marker = "*" if span["span_id"] in on_path else " "
+        offset = (span["start_ns"] - origin) / 1e6
+        status = "" if span["status"] == "ok" else f"  [{span['status']}]"
+        print(f"{marker} {offset:>9.1f} {span['duration_ms']:>9.1f}  {'  ' * depth}{span['name']} ({span['service']}){status}")
+        for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start_ns"]):
+            show(child, depth + 1)
+
+    print(f"  {'start ms':>9} {'dur ms':>9}  span")
+    show(root, 0)
+
+    print("\nCritical path self time:")
+    for span, self_ms in sorted(path, key=lambda entry: entry[1], reverse=True):
+        share = self_ms / root["duration_ms"] * 100 if root["duration_ms"] else 0.0
+        print(f"  {self_ms:>9.1f} ms {share:>5.1f}%  {span['name']} ({span['service']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
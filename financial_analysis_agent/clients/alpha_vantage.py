@@ -1,35 +1,280 @@
+import codecs
+import datetime
+import json
+import re
 import httpx
-from typing import Optional, Dict, Any, List
-from financial_analysis_agent.clients.data_provider import DataProvider, Quote, HistoricalData
+from contextlib import aclosing
+from pydantic import TypeAdapter
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+from financial_analysis_agent.clients.data_provider import DataProvider, Quote, HistoricalData, ProviderError, RateLimitedError, SymbolNotFoundError, TransientProviderError
 
-class AlphaVantageAPIError(Exception):
+TIME_SERIES_KEY = "Time Series (Daily)"
+COMPACT_BARS = 100 # Bars in an outputsize=compact response
+COMPACT_SPAN_DAYS = 130 # Calendar days that 100 trading days always cover
+
+# Periods measured in bars; the rest are date ranges ending at the latest bar
+_PERIOD_BARS = {"1d": 1, "5d": 5, "compact": COMPACT_BARS}
+_PERIOD_MONTHS = {"1mo": 1, "3mo": 3, "6mo": 6, "1y": 12, "2y": 24, "5y": 60, "10y": 120}
+
+_BARS = TypeAdapter(List[HistoricalData])
+_PREMIUM_ONLY = re.compile(r"premium (feature|endpoint)", re.IGNORECASE)
+
+class AlphaVantageAPIError(ProviderError):
     """Custom exception for Alpha Vantage API errors."""
     pass
 
+class AlphaVantageSymbolNotFoundError(AlphaVantageAPIError, SymbolNotFoundError):
+    """Alpha Vantage has no data for the symbol."""
+    pass
+
+class AlphaVantageRateLimitError(AlphaVantageAPIError, RateLimitedError):
+    """Alpha Vantage's per-minute or daily call limit was reached."""
+    pass
+
+class AlphaVantageTransientError(AlphaVantageAPIError, TransientProviderError):
+    """Alpha Vantage could not be reached or failed on its side."""
+    pass
+
+class AlphaVantagePremiumError(AlphaVantageAPIError):
+    """The request needs a premium plan (e.g. outputsize=full on a free key); retrying later will not help."""
+    pass
+
+def _months_before(day: datetime.date, months: int) -> datetime.date:
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    month += 1
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return datetime.date(year, month, min(day.day, (next_month - datetime.timedelta(days=1)).day))
+
+def period_start(period: str, latest: datetime.date) -> Optional[datetime.date]:
+    """
+    The day before the first bar of a date-range `period` ending at `latest` (e.g. "1y"
+    from 2024-06-28 keeps bars after 2023-06-28); None when the period has no start ("max", "full").
+    """
+    if period in _PERIOD_MONTHS:
+        return _months_before(latest, _PERIOD_MONTHS[period])
+    if period == "ytd":
+        return datetime.date(latest.year, 1, 1) - datetime.timedelta(days=1)
+    if period in ("max", "full"):
+        return None
+    raise AlphaVantageAPIError(f"Unsupported period '{period}'. Use one of: {', '.join([*_PERIOD_BARS, *_PERIOD_MONTHS, 'ytd', 'max'])}.")
+
+def outputsize_for(period: str, today: Optional[datetime.date] = None) -> str:
+    """
+    "compact" when the last 100 bars cover `period`, otherwise "full".
+    """
+    if period in _PERIOD_BARS:
+        return "compact"
+    today = today or datetime.date.today()
+    start = period_start(period, today)
+    return "compact" if start is not None and (today - start).days <= COMPACT_SPAN_DAYS else "full"
+
+def _raise_for_api_error(data: Dict[str, Any]) -> None:
+    if "Error Message" in data: # Answered for unknown symbols ("Invalid API call")
+        raise AlphaVantageSymbolNotFoundError(data["Error Message"])
+    if "Note" in data: # API rate limit message
+        raise AlphaVantageRateLimitError(data["Note"])
+    if "Information" in data: # Daily quota message, or a parameter or endpoint the key's plan does not include
+        error_class = AlphaVantagePremiumError if _PREMIUM_ONLY.search(data["Information"]) else AlphaVantageRateLimitError
+        raise error_class(data["Information"])
+
+def _http_error(e: httpx.HTTPError) -> AlphaVantageAPIError:
+    if isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+        error_class = AlphaVantageRateLimitError if status == 429 else AlphaVantageTransientError if status >= 500 else AlphaVantageAPIError
+        return error_class(f"HTTP error occurred: {status} - {e.response.text}")
+    return AlphaVantageTransientError(f"Request error occurred: {e}")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_SERIES_END = re.compile(r"\}[ \t\n\r]*\}") # The last bar's brace, then the series'
+_decoder = json.JSONDecoder()
+
+class TimeSeriesParser:
+    """
+    Incremental parser of an Alpha Vantage time series body: a JSON object whose
+    `series_key` member maps dates to bars, newest first. Bars are returned as soon as they
+    have arrived, so a reader can stop downloading once it has the range it needs. Other
+    members ("Meta Data", or an error message) are decoded whole into `fields`.
+
+    Bars are flat objects, so the complete bars in a chunk end at its last "}" and are
+    decoded together with one json.loads, at C speed. If that fails (a brace inside a
+    string), the bars are decoded one at a time instead. A value counts as complete only
+    once the character after it has arrived, so a chunk boundary inside a value never
+    yields a truncated one.
+    """
+    def __init__(self, series_key: str = TIME_SERIES_KEY):
+        self.series_key = series_key
+        self.fields: Dict[str, Any] = {}
+        self.has_series = False
+        self.done = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._state = "start" # start -> members <-> series -> done
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        Adds the next chunk of the body and returns the (date, bar) entries it completed.
+        """
+        self._buffer = self._buffer[self._position:] + self._utf8.decode(chunk)
+        self._position = 0
+        entries = []
+        while not self.done and self._step(entries):
+            pass
+        return entries
+
+    def close(self) -> None:
+        """
+        Checks that the whole object was read.
+        """
+        if not self.done:
+            raise ValueError("Truncated or malformed JSON time series")
+
+    def _skip(self, position: int) -> int:
+        return _WHITESPACE.match(self._buffer, position).end()
+
+    def _decode(self, position: int) -> Optional[Tuple[Any, int]]:
+        """
+        The value at `position` and the position after it, or None if it has not fully arrived.
+        """
+        try:
+            value, end = _decoder.raw_decode(self._buffer, position)
+        except json.JSONDecodeError:
+            return None
+        return (value, end) if end < len(self._buffer) else None
+
+    def _member(self, position: int) -> Optional[Tuple[str, int]]:
+        """
+        A `"key":` prefix at `position`: the key and the position of its value.
+        """
+        decoded = self._decode(position)
+        if decoded is None:
+            return None
+        key, position = decoded
+        if not isinstance(key, str):
+            raise ValueError("Expected a JSON object key")
+        position = self._skip(position)
+        if position >= len(self._buffer):
+            return None
+        if self._buffer[position] != ":":
+            raise ValueError("Expected ':' after a JSON object key")
+        return key, self._skip(position + 1)
+
+    def _series_batch(self, position: int) -> Optional[List[Tuple[str, Dict[str, str]]]]:
+        """
+        All complete bars from `position` on, decoded at once; None if there are none or
+        they do not decode as a batch.
+        """
+        series_end = _SERIES_END.search(self._buffer, position)
+        end = series_end.start() if series_end else self._buffer.rfind("}", position)
+        if end < 0:
+            return None
+        try:
+            batch = json.loads("{" + self._buffer[position:end + 1] + "}")
+        except json.JSONDecodeError:
+            return None
+        self._position = end + 1
+        return list(batch.items())
+
+    def _step(self, entries: List[Tuple[str, Dict[str, str]]]) -> bool:
+        """
+        Consumes one token or member; False when more data is needed.
+        """
+        position = self._skip(self._position)
+        if position >= len(self._buffer):
+            return False
+        char = self._buffer[position]
+        if self._state == "start":
+            if char != "{":
+                raise ValueError("Expected a JSON object")
+            self._state, self._position = "members", position + 1
+            return True
+        if char == ",":
+            self._position = position + 1
+            return True
+        if char == "}":
+            self._state = "members" if self._state == "series" else "done"
+            self.done = self._state == "done"
+            self._position = position + 1
+            return True
+
+        if self._state == "series":
+            batch = self._series_batch(position)
+            if batch:
+                entries.extend(batch)
+                return True
+
+        member = self._member(position)
+        if member is None:
+            return False
+        key, position = member
+        if self._state == "members" and key == self.series_key:
+            if position >= len(self._buffer):
+                return False
+            if self._buffer[position] != "{":
+                raise ValueError(f"Expected an object for '{key}'")
+            self.has_series = True
+            self._state, self._position = "series", position + 1
+            return True
+        decoded = self._decode(position)
+        if decoded is None:
+            return False
+        value, self._position = decoded
+        if self._state == "series":
+            entries.append((key, value))
+        else:
+            self.fields[key] = value
+        return True
+
 class AlphaVantageClient(DataProvider):
     def __init__(self, api_key: str, base_url: str = "https://www.alphavantage.co/query"):
         self.api_key = api_key
         self.base_url = base_url
         self.client = httpx.AsyncClient()
+        self.full_output_available = True # Cleared once the key's plan rejects outputsize=full
 
     async def _make_request(self, params: Dict[str, str]) -> Dict[str, Any]:
         params["apikey"] = self.api_key
         try:
             response = await self.client.get(self.base_url, params=params, timeout=5.0)
             response.raise_for_status()
-            data = await response.json()
-            if "Error Message" in data:
-                raise AlphaVantageAPIError(data["Error Message"])
-            if "Note" in data: # API rate limit message
-                raise AlphaVantageAPIError(data["Note"])
+            data = response.json()
+            _raise_for_api_error(data)
             return data
-        except httpx.HTTPStatusError as e:
-            raise AlphaVantageAPIError(f"HTTP error occurred: {e.response.status_code} - {e.response.text}")
-        except httpx.RequestError as e:
-            raise AlphaVantageAPIError(f"Request error occurred: {e}")
+        except AlphaVantageAPIError:
+            raise
+        except httpx.HTTPError as e:
+            raise _http_error(e)
         except Exception as e:
             raise AlphaVantageAPIError(f"An unexpected error occurred: {e}")
 
+    async def _stream_request(self, params: Dict[str, str], parser: TimeSeriesParser) -> AsyncIterator[List[Tuple[str, Dict[str, str]]]]:
+        """
+        Streams the response through `parser`, yielding the entries each chunk completes.
+        Closing the iterator early stops the download.
+        """
+        params["apikey"] = self.api_key
+        try:
+            async with self.client.stream("GET", self.base_url, params=params, timeout=5.0) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async with aclosing(response.aiter_bytes()) as chunks:
+                    async for chunk in chunks:
+                        entries = parser.feed(chunk)
+                        if entries:
+                            yield entries
+            parser.close()
+            _raise_for_api_error(parser.fields)
+        except AlphaVantageAPIError:
+            raise
+        except httpx.HTTPError as e:
+            raise _http_error(e)
+        except Exception as e:
+            raise AlphaVantageAPIError(f"An unexpected error occurred: {e}")
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
     async def get_quote(self, symbol: str) -> Quote:
         params = {
             "function": "GLOBAL_QUOTE",
@@ -38,7 +283,7 @@ class AlphaVantageClient(DataProvider):
         data = await self._make_request(params)
         
         if "Global Quote" not in data or not data["Global Quote"]:
-            raise AlphaVantageAPIError(f"No global quote data found for {symbol}")
+            raise AlphaVantageSymbolNotFoundError(f"No global quote data found for {symbol}")
 
         quote_data = data["Global Quote"]
         
@@ -57,35 +302,59 @@ class AlphaVantageClient(DataProvider):
         )
 
     async def get_historical_data(self, symbol: str, period: str = "compact") -> List[HistoricalData]:
-        # Alpha Vantage's "period" is "outputsize": "compact" (100 days) or "full"
-        # We will map "1mo", "3mo", etc. to "compact" for simplicity or require "compact"/"full"
-        # For now, let's just use "compact"
-        outputsize = "compact"
-        if period == "full": # Allow passing "full" if needed
-            outputsize = "full"
+        """
+        Daily bars of `symbol` over `period`, newest first. Periods are "1d", "5d", "1mo",
+        "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd" and "max" (as for Yahoo Finance),
+        measured back from the latest bar, plus Alpha Vantage's own "compact" (the latest 100
+        bars) and "full". Full-size responses are read only as far as the period reaches.
 
+        Periods beyond the latest 100 bars need outputsize=full, a premium feature. Once the
+        key's plan has rejected it, such periods raise AlphaVantagePremiumError without a
+        call, so the next provider answers them and no daily quota is spent.
+        """
+        limit = _PERIOD_BARS.get(period)
+        outputsize = outputsize_for(period)
+        if outputsize == "full" and not self.full_output_available:
+            raise AlphaVantagePremiumError(f"outputsize=full is not included in this API key's plan; period '{period}' needs it")
         params = {
             "function": "TIME_SERIES_DAILY",
             "symbol": symbol,
             "outputsize": outputsize
         }
-        data = await self._make_request(params)
+        parser = TimeSeriesParser()
+        historical_data_list: List[HistoricalData] = []
+        start = None
+        try:
+            async with aclosing(self._stream_request(params, parser)) as batches:
+                async for entries in batches:
+                    if start is None and limit is None and not historical_data_list:
+                        start = period_start(period, datetime.date.fromisoformat(entries[0][0]))
+                    # Dates are ISO strings, newest first: the range ends at the first older one
+                    kept = len(entries)
+                    if start is not None:
+                        oldest = start.isoformat()
+                        kept = next((i for i, (date_str, _) in enumerate(entries) if date_str <= oldest), kept)
+                    if limit is not None:
+                        kept = min(kept, limit - len(historical_data_list))
+                    # One validation call per chunk; pydantic parses the numeric strings
+                    historical_data_list.extend(_BARS.validate_python([
+                        {
+                            "date": date_str,
+                            "open": daily_data.get("1. open", 0),
+                            "high": daily_data.get("2. high", 0),
+                            "low": daily_data.get("3. low", 0),
+                            "close": daily_data.get("4. close", 0),
+                            "volume": daily_data.get("5. volume", 0),
+                        }
+                        for date_str, daily_data in entries[:kept]
+                    ]))
+                    if kept < len(entries) or len(historical_data_list) == limit:
+                        break
+        except AlphaVantagePremiumError:
+            if outputsize == "full":
+                self.full_output_available = False
+            raise
 
-        if "Time Series (Daily)" not in data:
+        if not parser.has_series:
             raise AlphaVantageAPIError(f"No daily time series data found for {symbol}")
-        
-        time_series_data = data["Time Series (Daily)"]
-        historical_data_list = []
-        for date_str, daily_data in time_series_data.items():
-            historical_data_list.append(
-                HistoricalData(
-                    date=date_str,
-                    open=float(daily_data.get("1. open", 0)),
-                    high=float(daily_data.get("2. high", 0)),
-                    low=float(daily_data.get("3. low", 0)),
-                    close=float(daily_data.get("4. close", 0)),
-                    volume=int(daily_data.get("5. volume", 0)),
-                )
-            )
-        
         return historical_data_list
@@ -25,11 +25,28 @@ class HistoricalData(BaseModel):
     close: float
     volume: int
 
+class ProviderError(Exception):
+    """Custom exception for data provider errors. The subclasses say whether asking again can help."""
+    pass
+
+class SymbolNotFoundError(ProviderError):
+    """The provider does not know the symbol (a typo, or delisted)."""
+    pass
+
+class RateLimitedError(ProviderError):
+    """The provider refused the call because of a rate limit or quota."""
+    pass
+
+class TransientProviderError(ProviderError):
+    """A network error, timeout or server error; the same call may succeed shortly."""
+    pass
+
 class DataProvider(ABC):
     """
     Abstract Base Class for financial data providers.
     Defines the common interface for fetching stock quotes and historical data,
-    returning normalized Quote and HistoricalData objects.
+    returning normalized Quote and HistoricalData objects. Failures are raised as
+    ProviderError subclasses: SymbolNotFoundError, RateLimitedError or TransientProviderError.
     """
 
     @abstractmethod
@@ -45,3 +62,9 @@ class DataProvider(ABC):
         Fetches historical data for a given stock symbol and period, returning a list of normalized HistoricalData objects.
         """
         pass
+
+    async def aclose(self) -> None:
+        """
+        Releases connections held by the provider; called at shutdown.
+        """
+        pass
@@ -1,35 +1,75 @@
-from typing import Dict, Type
+from typing import Callable, Dict, Iterator, MutableMapping
 from financial_analysis_agent.clients.data_provider import DataProvider
 from financial_analysis_agent.clients.alpha_vantage import AlphaVantageClient
 from financial_analysis_agent.clients.yahoo_finance import YahooFinanceClient
 
+class LazyProviders(MutableMapping[str, DataProvider]):
+    """
+    Data providers keyed by name, each constructed the first time it is looked up, so a
+    cold start does not pay for clients (and their connection pools) it never uses.
+    """
+    def __init__(self, constructors: Dict[str, Callable[[], DataProvider]]):
+        self._constructors = dict(constructors)
+        self._instances: Dict[str, DataProvider] = {}
+
+    def __getitem__(self, name: str) -> DataProvider:
+        provider = self._instances.get(name)
+        if provider is None:
+            provider = self._instances[name] = self._constructors[name]()
+        return provider
+
+    def __setitem__(self, name: str, provider: DataProvider) -> None:
+        self._constructors.setdefault(name, lambda: provider)
+        self._instances[name] = provider
+
+    def __delitem__(self, name: str) -> None:
+        del self._constructors[name]
+        self._instances.pop(name, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._constructors)
+
+    def __len__(self) -> int:
+        return len(self._constructors)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._constructors
+
+    def constructed(self) -> Dict[str, DataProvider]:
+        """
+        The providers built so far, without constructing the others.
+        """
+        return dict(self._instances)
+
 class DataProviderFactory:
     """
     A factory class to provide instances of various financial data providers.
     """
     def __init__(self, api_keys: Dict[str, str]):
-        self._providers: Dict[str, DataProvider] = {}
-        
-        # Initialize AlphaVantageClient if API key is provided
+        constructors: Dict[str, Callable[[], DataProvider]] = {}
+
+        # Register AlphaVantageClient if API key is provided
         if "ALPHA_VANTAGE_API_KEY" in api_keys and api_keys["ALPHA_VANTAGE_API_KEY"]:
-            self._providers["alpha_vantage"] = AlphaVantageClient(api_keys["ALPHA_VANTAGE_API_KEY"])
-        
-        # Initialize YahooFinanceClient (no API key needed directly for yfinance library)
-        self._providers["yahoo_finance"] = YahooFinanceClient()
+            api_key = api_keys["ALPHA_VANTAGE_API_KEY"]
+            constructors["alpha_vantage"] = lambda: AlphaVantageClient(api_key)
+
+        # Register YahooFinanceClient (no API key needed directly for yfinance library)
+        constructors["yahoo_finance"] = YahooFinanceClient
 
-        if not self._providers:
+        if not constructors:
             raise ValueError("No data providers could be initialized. Check API keys and configuration.")
+        self._providers = LazyProviders(constructors)
 
     def get_provider(self, provider_name: str) -> DataProvider:
         """
-        Retrieves a data provider instance by name.
+        Retrieves a data provider instance by name, constructing it on first use.
         """
         if provider_name not in self._providers:
             raise ValueError(f"Data provider '{provider_name}' not found.")
         return self._providers[provider_name]
 
-    def get_all_providers(self) -> Dict[str, DataProvider]:
+    def get_all_providers(self) -> MutableMapping[str, DataProvider]:
         """
-        Returns all initialized data providers.
+        Returns all configured data providers; each is constructed on first lookup.
         """
         return self._providers
@@ -1,14 +1,39 @@
-import yfinance as yf
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-import pandas as pd # yfinance returns pandas DataFrames
 
-from financial_analysis_agent.clients.data_provider import DataProvider, Quote, HistoricalData
+from financial_analysis_agent.clients.data_provider import DataProvider, Quote, HistoricalData, ProviderError, RateLimitedError, SymbolNotFoundError, TransientProviderError
 
-class YahooFinanceAPIError(Exception):
+class YahooFinanceAPIError(ProviderError):
     """Custom exception for Yahoo Finance API errors."""
     pass
 
+class YahooFinanceSymbolNotFoundError(YahooFinanceAPIError, SymbolNotFoundError):
+    """Yahoo Finance has no data for the symbol."""
+    pass
+
+class YahooFinanceRateLimitError(YahooFinanceAPIError, RateLimitedError):
+    """Yahoo Finance is throttling this client."""
+    pass
+
+class YahooFinanceTransientError(YahooFinanceAPIError, TransientProviderError):
+    """yfinance failed in a way that may not repeat (network, parsing of a bad response)."""
+    pass
+
+def _classified(e: Exception, message: str) -> YahooFinanceAPIError:
+    """
+    Wraps an exception raised by yfinance, which has no stable error types across versions.
+    """
+    if isinstance(e, YahooFinanceAPIError):
+        return e
+    if type(e).__name__ == "YFRateLimitError" or "Too Many Requests" in str(e):
+        return YahooFinanceRateLimitError(f"{message}: {e}")
+    return YahooFinanceTransientError(f"{message}: {e}")
+
+def _yfinance():
+    # yfinance pulls in pandas and takes about half a second to import; pay that on first use, not at startup
+    import yfinance
+    return yfinance
+
 class YahooFinanceClient(DataProvider):
     def __init__(self):
         # yfinance does not require an API key directly.
@@ -16,7 +41,7 @@ class YahooFinanceClient(DataProvider):
         pass
 
     async def get_quote(self, symbol: str) -> Quote:
-        ticker = yf.Ticker(symbol)
+        ticker = _yfinance().Ticker(symbol)
         try:
             # yfinance.Ticker().info can be slow; needs to be awaited or run in a threadpool
             # For now, we'll assume it's "fast enough" or that the abstraction layer handles concurrency
@@ -24,7 +49,7 @@ class YahooFinanceClient(DataProvider):
             info = ticker.info
             
             if not info or info.get('regularMarketPrice') is None:
-                raise YahooFinanceAPIError(f"Could not retrieve quote for {symbol}. Data not found or invalid symbol.")
+                raise YahooFinanceSymbolNotFoundError(f"Could not retrieve quote for {symbol}. Data not found or invalid symbol.")
 
             return Quote(
                 symbol=info.get('symbol', symbol),
@@ -44,15 +69,16 @@ class YahooFinanceClient(DataProvider):
         except Exception as e:
             # yfinance can raise various exceptions (e.g., KeyError if symbol not found, ValueError)
             # We catch them and re-raise as our custom API error
-            raise YahooFinanceAPIError(f"Error fetching quote for {symbol}: {e}")
+            raise _classified(e, f"Error fetching quote for {symbol}")
 
     async def get_historical_data(self, symbol: str, period: str = "1mo") -> List[HistoricalData]:
         # periods: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
-        ticker = yf.Ticker(symbol)
+        ticker = _yfinance().Ticker(symbol)
         try:
-            hist: pd.DataFrame = ticker.history(period=period)
+            hist = ticker.history(period=period) # A pandas DataFrame indexed by date
             if hist.empty:
-                raise YahooFinanceAPIError(f"No historical data found for {symbol} for period {period}.")
+                # yfinance answers unknown and delisted symbols with an empty frame
+                raise YahooFinanceSymbolNotFoundError(f"No historical data found for {symbol} for period {period}.")
             
             historical_data_list = []
             for index, row in hist.iterrows():
@@ -68,4 +94,4 @@ class YahooFinanceClient(DataProvider):
                 )
             return historical_data_list
         except Exception as e:
-            raise YahooFinanceAPIError(f"Error fetching historical data for {symbol} (period={period}): {e}")
+            raise _classified(e, f"Error fetching historical data for {symbol} (period={period})")
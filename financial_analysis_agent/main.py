@@ -1,21 +1,60 @@
-from fastapi import FastAPI, HTTPException
-from financial_analysis_agent.services.financial_data_service import FinancialDataService, FinancialDataServiceError
+from fastapi import FastAPI, Header, HTTPException, Query, WebSocket
+from fastapi.responses import StreamingResponse
+from financial_analysis_agent.services.financial_data_service import FinancialDataService, FinancialDataServiceError, UnknownSymbolError
 from financial_analysis_agent.clients.data_provider_factory import DataProviderFactory
-from financial_analysis_agent.schemas import StockDataInput, StockDataOutput, PortfolioRecommendationInput, PortfolioRecommendationOutput, CompareStocksInput, CompareStocksOutput
+from financial_analysis_agent.schemas import StockDataInput, StockDataOutput, PortfolioRecommendationInput, PortfolioRecommendationOutput, CompareStocksInput, CompareStocksOutput, BacktestInput, BacktestOutput, IndicatorInput, IndicatorOutput, CacheInvalidationInput, CacheInvalidationOutput, SymbolSearchInput, SymbolSearchOutput, SymbolResolveInput, SymbolResolveOutput
 from financial_analysis_agent.services.portfolio_service import PortfolioService
+from financial_analysis_agent.services.projection_service import ProjectionService
+from financial_analysis_agent.services.optimizer_service import PortfolioOptimizer
+from financial_analysis_agent.services.backtest_service import BacktestService, BacktestError
+from financial_analysis_agent.services.indicator_service import IndicatorService
+from financial_analysis_agent.services.quote_hub import QuoteHub
+from financial_analysis_agent.services.symbol_directory import SymbolDirectory
+from financial_analysis_agent.utils.cache_events import CacheEventBus
+from financial_analysis_agent.utils.symbols import load_symbol_universe, normalize_symbol
 import redis.asyncio as redis
+import asyncio
+import hmac
 import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
 import structlog
-from financial_analysis_agent.logging import configure_logging
+from common.encoding import NegotiatedResponse, install_encoding
+from common.metrics import instrument_app
+from common.tracing import trace_app
+from common.logging import configure_logging
 
-configure_logging()
+configure_logging(service="financial_analysis_agent")
 logger = structlog.get_logger()
 
-app = FastAPI()
+def _log_index_build_failure(build: asyncio.Future) -> None:
+    if not build.cancelled() and build.exception() is not None:
+        # Searches retry the build; log why this one failed
+        logger.error("Symbol index build failed", exc_info=build.exception())
 
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     logger.info("Financial Analysis Agent starting up")
+    event_bus = financial_data_service.cache_manager.event_bus
+    if event_bus is not None:
+        await event_bus.start()
+    # Precompute the efficient frontier off the request path and keep it current
+    frontier_refresh = asyncio.create_task(portfolio_optimizer.run_refresh_loop())
+    # Build the symbol index in the background so the first search does not wait for it
+    index_build = asyncio.get_running_loop().run_in_executor(None, symbol_directory.index)
+    index_build.add_done_callback(_log_index_build_failure)
+    yield
+    index_build.cancel()
+    frontier_refresh.cancel()
+    await quote_hub.close()
+    if event_bus is not None:
+        await event_bus.close()
+    await financial_data_service.close()
+
+app = FastAPI(default_response_class=NegotiatedResponse, lifespan=lifespan)
+install_encoding(app)
+instrument_app(app)
+trace_app(app, service="financial_analysis_agent")
 
 # Configuration for Redis (from environment variables)
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
@@ -25,6 +64,10 @@ REDIS_DB = int(os.getenv("REDIS_DB", 0))
 # Configuration for API keys (from environment variables or Secret Manager)
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
 # YAHOO_FINANCE_API_KEY - yfinance does not typically use an API key
+# Listed symbols (Alpha Vantage LISTING_STATUS CSV, or one symbol per line); unset allows every symbol
+SYMBOL_UNIVERSE_PATH = os.getenv("SYMBOL_UNIVERSE_PATH")
+# Shared secret for the /admin endpoints, sent in the X-Admin-Token header; unset disables them
+CACHE_ADMIN_TOKEN = os.getenv("CACHE_ADMIN_TOKEN")
 
 def get_financial_data_service() -> FinancialDataService:
     """
@@ -40,12 +83,27 @@ def get_financial_data_service() -> FinancialDataService:
         "ALPHA_VANTAGE_API_KEY": ALPHA_VANTAGE_API_KEY,
     }
     provider_factory = DataProviderFactory(api_keys=api_keys)
-    service = FinancialDataService(provider_factory=provider_factory, redis_client=redis_client)
+    # Shares refreshes and invalidations with the other instances' local cache tiers
+    event_bus = CacheEventBus(redis_client)
+    service = FinancialDataService(
+        provider_factory=provider_factory, redis_client=redis_client, event_bus=event_bus,
+        symbol_universe=load_symbol_universe(SYMBOL_UNIVERSE_PATH),
+    )
     return service
 
 # Initialize the service globally, but allow patching get_financial_data_service
 financial_data_service = get_financial_data_service()
-portfolio_service = PortfolioService()
+portfolio_optimizer = PortfolioOptimizer(financial_data_service)
+portfolio_service = PortfolioService(optimizer=portfolio_optimizer)
+projection_service = ProjectionService(financial_data_service)
+backtest_service = BacktestService(financial_data_service)
+indicator_service = IndicatorService(financial_data_service)
+quote_hub = QuoteHub(financial_data_service)
+# Searches the configured symbol universe, or the bundled listings without one
+symbol_directory = SymbolDirectory(universe=financial_data_service.symbol_universe)
+
+SSE_KEEPALIVE_S = 15
+MAX_STREAM_SYMBOLS = 50
 
 @app.get("/health")
 async def health_check():
@@ -55,13 +113,20 @@ async def health_check():
 @app.post("/financial/stock-data", response_model=StockDataOutput)
 async def get_stock_data(input: StockDataInput):
     logger.info("Getting stock data", symbol=input.symbol, period=input.period)
+    if not input.symbol.strip():
+        raise HTTPException(status_code=422, detail="Symbol cannot be empty")
     quote = None
     historical_data = None
     errors = []
+    unknown_symbol = False
 
     try:
         # Always try to get the quote
         quote = await financial_data_service.get_quote(input.symbol)
+    except UnknownSymbolError as e:
+        logger.info("Unknown symbol", symbol=input.symbol)
+        unknown_symbol = True
+        errors.append(f"Error fetching quote: {e}")
     except FinancialDataServiceError as e:
         logger.error("Error fetching quote", error=e, symbol=input.symbol)
         errors.append(f"Error fetching quote: {e}")
@@ -72,6 +137,9 @@ async def get_stock_data(input: StockDataInput):
     if input.period:
         try:
             historical_data = await financial_data_service.get_historical_data(input.symbol, input.period)
+        except UnknownSymbolError as e:
+            unknown_symbol = True
+            errors.append(f"Error fetching historical data: {e}")
         except FinancialDataServiceError as e:
             logger.error("Error fetching historical data", error=e, symbol=input.symbol, period=input.period)
             errors.append(f"Error fetching historical data: {e}")
@@ -79,6 +147,8 @@ async def get_stock_data(input: StockDataInput):
             logger.exception("Unexpected error fetching historical data", symbol=input.symbol, period=input.period)
             errors.append(f"Unexpected error fetching historical data: {e}")
     
+    if unknown_symbol and not quote and not historical_data:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol {input.symbol}: {'; '.join(errors)}")
     if not quote and not historical_data and errors:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve any data: {'; '.join(errors)}")
     elif errors:
@@ -93,11 +163,19 @@ async def recommend_portfolio(input: PortfolioRecommendationInput):
     logger.info("Recommending portfolio", risk_tolerance=input.risk_tolerance)
     try:
         recommendation = portfolio_service.recommend_portfolio(input)
-        return recommendation
     except Exception as e:
         logger.exception("Failed to generate portfolio recommendation")
         raise HTTPException(status_code=500, detail=f"Failed to generate portfolio recommendation: {e}")
 
+    try:
+        recommendation.projection = await projection_service.project(
+            recommendation.recommended_portfolio, input.risk_tolerance, input.investment_amount, input.time_horizon
+        )
+    except Exception:
+        # The recommendation stands on its own; return it without a projection
+        logger.exception("Failed to project portfolio outcomes", risk_tolerance=input.risk_tolerance, time_horizon=input.time_horizon)
+    return recommendation
+
 @app.post("/financial/compare-stocks", response_model=CompareStocksOutput)
 async def compare_stocks(input: CompareStocksInput):
     logger.info("Comparing stocks", symbols=input.symbols, period=input.period)
@@ -113,3 +191,124 @@ async def compare_stocks(input: CompareStocksInput):
     except Exception as e:
         logger.exception("An unexpected error occurred during stock comparison", symbols=input.symbols)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during stock comparison: {e}")
+
+@app.post("/financial/backtest", response_model=BacktestOutput)
+async def backtest(input: BacktestInput):
+    logger.info("Backtesting portfolio", symbols=list(input.weights), period=input.period, rebalance=input.rebalance)
+    try:
+        return await backtest_service.backtest(input.weights, input.period, input.rebalance)
+    except BacktestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except UnknownSymbolError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except FinancialDataServiceError as e:
+        logger.error("Error fetching backtest history", error=e, symbols=list(input.weights))
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.exception("An unexpected error occurred during backtest", symbols=list(input.weights))
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during backtest: {e}")
+
+@app.post("/financial/indicators", response_model=IndicatorOutput)
+async def get_indicators(input: IndicatorInput):
+    logger.info("Computing indicators", symbol=input.symbol, period=input.period)
+    try:
+        return await indicator_service.indicators(input.symbol, input.period, input.params, input.include_series)
+    except UnknownSymbolError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except FinancialDataServiceError as e:
+        logger.error("Error fetching indicator history", error=e, symbol=input.symbol)
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.exception("An unexpected error occurred computing indicators", symbol=input.symbol)
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred computing indicators: {e}")
+
+async def _symbol_index_ready() -> None:
+    """
+    Waits for the symbol index off the event loop; a build already under way is joined, not repeated.
+    """
+    if not symbol_directory.indexed:
+        await asyncio.to_thread(symbol_directory.index)
+
+@app.post("/financial/symbols/search", response_model=SymbolSearchOutput)
+async def search_symbols(input: SymbolSearchInput):
+    logger.info("Searching symbols", query=input.query, limit=input.limit)
+    await _symbol_index_ready()
+    return SymbolSearchOutput(query=input.query, matches=symbol_directory.search(input.query, input.limit))
+
+@app.post("/financial/symbols/resolve", response_model=SymbolResolveOutput)
+async def resolve_symbols(input: SymbolResolveInput):
+    await _symbol_index_ready()
+    resolved = {}
+    for name in input.names:
+        listing = symbol_directory.resolve(name)
+        resolved[name] = listing.symbol if listing is not None else None
+    logger.info("Resolved symbols", resolved=resolved)
+    return SymbolResolveOutput(resolved=resolved)
+
+INVALID_STREAM_SYMBOLS = f"Provide between 1 and {MAX_STREAM_SYMBOLS} comma-separated symbols."
+
+def _stream_symbols(symbols: str) -> Optional[List[str]]:
+    requested = [symbol for symbol in symbols.split(",") if symbol.strip()]
+    return requested if 0 < len(requested) <= MAX_STREAM_SYMBOLS else None
+
+@app.websocket("/financial/quotes/ws")
+async def stream_quotes_ws(websocket: WebSocket, symbols: str = Query(..., description="Comma-separated ticker symbols.")):
+    requested = _stream_symbols(symbols)
+    if requested is None:
+        await websocket.close(code=1008, reason=INVALID_STREAM_SYMBOLS)
+        return
+    await websocket.accept()
+    logger.info("Quote WebSocket opened", symbols=requested)
+
+    async def send_quotes():
+        while True:
+            quote = await subscription.get()
+            await websocket.send_text(quote.model_dump_json())
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    async with await quote_hub.subscribe(requested) as subscription:
+        tasks = [asyncio.create_task(send_quotes()), asyncio.create_task(wait_for_disconnect())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+    logger.info("Quote WebSocket closed", symbols=requested, dropped=subscription.dropped)
+
+@app.get("/financial/quotes/stream")
+async def stream_quotes_sse(symbols: str = Query(..., description="Comma-separated ticker symbols.")):
+    requested = _stream_symbols(symbols)
+    if requested is None:
+        raise HTTPException(status_code=422, detail=INVALID_STREAM_SYMBOLS)
+
+    async def events():
+        # Subscribed once streaming starts, so a response that is never sent holds no feeds
+        async with await quote_hub.subscribe(requested) as subscription:
+            while True:
+                try:
+                    quote = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: quote\ndata: {quote.model_dump_json()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/admin/cache/invalidate", response_model=CacheInvalidationOutput)
+async def invalidate_cache(input: CacheInvalidationInput, x_admin_token: Optional[str] = Header(None)):
+    if not CACHE_ADMIN_TOKEN or x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), CACHE_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Cache administration requires a valid X-Admin-Token header.")
+    patterns = []
+    if input.symbol:
+        symbol = normalize_symbol(input.symbol)
+        patterns += [f"*:symbol={symbol}", f"*:symbol={symbol}:*"]
+    if input.prefix:
+        patterns.append(f"{input.prefix}*")
+    logger.info("Invalidating cache", patterns=patterns)
+    try:
+        deleted = await financial_data_service.cache_manager.invalidate(patterns)
+    except Exception as e:
+        logger.exception("Failed to invalidate cache", patterns=patterns)
+        raise HTTPException(status_code=500, detail=f"Failed to invalidate cache: {e}")
+    return CacheInvalidationOutput(patterns=patterns, deleted=deleted)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Optional, List, Dict, Literal
 from financial_analysis_agent.clients.data_provider import Quote, HistoricalData
+from financial_analysis_agent.utils.symbols import SYMBOL_PATTERN, normalize_symbol
 
 class StockDataInput(BaseModel):
     symbol: str = Field(..., description="Stock ticker symbol (e.g., 'AAPL', 'IBM').")
@@ -13,17 +14,49 @@ class StockDataOutput(BaseModel):
 class PortfolioRecommendationInput(BaseModel):
     risk_tolerance: str = Field(..., description="User's risk tolerance (e.g., 'conservative', 'moderate', 'aggressive').")
     investment_amount: float = Field(..., gt=0, description="Amount to invest.")
-    time_horizon: int = Field(..., gt=0, description="Investment time horizon in years.")
+    time_horizon: int = Field(..., gt=0, le=50, description="Investment time horizon in years.")
 
 class PortfolioAsset(BaseModel):
     symbol: str
     asset_class: str
     allocation: float = Field(..., ge=0, le=100, description="Percentage allocation of this asset.")
 
+class ProjectionBand(BaseModel):
+    year: int
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+
+class PortfolioProjection(BaseModel):
+    investment_amount: float
+    time_horizon: int
+    simulated_paths: int
+    expected_annual_return: float = Field(..., description="Expected annual log return of the allocation.")
+    annual_volatility: float
+    probability_of_loss: float = Field(..., description="Share of simulated paths ending below the amount invested.")
+    estimates_source: str = Field(..., description="'history' when estimated from cached price history, 'assumptions' otherwise.")
+    bands: List[ProjectionBand] = Field(..., description="Percentiles of the portfolio value at the end of selected years.")
+
+class FrontierPoint(BaseModel):
+    risk_aversion: float
+    expected_return: float = Field(..., description="Expected annual log return.")
+    volatility: float = Field(..., description="Annualized volatility.")
+    weights: Dict[str, float] = Field(..., description="Asset weights summing to 1.")
+
+class EfficientFrontier(BaseModel):
+    universe: List[str]
+    as_of: str = Field(..., description="Date of the latest bar the estimates include.")
+    observations: int = Field(..., description="Daily returns behind the estimates.")
+    estimates_source: str
+    points: List[FrontierPoint] = Field(..., description="Efficient portfolios ordered by increasing volatility.")
+
 class PortfolioRecommendationOutput(BaseModel):
     risk_profile: str
     description: str
     recommended_portfolio: List[PortfolioAsset]
+    projection: Optional[PortfolioProjection] = None
 
 class CompareStocksInput(BaseModel):
     symbols: List[str] = Field(..., description="List of stock symbols to compare.")
@@ -40,3 +73,130 @@ class CompareStocksOutput(BaseModel):
     period: str
     performance_comparison: List[StockPerformance]
 
+
+RebalanceFrequency = Literal["never", "daily", "weekly", "monthly", "quarterly", "annually"]
+
+class BacktestInput(BaseModel):
+    weights: Dict[str, float] = Field(..., description="Target weight per symbol; normalized to sum to 1.")
+    period: str = Field("5y", description="Time period of history to test over (e.g., '1y', '10y', 'max').")
+    rebalance: RebalanceFrequency = Field("monthly", description="How often holdings are reset to the target weights.")
+
+    @field_validator("weights")
+    @classmethod
+    def normalize_weights(cls, weights: Dict[str, float]) -> Dict[str, float]:
+        normalized: Dict[str, float] = {}
+        for symbol, weight in weights.items():
+            key = normalize_symbol(symbol)
+            if not SYMBOL_PATTERN.match(key):
+                raise ValueError(f"'{symbol}' is not a valid ticker symbol")
+            if key in normalized:
+                raise ValueError(f"{key} is given more than once")
+            normalized[key] = weight
+        if any(weight < 0 for weight in normalized.values()):
+            raise ValueError("weights must be non-negative")
+        total = sum(normalized.values())
+        if total <= 0:
+            raise ValueError("at least one weight must be positive")
+        return {symbol: weight / total for symbol, weight in normalized.items() if weight > 0}
+
+class EquityCurve(BaseModel):
+    """Daily series in columns; decades of daily points are cheaper to build and encode this way."""
+    dates: List[str]
+    values: List[float] = Field(..., description="Portfolio value per unit invested at the start.")
+    drawdowns: List[float] = Field(..., description="Decline from the running peak, as a fraction (0 or negative).")
+
+class Drawdown(BaseModel):
+    depth: float = Field(..., description="Largest decline from a peak, as a fraction (0 or negative).")
+    peak_date: str
+    trough_date: str
+    recovery_date: Optional[str] = Field(None, description="First date back at the peak value; None if not yet recovered.")
+
+class BacktestOutput(BaseModel):
+    weights: Dict[str, float]
+    period: str
+    rebalance: RebalanceFrequency
+    start_date: str
+    end_date: str
+    total_return: float
+    cagr: float = Field(..., description="Compound annual growth rate.")
+    annual_volatility: float = Field(..., description="Annualized volatility of daily portfolio returns.")
+    max_drawdown: Drawdown
+    equity_curve: EquityCurve
+
+class IndicatorParams(BaseModel):
+    sma_window: int = Field(20, ge=2)
+    ema_window: int = Field(20, ge=2)
+    rsi_window: int = Field(14, ge=2)
+    macd_fast: int = Field(12, ge=2)
+    macd_slow: int = Field(26, ge=2)
+    macd_signal: int = Field(9, ge=2)
+    bollinger_window: int = Field(20, ge=2)
+    bollinger_k: float = Field(2.0, gt=0)
+
+class IndicatorInput(BaseModel):
+    symbol: str = Field(..., description="Stock ticker symbol (e.g., 'AAPL', 'IBM').")
+    period: str = Field("1y", description="Time period of history the indicators are computed over.")
+    params: IndicatorParams = Field(default_factory=IndicatorParams)
+    include_series: bool = Field(False, description="Also return every indicator for every bar, not just the latest values.")
+
+class IndicatorValues(BaseModel):
+    """Indicator values at one bar; None while an indicator is still warming up."""
+    close: float
+    sma: Optional[float] = None
+    ema: Optional[float] = None
+    rsi: Optional[float] = None
+    macd: Optional[float] = None
+    macd_signal: Optional[float] = None
+    macd_histogram: Optional[float] = None
+    bollinger_upper: Optional[float] = None
+    bollinger_middle: Optional[float] = None
+    bollinger_lower: Optional[float] = None
+
+class IndicatorSeries(BaseModel):
+    """Per-bar indicator values in columns, oldest first."""
+    dates: List[str]
+    columns: Dict[str, List[Optional[float]]]
+
+class IndicatorOutput(BaseModel):
+    symbol: str
+    period: str
+    as_of: str = Field(..., description="Date of the latest bar.")
+    params: IndicatorParams
+    latest: IndicatorValues
+    series: Optional[IndicatorSeries] = None
+
+class CacheInvalidationInput(BaseModel):
+    symbol: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9.^=-]+$", description="Invalidate every cached entry for this symbol.")
+    prefix: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_:.-]+$", description="Invalidate every cached entry whose key starts with this prefix (e.g., 'financial_data:quote').")
+
+    @model_validator(mode="after")
+    def require_target(self) -> "CacheInvalidationInput":
+        if not self.symbol and not self.prefix:
+            raise ValueError("Provide a symbol or a prefix")
+        return self
+
+class CacheInvalidationOutput(BaseModel):
+    patterns: List[str] = Field(..., description="Key patterns invalidated on every instance.")
+    deleted: int = Field(..., description="Redis keys deleted.")
+
+class SymbolSearchInput(BaseModel):
+    query: str = Field(..., min_length=1, max_length=64, description="Ticker or company name, complete or partial (e.g., 'AAP', 'apple').")
+    limit: int = Field(10, ge=1, le=25, description="Maximum number of matches.")
+
+class SymbolMatch(BaseModel):
+    symbol: str
+    name: str
+    exchange: str
+    asset_type: str
+    match: Literal["symbol", "name", "fuzzy"] = Field(..., description="Whether the query matched the ticker, the company name, or the name with typos.")
+    distance: int = Field(0, description="Edits between the query and the matched name; 0 unless the match is fuzzy.")
+
+class SymbolSearchOutput(BaseModel):
+    query: str
+    matches: List[SymbolMatch]
+
+class SymbolResolveInput(BaseModel):
+    names: List[str] = Field(..., min_length=1, max_length=50, description="Tickers or company names to resolve (e.g., ['Apple', 'MSFT']).")
+
+class SymbolResolveOutput(BaseModel):
+    resolved: Dict[str, Optional[str]] = Field(..., description="The symbol for each input, or null when no listing matches it unambiguously.")
@@ -0,0 +1,132 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+import numpy as np
+import structlog
+
+from financial_analysis_agent.schemas import BacktestOutput, Drawdown, EquityCurve, RebalanceFrequency
+from financial_analysis_agent.services.financial_data_service import FinancialDataService, FinancialDataServiceError, UnknownSymbolError
+from financial_analysis_agent.utils.timeseries import TRADING_DAYS, align_closes
+from common.metrics import stage
+
+logger = structlog.get_logger()
+
+MIN_BACKTEST_DAYS = 2
+
+class BacktestError(Exception):
+    """Custom exception for backtests that cannot be run on the available history."""
+    pass
+
+
+def rebalance_points(dates: List[str], frequency: RebalanceFrequency) -> np.ndarray:
+    """
+    Indices of the bars at whose close holdings are reset to the target weights: the first
+    bar, then the last bar of every week, month, quarter or year.
+    """
+    if frequency == "daily":
+        return np.arange(len(dates))
+    if frequency == "never":
+        return np.zeros(1, dtype=int)
+    days = np.array(dates, dtype="datetime64[D]")
+    if frequency == "weekly":
+        periods = (days.astype(np.int64) + 3) // 7 # Weeks starting on Monday (1970-01-01 was a Thursday)
+    elif frequency == "monthly":
+        periods = days.astype("datetime64[M]").astype(np.int64)
+    elif frequency == "quarterly":
+        periods = days.astype("datetime64[M]").astype(np.int64) // 3
+    else:
+        periods = days.astype("datetime64[Y]").astype(np.int64)
+    period_ends = np.flatnonzero(periods[1:] != periods[:-1])
+    return np.concatenate([[0], period_ends[period_ends > 0]])
+
+
+def equity_curve(closes: np.ndarray, weights: np.ndarray, rebalances: np.ndarray) -> np.ndarray:
+    """
+    Value of one unit invested at the first close of a (dates x assets) price matrix,
+    rebalanced to `weights` at the close of each bar in `rebalances`.
+
+    Between rebalances the holdings drift with prices, so each bar's value is the value at
+    the last rebalance times the weighted price relatives since then. That turns the
+    day-by-day loop into one gather, one matrix-vector product and a cumulative product
+    over the rebalance points.
+    """
+    index = np.arange(len(closes))
+    anchor = rebalances[np.maximum(np.searchsorted(rebalances, index, side="left") - 1, 0)]
+    growth = (closes / closes[anchor]) @ weights
+    anchor_value = np.ones(len(rebalances))
+    anchor_value[1:] = np.cumprod(growth[rebalances[1:]])
+    return anchor_value[np.searchsorted(rebalances, anchor)] * growth
+
+
+def max_drawdown(values: np.ndarray) -> Tuple[np.ndarray, int, int, int]:
+    """
+    Drawdown series of `values`, plus the peak, trough and recovery indices of the deepest
+    drawdown (recovery is -1 if the peak has not been regained).
+    """
+    running_peak = np.maximum.accumulate(values)
+    drawdowns = values / running_peak - 1.0
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(values[:trough + 1]))
+    regained = np.flatnonzero(values[trough:] >= values[peak])
+    recovery = trough + int(regained[0]) if trough > peak and len(regained) else -1
+    return drawdowns, peak, trough, recovery
+
+
+def run_backtest(dates: List[str], closes: np.ndarray, weights: np.ndarray, rebalance: RebalanceFrequency) -> Dict:
+    """
+    Equity curve and summary statistics of a (dates x assets) price matrix, oldest first.
+    """
+    values = equity_curve(closes, weights, rebalance_points(dates, rebalance))
+    drawdowns, peak, trough, recovery = max_drawdown(values)
+    years = (np.datetime64(dates[-1]) - np.datetime64(dates[0])).astype(int) / 365.25
+    daily_returns = np.diff(np.log(values))
+    return {
+        "start_date": dates[0],
+        "end_date": dates[-1],
+        "total_return": float(values[-1] - 1.0),
+        "cagr": float(values[-1] ** (1.0 / years) - 1.0) if years > 0 else 0.0,
+        "annual_volatility": float(daily_returns.std(ddof=1) * np.sqrt(TRADING_DAYS)) if len(daily_returns) > 1 else 0.0,
+        "max_drawdown": Drawdown(
+            depth=float(drawdowns[trough]),
+            peak_date=dates[peak],
+            trough_date=dates[trough],
+            recovery_date=dates[recovery] if recovery >= 0 else None,
+        ),
+        "equity_curve": EquityCurve(dates=dates, values=values.tolist(), drawdowns=drawdowns.tolist()),
+    }
+
+
+class BacktestService:
+    def __init__(self, financial_data_service: FinancialDataService):
+        self.financial_data_service = financial_data_service
+        # Weights are canonicalized into one sorted tuple; long portfolios make for long keys, so they are hashed
+        self._backtest = financial_data_service.cache_manager.cache(key_prefix="portfolio:backtest", ttl=3600, hash_args=True)(self._backtest_uncached)
+
+    async def backtest(self, weights: Dict[str, float], period: str, rebalance: RebalanceFrequency) -> BacktestOutput:
+        """
+        Replays `weights` over `period` of history, rebalancing at `rebalance` frequency.
+        """
+        portfolio = tuple((symbol, float(f"{weight:.6g}")) for symbol, weight in sorted(weights.items()))
+        return await self._backtest(portfolio, period, rebalance)
+
+    async def _backtest_uncached(self, portfolio: Tuple[Tuple[str, float], ...], period: str, rebalance: str) -> BacktestOutput:
+        weights = dict(portfolio)
+        symbols = list(weights)
+        histories = await asyncio.gather(
+            *(self.financial_data_service.get_historical_data(symbol, period) for symbol in symbols),
+            return_exceptions=True,
+        )
+        failed = {symbol: str(result) for symbol, result in zip(symbols, histories) if isinstance(result, BaseException)}
+        if failed:
+            # An unknown symbol is the caller's mistake, whatever else failed alongside it
+            error = UnknownSymbolError if any(isinstance(result, UnknownSymbolError) for result in histories) else FinancialDataServiceError
+            raise error(f"Could not fetch history for {', '.join(failed)}: {'; '.join(failed.values())}")
+
+        dates, closes = align_closes(dict(zip(symbols, histories)), symbols)
+        if len(dates) < MIN_BACKTEST_DAYS:
+            raise BacktestError(f"The symbols share {len(dates)} trading days over {period}; at least {MIN_BACKTEST_DAYS} are needed.")
+        logger.info("Running backtest", symbols=len(symbols), days=len(dates), rebalance=rebalance)
+        target = np.array([weights[symbol] for symbol in symbols])
+        with stage("backtest:compute").time(assets=len(symbols)):
+            result = run_backtest(dates, closes, target / target.sum(), rebalance)
+        return BacktestOutput(weights=weights, period=period, rebalance=rebalance, **result)
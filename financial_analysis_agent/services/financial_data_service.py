@@ -1,19 +1,42 @@
-from typing import Dict, List, Optional
-from financial_analysis_agent.clients.data_provider import DataProvider, Quote, HistoricalData
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+from financial_analysis_agent.clients.data_provider import DataProvider, Quote, HistoricalData, ProviderError, RateLimitedError, SymbolNotFoundError
 from financial_analysis_agent.clients.data_provider_factory import DataProviderFactory
-from financial_analysis_agent.clients.alpha_vantage import AlphaVantageAPIError
-from financial_analysis_agent.clients.yahoo_finance import YahooFinanceAPIError
 from financial_analysis_agent.utils.cache import CacheManager
+from financial_analysis_agent.utils.cache_events import CacheEventBus
+from financial_analysis_agent.utils.symbols import SymbolUniverse, normalize_symbol
 from financial_analysis_agent.schemas import StockPerformance
+from common.metrics import stage
+from prometheus_client import Counter
 import redis.asyncio as redis # For type hinting the Redis client
 import asyncio
+import os
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+# How long an instance keeps values in memory; peers' refreshes and invalidations arrive over the event bus
+CACHE_LOCAL_TTL_S = int(os.getenv("CACHE_LOCAL_TTL_S", "30"))
+# Negative caching: how long a symbol no provider knows, and a fetch that failed on every provider, are answered without asking again
+NEGATIVE_CACHE_NOT_FOUND_TTL_S = int(os.getenv("NEGATIVE_CACHE_NOT_FOUND_TTL_S", "900"))
+NEGATIVE_CACHE_TRANSIENT_TTL_S = int(os.getenv("NEGATIVE_CACHE_TRANSIENT_TTL_S", "10"))
+# How long a provider is skipped after it reports a rate limit
+PROVIDER_RATE_LIMIT_COOLDOWN_S = int(os.getenv("PROVIDER_RATE_LIMIT_COOLDOWN_S", "60"))
+NEGATIVE_KEY_PREFIX = "financial_data"
+
+NEGATIVE_HITS = Counter("financial_data_negative_hits_total", "Provider calls avoided through symbol validation or negative state, by reason.", ["reason"])
 
 class FinancialDataServiceError(Exception):
     """Custom exception for FinancialDataService errors."""
     pass
 
+class UnknownSymbolError(FinancialDataServiceError):
+    """Custom exception for symbols that are not listed or that no provider has data for."""
+    pass
+
 class FinancialDataService:
-    def __init__(self, provider_factory: DataProviderFactory, redis_client: redis.Redis):
+    def __init__(self, provider_factory: DataProviderFactory, redis_client: redis.Redis, event_bus: Optional[CacheEventBus] = None, local_cache_ttl: int = CACHE_LOCAL_TTL_S, symbol_universe: Optional[SymbolUniverse] = None):
         self._providers = provider_factory.get_all_providers()
         
         # Define preferred order of providers for fallback
@@ -22,51 +45,136 @@ class FinancialDataService:
 
         if not self._active_providers:
             raise FinancialDataServiceError("No active data providers available.")
+        # Symbols outside the universe are rejected without a provider call; None allows every symbol
+        self.symbol_universe = symbol_universe
 
-        self.cache_manager = CacheManager(redis_client=redis_client)
+        self.cache_manager = CacheManager(redis_client=redis_client, local_ttl=local_cache_ttl, event_bus=event_bus)
 
         # Apply caching decorators dynamically after cache_manager is initialized
-        self.get_quote = self.cache_manager.cache(key_prefix="financial_data:quote", ttl=300)(self._get_quote_uncached)
-        self.get_historical_data = self.cache_manager.cache(key_prefix="financial_data:historical", ttl=3600)(self._get_historical_data_uncached)
+        self._get_quote_cached = self.cache_manager.cache(key_prefix="financial_data:quote", ttl=300)(self._get_quote_uncached)
+        self._get_historical_data_cached = self.cache_manager.cache(key_prefix="financial_data:historical", ttl=3600)(self._get_historical_data_uncached)
+
+    async def close(self) -> None:
+        """
+        Closes the providers constructed so far and the Redis connection pool.
+        """
+        providers = self._providers.constructed() if hasattr(self._providers, "constructed") else self._providers
+        for provider in providers.values():
+            await provider.aclose()
+        await self.cache_manager.redis.aclose()
+
+    async def get_quote(self, symbol: str) -> Quote:
+        """
+        Cached quote of `symbol`. The symbol is normalized first, so "aapl" and "AAPL" share
+        one cache entry and invalidating a symbol reaches every spelling of it.
+        """
+        return await self._get_quote_cached(normalize_symbol(symbol))
+
+    async def get_historical_data(self, symbol: str, period: str) -> List[HistoricalData]:
+        """
+        Cached historical data of `symbol` over `period`, keyed by the normalized symbol.
+        """
+        return await self._get_historical_data_cached(normalize_symbol(symbol), period)
 
     async def _get_quote_uncached(self, symbol: str) -> Quote:
         """
         Fetches a stock quote with fallback logic (uncached version).
         Tries providers in order until one succeeds.
         """
-        errors = []
-        for provider_name in self._active_providers:
-            provider = self._providers[provider_name]
-            try:
-                quote = await provider.get_quote(symbol)
-                return quote
-            except (AlphaVantageAPIError, YahooFinanceAPIError) as e:
-                errors.append(f"Provider {provider_name} failed for {symbol}: {e}")
-            except Exception as e:
-                errors.append(f"Provider {provider_name} encountered an unexpected error for {symbol}: {e}")
-        
-        raise FinancialDataServiceError(f"Failed to fetch quote for {symbol} after trying all providers. Errors: {'; '.join(errors)}")
+        return await self._from_providers(
+            "quote", symbol, symbol, f"symbol={normalize_symbol(symbol)}",
+            lambda provider: provider.get_quote(symbol), {"symbol": symbol},
+        )
+
+    async def fetch_live_quote(self, symbol: str) -> Quote:
+        """
+        Fetches a quote from the providers, bypassing the cache; for pollers that need fresh prices.
+        """
+        return await self._get_quote_uncached(normalize_symbol(symbol))
 
     async def _get_historical_data_uncached(self, symbol: str, period: str) -> List[HistoricalData]:
         """
         Fetches historical data with fallback logic (uncached version).
         Tries providers in order until one succeeds.
         """
+        return await self._from_providers(
+            "historical", symbol, f"{symbol}, period {period}", f"symbol={normalize_symbol(symbol)}:period={period}",
+            lambda provider: provider.get_historical_data(symbol, period), {"symbol": symbol, "period": period},
+        )
+
+    async def _from_providers(self, kind: str, symbol: str, subject: str, scope: str, fetch: Callable[[DataProvider], Awaitable[T]], attrs: Dict[str, str]) -> T:
+        """
+        Tries the providers in order until one returns data, consulting and recording negative state:
+        symbols no provider knows, recent failures of this exact fetch, and providers cooling down after
+        a rate limit. Not-found and failure entries are kept per kind and `scope` (the symbol, and the
+        period for history), which starts with `symbol=`, so invalidating a symbol clears them too.
+        """
+        what = "quote" if kind == "quote" else "historical data"
+        if self.symbol_universe is not None and self.symbol_universe.rejects(symbol):
+            NEGATIVE_HITS.labels("unlisted").inc()
+            raise UnknownSymbolError(f"Unknown symbol {symbol}: not in the symbol universe")
+
+        # Per kind: a provider may list a symbol's history but have no quote for it, or the reverse.
+        # Per period: an empty window (a holiday "1d") says nothing about longer ones
+        missing_key = f"{NEGATIVE_KEY_PREFIX}:missing:{kind}:{scope}"
+        failure_key = f"{NEGATIVE_KEY_PREFIX}:failed:{kind}:{scope}"
+        cooldown_keys = [f"{NEGATIVE_KEY_PREFIX}:cooldown:provider={name}" for name in self._active_providers]
+        missing, failed, *cooling = await self._negative_state([missing_key, failure_key, *cooldown_keys])
+        if missing:
+            NEGATIVE_HITS.labels("not_found").inc()
+            raise UnknownSymbolError(f"Unknown symbol {symbol}: no provider has data for it")
+        if failed:
+            NEGATIVE_HITS.labels("failed").inc()
+            errors = failed.decode() if isinstance(failed, bytes) else failed
+            raise FinancialDataServiceError(f"Failed to fetch {what} for {subject} after trying all providers. Errors: {errors}")
+
         errors = []
-        for provider_name in self._active_providers:
+        not_found = 0
+        for provider_name, cooldown_key, cooling_down in zip(self._active_providers, cooldown_keys, cooling):
+            if cooling_down:
+                NEGATIVE_HITS.labels("cooldown").inc()
+                errors.append(f"Provider {provider_name} skipped for {subject}: rate limited, cooling down")
+                continue
             provider = self._providers[provider_name]
             try:
-                historical_data = await provider.get_historical_data(symbol, period)
-                if historical_data: # Ensure data is not empty
-                    return historical_data
-                else:
-                    errors.append(f"Provider {provider_name} returned empty historical data for {symbol}, period {period}")
-            except (AlphaVantageAPIError, YahooFinanceAPIError) as e:
-                errors.append(f"Provider {provider_name} failed for {symbol}, period {period}: {e}")
+                with stage(f"provider:{provider_name}:{kind}").time(**attrs):
+                    result = await fetch(provider)
+                if result: # Ensure data is not empty
+                    return result
+                errors.append(f"Provider {provider_name} returned empty {what} for {subject}")
+            except SymbolNotFoundError as e:
+                not_found += 1
+                errors.append(f"Provider {provider_name} failed for {subject}: {e}")
+            except RateLimitedError as e:
+                await self._remember(cooldown_key, PROVIDER_RATE_LIMIT_COOLDOWN_S)
+                errors.append(f"Provider {provider_name} failed for {subject}: {e}")
+            except ProviderError as e:
+                errors.append(f"Provider {provider_name} failed for {subject}: {e}")
             except Exception as e:
-                errors.append(f"Provider {provider_name} encountered an unexpected error for {symbol}, period {period}: {e}")
-        
-        raise FinancialDataServiceError(f"Failed to fetch historical data for {symbol}, period {period} after trying all providers. Errors: {'; '.join(errors)}")
+                errors.append(f"Provider {provider_name} encountered an unexpected error for {subject}: {e}")
+
+        message = '; '.join(errors)
+        if not_found == len(self._active_providers):
+            await self._remember(missing_key, NEGATIVE_CACHE_NOT_FOUND_TTL_S)
+            raise UnknownSymbolError(f"Unknown symbol {symbol}: no provider has data for it. Errors: {message}")
+        await self._remember(failure_key, NEGATIVE_CACHE_TRANSIENT_TTL_S, message)
+        raise FinancialDataServiceError(f"Failed to fetch {what} for {subject} after trying all providers. Errors: {message}")
+
+    async def _negative_state(self, keys: List[str]) -> List[Optional[Union[str, bytes]]]:
+        try:
+            return await self.cache_manager.redis.mget(keys)
+        except redis.RedisError as e:
+            # Without the negative state every fetch simply goes to the providers
+            logger.warning("Could not read negative cache entries", error=str(e))
+            return [None] * len(keys)
+
+    async def _remember(self, key: str, ttl: int, value: str = "1") -> None:
+        if ttl <= 0:
+            return
+        try:
+            await self.cache_manager.redis.set(key, value, ex=ttl)
+        except redis.RedisError as e:
+            logger.warning("Could not write negative cache entry", key=key, error=str(e))
 
     async def compare_stocks(self, symbols: List[str], period: str) -> List[StockPerformance]:
         """
@@ -0,0 +1,259 @@
+"""
+Technical indicators (SMA, EMA, RSI, MACD, Bollinger Bands) over cached daily bars.
+
+Full series are computed with NumPy: rolling windows through cumulative sums, and the
+exponential averages (EMA, MACD, Wilder's RSI smoothing) in one pass each. The latest values
+come from an IndicatorState kept in Redis per symbol, period and parameters. The state
+holds the running sums and averages, so each new bar updates it in O(1) instead of
+recomputing the window. The exponential averages depend on the bar they were seeded with,
+so the state is rebuilt when the period's first bar moves (a rolling "1y" gaining a day);
+the latest values then always equal the last bar of the series in the same response.
+
+Conventions: exponential averages are seeded with the first value (alpha = 2 / (n + 1), or
+1 / n for RSI), Bollinger Bands use the population standard deviation, and an indicator
+is None until it has seen as many bars as its window.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import structlog
+from pydantic import BaseModel
+
+from financial_analysis_agent.schemas import IndicatorOutput, IndicatorParams, IndicatorSeries, IndicatorValues
+from financial_analysis_agent.services.financial_data_service import FinancialDataService
+from financial_analysis_agent.utils.timeseries import align_closes
+from common.metrics import stage
+
+logger = structlog.get_logger()
+
+INDICATOR_STATE_TTL = 7 * 86400
+
+
+def _alpha(window: int) -> float:
+    return 2.0 / (window + 1)
+
+
+def _rsi(average_gain: float, average_loss: float) -> float:
+    if average_loss == 0:
+        return 100.0
+    return 100.0 - 100.0 / (1.0 + average_gain / average_loss)
+
+
+class IndicatorState(BaseModel):
+    """
+    Everything needed to advance the indicators by one bar.
+    """
+    params: IndicatorParams
+    first_date: Optional[str] = None
+    last_date: Optional[str] = None
+    count: int = 0
+    last_close: float = 0.0
+    window: List[float] = [] # The last max(sma_window, bollinger_window) closes, oldest first
+    sma_sum: float = 0.0
+    bollinger_sum: float = 0.0
+    bollinger_sum_sq: float = 0.0
+    ema: float = 0.0
+    ema_fast: float = 0.0
+    ema_slow: float = 0.0
+    macd_signal: float = 0.0
+    average_gain: float = 0.0
+    average_loss: float = 0.0
+
+    def update(self, date: str, close: float) -> None:
+        p = self.params
+        self.count += 1
+        if self.count == 1:
+            self.first_date = date
+            self.ema = self.ema_fast = self.ema_slow = close
+        else:
+            self.ema += _alpha(p.ema_window) * (close - self.ema)
+            self.ema_fast += _alpha(p.macd_fast) * (close - self.ema_fast)
+            self.ema_slow += _alpha(p.macd_slow) * (close - self.ema_slow)
+            change = close - self.last_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            if self.count == 2:
+                self.average_gain, self.average_loss = gain, loss
+            else:
+                self.average_gain += (gain - self.average_gain) / p.rsi_window
+                self.average_loss += (loss - self.average_loss) / p.rsi_window
+        macd = self.ema_fast - self.ema_slow
+        self.macd_signal = macd if self.count == 1 else self.macd_signal + _alpha(p.macd_signal) * (macd - self.macd_signal)
+
+        self.window.append(close)
+        self.sma_sum += close
+        self.bollinger_sum += close
+        self.bollinger_sum_sq += close * close
+        if len(self.window) > p.sma_window:
+            self.sma_sum -= self.window[-p.sma_window - 1]
+        if len(self.window) > p.bollinger_window:
+            dropped = self.window[-p.bollinger_window - 1]
+            self.bollinger_sum -= dropped
+            self.bollinger_sum_sq -= dropped * dropped
+        keep = max(p.sma_window, p.bollinger_window)
+        if len(self.window) > keep:
+            del self.window[:-keep]
+        self.last_date, self.last_close = date, close
+
+    def values(self) -> IndicatorValues:
+        p = self.params
+        values = IndicatorValues(close=self.last_close)
+        if self.count >= p.sma_window:
+            values.sma = self.sma_sum / p.sma_window
+        if self.count >= p.ema_window:
+            values.ema = self.ema
+        if self.count > p.rsi_window:
+            values.rsi = _rsi(self.average_gain, self.average_loss)
+        if self.count >= p.macd_slow:
+            values.macd = self.ema_fast - self.ema_slow
+        if self.count >= p.macd_slow + p.macd_signal - 1:
+            values.macd_signal = self.macd_signal
+            values.macd_histogram = values.macd - self.macd_signal
+        if self.count >= p.bollinger_window:
+            mean = self.bollinger_sum / p.bollinger_window
+            deviation = np.sqrt(max(self.bollinger_sum_sq / p.bollinger_window - mean * mean, 0.0))
+            values.bollinger_upper = mean + p.bollinger_k * deviation
+            values.bollinger_middle = mean
+            values.bollinger_lower = mean - p.bollinger_k * deviation
+        return values
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of each trailing `window`, NaN for the first window - 1 positions.
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate([[0.0], values]))
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def exponential_average(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    a[0] = values[0], a[t] = a[t-1] + alpha * (values[t] - a[t-1]).
+    """
+    result = np.empty(len(values))
+    average = values[0] if len(values) else 0.0
+    for t, value in enumerate(values.tolist()):
+        average += alpha * (value - average)
+        result[t] = average
+    return result
+
+
+def indicator_series(closes: np.ndarray, params: IndicatorParams) -> Dict[str, np.ndarray]:
+    """
+    Every indicator at every bar of `closes` (oldest first), NaN while warming up.
+    """
+    n = len(closes)
+    index = np.arange(1, n + 1)
+
+    def warm(series: np.ndarray, bars: int) -> np.ndarray:
+        return np.where(index >= bars, series, np.nan)
+
+    ema_fast = exponential_average(closes, _alpha(params.macd_fast))
+    ema_slow = exponential_average(closes, _alpha(params.macd_slow))
+    macd = ema_fast - ema_slow
+    signal = exponential_average(macd, _alpha(params.macd_signal))
+
+    changes = np.diff(closes)
+    average_gain = exponential_average(np.maximum(changes, 0.0), 1.0 / params.rsi_window)
+    average_loss = exponential_average(np.maximum(-changes, 0.0), 1.0 / params.rsi_window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(average_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + average_gain / average_loss))
+
+    middle = rolling_mean(closes, params.bollinger_window)
+    deviation = np.sqrt(np.maximum(rolling_mean(closes * closes, params.bollinger_window) - middle * middle, 0.0))
+    signal_bars = params.macd_slow + params.macd_signal - 1
+    return {
+        "close": closes,
+        "sma": rolling_mean(closes, params.sma_window),
+        "ema": warm(exponential_average(closes, _alpha(params.ema_window)), params.ema_window),
+        "rsi": warm(np.concatenate([[np.nan], rsi]), params.rsi_window + 1),
+        "macd": warm(macd, params.macd_slow),
+        "macd_signal": warm(signal, signal_bars),
+        "macd_histogram": warm(macd - signal, signal_bars),
+        "bollinger_upper": middle + params.bollinger_k * deviation,
+        "bollinger_middle": middle,
+        "bollinger_lower": middle - params.bollinger_k * deviation,
+    }
+
+
+def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+class IndicatorService:
+    def __init__(self, financial_data_service: FinancialDataService, state_ttl: int = INDICATOR_STATE_TTL):
+        self.financial_data_service = financial_data_service
+        self.redis = financial_data_service.cache_manager.redis
+        self.state_ttl = state_ttl
+
+    async def indicators(self, symbol: str, period: str, params: IndicatorParams, include_series: bool = False) -> IndicatorOutput:
+        """
+        Indicators of `symbol` over `period` of cached daily bars: the latest values, and
+        optionally the full series.
+        """
+        history = await self.financial_data_service.get_historical_data(symbol, period)
+        dates, closes = align_closes({symbol: history}, [symbol])
+        closes = closes[:, 0]
+        if not dates:
+            raise ValueError(f"No historical data for {symbol} over {period}.")
+
+        key = self._state_key(symbol, period, params)
+        state = await self._load_state(key)
+        with stage("indicators:update").time(symbol=symbol):
+            state, added = self._advance(state, params, dates, closes)
+        if added:
+            await self._save_state(key, state)
+        logger.info("Indicators updated", symbol=symbol, period=period, bars_added=added)
+
+        series = None
+        if include_series:
+            with stage("indicators:series").time(symbol=symbol):
+                columns = indicator_series(closes, params)
+            series = IndicatorSeries(dates=dates, columns={name: _nan_to_none(values) for name, values in columns.items()})
+        return IndicatorOutput(symbol=symbol, period=period, as_of=state.last_date, params=params, latest=state.values(), series=series)
+
+    @staticmethod
+    def _advance(state: Optional[IndicatorState], params: IndicatorParams, dates: List[str], closes: np.ndarray) -> Tuple[IndicatorState, int]:
+        """
+        Folds the bars after `state.last_date` into the state, or rebuilds it from every bar
+        when there is no state, it was seeded with a different first bar, its last bar is no
+        longer in the history, or that bar's close has since been revised (a session still
+        trading when the state was saved).
+        """
+        start = 0
+        if state is not None and state.first_date != dates[0]:
+            state = None
+        if state is not None:
+            position = int(np.searchsorted(dates, state.last_date))
+            if position < len(dates) and dates[position] == state.last_date and closes[position] == state.last_close:
+                start = position + 1
+            else:
+                state = None
+        if state is None:
+            state = IndicatorState(params=params)
+        new_closes = closes[start:].tolist()
+        for date, close in zip(dates[start:], new_closes):
+            state.update(date, close)
+        return state, len(new_closes)
+
+    @staticmethod
+    def _state_key(symbol: str, period: str, params: IndicatorParams) -> str:
+        settings = ",".join(f"{name}={value}" for name, value in params.model_dump().items())
+        return f"indicators:state:{symbol}:{period}:{settings}"
+
+    async def _load_state(self, key: str) -> Optional[IndicatorState]:
+        try:
+            cached = await self.redis.get(key)
+            return IndicatorState.model_validate_json(cached) if cached else None
+        except Exception:
+            # The state is an optimization; rebuild it from the bars
+            logger.warning("Could not load indicator state", key=key, exc_info=True)
+            return None
+
+    async def _save_state(self, key: str, state: IndicatorState) -> None:
+        try:
+            await self.redis.setex(key, self.state_ttl, state.model_dump_json())
+        except Exception:
+            logger.warning("Could not save indicator state", key=key, exc_info=True)
@@ -0,0 +1,207 @@
+import asyncio
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from financial_analysis_agent.schemas import EfficientFrontier, FrontierPoint
+from financial_analysis_agent.services.financial_data_service import FinancialDataService
+from financial_analysis_agent.services.projection_service import HISTORY_PERIOD, MIN_HISTORY_DAYS, assumed_moments, shrink_mean
+from financial_analysis_agent.utils.timeseries import TRADING_DAYS, align_closes, log_returns
+from common.metrics import stage
+
+logger = structlog.get_logger()
+
+PORTFOLIO_UNIVERSE = [s.strip() for s in os.getenv("PORTFOLIO_UNIVERSE", "VTI,VEA,VWO,BND").split(",") if s.strip()]
+PORTFOLIO_MAX_WEIGHT = float(os.getenv("PORTFOLIO_MAX_WEIGHT", "0.6"))
+FRONTIER_REFRESH_S = int(os.getenv("FRONTIER_REFRESH_S", "3600"))
+
+# Risk aversion (lambda in max w.mu - lambda/2 w'Sigma w) for each risk tolerance
+RISK_AVERSION = {"conservative": 12.0, "moderate": 5.0, "aggressive": 2.0}
+FRONTIER_RISK_AVERSIONS = np.unique(np.concatenate([np.geomspace(0.5, 50.0, 32), list(RISK_AVERSION.values())]))
+
+ASSET_CLASSES = {
+    "VTI": "US Stock Market ETF",
+    "VEA": "International Stock ETF",
+    "VWO": "Emerging Markets ETF",
+    "BND": "Bond ETF",
+}
+
+SOLVER_ITERATIONS = 400
+SOLVER_TOLERANCE = 1e-8
+
+
+class ReturnStatistics:
+    """
+    Running sums of daily log returns over a sliding window for a fixed universe, so new bars
+    update the mean and covariance without reprocessing the whole history. The window's
+    returns are kept too, so bars that leave it are subtracted from the sums.
+    """
+    def __init__(self, symbols: Sequence[str]):
+        self.symbols = list(symbols)
+        self.count = 0
+        self.total = np.zeros(len(symbols))
+        self.outer = np.zeros((len(symbols), len(symbols)))
+        self.return_dates: List[str] = []
+        self.returns = np.empty((0, len(symbols)))
+        self.last_date: Optional[str] = None
+        self.last_closes: Optional[np.ndarray] = None
+
+    @property
+    def window_start(self) -> Optional[str]:
+        """Date of the first bar whose return is in the window."""
+        return self.return_dates[0] if self.return_dates else None
+
+    def update(self, dates: List[str], closes: np.ndarray) -> int:
+        """
+        Moves the window to the bars of `dates`: adds the returns of bars dated after the last
+        one seen and subtracts those of bars before the second date, the first return in the
+        window. Returns how many returns were added or dropped.
+        """
+        start = 0 if self.last_date is None else int(np.searchsorted(dates, self.last_date, side="right"))
+        added = 0
+        if start < len(dates):
+            new_closes = closes[start:] if self.last_closes is None else np.vstack([self.last_closes, closes[start:]])
+            returns = log_returns(new_closes)
+            self.count += len(returns)
+            self.total += returns.sum(axis=0)
+            self.outer += returns.T @ returns
+            self.return_dates.extend(dates[-len(returns):] if len(returns) else [])
+            self.returns = np.vstack([self.returns, returns])
+            self.last_date, self.last_closes = dates[-1], closes[-1]
+            added = len(returns)
+
+        expired = int(np.searchsorted(self.return_dates, dates[1], side="left")) if len(dates) > 1 else len(self.return_dates)
+        if expired:
+            dropped = self.returns[:expired]
+            self.count -= expired
+            self.total -= dropped.sum(axis=0)
+            self.outer -= dropped.T @ dropped
+            del self.return_dates[:expired]
+            self.returns = self.returns[expired:]
+        return added + expired
+
+    def moments(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Annualized mean vector and covariance matrix of the returns in the window.
+        """
+        mean = self.total / self.count
+        covariance = (self.outer - self.count * np.outer(mean, mean)) / (self.count - 1)
+        return mean * TRADING_DAYS, covariance * TRADING_DAYS
+
+
+def project_capped_simplex(points: np.ndarray, cap: float) -> np.ndarray:
+    """
+    Euclidean projection of each row onto {w : 0 <= w <= cap, sum(w) = 1}, by bisection on
+    the shift tau in w = clip(v - tau, 0, cap).
+    """
+    low = points.min(axis=1) - 1.0
+    high = points.max(axis=1)
+    for _ in range(40):
+        tau = (low + high) / 2
+        total = np.clip(points - tau[:, None], 0.0, cap).sum(axis=1)
+        low = np.where(total > 1.0, tau, low)
+        high = np.where(total > 1.0, high, tau)
+    return np.clip(points - ((low + high) / 2)[:, None], 0.0, cap)
+
+
+def solve_frontier(mean: np.ndarray, covariance: np.ndarray, risk_aversions: np.ndarray, max_weight: float = 1.0) -> np.ndarray:
+    """
+    Long-only weights maximizing w.mean - lambda/2 w'Cw for every lambda in `risk_aversions`
+    at once (accelerated projected gradient), capped at `max_weight` per asset. Returns a
+    (lambdas x assets) matrix.
+    """
+    n = len(mean)
+    cap = max(max_weight, 1.0 / n)
+    lipschitz = risk_aversions * max(np.linalg.eigvalsh(covariance)[-1], 1e-12)
+    step = (1.0 / lipschitz)[:, None]
+    weights = np.full((len(risk_aversions), n), 1.0 / n)
+    momentum, t = weights.copy(), 1.0
+    for _ in range(SOLVER_ITERATIONS):
+        gradient = mean[None, :] - risk_aversions[:, None] * (momentum @ covariance)
+        updated = project_capped_simplex(momentum + step * gradient, cap)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = updated + ((t - 1) / t_next) * (updated - weights)
+        converged = np.abs(updated - weights).max() < SOLVER_TOLERANCE
+        weights, t = updated, t_next
+        if converged:
+            break
+    return weights
+
+
+class PortfolioOptimizer:
+    """
+    Keeps the efficient frontier of a universe current and answers recommendations from it.
+
+    `refresh()` reads cached history, moves the ReturnStatistics window to it, and re-solves
+    the frontier only when the window changed. Frontiers are cached per universe and window
+    (first and latest bar), so replicas share them. `frontier` holds the latest one for
+    in-process lookups.
+    """
+    def __init__(self, financial_data_service: FinancialDataService, universe: Optional[List[str]] = None, max_weight: float = PORTFOLIO_MAX_WEIGHT):
+        self.financial_data_service = financial_data_service
+        self.universe = universe or PORTFOLIO_UNIVERSE
+        self.max_weight = max_weight
+        self.stats = ReturnStatistics(self.universe)
+        self.frontier: Optional[EfficientFrontier] = None
+        self._get_frontier = financial_data_service.cache_manager.cache(key_prefix="portfolio:frontier", ttl=86400)(self._solve_frontier)
+
+    async def refresh(self) -> Optional[EfficientFrontier]:
+        histories = await asyncio.gather(
+            *(self.financial_data_service.get_historical_data(symbol, HISTORY_PERIOD) for symbol in self.universe),
+            return_exceptions=True,
+        )
+        failed = [symbol for symbol, history in zip(self.universe, histories) if isinstance(history, BaseException)]
+        if not failed:
+            dates, closes = align_closes(dict(zip(self.universe, histories)), self.universe)
+            changed = self.stats.update(dates, closes) if len(dates) else 0
+            if changed == 0 and self.frontier is not None:
+                return self.frontier
+        else:
+            logger.warning("Missing history for frontier universe", failed=failed)
+
+        as_of = self.stats.last_date or "assumptions"
+        self.frontier = await self._get_frontier(",".join(self.universe), as_of, self.stats.window_start)
+        logger.info("Efficient frontier refreshed", universe=self.universe, as_of=as_of, observations=self.frontier.observations)
+        return self.frontier
+
+    async def run_refresh_loop(self, interval_s: float = FRONTIER_REFRESH_S) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Efficient frontier refresh failed")
+            await asyncio.sleep(interval_s)
+
+    def point_for(self, risk_tolerance: str) -> Optional[FrontierPoint]:
+        """
+        The frontier portfolio for a risk tolerance (unknown ones map to moderate).
+        """
+        if self.frontier is None:
+            return None
+        risk_aversion = RISK_AVERSION.get(risk_tolerance.lower(), RISK_AVERSION["moderate"])
+        return min(self.frontier.points, key=lambda point: abs(point.risk_aversion - risk_aversion))
+
+    async def _solve_frontier(self, universe: str, as_of: str, since: Optional[str]) -> EfficientFrontier:
+        prior_mean, prior_covariance = assumed_moments(self.universe)
+        if self.stats.count > MIN_HISTORY_DAYS:
+            mean, covariance = self.stats.moments()
+            mean = shrink_mean(self.universe, mean)
+            source = "history"
+        else:
+            mean, covariance, source = prior_mean, prior_covariance, "assumptions"
+
+        with stage("optimizer:frontier").time(assets=len(self.universe)):
+            weights = await asyncio.to_thread(solve_frontier, mean, covariance, FRONTIER_RISK_AVERSIONS, self.max_weight)
+        points = [
+            FrontierPoint(
+                risk_aversion=float(risk_aversion),
+                expected_return=float(w @ mean),
+                volatility=float(np.sqrt(w @ covariance @ w)),
+                weights={symbol: round(float(weight), 4) for symbol, weight in zip(self.universe, w)},
+            )
+            for risk_aversion, w in zip(FRONTIER_RISK_AVERSIONS, weights)
+        ]
+        points.sort(key=lambda point: point.volatility)
+        return EfficientFrontier(universe=self.universe, as_of=as_of, observations=self.stats.count, estimates_source=source, points=points)
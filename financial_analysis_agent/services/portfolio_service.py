@@ -1,11 +1,35 @@
 from financial_analysis_agent.schemas import PortfolioRecommendationInput, PortfolioRecommendationOutput, PortfolioAsset
-from typing import Dict, List
+from financial_analysis_agent.services.optimizer_service import ASSET_CLASSES, PortfolioOptimizer
+from typing import Dict, List, Optional
+
+# Weights below this share of the portfolio are left out of a recommendation
+MIN_ALLOCATION = 0.5
 
 class PortfolioService:
+    def __init__(self, optimizer: Optional[PortfolioOptimizer] = None):
+        self.optimizer = optimizer
+
     def recommend_portfolio(self, input: PortfolioRecommendationInput) -> PortfolioRecommendationOutput:
         """
-        Generates a simplified portfolio recommendation based on risk tolerance.
+        Recommends the efficient-frontier portfolio matching the risk tolerance. Until the
+        optimizer has a frontier, falls back to fixed allocations per risk tolerance.
         """
+        point = self.optimizer.point_for(input.risk_tolerance) if self.optimizer is not None else None
+        if point is not None:
+            allocations = {symbol: round(weight * 100, 1) for symbol, weight in point.weights.items() if weight * 100 >= MIN_ALLOCATION}
+            scale = 100.0 / sum(allocations.values())
+            assets = [
+                PortfolioAsset(symbol=symbol, asset_class=ASSET_CLASSES.get(symbol, "Equity"), allocation=round(allocation * scale, 1))
+                for symbol, allocation in sorted(allocations.items(), key=lambda item: -item[1])
+            ]
+            description = (
+                f"An efficient portfolio for a {input.risk_tolerance.lower()} investor, with an expected annual return of "
+                f"{point.expected_return:.1%} and a volatility of {point.volatility:.1%} based on data to {self.optimizer.frontier.as_of}."
+            )
+            return PortfolioRecommendationOutput(risk_profile=input.risk_tolerance, description=description, recommended_portfolio=assets)
+        return self._fixed_portfolio(input)
+
+    def _fixed_portfolio(self, input: PortfolioRecommendationInput) -> PortfolioRecommendationOutput:
         risk = input.risk_tolerance.lower()
 
         if risk == "conservative":
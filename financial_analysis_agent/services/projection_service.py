@@ -0,0 +1,195 @@
+import asyncio
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from financial_analysis_agent.schemas import PortfolioAsset, PortfolioProjection, ProjectionBand
+from financial_analysis_agent.services.financial_data_service import FinancialDataService
+from financial_analysis_agent.utils.timeseries import align_closes, annualized_moments, log_returns
+from common.metrics import stage
+
+logger = structlog.get_logger()
+
+PROJECTION_PATHS = int(os.getenv("PROJECTION_PATHS", "20000"))
+HISTORY_PERIOD = "5y"
+MIN_HISTORY_DAYS = 252 # Below a year of overlapping bars, estimates are too noisy to use
+MAX_BANDS = 10
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Long-run (annual log return, volatility) assumptions, used when cached history is insufficient
+ASSET_ASSUMPTIONS = {
+    "VTI": (0.07, 0.16),
+    "VEA": (0.055, 0.17),
+    "VWO": (0.06, 0.22),
+    "BND": (0.03, 0.05),
+}
+DEFAULT_ASSUMPTION = (0.06, 0.18)
+BOND_SYMBOLS = {"BND", "AGG", "TLT"}
+EQUITY_CORRELATION = 0.75
+BOND_CORRELATION = 0.1
+
+# Historical means are noisy; blend them with the long-run assumptions
+MEAN_SHRINKAGE = 0.5
+
+
+def assumed_moments(symbols: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Annual log-return means and covariance from ASSET_ASSUMPTIONS.
+    """
+    mean = np.array([ASSET_ASSUMPTIONS.get(s, DEFAULT_ASSUMPTION)[0] for s in symbols])
+    volatility = np.array([ASSET_ASSUMPTIONS.get(s, DEFAULT_ASSUMPTION)[1] for s in symbols])
+    is_bond = np.array([s in BOND_SYMBOLS for s in symbols])
+    correlation = np.where(is_bond[:, None] | is_bond[None, :], BOND_CORRELATION, EQUITY_CORRELATION)
+    np.fill_diagonal(correlation, 1.0)
+    return mean, correlation * np.outer(volatility, volatility)
+
+
+def shrink_mean(symbols: Sequence[str], mean: np.ndarray) -> np.ndarray:
+    """
+    Historical annual log-return means blended MEAN_SHRINKAGE of the way toward ASSET_ASSUMPTIONS.
+    """
+    prior_mean, _ = assumed_moments(symbols)
+    return MEAN_SHRINKAGE * prior_mean + (1 - MEAN_SHRINKAGE) * mean
+
+
+def portfolio_moments(weights: np.ndarray, mean: np.ndarray, covariance: np.ndarray) -> Tuple[float, float]:
+    """
+    Annual log-return mean and volatility of a portfolio rebalanced to `weights` each year.
+    """
+    variance = float(weights @ covariance @ weights)
+    # Rebalancing harvests the gap between the assets' and the portfolio's variance drag
+    drift = float(weights @ mean + 0.5 * (weights @ np.diag(covariance) - variance))
+    return drift, float(np.sqrt(variance))
+
+
+def band_years(time_horizon: int, max_bands: int = MAX_BANDS) -> np.ndarray:
+    """
+    The years reported: every year for short horizons, evenly spaced ones ending at the horizon otherwise.
+    """
+    if time_horizon <= max_bands:
+        return np.arange(1, time_horizon + 1)
+    return np.unique(np.round(np.linspace(time_horizon / max_bands, time_horizon, max_bands)).astype(int))
+
+
+def _covariance_factor(covariance: np.ndarray) -> np.ndarray:
+    """
+    A matrix L with L @ L.T == covariance: the Cholesky factor, or an eigendecomposition square
+    root when the covariance is only semi-definite (perfectly correlated assets).
+    """
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+def simulate_bands(
+    weights: np.ndarray,
+    mean: np.ndarray,
+    covariance: np.ndarray,
+    years: np.ndarray,
+    n_paths: int,
+    rng: Optional[np.random.Generator] = None,
+) -> Tuple[np.ndarray, float]:
+    """
+    Simulates `n_paths` growth paths of one unit invested and returns the PERCENTILES of
+    growth at each of `years` (percentiles x years) and the probability of ending below 1.
+
+    Each year the assets' annual log returns are drawn jointly normal with `mean` and
+    `covariance` (correlated through the covariance's Cholesky factor), and the portfolio is
+    rebalanced to `weights` at the end of the year, so its growth that year is the weighted
+    sum of the assets' gross returns. Half the paths mirror the other half's shocks
+    (antithetic variates), which halves the random draws, the bulk of the work, and
+    narrows the spread of the estimates.
+    """
+    rng = rng or np.random.default_rng()
+    factor = _covariance_factor(covariance).T.astype(np.float32)
+    mean = mean.astype(np.float32)
+    weights = weights.astype(np.float32)
+    reported = {int(year): i for i, year in enumerate(years)}
+    log_growth = np.zeros(n_paths, dtype=np.float32)
+    growth_at_years = np.empty((len(years), n_paths), dtype=np.float32)
+    drawn = (n_paths + 1) // 2
+    shocks = np.empty((n_paths, len(mean)), dtype=np.float32)
+    for year in range(1, int(years[-1]) + 1):
+        rng.standard_normal(out=shocks[:drawn], dtype=np.float32)
+        np.negative(shocks[:n_paths - drawn], out=shocks[drawn:])
+        asset_returns = shocks @ factor
+        asset_returns += mean
+        np.exp(asset_returns, out=asset_returns)
+        log_growth += np.log(asset_returns @ weights)
+        if year in reported:
+            growth_at_years[reported[year]] = log_growth
+
+    kth = np.round(np.array(PERCENTILES) / 100 * (n_paths - 1)).astype(int)
+    percentiles = np.partition(growth_at_years, kth, axis=1)[:, kth].T
+    probability_of_loss = float(np.count_nonzero(log_growth < 0.0)) / n_paths
+    return np.exp(percentiles), probability_of_loss
+
+
+class ProjectionService:
+    def __init__(self, financial_data_service: FinancialDataService, n_paths: int = PROJECTION_PATHS, history_period: str = HISTORY_PERIOD):
+        self.financial_data_service = financial_data_service
+        self.n_paths = n_paths
+        self.history_period = history_period
+        # Projections are computed for one unit invested and scaled per request
+        self._project_unit = financial_data_service.cache_manager.cache(key_prefix="portfolio:projection", ttl=3600)(self._project_unit_uncached)
+
+    async def project(self, assets: List[PortfolioAsset], risk_profile: str, investment_amount: float, time_horizon: int) -> PortfolioProjection:
+        """
+        Monte Carlo projection of `investment_amount` in the allocation over `time_horizon` years.
+        """
+        allocation = ",".join(f"{asset.symbol}={asset.allocation:g}" for asset in assets)
+        unit = await self._project_unit(risk_profile.lower(), time_horizon, allocation)
+        return unit.model_copy(update={
+            "investment_amount": investment_amount,
+            "bands": [
+                ProjectionBand(year=band.year, **{f"p{p}": getattr(band, f"p{p}") * investment_amount for p in PERCENTILES})
+                for band in unit.bands
+            ],
+        })
+
+    async def estimate_moments(self, symbols: List[str]) -> Tuple[np.ndarray, np.ndarray, str]:
+        """
+        Annualized log-return means and covariance of `symbols` from cached history, with the
+        means shrunk toward ASSET_ASSUMPTIONS as the optimizer does. Falls back to the
+        assumptions alone when any history is missing or too short.
+        """
+        results = await asyncio.gather(
+            *(self.financial_data_service.get_historical_data(symbol, self.history_period) for symbol in symbols),
+            return_exceptions=True,
+        )
+        failed = [symbol for symbol, result in zip(symbols, results) if isinstance(result, BaseException)]
+        if not failed:
+            _, closes = align_closes(dict(zip(symbols, results)), symbols)
+            if len(closes) > MIN_HISTORY_DAYS:
+                mean, covariance = annualized_moments(log_returns(closes))
+                return shrink_mean(symbols, mean), covariance, "history"
+        logger.warning("Using assumed returns for projection", symbols=symbols, failed=failed)
+        mean, covariance = assumed_moments(symbols)
+        return mean, covariance, "assumptions"
+
+    async def _project_unit_uncached(self, risk_profile: str, time_horizon: int, allocation: str) -> PortfolioProjection:
+        symbols, weights = zip(*((symbol, float(weight)) for symbol, weight in (item.split("=") for item in allocation.split(","))))
+        weights = np.array(weights) / sum(weights)
+        mean, covariance, source = await self.estimate_moments(list(symbols))
+        drift, volatility = portfolio_moments(weights, mean, covariance)
+
+        years = band_years(time_horizon)
+        with stage("projection:simulate").time(paths=self.n_paths, years=time_horizon):
+            percentiles, probability_of_loss = await asyncio.to_thread(simulate_bands, weights, mean, covariance, years, self.n_paths)
+        return PortfolioProjection(
+            investment_amount=1.0,
+            time_horizon=time_horizon,
+            simulated_paths=self.n_paths,
+            expected_annual_return=drift,
+            annual_volatility=volatility,
+            probability_of_loss=probability_of_loss,
+            estimates_source=source,
+            bands=[
+                ProjectionBand(year=int(year), **{f"p{p}": float(value) for p, value in zip(PERCENTILES, column)})
+                for year, column in zip(years, percentiles.T)
+            ],
+        )
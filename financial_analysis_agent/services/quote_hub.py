@@ -0,0 +1,276 @@
+"""
+Live quote fan-out for the WebSocket and SSE endpoints.
+
+Each symbol with local subscribers has a feed. Across all instances, only the holder of
+the Redis lease `quotes:poller:{symbol}` polls the providers. It publishes changed quotes
+on the channel `quotes:{symbol}`. Every instance listens on one pub/sub connection and
+copies each message into its subscribers' queues. So upstream load grows with the number
+of symbols, not with subscribers or instances. If the lease holder goes away, the lease
+expires and another instance with subscribers takes it over on its next poll.
+
+Subscriber queues are bounded and keep the newest quotes. A slow client skips
+intermediate prices instead of growing memory or holding up the fan-out. A symbol with no
+subscribers for QUOTE_IDLE_TIMEOUT_S stops polling, releases its lease and unsubscribes.
+"""
+import asyncio
+import math
+import os
+import uuid
+from typing import Dict, List, Optional, Set
+
+import structlog
+from prometheus_client import Counter, Gauge
+
+from financial_analysis_agent.clients.data_provider import Quote
+from financial_analysis_agent.services.financial_data_service import FinancialDataService
+from financial_analysis_agent.utils.symbols import normalize_symbol
+
+logger = structlog.get_logger()
+
+QUOTE_POLL_INTERVAL_S = float(os.getenv("QUOTE_POLL_INTERVAL_S", "5"))
+QUOTE_IDLE_TIMEOUT_S = float(os.getenv("QUOTE_IDLE_TIMEOUT_S", "30"))
+QUOTE_QUEUE_SIZE = int(os.getenv("QUOTE_QUEUE_SIZE", "32"))
+LEASE_POLL_INTERVALS = 3 # A lease outlives this many missed polls before another instance takes over
+
+SUBSCRIBERS = Gauge("quote_subscribers", "Open live quote subscriptions on this instance.")
+FEEDS = Gauge("quote_feeds", "Symbols with a live quote feed on this instance.")
+POLLS = Counter("quote_polls_total", "Upstream quote polls by the lease holder, by result.", ["result"])
+DROPPED = Counter("quote_updates_dropped_total", "Quotes dropped from full subscriber queues.")
+
+# Compare-and-set and compare-and-delete of a lease, atomic so a lease another instance took
+# over after ours expired is never overwritten or deleted
+RENEW_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[2], "XX") and 1 or 0
+end
+return 0
+"""
+RELEASE_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def _channel(symbol: str) -> str:
+    return f"quotes:{symbol}"
+
+
+def _lease_key(symbol: str) -> str:
+    return f"quotes:poller:{symbol}"
+
+
+def _text(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class Subscription:
+    """
+    One client's view of a set of symbols. Use as an async context manager so it is
+    released when the client goes away.
+    """
+    def __init__(self, hub: "QuoteHub", symbols: List[str], queue_size: int):
+        self.hub = hub
+        self.symbols = symbols
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, quote: Quote) -> None:
+        """
+        Queues a quote without blocking, dropping the oldest one when the client is behind.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            DROPPED.inc()
+        self.queue.put_nowait(quote)
+
+    async def get(self) -> Quote:
+        return await self.queue.get()
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.hub.unsubscribe(self)
+
+
+class _Feed:
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.subscribers: Set[Subscription] = set()
+        self.last: Optional[Quote] = None
+        self.last_published: Optional[Quote] = None
+        self.poller: Optional[asyncio.Task] = None
+        self.expiry: Optional[asyncio.Task] = None
+
+
+class QuoteHub:
+    def __init__(
+        self,
+        financial_data_service: FinancialDataService,
+        redis_client=None,
+        poll_interval_s: float = QUOTE_POLL_INTERVAL_S,
+        idle_timeout_s: float = QUOTE_IDLE_TIMEOUT_S,
+        queue_size: int = QUOTE_QUEUE_SIZE,
+    ):
+        self.financial_data_service = financial_data_service
+        self.redis = redis_client or financial_data_service.cache_manager.redis
+        self.poll_interval_s = poll_interval_s
+        self.idle_timeout_s = idle_timeout_s
+        self.queue_size = queue_size
+        self.instance_id = uuid.uuid4().hex
+        self._feeds: Dict[str, _Feed] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def subscribe(self, symbols: List[str]) -> Subscription:
+        """
+        Subscribes to live quotes of `symbols`. The latest known quote of each symbol is
+        queued right away. If a feed cannot be started, the feeds started by this call are
+        stopped again and the error is raised.
+        """
+        subscription = Subscription(self, sorted({normalize_symbol(symbol) for symbol in symbols if symbol.strip()}), self.queue_size)
+        started: List[_Feed] = []
+        try:
+            for symbol in subscription.symbols:
+                feed = self._feeds.get(symbol)
+                if feed is None:
+                    feed = self._feeds[symbol] = _Feed(symbol)
+                    started.append(feed)
+                    await self._start(feed)
+                if feed.expiry is not None:
+                    feed.expiry.cancel()
+                    feed.expiry = None
+                feed.subscribers.add(subscription)
+                if feed.last is not None:
+                    subscription.offer(feed.last)
+        except BaseException:
+            for feed in started:
+                await self._stop(feed)
+            self._detach(subscription)
+            raise
+        SUBSCRIBERS.inc()
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        self._detach(subscription)
+        SUBSCRIBERS.dec()
+
+    def _detach(self, subscription: Subscription) -> None:
+        """
+        Removes `subscription` from its feeds; feeds left without subscribers expire after the idle timeout.
+        """
+        for symbol in subscription.symbols:
+            feed = self._feeds.get(symbol)
+            if feed is None:
+                continue
+            feed.subscribers.discard(subscription)
+            if not feed.subscribers and feed.expiry is None:
+                feed.expiry = asyncio.create_task(self._expire(feed))
+
+    async def close(self) -> None:
+        """
+        Stops every feed and the listener, releasing the leases this instance holds.
+        """
+        for feed in list(self._feeds.values()):
+            await self._stop(feed)
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    async def _start(self, feed: _Feed) -> None:
+        FEEDS.inc() # Counted from registration, so _stop balances it even when starting fails
+        if self._pubsub is None:
+            self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(_channel(feed.symbol))
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            # Cached quote so new subscribers see a price before the next change is published
+            feed.last = await self.financial_data_service.get_quote(feed.symbol)
+        except Exception as e:
+            logger.warning("No initial quote for live feed", symbol=feed.symbol, error=str(e))
+        feed.poller = asyncio.create_task(self._poll(feed))
+        logger.info("Quote feed started", symbol=feed.symbol)
+
+    async def _expire(self, feed: _Feed) -> None:
+        await asyncio.sleep(self.idle_timeout_s)
+        feed.expiry = None
+        if not feed.subscribers:
+            await self._stop(feed)
+
+    async def _stop(self, feed: _Feed) -> None:
+        if self._feeds.get(feed.symbol) is not feed:
+            return
+        del self._feeds[feed.symbol]
+        for task in (feed.poller, feed.expiry):
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+        FEEDS.dec()
+        try:
+            await self._pubsub.unsubscribe(_channel(feed.symbol))
+            await self._release_lease(feed.symbol)
+        except Exception as e:
+            logger.warning("Could not clean up quote feed", symbol=feed.symbol, error=str(e))
+        if not self._feeds and self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        logger.info("Quote feed stopped", symbol=feed.symbol)
+
+    async def _poll(self, feed: _Feed) -> None:
+        while True:
+            try:
+                if await self._hold_lease(feed.symbol):
+                    quote = await self.financial_data_service.fetch_live_quote(feed.symbol)
+                    if quote != feed.last_published:
+                        await self.redis.publish(_channel(feed.symbol), quote.model_dump_json())
+                        feed.last_published = quote
+                        POLLS.labels(result="changed").inc()
+                    else:
+                        POLLS.labels(result="unchanged").inc()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                POLLS.labels(result="error").inc()
+                logger.warning("Quote poll failed", symbol=feed.symbol, error=str(e))
+            await asyncio.sleep(self.poll_interval_s)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Quote pub/sub read failed", error=str(e))
+                await asyncio.sleep(self.poll_interval_s)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            feed = self._feeds.get(_text(message["channel"]).removeprefix("quotes:"))
+            if feed is None:
+                continue
+            try:
+                feed.last = Quote.model_validate_json(message["data"])
+            except Exception as e:
+                logger.warning("Ignoring malformed quote message", symbol=feed.symbol, error=str(e))
+                continue
+            for subscription in list(feed.subscribers):
+                subscription.offer(feed.last)
+
+    async def _hold_lease(self, symbol: str) -> bool:
+        """
+        Takes or renews the poller lease of `symbol`; False while another instance holds it.
+        """
+        ttl = max(1, math.ceil(self.poll_interval_s * LEASE_POLL_INTERVALS))
+        if await self.redis.set(_lease_key(symbol), self.instance_id, ex=ttl, nx=True):
+            return True
+        return bool(await self.redis.eval(RENEW_LEASE_SCRIPT, 1, _lease_key(symbol), self.instance_id, ttl))
+
+    async def _release_lease(self, symbol: str) -> None:
+        await self.redis.eval(RELEASE_LEASE_SCRIPT, 1, _lease_key(symbol), self.instance_id)
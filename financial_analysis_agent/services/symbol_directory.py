@@ -0,0 +1,187 @@
+"""
+Symbol search and company-name resolution over a listing file, answered from memory.
+
+The listings come from the symbol universe (SYMBOL_UNIVERSE_PATH) when one is configured,
+and from the bundled data/listing_status.csv otherwise. On first use they are indexed into
+two SymbolTries, one keyed by ticker and one by normalized company name. Each name is also
+indexed from each later word ("walt disney" and "disney"). Listings are ranked stocks
+first, then major exchanges, then shorter tickers, and trie values are positions in that
+order. So the trie's precomputed top values are already the best matches.
+"""
+import os
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import structlog
+
+from financial_analysis_agent.schemas import SymbolMatch
+from financial_analysis_agent.utils.symbol_trie import SymbolTrie
+from financial_analysis_agent.utils.symbols import SYMBOL_PATTERN, Listing, SymbolUniverse
+
+logger = structlog.get_logger()
+
+BUNDLED_LISTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "listing_status.csv")
+MAX_MATCHES = 25
+MAJOR_EXCHANGES = {"NASDAQ", "NYSE"}
+
+_NAME_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc", "sa", "nv", "ag", "adr", "the"}
+_STOPWORDS = {"the", "of", "and", "a", "an"}
+
+
+def normalize_name(name: str) -> str:
+    """
+    Lowercase words without punctuation or trailing corporate suffixes:
+    "Alphabet Inc - Class A" -> "alphabet", "AT&T Inc" -> "att".
+    """
+    words = re.sub(r"[^a-z0-9]+", " ", name.lower().replace("&", "").replace("'", "")).split()
+    while words:
+        if words[-1] in _NAME_SUFFIXES:
+            words.pop()
+        elif len(words) > 2 and words[-2] == "class" and len(words[-1]) == 1:
+            del words[-2:]
+        else:
+            break
+    return " ".join(words)
+
+
+def symbol_key(symbol: str) -> str:
+    """
+    Tickers without separators, so "BRK-B", "BRK.B" and "brk b" are the same key.
+    """
+    return re.sub(r"[^a-z0-9]", "", symbol.lower())
+
+
+def _name_keys(name: str) -> List[str]:
+    words = name.split()
+    return [" ".join(words[i:]) for i in range(len(words)) if i == 0 or words[i] not in _STOPWORDS]
+
+
+def _fuzzy_distance(key: str) -> int:
+    """
+    Typos tolerated for a query of this length; short queries match too much to allow any.
+    """
+    if len(key) < 4:
+        return 0
+    return 1 if len(key) < 8 else 2
+
+
+class _Index(NamedTuple):
+    listings: List[Listing]
+    symbols: SymbolTrie
+    names: SymbolTrie
+
+
+class SymbolDirectory:
+    def __init__(self, universe: Optional[SymbolUniverse] = None, path: str = BUNDLED_LISTINGS_PATH):
+        self.universe = universe
+        self.path = path
+        self._index: Optional[_Index] = None
+        self._lock = threading.Lock()
+
+    @property
+    def indexed(self) -> bool:
+        return self._index is not None
+
+    def index(self) -> _Index:
+        """
+        The tries, built on first use so that startup does not pay for them. Callers that
+        arrive during a build, from any thread, wait for it instead of starting another.
+        """
+        if self._index is not None:
+            return self._index
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            start = time.perf_counter()
+            universe = self.universe or SymbolUniverse.from_file(self.path)
+            listings = sorted(
+                universe.listings.values(),
+                key=lambda listing: (listing.asset_type != "Stock", listing.exchange not in MAJOR_EXCHANGES, len(listing.symbol), listing.symbol),
+            )
+            symbols = SymbolTrie.build(((symbol_key(listing.symbol), i) for i, listing in enumerate(listings)), top_k=MAX_MATCHES)
+            names = SymbolTrie.build(
+                ((key, i) for i, listing in enumerate(listings) for key in _name_keys(normalize_name(listing.name))),
+                top_k=MAX_MATCHES,
+            )
+            self._index = _Index(listings, symbols, names)
+            logger.info("Symbol index built", listings=len(listings), symbol_keys=symbols.keys, name_keys=names.keys, ms=round((time.perf_counter() - start) * 1000, 1))
+            return self._index
+
+    def search(self, query: str, limit: int = 10) -> List[SymbolMatch]:
+        """
+        Matches for an autocomplete query, best first: exact ticker, exact name, ticker prefix,
+        then name prefix. Only when none of these match, names within a few typos of the query.
+        """
+        index = self.index()
+        ticker, name = symbol_key(query), normalize_name(query)
+        if not ticker and not name:
+            return []
+        limit = min(limit, MAX_MATCHES)
+        found: Dict[int, Tuple[str, int]] = {}
+
+        def add(values, match: str, distance: int = 0) -> None:
+            for value in values:
+                if len(found) >= limit:
+                    return
+                found.setdefault(value, (match, distance))
+
+        add(index.symbols.exact(ticker), "symbol")
+        add(index.names.exact(name), "name")
+        add(index.symbols.prefix(ticker), "symbol")
+        if name:
+            add(index.names.prefix(name), "name")
+        max_distance = _fuzzy_distance(name)
+        if not found and max_distance:
+            for distance, value in index.names.fuzzy(name, max_distance):
+                add((value,), "fuzzy", distance)
+        return [
+            SymbolMatch(
+                symbol=listing.symbol, name=listing.name, exchange=listing.exchange, asset_type=listing.asset_type,
+                match=match, distance=distance,
+            )
+            for listing, (match, distance) in ((index.listings[value], result) for value, result in found.items())
+        ]
+
+    def resolve(self, text: str) -> Optional[Listing]:
+        """
+        The listing `text` names, or None when there is no clear answer.
+
+        Ticker-shaped text (capitals, no spaces: "FORD") is looked up as a ticker, or else
+        as an exact company name ("APPLE"), and is never completed or corrected, so an
+        unknown ticker stays unresolved. Other text is read as a company name first ("Ford"):
+        an exact name, a prefix with a single listing under it, the ticker, and failing all
+        of these, the one name within a few typos of the whole text. Share classes that have
+        the same name resolve to the best-ranked class ("Alphabet" is GOOG, not GOOGL).
+        """
+        index = self.index()
+        ticker, name = symbol_key(text), normalize_name(text)
+        if not ticker:
+            return None
+
+        def by_ticker() -> Tuple[int, ...]:
+            return index.symbols.exact(ticker)
+
+        def by_exact_name() -> Tuple[int, ...]:
+            return index.names.exact(name)
+
+        def by_name() -> Tuple[int, ...]:
+            exact = index.names.exact(name)
+            if exact or len(name) < 4:
+                return exact
+            under_prefix = index.names.prefix(name)
+            return under_prefix if len(under_prefix) == 1 else ()
+
+        def by_fuzzy_name() -> Tuple[int, ...]:
+            max_distance = _fuzzy_distance(name)
+            matches = index.names.fuzzy(name, max_distance, whole_keys=True) if max_distance else []
+            closest = tuple(value for distance, value in matches if distance == matches[0][0])
+            return closest if len(closest) == 1 else ()
+
+        as_ticker = SYMBOL_PATTERN.match(text.strip()) is not None
+        for lookup in ((by_ticker, by_exact_name) if as_ticker else (by_name, by_ticker, by_fuzzy_name)):
+            values = lookup()
+            if values:
+                return index.listings[values[0]]
+        return None
@@ -1,8 +1,11 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
+import datetime
+import json
 import httpx
-from financial_analysis_agent.clients.alpha_vantage import AlphaVantageClient, AlphaVantageAPIError
+from financial_analysis_agent.clients.alpha_vantage import AlphaVantageClient, AlphaVantageAPIError, AlphaVantagePremiumError, AlphaVantageRateLimitError, AlphaVantageSymbolNotFoundError, AlphaVantageTransientError, TimeSeriesParser, outputsize_for, period_start
 from financial_analysis_agent.clients.data_provider import Quote, HistoricalData
+from benchmarks.stubs import ChunkedStream
 
 # Mock API Key for testing
 TEST_API_KEY = "test_api_key"
@@ -29,7 +32,7 @@ async def test_get_quote_success(alpha_vantage_client):
         }
     }
     with patch('httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
-        mock_response = AsyncMock()
+        mock_response = MagicMock()
         mock_response.json.return_value = mock_response_data
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
@@ -104,41 +107,147 @@ async def test_get_historical_data_success(alpha_vantage_client):
             }
         }
     }
-    with patch('httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
-        mock_response = AsyncMock()
-        mock_response.json.return_value = mock_response_data
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
-
-        historical_data = await alpha_vantage_client.get_historical_data("BTC", "compact")
-
-        assert isinstance(historical_data, list)
-        assert len(historical_data) == 2
-        assert all(isinstance(data, HistoricalData) for data in historical_data)
-        assert historical_data[0].date == "2023-11-20"
-        assert historical_data[0].close == 37700.00
-        mock_get.assert_called_once()
-        assert mock_get.call_args.kwargs['params']['function'] == "TIME_SERIES_DAILY"
-        assert mock_get.call_args.kwargs['params']['symbol'] == "BTC"
-        assert mock_get.call_args.kwargs['params']['apikey'] == TEST_API_KEY
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=mock_response_data)
+    alpha_vantage_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    historical_data = await alpha_vantage_client.get_historical_data("BTC", "compact")
+
+    assert isinstance(historical_data, list)
+    assert len(historical_data) == 2
+    assert all(isinstance(data, HistoricalData) for data in historical_data)
+    assert historical_data[0].date == "2023-11-20"
+    assert historical_data[0].close == 37700.00
+    assert len(requests) == 1
+    assert requests[0].url.params['function'] == "TIME_SERIES_DAILY"
+    assert requests[0].url.params['symbol'] == "BTC"
+    assert requests[0].url.params['outputsize'] == "compact"
+    assert requests[0].url.params['apikey'] == TEST_API_KEY
+
+def _serve(alpha_vantage_client, body, chunk_size=65536):
+    """
+    Points the client at a mock transport answering with `body` in chunks; returns the stream.
+    """
+    stream = ChunkedStream(json.dumps(body).encode() if not isinstance(body, bytes) else body, chunk_size)
+    alpha_vantage_client.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, stream=stream)))
+    return stream
+
+def _daily_series(start: datetime.date, days: int):
+    series = {}
+    day = start
+    while len(series) < days:
+        if day.weekday() < 5:
+            series[day.isoformat()] = {"1. open": "10.0", "2. high": "11.0", "3. low": "9.0", "4. close": f"{10 + len(series) * 0.01:.2f}", "5. volume": "1000"}
+        day -= datetime.timedelta(days=1)
+    return {"Meta Data": {"2. Symbol": "IBM"}, "Time Series (Daily)": series}
 
 @pytest.mark.asyncio
 async def test_get_daily_historical_data_api_error(alpha_vantage_client):
-    with patch('financial_analysis_agent.clients.alpha_vantage.AlphaVantageClient._make_request', new_callable=AsyncMock) as mock_make_request:
-        mock_make_request.side_effect = AlphaVantageAPIError("the parameter symbol is invalid")
+    _serve(alpha_vantage_client, {"Error Message": "the parameter symbol is invalid"})
 
-        with pytest.raises(AlphaVantageAPIError, match="the parameter symbol is invalid"):
-            await alpha_vantage_client.get_historical_data("INVALID_SYMBOL", "compact")
-        mock_make_request.assert_called_once()
-        assert mock_make_request.call_args.args[0]['symbol'] == "INVALID_SYMBOL"
+    with pytest.raises(AlphaVantageSymbolNotFoundError, match="the parameter symbol is invalid"):
+        await alpha_vantage_client.get_historical_data("INVALID_SYMBOL", "compact")
 
 @pytest.mark.asyncio
 async def test_get_daily_historical_data_no_data(alpha_vantage_client):
-    with patch('financial_analysis_agent.clients.alpha_vantage.AlphaVantageClient._make_request', new_callable=AsyncMock) as mock_make_request:
-        mock_make_request.side_effect = AlphaVantageAPIError("Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute and 500 calls per day. Please visit https://www.alphavantage.co/premium/ to upgrade your rate limit.")
+    _serve(alpha_vantage_client, {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute and 500 calls per day. Please visit https://www.alphavantage.co/premium/ to upgrade your rate limit."})
 
-        with pytest.raises(AlphaVantageAPIError, match="API call frequency is 5 calls per minute"):
-            await alpha_vantage_client.get_historical_data("IBM", "compact")
-        mock_make_request.assert_called_once()
-        assert mock_make_request.call_args.args[0]['symbol'] == "IBM"
+    with pytest.raises(AlphaVantageRateLimitError, match="API call frequency is 5 calls per minute"):
+        await alpha_vantage_client.get_historical_data("IBM", "compact")
+
+@pytest.mark.asyncio
+async def test_premium_only_full_output_is_not_a_rate_limit(alpha_vantage_client):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"Information": "Thank you for using Alpha Vantage! The **outputsize=full** parameter value is a premium feature for the TIME_SERIES_DAILY endpoint. You may subscribe to any of the premium plans at https://www.alphavantage.co/premium/ to instantly unlock all premium features"})
+    alpha_vantage_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(AlphaVantagePremiumError) as raised:
+        await alpha_vantage_client.get_historical_data("IBM", "1y")
+    assert not isinstance(raised.value, AlphaVantageRateLimitError)
+    # Later full-size periods fail without spending a call; compact ones still go out
+    with pytest.raises(AlphaVantagePremiumError):
+        await alpha_vantage_client.get_historical_data("IBM", "5y")
+    with pytest.raises(AlphaVantagePremiumError):
+        await alpha_vantage_client.get_historical_data("IBM", "1mo")
+    assert [request.url.params["outputsize"] for request in requests] == ["full", "compact"]
+
+@pytest.mark.asyncio
+async def test_daily_quota_information_is_a_rate_limit(alpha_vantage_client):
+    _serve(alpha_vantage_client, {"Information": "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day. Please subscribe to any of the premium plans at https://www.alphavantage.co/premium/ to instantly remove all daily rate limits."})
+
+    with pytest.raises(AlphaVantageRateLimitError, match="25 requests per day"):
+        await alpha_vantage_client.get_historical_data("IBM", "compact")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status, error", [(429, AlphaVantageRateLimitError), (503, AlphaVantageTransientError)])
+async def test_http_errors_are_classified(alpha_vantage_client, status, error):
+    alpha_vantage_client.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(status)))
+
+    with pytest.raises(error, match=f"HTTP error occurred: {status}"):
+        await alpha_vantage_client.get_quote("IBM")
+    with pytest.raises(error):
+        await alpha_vantage_client.get_historical_data("IBM", "compact")
+
+@pytest.mark.asyncio
+async def test_get_quote_unknown_symbol(alpha_vantage_client):
+    alpha_vantage_client.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"Global Quote": {}})))
+
+    with pytest.raises(AlphaVantageSymbolNotFoundError):
+        await alpha_vantage_client.get_quote("XYZZY")
+
+@pytest.mark.asyncio
+async def test_get_daily_historical_data_malformed_body(alpha_vantage_client):
+    _serve(alpha_vantage_client, b'{"Meta Data": {}, "Time Series (Daily)": {"2024-06-28": {"4. close": "1')
+
+    with pytest.raises(AlphaVantageAPIError, match="Truncated or malformed"):
+        await alpha_vantage_client.get_historical_data("IBM", "full")
+
+@pytest.mark.asyncio
+async def test_get_historical_data_keeps_period_and_stops_reading(alpha_vantage_client):
+    body = _daily_series(datetime.date(2024, 6, 28), 5000)
+    stream = _serve(alpha_vantage_client, body, chunk_size=4096)
+
+    historical_data = await alpha_vantage_client.get_historical_data("IBM", "1y")
 
+    assert historical_data[0].date == "2024-06-28"
+    assert historical_data[-1].date == "2023-06-29"
+    assert [bar.date for bar in historical_data] == [date for date in body["Time Series (Daily)"] if date > "2023-06-28"]
+    # About a twentieth of the 20-year body is downloaded
+    assert stream.bytes_read < len(json.dumps(body)) / 10
+
+@pytest.mark.asyncio
+async def test_get_historical_data_bar_count_periods(alpha_vantage_client):
+    _serve(alpha_vantage_client, _daily_series(datetime.date(2024, 6, 28), 100), chunk_size=7)
+    assert len(await alpha_vantage_client.get_historical_data("IBM", "5d")) == 5
+
+@pytest.mark.asyncio
+async def test_get_historical_data_rejects_unknown_period(alpha_vantage_client):
+    with pytest.raises(AlphaVantageAPIError, match="Unsupported period"):
+        await alpha_vantage_client.get_historical_data("IBM", "3w")
+
+def test_period_start_and_outputsize():
+    latest = datetime.date(2024, 3, 31)
+    assert period_start("1mo", latest) == datetime.date(2024, 2, 29)
+    assert period_start("1y", latest) == datetime.date(2023, 3, 31)
+    assert period_start("ytd", latest) == datetime.date(2023, 12, 31)
+    assert period_start("max", latest) is None
+    today = datetime.date(2024, 6, 28)
+    assert [outputsize_for(p, today) for p in ("5d", "3mo", "6mo", "1y", "max", "compact")] == ["compact", "compact", "full", "full", "full", "compact"]
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, None])
+def test_time_series_parser_is_chunk_independent(chunk_size):
+    body = {"Meta Data": {"2. Symbol": "IBM", "5. Output Size": "Full"}, "Time Series (Daily)": _daily_series(datetime.date(2024, 6, 28), 30)["Time Series (Daily)"]}
+    raw = json.dumps(body, indent=2).encode()
+    parser = TimeSeriesParser()
+    entries = []
+    for i in range(0, len(raw), chunk_size or len(raw)):
+        entries += parser.feed(raw[i:i + (chunk_size or len(raw))])
+    parser.close()
+    assert entries == list(body["Time Series (Daily)"].items())
+    assert parser.fields == {"Meta Data": body["Meta Data"]}
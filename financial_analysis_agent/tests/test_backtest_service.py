@@ -0,0 +1,118 @@
+import datetime
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from benchmarks.stubs import FakeRedis
+from financial_analysis_agent.clients.data_provider import DataProvider, HistoricalData
+from financial_analysis_agent.clients.data_provider_factory import DataProviderFactory
+from financial_analysis_agent.clients.yahoo_finance import YahooFinanceAPIError
+from financial_analysis_agent.schemas import BacktestInput
+from financial_analysis_agent.services.backtest_service import BacktestService, equity_curve, max_drawdown, rebalance_points
+from financial_analysis_agent.services.financial_data_service import FinancialDataServiceError, FinancialDataService
+
+DATES = [(datetime.date(2023, 1, 2) + datetime.timedelta(days=i)).isoformat() for i in range(120)]
+
+
+def _loop_equity_curve(closes, weights, rebalances):
+    """Reference implementation holding shares and trading on each rebalance bar."""
+    shares = weights / closes[0]
+    values = []
+    for t, prices in enumerate(closes):
+        value = float(shares @ prices)
+        values.append(value)
+        if t in rebalances:
+            shares = value * weights / prices
+    return np.array(values)
+
+
+def _bars(closes):
+    return [
+        HistoricalData(date=date, open=close, high=close, low=close, close=close, volume=1000)
+        for date, close in zip(DATES, closes)
+    ][::-1]
+
+
+@pytest.fixture
+def provider():
+    rng = np.random.default_rng(7)
+    series = {symbol: 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(DATES)))) for symbol in ["VTI", "BND", "EURUSD=X", "BTC-USD"]}
+    mock = AsyncMock(spec=DataProvider)
+    mock.get_historical_data.side_effect = lambda symbol, period: _bars(series[symbol])
+    return mock
+
+
+@pytest.fixture
+def backtest_service(provider):
+    factory = MagicMock(spec=DataProviderFactory)
+    factory.get_all_providers.return_value = {"yahoo_finance": provider}
+    return BacktestService(FinancialDataService(factory, FakeRedis()))
+
+
+def test_rebalance_points():
+    assert list(rebalance_points(DATES[:5], "never")) == [0]
+    assert list(rebalance_points(DATES[:5], "daily")) == [0, 1, 2, 3, 4]
+    monthly = rebalance_points(DATES, "monthly")
+    assert [DATES[i] for i in monthly] == ["2023-01-02", "2023-01-31", "2023-02-28", "2023-03-31", "2023-04-30"]
+    assert DATES[rebalance_points(DATES, "weekly")[1]] == "2023-01-08" # The Sunday closing the first week
+
+
+@pytest.mark.parametrize("frequency", ["never", "daily", "weekly", "monthly", "quarterly"])
+def test_vectorized_equity_curve_matches_loop(frequency):
+    rng = np.random.default_rng(1)
+    closes = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(DATES), 5)), axis=0))
+    weights = np.array([0.3, 0.2, 0.2, 0.2, 0.1])
+    rebalances = rebalance_points(DATES, frequency)
+
+    assert equity_curve(closes, weights, rebalances) == pytest.approx(_loop_equity_curve(closes, weights, set(rebalances.tolist())))
+
+
+def test_max_drawdown():
+    drawdowns, peak, trough, recovery = max_drawdown(np.array([1.0, 1.2, 0.9, 1.1, 1.3, 1.0]))
+
+    assert (peak, trough, recovery) == (1, 2, 4)
+    assert drawdowns[2] == pytest.approx(-0.25)
+    assert max_drawdown(np.array([1.0, 0.8, 0.9]))[3] == -1
+
+
+def test_weights_are_normalized():
+    assert BacktestInput(weights={"vti": 3, "bnd": 1, "vea": 0}).weights == {"VTI": 0.75, "BND": 0.25}
+    with pytest.raises(ValueError):
+        BacktestInput(weights={"VTI": -1, "BND": 2})
+
+
+@pytest.mark.parametrize("weights", [{"A B": 1}, {"VTI,BND": 1}, {" ": 1}, {"aapl": 1, "AAPL ": 1}])
+def test_invalid_or_repeated_symbols_are_rejected(weights):
+    with pytest.raises(ValueError):
+        BacktestInput(weights=weights)
+
+
+@pytest.mark.asyncio
+async def test_backtest_is_cached_per_portfolio(backtest_service, provider):
+    result = await backtest_service.backtest({"VTI": 0.6, "BND": 0.4}, "1y", "monthly")
+
+    assert result.start_date == DATES[0] and result.end_date == DATES[-1]
+    assert result.equity_curve.dates == DATES
+    assert result.equity_curve.values[0] == 1.0
+    assert result.total_return == pytest.approx(result.equity_curve.values[-1] - 1.0)
+    assert result.max_drawdown.depth == pytest.approx(min(result.equity_curve.drawdowns))
+
+    assert await backtest_service.backtest({"BND": 0.4, "VTI": 0.6}, "1y", "monthly") == result
+    assert provider.get_historical_data.await_count == 2
+    await backtest_service.backtest({"VTI": 0.6, "BND": 0.4}, "1y", "quarterly")
+    assert provider.get_historical_data.await_count == 2 # Histories come from the cache
+
+
+@pytest.mark.asyncio
+async def test_symbols_in_yahoo_notation_are_backtested(backtest_service, provider):
+    weights = BacktestInput(weights={"eurusd=x": 1, "BTC-USD": 1}).weights
+    result = await backtest_service.backtest(weights, "1y", "monthly")
+
+    assert result.weights == {"EURUSD=X": 0.5, "BTC-USD": 0.5}
+
+
+@pytest.mark.asyncio
+async def test_backtest_reports_missing_history(backtest_service, provider):
+    provider.get_historical_data.side_effect = YahooFinanceAPIError("No data")
+
+    with pytest.raises(FinancialDataServiceError, match="VTI"):
+        await backtest_service.backtest({"VTI": 1.0}, "1y", "never")
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from benchmarks.stubs import FakeRedis
+from financial_analysis_agent.clients.data_provider import Quote
+from financial_analysis_agent.utils.cache import CacheManager
+from financial_analysis_agent.utils.cache_events import CacheEventBus
+
+
+async def _instance(redis):
+    bus = CacheEventBus(redis)
+    await bus.start()
+    await asyncio.sleep(0) # The listener subscribes in the background
+    cache_manager = CacheManager(redis_client=redis, local_ttl=30, event_bus=bus)
+    fetch = AsyncMock(side_effect=lambda symbol: Quote(symbol=symbol, price=100.0))
+
+    async def fetch_quote(symbol: str) -> Quote:
+        return await fetch(symbol)
+    return cache_manager, cache_manager.cache(key_prefix="financial_data:quote", ttl=300)(fetch_quote), fetch
+
+
+async def _delivered():
+    await asyncio.sleep(0.05) # Let the listeners drain the pub/sub queue
+
+
+@pytest.mark.asyncio
+async def test_peers_fill_their_local_tier_from_refresh_events():
+    redis = FakeRedis()
+    (first, get_first, fetch_first), (second, get_second, fetch_second) = await _instance(redis), await _instance(redis)
+    redis.get = AsyncMock(wraps=redis.get)
+
+    assert (await get_first("AAPL")).price == 100.0
+    await _delivered()
+    redis.get.reset_mock()
+
+    assert (await get_second("AAPL")).price == 100.0
+    assert await get_first("AAPL") == await get_second("AAPL")
+    fetch_first.assert_awaited_once()
+    fetch_second.assert_not_awaited()
+    redis.get.assert_not_awaited() # Both served from their local tier
+    await first.event_bus.close()
+    await second.event_bus.close()
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_every_tier():
+    redis = FakeRedis()
+    (first, get_first, _), (second, get_second, fetch_second) = await _instance(redis), await _instance(redis)
+    await get_first("AAPL")
+    await get_first("MSFT")
+    await _delivered()
+
+    deleted = await first.invalidate(["*:symbol=AAPL", "*:symbol=AAPL:*"])
+    await _delivered()
+
+    assert deleted == 1
+    assert [key async for key in redis.scan_iter(match="*")] == ["financial_data:quote:fetch_quote:symbol=MSFT"]
+    await get_second("MSFT")
+    fetch_second.assert_not_awaited()
+    await get_second("AAPL")
+    fetch_second.assert_awaited_once_with("AAPL")
+    await first.event_bus.close()
+    await second.event_bus.close()
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_optional():
+    redis = FakeRedis()
+    cache_manager = CacheManager(redis_client=redis, local_ttl=0)
+    fetch = AsyncMock(return_value=Quote(symbol="AAPL", price=1.0))
+
+    async def fetch_quote(symbol: str) -> Quote:
+        return await fetch(symbol)
+    cached = cache_manager.cache(key_prefix="financial_data:quote", ttl=300)(fetch_quote)
+    await cached("AAPL")
+    redis.clear()
+    await cached("AAPL")
+
+    assert fetch.await_count == 2 # Without a local tier every lookup goes to Redis
+
+
+@pytest.mark.asyncio
+async def test_malformed_events_do_not_stop_the_listener():
+    redis = FakeRedis()
+    bus = CacheEventBus(redis)
+    received = []
+    bus.add_listener(received.append)
+    await bus.start()
+    await asyncio.sleep(0)
+
+    for data in ("not json", "[1, 2]", '{"op": "invalidate", "origin": "peer", "patterns": ["*"]}'):
+        await redis.publish(bus.channel, data)
+    await _delivered()
+
+    assert [event["op"] for event in received] == ["invalidate"]
+    assert not bus._task.done()
+    await bus.close()
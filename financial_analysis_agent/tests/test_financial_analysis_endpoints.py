@@ -134,3 +134,25 @@ async def test_get_stock_data_invalid_symbol_pydantic_validation(): # No mock_ge
     )
     assert response.status_code == 422 # Pydantic validation error
     # No service calls expected due to Pydantic validation catching it earlier
+
+def test_cache_invalidation_requires_the_admin_token(mock_financial_data_service_instance: AsyncMock):
+    mock_financial_data_service_instance.cache_manager = MagicMock()
+    mock_financial_data_service_instance.cache_manager.invalidate = AsyncMock(return_value=2)
+
+    with patch("financial_analysis_agent.main.CACHE_ADMIN_TOKEN", None):
+        assert client.post("/admin/cache/invalidate", json={"symbol": "aapl"}, headers={"X-Admin-Token": ""}).status_code == 403
+    with patch("financial_analysis_agent.main.CACHE_ADMIN_TOKEN", "s3cret"):
+        assert client.post("/admin/cache/invalidate", json={"symbol": "aapl"}).status_code == 403
+        assert client.post("/admin/cache/invalidate", json={"symbol": "aapl"}, headers={"X-Admin-Token": "guess"}).status_code == 403
+        response = client.post("/admin/cache/invalidate", json={"symbol": "aapl"}, headers={"X-Admin-Token": "s3cret"})
+
+    assert mock_financial_data_service_instance.cache_manager.invalidate.await_count == 1
+    assert response.status_code == 200
+    assert response.json() == {"patterns": ["*:symbol=AAPL", "*:symbol=AAPL:*"], "deleted": 2}
+
+def test_recommend_portfolio_rejects_horizons_beyond_fifty_years():
+    response = client.post(
+        "/financial/recommend-portfolio",
+        json={"risk_tolerance": "moderate", "investment_amount": 10_000, "time_horizon": 1_000_000},
+    )
+    assert response.status_code == 422
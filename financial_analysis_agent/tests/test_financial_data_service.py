@@ -1,10 +1,12 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock
-from financial_analysis_agent.services.financial_data_service import FinancialDataService, FinancialDataServiceError
+from financial_analysis_agent.services.financial_data_service import FinancialDataService, FinancialDataServiceError, UnknownSymbolError
 from financial_analysis_agent.clients.data_provider import Quote, HistoricalData, DataProvider
 from financial_analysis_agent.clients.data_provider_factory import DataProviderFactory
-from financial_analysis_agent.clients.alpha_vantage import AlphaVantageAPIError
-from financial_analysis_agent.clients.yahoo_finance import YahooFinanceAPIError
+from financial_analysis_agent.clients.alpha_vantage import AlphaVantageAPIError, AlphaVantageRateLimitError, AlphaVantageSymbolNotFoundError
+from financial_analysis_agent.clients.yahoo_finance import YahooFinanceAPIError, YahooFinanceSymbolNotFoundError, YahooFinanceTransientError
+from financial_analysis_agent.utils.symbols import Listing, SymbolUniverse
+from benchmarks.stubs import FakeRedis
 import json
 
 @pytest.fixture
@@ -34,6 +36,7 @@ def mock_provider_factory(mock_alpha_vantage_client, mock_yahoo_finance_client):
 def mock_redis_client():
     mock = AsyncMock()
     mock.get.return_value = None # By default, cache is empty
+    mock.mget.side_effect = lambda keys: [None] * len(keys) # No negative entries
     mock.setex.return_value = None
     return mock
 
@@ -141,3 +144,143 @@ async def test_financial_data_service_no_providers_initialized(mock_redis_client
     mock_factory.get_all_providers.return_value = {} # No providers
     with pytest.raises(FinancialDataServiceError, match="No active data providers available."):
         FinancialDataService(mock_factory, mock_redis_client)
+
+def test_provider_factory_constructs_providers_on_first_use():
+    factory = DataProviderFactory({"ALPHA_VANTAGE_API_KEY": "key"})
+    providers = factory.get_all_providers()
+    assert list(providers) == ["alpha_vantage", "yahoo_finance"]
+    assert providers.constructed() == {}
+    provider = factory.get_provider("yahoo_finance")
+    assert providers.constructed() == {"yahoo_finance": provider}
+    assert factory.get_provider("yahoo_finance") is provider
+
+@pytest.mark.asyncio
+async def test_cache_and_provider_metrics_recorded(mock_provider_factory, mock_alpha_vantage_client, mock_redis_client):
+    from prometheus_client import REGISTRY
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    hits_before = sample("cache_requests_total", prefix="financial_data:quote", result="hit")
+    misses_before = sample("cache_requests_total", prefix="financial_data:quote", result="miss")
+    provider_calls_before = sample("stage_duration_seconds_count", stage="provider:alpha_vantage:quote")
+
+    service = FinancialDataService(mock_provider_factory, mock_redis_client, local_cache_ttl=0) # Redis tier only
+    await service.get_quote("IBM") # Miss
+    mock_redis_client.get.return_value = Quote(symbol="IBM", price=150.0).model_dump_json()
+    await service.get_quote("IBM") # Hit
+
+    assert sample("cache_requests_total", prefix="financial_data:quote", result="hit") == hits_before + 1
+    assert sample("cache_requests_total", prefix="financial_data:quote", result="miss") == misses_before + 1
+    assert sample("stage_duration_seconds_count", stage="provider:alpha_vantage:quote") == provider_calls_before + 1
+    assert sample("stage_in_flight", stage="provider:alpha_vantage:quote") == 0
+
+@pytest.mark.asyncio
+async def test_symbol_spellings_share_one_cache_entry(mock_provider_factory, mock_alpha_vantage_client):
+    redis = FakeRedis()
+    service = FinancialDataService(mock_provider_factory, redis, local_cache_ttl=0)
+    await service.get_quote("aapl ")
+    await service.get_quote("AAPL")
+
+    mock_alpha_vantage_client.get_quote.assert_awaited_once_with("AAPL")
+    assert await service.cache_manager.invalidate(["*:symbol=AAPL", "*:symbol=AAPL:*"]) == 1
+
+@pytest.mark.asyncio
+async def test_unknown_symbol_is_cached_and_not_asked_again(mock_provider_factory, mock_alpha_vantage_client, mock_yahoo_finance_client):
+    mock_alpha_vantage_client.get_quote.side_effect = AlphaVantageSymbolNotFoundError("Invalid API call")
+    mock_yahoo_finance_client.get_quote.side_effect = YahooFinanceSymbolNotFoundError("No price")
+    redis = FakeRedis()
+    service = FinancialDataService(mock_provider_factory, redis, local_cache_ttl=0)
+    for symbol in ("XYZZY", "xyzzy "):
+        with pytest.raises(UnknownSymbolError):
+            await service.fetch_live_quote(symbol)
+    assert await redis.get("financial_data:missing:quote:symbol=XYZZY") is not None
+    mock_alpha_vantage_client.get_quote.assert_awaited_once()
+    mock_yahoo_finance_client.get_quote.assert_awaited_once()
+
+    # A quote miss says nothing about history, which is still asked for and remembered per period
+    mock_alpha_vantage_client.get_historical_data.side_effect = AlphaVantageSymbolNotFoundError("Invalid API call")
+    mock_yahoo_finance_client.get_historical_data.side_effect = YahooFinanceSymbolNotFoundError("No data")
+    for _ in range(2):
+        with pytest.raises(UnknownSymbolError):
+            await service.get_historical_data("XYZZY", "1mo")
+    mock_alpha_vantage_client.get_historical_data.assert_awaited_once()
+    assert await redis.get("financial_data:missing:historical:symbol=XYZZY:period=1mo") is not None
+
+    # Invalidating the symbol clears its negative entries too
+    await service.cache_manager.invalidate(["*:symbol=XYZZY", "*:symbol=XYZZY:*"])
+    assert await redis.get("financial_data:missing:quote:symbol=XYZZY") is None
+    assert await redis.get("financial_data:missing:historical:symbol=XYZZY:period=1mo") is None
+
+@pytest.mark.asyncio
+async def test_empty_short_period_does_not_hide_longer_ones(mock_provider_factory, mock_alpha_vantage_client, mock_yahoo_finance_client):
+    # Both providers find nothing in a holiday "1d" window of a valid ticker
+    async def history(symbol, period):
+        if period == "1d":
+            raise AlphaVantageSymbolNotFoundError("No data")
+        return [HistoricalData(date="2024-01-02", open=1, high=1, low=1, close=1, volume=1)]
+    mock_alpha_vantage_client.get_historical_data.side_effect = history
+    mock_yahoo_finance_client.get_historical_data.side_effect = YahooFinanceSymbolNotFoundError("No data")
+    service = FinancialDataService(mock_provider_factory, FakeRedis(), local_cache_ttl=0)
+    with pytest.raises(UnknownSymbolError):
+        await service.get_historical_data("IBM", "1d")
+
+    assert await service.get_historical_data("IBM", "1mo")
+
+@pytest.mark.asyncio
+async def test_history_is_fetched_for_a_symbol_without_a_quote(mock_provider_factory, mock_alpha_vantage_client, mock_yahoo_finance_client):
+    mock_alpha_vantage_client.get_quote.side_effect = AlphaVantageSymbolNotFoundError("Invalid API call")
+    mock_yahoo_finance_client.get_quote.side_effect = YahooFinanceSymbolNotFoundError("No price")
+    service = FinancialDataService(mock_provider_factory, FakeRedis(), local_cache_ttl=0)
+    with pytest.raises(UnknownSymbolError):
+        await service.get_quote("DELISTED")
+
+    assert await service.get_historical_data("DELISTED", "1mo") == mock_alpha_vantage_client.get_historical_data.return_value
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_cached_briefly(mock_provider_factory, mock_alpha_vantage_client, mock_yahoo_finance_client):
+    mock_alpha_vantage_client.get_historical_data.side_effect = AlphaVantageSymbolNotFoundError("Invalid API call")
+    mock_yahoo_finance_client.get_historical_data.side_effect = YahooFinanceTransientError("Timed out")
+    redis = FakeRedis()
+    service = FinancialDataService(mock_provider_factory, redis, local_cache_ttl=0)
+    for _ in range(2):
+        with pytest.raises(FinancialDataServiceError, match="Failed to fetch historical data for IBM, period 1mo after trying all providers") as excinfo:
+            await service.get_historical_data("IBM", "1mo")
+        assert not isinstance(excinfo.value, UnknownSymbolError)
+    mock_yahoo_finance_client.get_historical_data.assert_awaited_once()
+    assert await redis.get("financial_data:missing:historical:symbol=IBM:period=1mo") is None
+
+    # Only that exact fetch is remembered; other periods still reach the providers
+    mock_yahoo_finance_client.get_historical_data.side_effect = None
+    assert await service.get_historical_data("IBM", "1y")
+
+@pytest.mark.asyncio
+async def test_rate_limited_provider_is_skipped_while_cooling_down(mock_provider_factory, mock_alpha_vantage_client, mock_yahoo_finance_client):
+    mock_alpha_vantage_client.get_quote.side_effect = AlphaVantageRateLimitError("Note: call frequency")
+    service = FinancialDataService(mock_provider_factory, FakeRedis(), local_cache_ttl=0)
+    assert (await service.get_quote("IBM")).price == 150.5
+    assert (await service.fetch_live_quote("MSFT")).price == 150.5
+    mock_alpha_vantage_client.get_quote.assert_awaited_once_with("IBM")
+    assert mock_yahoo_finance_client.get_quote.await_count == 2
+
+@pytest.mark.asyncio
+async def test_symbol_universe_rejects_before_any_provider_call(mock_provider_factory, mock_alpha_vantage_client, mock_yahoo_finance_client, mock_redis_client):
+    universe = SymbolUniverse([Listing("IBM", "International Business Machines Corp")])
+    service = FinancialDataService(mock_provider_factory, mock_redis_client, symbol_universe=universe)
+    with pytest.raises(UnknownSymbolError, match="not in the symbol universe"):
+        await service.get_quote("IMB")
+    with pytest.raises(UnknownSymbolError):
+        await service.get_historical_data("not a symbol", "1mo")
+    mock_alpha_vantage_client.get_quote.assert_not_awaited()
+    mock_redis_client.mget.assert_not_awaited()
+
+    assert (await service.get_quote("IBM")).price == 150.0
+    assert (await service.get_historical_data("^GSPC", "1mo")) # Index notation is outside the universe and allowed
+
+@pytest.mark.asyncio
+async def test_negative_state_read_failure_falls_back_to_providers(mock_provider_factory, mock_alpha_vantage_client, mock_redis_client):
+    import redis.asyncio as redis
+    mock_redis_client.mget.side_effect = redis.ConnectionError("down")
+    service = FinancialDataService(mock_provider_factory, mock_redis_client)
+    assert (await service.get_quote("IBM")).price == 150.0
+    mock_alpha_vantage_client.get_quote.assert_awaited_once_with("IBM")
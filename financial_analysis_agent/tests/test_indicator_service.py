@@ -0,0 +1,117 @@
+import datetime
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from benchmarks.stubs import FakeRedis
+from financial_analysis_agent.clients.data_provider import DataProvider, HistoricalData
+from financial_analysis_agent.clients.data_provider_factory import DataProviderFactory
+from financial_analysis_agent.schemas import IndicatorParams
+from financial_analysis_agent.services.financial_data_service import FinancialDataService
+from financial_analysis_agent.services.indicator_service import IndicatorService, IndicatorState, indicator_series, rolling_mean
+
+PARAMS = IndicatorParams()
+RNG = np.random.default_rng(3)
+CLOSES = 100 * np.exp(np.cumsum(RNG.normal(0, 0.015, 300)))
+DATES = [(datetime.date(2023, 1, 1) + datetime.timedelta(days=i)).isoformat() for i in range(len(CLOSES))]
+
+
+def _bars(count):
+    return [
+        HistoricalData(date=date, open=close, high=close, low=close, close=close, volume=1000)
+        for date, close in zip(DATES[:count], CLOSES[:count])
+    ][::-1]
+
+
+@pytest.fixture
+def bars_available():
+    return {"count": 250}
+
+
+@pytest.fixture
+def indicator_service(bars_available):
+    provider = AsyncMock(spec=DataProvider)
+    provider.get_historical_data.side_effect = lambda symbol, period: _bars(bars_available["count"])
+    factory = MagicMock(spec=DataProviderFactory)
+    factory.get_all_providers.return_value = {"yahoo_finance": provider}
+    return IndicatorService(FinancialDataService(factory, FakeRedis()))
+
+
+def test_rolling_mean():
+    assert rolling_mean(np.array([1.0, 2.0, 3.0, 4.0]), 2)[1:] == pytest.approx([1.5, 2.5, 3.5])
+    assert np.isnan(rolling_mean(np.array([1.0]), 2)[0])
+
+
+def test_rsi_of_a_rising_series_is_100():
+    series = indicator_series(np.arange(1.0, 30.0), PARAMS)
+
+    assert np.isnan(series["rsi"][PARAMS.rsi_window - 1])
+    assert series["rsi"][-1] == 100.0
+    assert series["sma"][-1] == pytest.approx(np.mean(np.arange(10.0, 30.0)))
+    assert series["bollinger_upper"][-1] - series["bollinger_middle"][-1] == pytest.approx(2 * np.std(np.arange(10.0, 30.0)))
+
+
+@pytest.mark.parametrize("bars", [5, 20, 34, 300])
+def test_streaming_state_matches_vectorized_series(bars):
+    state = IndicatorState(params=PARAMS)
+    for date, close in zip(DATES[:bars], CLOSES[:bars]):
+        state.update(date, float(close))
+    latest = state.values().model_dump()
+    series = indicator_series(CLOSES[:bars], PARAMS)
+
+    for name, values in series.items():
+        if np.isnan(values[-1]):
+            assert latest[name] is None, name
+        else:
+            assert latest[name] == pytest.approx(values[-1]), name
+    assert len(state.window) == min(bars, max(PARAMS.sma_window, PARAMS.bollinger_window))
+
+
+@pytest.mark.asyncio
+async def test_new_bars_update_the_cached_state(indicator_service, bars_available, monkeypatch):
+    first = await indicator_service.indicators("IBM", "1y", PARAMS)
+    assert first.as_of == DATES[249]
+
+    state_key = indicator_service._state_key("IBM", "1y", PARAMS)
+    # Two new bars arrive once the cached history expires
+    await indicator_service.financial_data_service.cache_manager.invalidate(["financial_data:historical:*"])
+    bars_available["count"] = 252
+    state = await indicator_service._load_state(state_key)
+    assert state.count == 250
+
+    updates = []
+    original_update = IndicatorState.update
+    monkeypatch.setattr(IndicatorState, "update", lambda self, date, close: updates.append(date) or original_update(self, date, close))
+    updated = await indicator_service.indicators("IBM", "1y", PARAMS, include_series=True)
+    updated_state = await indicator_service._load_state(state_key)
+    assert updated.as_of == DATES[251]
+    assert updates == DATES[250:252] # Only the new bars are folded in
+    assert updated_state.count == 252 and updated_state.window[-1] == CLOSES[251]
+    assert updated.latest == updated_state.values()
+    assert updated.series.dates == DATES[:252]
+    assert updated.series.columns["rsi"][0] is None
+    assert updated.latest.macd == pytest.approx(updated.series.columns["macd"][-1])
+
+
+def test_a_moved_first_bar_rebuilds_the_state():
+    state, _ = IndicatorService._advance(None, PARAMS, DATES[:250], CLOSES[:250])
+
+    # A rolling period a day later: one bar more at the end, one fewer at the start
+    state, added = IndicatorService._advance(state, PARAMS, DATES[1:251], CLOSES[1:251])
+    series = indicator_series(CLOSES[1:251], PARAMS)
+    assert added == 250
+    assert state.values().ema == pytest.approx(series["ema"][-1])
+    assert state.values().rsi == pytest.approx(series["rsi"][-1])
+    assert state.values().macd_signal == pytest.approx(series["macd_signal"][-1])
+
+
+def test_a_revised_last_close_rebuilds_the_state():
+    dates, closes = DATES[:250], CLOSES[:250].copy()
+    state, _ = IndicatorService._advance(None, PARAMS, dates, closes)
+    closes[-1] *= 1.02 # The last session closed above the price seen when the state was saved
+
+    state, added = IndicatorService._advance(state, PARAMS, dates, closes)
+    rebuilt, _ = IndicatorService._advance(None, PARAMS, dates, closes)
+    assert added == 250
+    assert state.last_close == closes[-1]
+    assert state.values() == rebuilt.values()
+    assert IndicatorService._advance(state, PARAMS, dates, closes)[1] == 0
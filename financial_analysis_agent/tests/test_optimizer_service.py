@@ -0,0 +1,133 @@
+import datetime
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from benchmarks.stubs import FakeRedis
+from financial_analysis_agent.clients.data_provider import DataProvider, HistoricalData
+from financial_analysis_agent.clients.data_provider_factory import DataProviderFactory
+from financial_analysis_agent.schemas import PortfolioRecommendationInput
+from financial_analysis_agent.services.financial_data_service import FinancialDataService
+from financial_analysis_agent.services.optimizer_service import PortfolioOptimizer, ReturnStatistics, project_capped_simplex, solve_frontier
+from financial_analysis_agent.services.portfolio_service import PortfolioService
+from financial_analysis_agent.utils.timeseries import align_closes, annualized_moments, log_returns
+
+UNIVERSE = ["VTI", "VEA", "VWO", "BND"]
+VOLATILITY = {"VTI": 0.16, "VEA": 0.17, "VWO": 0.22, "BND": 0.05}
+
+
+def _bars(symbol: str, days: int) -> list:
+    rng = np.random.default_rng(sum(map(ord, symbol)))
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.06 / 252, VOLATILITY[symbol] / np.sqrt(252), days)))
+    start = datetime.date(2019, 1, 1)
+    return [
+        HistoricalData(date=(start + datetime.timedelta(days=i)).isoformat(), open=c, high=c, low=c, close=c, volume=1000)
+        for i, c in enumerate(closes)
+    ][::-1]
+
+
+@pytest.fixture
+def history_days():
+    return {"days": 600}
+
+
+@pytest.fixture
+def optimizer(history_days):
+    provider = AsyncMock(spec=DataProvider)
+    provider.get_historical_data.side_effect = lambda symbol, period: _bars(symbol, history_days["days"])
+    factory = MagicMock(spec=DataProviderFactory)
+    factory.get_all_providers.return_value = {"yahoo_finance": provider}
+    redis = FakeRedis()
+    service = FinancialDataService(factory, redis)
+    optimizer = PortfolioOptimizer(service, universe=UNIVERSE, max_weight=0.6)
+    optimizer.redis = redis
+    return optimizer
+
+
+def test_capped_simplex_projection():
+    projected = project_capped_simplex(np.array([[0.9, 0.3, -0.2], [0.2, 0.2, 0.2]]), cap=0.6)
+
+    assert projected.sum(axis=1) == pytest.approx([1.0, 1.0])
+    assert projected.max() <= 0.6 + 1e-9 and projected.min() >= 0.0
+    assert projected[1] == pytest.approx([1 / 3] * 3)
+
+
+def test_frontier_matches_closed_form_interior_solution():
+    # Lagrangian: w_i = (mu_i - gamma) / (lambda * sigma_i^2) with gamma chosen so the weights sum to 1
+    weights = solve_frontier(np.array([0.10, 0.05]), np.diag([0.04, 0.01]), np.array([5.0]))
+
+    assert weights[0] == pytest.approx([0.4, 0.6], abs=1e-4)
+
+
+def test_frontier_risk_decreases_with_risk_aversion():
+    mean = np.array([0.08, 0.07, 0.09, 0.03])
+    covariance = np.diag([0.16, 0.17, 0.22, 0.05]) ** 2
+    weights = solve_frontier(mean, covariance, np.array([1.0, 5.0, 25.0]), max_weight=0.6)
+    volatility = np.sqrt(np.einsum("ki,ij,kj->k", weights, covariance, weights))
+
+    assert np.all(np.diff(volatility) < 0)
+    assert np.all(weights <= 0.6 + 1e-9)
+    assert weights.sum(axis=1) == pytest.approx([1.0] * 3)
+
+
+def test_incremental_statistics_match_batch():
+    histories = {symbol: _bars(symbol, 300) for symbol in UNIVERSE}
+    dates, closes = align_closes(histories, UNIVERSE)
+    stats = ReturnStatistics(UNIVERSE)
+
+    assert stats.update(dates[:200], closes[:200]) == 199
+    assert stats.update(dates[:200], closes[:200]) == 0
+    assert stats.update(dates, closes) == 100
+
+    mean, covariance = stats.moments()
+    batch_mean, batch_covariance = annualized_moments(log_returns(closes))
+    assert mean == pytest.approx(batch_mean)
+    assert covariance == pytest.approx(batch_covariance)
+
+
+def test_statistics_window_slides_with_the_history():
+    histories = {symbol: _bars(symbol, 400) for symbol in UNIVERSE}
+    dates, closes = align_closes(histories, UNIVERSE)
+    stats = ReturnStatistics(UNIVERSE)
+    stats.update(dates[:300], closes[:300])
+
+    # The next fetch of the same period starts 50 bars later and ends 50 bars later
+    assert stats.update(dates[50:350], closes[50:350]) == 100
+    assert stats.count == 299 and stats.window_start == dates[51]
+
+    mean, covariance = stats.moments()
+    batch_mean, batch_covariance = annualized_moments(log_returns(closes[50:350]))
+    assert mean == pytest.approx(batch_mean)
+    assert covariance == pytest.approx(batch_covariance)
+
+
+@pytest.mark.asyncio
+async def test_refresh_solves_only_when_new_bars_arrive(optimizer, history_days):
+    frontier = await optimizer.refresh()
+    assert frontier.estimates_source == "history"
+    assert frontier.observations == 599
+
+    assert await optimizer.refresh() is frontier
+
+    history_days["days"] = 610
+    await optimizer.financial_data_service.cache_manager.invalidate(["financial_data:historical:*"])
+    updated = await optimizer.refresh()
+    assert updated.observations == 609
+    assert updated.as_of > frontier.as_of
+
+
+@pytest.mark.asyncio
+async def test_recommendation_is_a_frontier_lookup(optimizer):
+    service = PortfolioService(optimizer=optimizer)
+    request = dict(investment_amount=10_000, time_horizon=10)
+
+    fixed = service.recommend_portfolio(PortfolioRecommendationInput(risk_tolerance="moderate", **request))
+    assert [asset.symbol for asset in fixed.recommended_portfolio] == ["VTI", "VEA", "BND"] # No frontier yet
+
+    await optimizer.refresh()
+    conservative = optimizer.point_for("conservative")
+    aggressive = optimizer.point_for("aggressive")
+    assert conservative.volatility < aggressive.volatility
+
+    recommendation = service.recommend_portfolio(PortfolioRecommendationInput(risk_tolerance="Conservative", **request))
+    assert sum(asset.allocation for asset in recommendation.recommended_portfolio) == pytest.approx(100.0, abs=0.2)
+    assert "efficient portfolio" in recommendation.description
@@ -0,0 +1,110 @@
+import datetime
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from benchmarks.stubs import FakeRedis
+from financial_analysis_agent.clients.data_provider import DataProvider, HistoricalData
+from financial_analysis_agent.clients.data_provider_factory import DataProviderFactory
+from financial_analysis_agent.clients.yahoo_finance import YahooFinanceAPIError
+from financial_analysis_agent.schemas import PortfolioAsset
+from financial_analysis_agent.services.financial_data_service import FinancialDataService
+from financial_analysis_agent.services.projection_service import ProjectionService, assumed_moments, band_years, portfolio_moments, shrink_mean, simulate_bands
+
+ASSETS = [
+    PortfolioAsset(symbol="VTI", asset_class="US Stock Market ETF", allocation=60.0),
+    PortfolioAsset(symbol="BND", asset_class="Bond ETF", allocation=40.0),
+]
+
+
+def _bars(symbol: str, days: int = 3 * 252) -> list:
+    """Geometric random walk per symbol, newest first like the providers."""
+    rng = np.random.default_rng(sum(map(ord, symbol)))
+    volatility = 0.05 if symbol == "BND" else 0.16
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.06 / 252, volatility / np.sqrt(252), days)))
+    start = datetime.date(2020, 1, 1)
+    bars = [
+        HistoricalData(date=(start + datetime.timedelta(days=i)).isoformat(), open=c, high=c, low=c, close=c, volume=1000)
+        for i, c in enumerate(closes)
+    ]
+    return bars[::-1]
+
+
+@pytest.fixture
+def provider():
+    mock = AsyncMock(spec=DataProvider)
+    mock.get_historical_data.side_effect = lambda symbol, period: _bars(symbol)
+    return mock
+
+
+@pytest.fixture
+def projection_service(provider):
+    factory = MagicMock(spec=DataProviderFactory)
+    factory.get_all_providers.return_value = {"yahoo_finance": provider}
+    return ProjectionService(FinancialDataService(factory, FakeRedis()), n_paths=20_000)
+
+
+def test_simulated_bands_match_lognormal_quantiles():
+    percentiles, probability_of_loss = simulate_bands(
+        np.array([1.0]), np.array([0.05]), np.array([[0.15 ** 2]]), np.array([1, 10]), 200_000, np.random.default_rng(0),
+    )
+
+    median = percentiles[2]
+    assert median == pytest.approx(np.exp([0.05, 0.5]), rel=0.01)
+    # 5th percentile after 10 years: exp(10 * 0.05 - 1.645 * 0.15 * sqrt(10))
+    assert percentiles[0][1] == pytest.approx(np.exp(0.5 - 1.645 * 0.15 * np.sqrt(10)), rel=0.02)
+    assert probability_of_loss == pytest.approx(0.146, abs=0.01) # P(N(0.5, 0.474) < 0)
+    assert np.all(np.diff(percentiles, axis=0) > 0)
+
+
+def test_simulated_portfolio_rebalances_correlated_assets():
+    weights, mean = np.array([0.6, 0.4]), np.array([0.07, 0.03])
+    covariance = np.array([[0.16 ** 2, 0.3 * 0.16 * 0.05], [0.3 * 0.16 * 0.05, 0.05 ** 2]])
+    percentiles, _ = simulate_bands(weights, mean, covariance, np.array([20]), 200_000, np.random.default_rng(0))
+
+    drift, volatility = portfolio_moments(weights, mean, covariance)
+    assert percentiles[2][0] == pytest.approx(np.exp(20 * drift), rel=0.02)
+    assert percentiles[0][0] == pytest.approx(np.exp(20 * drift - 1.645 * volatility * np.sqrt(20)), rel=0.03)
+
+
+def test_rebalanced_portfolio_moments():
+    covariance = np.array([[0.04, 0.0], [0.0, 0.04]])
+    drift, volatility = portfolio_moments(np.array([0.5, 0.5]), np.array([0.05, 0.05]), covariance)
+
+    assert volatility == pytest.approx(np.sqrt(0.02))
+    assert drift == pytest.approx(0.05 + 0.5 * (0.04 - 0.02))
+
+
+def test_band_years():
+    assert list(band_years(3)) == [1, 2, 3]
+    years = band_years(30)
+    assert len(years) == 10 and years[-1] == 30
+
+
+@pytest.mark.asyncio
+async def test_projection_scales_and_is_cached(projection_service, provider):
+    small = await projection_service.project(ASSETS, "Moderate", 1_000.0, 10)
+    large = await projection_service.project(ASSETS, "moderate", 50_000.0, 10)
+
+    assert small.estimates_source == "history"
+    mean, covariance, _ = await projection_service.estimate_moments(["VTI", "BND"])
+    assert small.expected_annual_return == pytest.approx(portfolio_moments(np.array([0.6, 0.4]), mean, covariance)[0])
+    assert small.simulated_paths == 20_000
+    assert [band.year for band in small.bands] == list(range(1, 11))
+    assert large.bands[-1].p50 == pytest.approx(small.bands[-1].p50 * 50)
+    assert small.bands[-1].p5 < small.bands[-1].p50 < small.bands[-1].p95
+    assert provider.get_historical_data.await_count == 2 # One fetch per symbol; later lookups are cache hits
+
+
+@pytest.mark.asyncio
+async def test_projection_falls_back_to_assumptions(projection_service, provider):
+    provider.get_historical_data.side_effect = YahooFinanceAPIError("No data")
+
+    projection = await projection_service.project(ASSETS, "conservative", 10_000.0, 5)
+
+    assert projection.estimates_source == "assumptions"
+    assert 0.0 < projection.annual_volatility < 0.16
+
+
+def test_shrink_mean_blends_history_with_assumptions():
+    prior_mean, _ = assumed_moments(["VTI", "BND"])
+    assert shrink_mean(["VTI", "BND"], np.array([0.15, 0.01])) == pytest.approx(0.5 * prior_mean + 0.5 * np.array([0.15, 0.01]))
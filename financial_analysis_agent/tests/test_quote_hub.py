@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from benchmarks.stubs import FakeRedis
+from financial_analysis_agent.clients.data_provider import Quote
+from financial_analysis_agent.services.quote_hub import QuoteHub, Subscription
+
+
+def _data_service():
+    prices = itertools.count(100)
+    service = MagicMock()
+    service.get_quote = AsyncMock(return_value=Quote(symbol="AAPL", price=99.0))
+    service.fetch_live_quote = AsyncMock(side_effect=lambda symbol: Quote(symbol=symbol, price=float(next(prices))))
+    return service
+
+
+def _hub(redis, **kwargs):
+    return QuoteHub(_data_service(), redis, poll_interval_s=0.01, idle_timeout_s=0.05, **kwargs)
+
+
+async def _next_price(subscription: Subscription) -> float:
+    return (await asyncio.wait_for(subscription.get(), 1.0)).price
+
+
+@pytest.mark.asyncio
+async def test_one_poller_fans_out_across_instances():
+    redis = FakeRedis()
+    first, second = _hub(redis), _hub(redis)
+    subscriptions = [await first.subscribe(["aapl"]), await first.subscribe(["AAPL"]), await second.subscribe(["AAPL", " "])]
+
+    for subscription in subscriptions:
+        assert subscription.symbols == ["AAPL"]
+        assert await _next_price(subscription) == 99.0 # The cached quote, right away
+        assert await _next_price(subscription) >= 100.0 # Then live updates through pub/sub
+
+    assert first.financial_data_service.fetch_live_quote.await_count > 0
+    assert second.financial_data_service.fetch_live_quote.await_count == 0 # The lease holder polls for everyone
+    await first.close()
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_lease_moves_when_the_poller_goes_away():
+    redis = FakeRedis()
+    first, second = _hub(redis), _hub(redis)
+    await first.subscribe(["AAPL"])
+    subscription = await second.subscribe(["AAPL"])
+    await asyncio.sleep(0.05)
+
+    await first.close()
+    while not subscription.queue.empty():
+        subscription.queue.get_nowait()
+    polls = second.financial_data_service.fetch_live_quote.await_count
+    await asyncio.sleep(0.05)
+
+    assert second.financial_data_service.fetch_live_quote.await_count > polls
+    assert await _next_price(subscription) >= 100.0
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscribers_keep_the_newest_quotes():
+    subscription = Subscription(hub=None, symbols=["AAPL"], queue_size=2)
+    for price in range(5):
+        subscription.offer(Quote(symbol="AAPL", price=float(price)))
+
+    assert subscription.dropped == 3
+    assert [await _next_price(subscription), await _next_price(subscription)] == [3.0, 4.0]
+
+
+@pytest.mark.asyncio
+async def test_idle_feeds_are_shut_down():
+    redis = FakeRedis()
+    hub = _hub(redis)
+    async with await hub.subscribe(["AAPL"]):
+        await asyncio.sleep(0.03)
+        assert await redis.get("quotes:poller:AAPL") == hub.instance_id
+
+    async with await hub.subscribe(["AAPL"]): # Resubscribing within the idle timeout keeps the feed
+        await asyncio.sleep(0.01)
+    assert "AAPL" in hub._feeds
+
+    await asyncio.sleep(0.1)
+    polls = hub.financial_data_service.fetch_live_quote.await_count
+    await asyncio.sleep(0.03)
+    assert "AAPL" not in hub._feeds
+    assert await redis.get("quotes:poller:AAPL") is None
+    assert hub.financial_data_service.fetch_live_quote.await_count == polls
+    assert hub._listener is None
+
+
+@pytest.mark.asyncio
+async def test_failed_subscribe_stops_the_feeds_it_started():
+    redis = FakeRedis()
+    hub = _hub(redis)
+    existing = await hub.subscribe(["AAPL"])
+    pubsub = hub._pubsub
+    subscribe = pubsub.subscribe
+
+    async def failing_subscribe(*channels):
+        if "quotes:MSFT" in channels:
+            raise ConnectionError("redis down")
+        await subscribe(*channels)
+    pubsub.subscribe = failing_subscribe
+
+    with pytest.raises(ConnectionError):
+        await hub.subscribe(["AAPL", "IBM", "MSFT"])
+
+    assert sorted(hub._feeds) == ["AAPL"]
+    assert hub._feeds["AAPL"].subscribers == {existing}
+    assert pubsub.channels == {"quotes:AAPL"}
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_lease_taken_over_by_another_instance_is_left_alone():
+    redis = FakeRedis()
+    hub = _hub(redis)
+    assert await hub._hold_lease("AAPL")
+
+    # Our lease expired and another instance took it before we renewed or released it
+    await redis.set("quotes:poller:AAPL", "other", ex=60)
+    assert not await hub._hold_lease("AAPL")
+    await hub._release_lease("AAPL")
+
+    assert await redis.get("quotes:poller:AAPL") == "other"
+
+
+@pytest.mark.asyncio
+async def test_malformed_messages_do_not_stop_the_listener():
+    redis = FakeRedis()
+    hub = _hub(redis)
+    hub.financial_data_service.fetch_live_quote.side_effect = ConnectionError("provider down") # Only our messages are published
+    subscription = await hub.subscribe(["AAPL"])
+    assert await _next_price(subscription) == 99.0
+
+    await redis.publish("quotes:AAPL", "not json")
+    await redis.publish("quotes:AAPL", Quote(symbol="AAPL", price=101.0).model_dump_json())
+
+    assert await _next_price(subscription) == 101.0
+    assert not hub._listener.done()
+    await hub.close()
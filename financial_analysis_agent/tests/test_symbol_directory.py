@@ -0,0 +1,106 @@
+import threading
+import pytest
+from financial_analysis_agent.services import symbol_directory
+from financial_analysis_agent.services.symbol_directory import SymbolDirectory, normalize_name, symbol_key
+from financial_analysis_agent.utils.symbol_trie import SymbolTrie
+from financial_analysis_agent.utils.symbols import Listing, SymbolUniverse
+
+
+def test_trie_prefix_exact_and_fuzzy():
+    trie = SymbolTrie.build([("apple", 0), ("applied materials", 1), ("apple hospitality reit", 2), ("amazoncom", 3), ("app", 4)], top_k=3)
+    assert trie.exact("apple") == (0,)
+    assert trie.exact("appl") == () # Ends inside an edge
+    assert trie.prefix("appl") == (0, 1, 2)
+    assert trie.prefix("app") == (0, 1, 2) # Top values are capped at top_k, best first
+    assert trie.prefix("b") == ()
+    assert trie.fuzzy("amazn", 1) == [(1, 3)]
+    assert trie.fuzzy("zmazon", 1) == [] # The first character must match
+    assert trie.fuzzy("appel", 1) == [(1, 0), (1, 1), (1, 2)] # Prefixes of keys match
+    assert trie.fuzzy("appel", 1, whole_keys=True) == [] # "apple" itself is two edits away
+    assert trie.fuzzy("aple", 1, whole_keys=True) == [(1, 0)]
+    assert trie.fuzzy("amazoncomx", 1, whole_keys=True) == [(1, 3)]
+
+
+@pytest.fixture
+def directory():
+    return SymbolDirectory(SymbolUniverse([
+        Listing("AAPL", "Apple Inc", "NASDAQ", "Stock"),
+        Listing("APLE", "Apple Hospitality REIT Inc", "NYSE", "Stock"),
+        Listing("MSFT", "Microsoft Corporation", "NASDAQ", "Stock"),
+        Listing("DIS", "Walt Disney Co", "NYSE", "Stock"),
+        Listing("F", "Ford Motor Co", "NYSE", "Stock"),
+        Listing("FORD", "Forward Industries Inc", "NASDAQ", "Stock"),
+        Listing("BRK-B", "Berkshire Hathaway Inc - Class B", "NYSE", "Stock"),
+        Listing("APPX", "Apple Tracker ETF", "NYSE ARCA", "ETF"),
+        Listing("COP", "ConocoPhillips", "NYSE", "Stock"),
+        Listing("GLD", "SPDR Gold Shares", "NYSE ARCA", "ETF"),
+        Listing("GOOG", "Alphabet Inc - Class C", "NASDAQ", "Stock"),
+        Listing("GOOGL", "Alphabet Inc - Class A", "NASDAQ", "Stock"),
+    ]))
+
+
+def test_normalization():
+    assert normalize_name("Alphabet Inc - Class A") == "alphabet"
+    assert normalize_name("AT&T Inc") == "att"
+    assert normalize_name("McDonald's Corp") == "mcdonalds"
+    assert symbol_key("brk.b") == symbol_key("BRK-B") == "brkb"
+
+
+def test_search_ranks_exact_then_prefix_then_fuzzy(directory):
+    assert [(m.symbol, m.match) for m in directory.search("apple")] == [("AAPL", "name"), ("APLE", "name"), ("APPX", "name")]
+    assert [m.symbol for m in directory.search("aapl")] == ["AAPL"]
+    assert [m.symbol for m in directory.search("disney")] == ["DIS"] # Later words of a name are indexed too
+    assert [m.symbol for m in directory.search("brk.b")] == ["BRK-B"]
+    assert [(m.symbol, m.match, m.distance) for m in directory.search("microsft")] == [("MSFT", "fuzzy", 1)]
+    assert len(directory.search("a", limit=2)) == 2
+    assert directory.search("?!") == []
+
+
+def test_resolve(directory):
+    assert directory.resolve("Apple").symbol == "AAPL"
+    assert directory.resolve("Ford").symbol == "F" # Names are read as names first
+    assert directory.resolve("FORD").symbol == "FORD" # and capitals as tickers
+    assert directory.resolve("Berkshire").symbol == "BRK-B" # The only listing under the prefix
+    assert directory.resolve("Microsfot").symbol == "MSFT"
+    assert directory.resolve("Google") is None
+    assert directory.resolve("App") is None # Ambiguous
+    assert directory.resolve("Alphabet").symbol == "GOOG" # Share classes: the best-ranked one
+    assert directory.resolve("APPLE").symbol == "AAPL" # An exact name in capitals
+
+
+@pytest.mark.parametrize("ticker", ["COIN", "SHAK", "MSFTX", "APPL", "BERK"])
+def test_unknown_tickers_stay_unresolved(directory, ticker):
+    # Neither completed to a name ("COIN" -> ConocoPhillips) nor corrected ("APPL" -> AAPL)
+    assert directory.resolve(ticker) is None
+
+
+def test_fuzzy_resolution_compares_whole_names(directory):
+    assert directory.resolve("Shak") is None # Not "shares" in SPDR Gold Shares
+    assert directory.resolve("Conoco phillip").symbol == "COP"
+
+
+def test_bundled_listings_load():
+    directory = SymbolDirectory()
+    assert directory.resolve("Apple").symbol == "AAPL"
+    assert directory.resolve("VTI").name == "Vanguard Total Stock Market ETF"
+
+
+def test_concurrent_callers_share_one_index_build(monkeypatch):
+    builds = []
+    build = SymbolTrie.build
+
+    def slow_build(items, top_k):
+        builds.append(top_k)
+        threading.Event().wait(0.05) # Long enough for the other callers to arrive mid-build
+        return build(items, top_k=top_k)
+    monkeypatch.setattr(symbol_directory.SymbolTrie, "build", staticmethod(slow_build))
+
+    directory = SymbolDirectory(SymbolUniverse([Listing("AAPL", "Apple Inc", "NASDAQ", "Stock")]))
+    threads = [threading.Thread(target=directory.index) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 2 # One symbol trie and one name trie
+    assert directory.indexed and directory.resolve("Apple").symbol == "AAPL"
@@ -0,0 +1,34 @@
+from financial_analysis_agent.utils.symbols import SymbolUniverse, load_symbol_universe
+
+
+def test_loads_listing_status_csv(tmp_path):
+    path = tmp_path / "listing_status.csv"
+    path.write_text(
+        "symbol,name,exchange,assetType,ipoDate,delistingDate,status\n"
+        "AAPL,Apple Inc,NASDAQ,Stock,1980-12-12,null,Active\n"
+        "SPY,SPDR S&P 500 ETF Trust,NYSE ARCA,ETF,1993-01-29,null,Active\n"
+        "OLD,Old Corp,NYSE,Stock,1990-01-01,2020-01-01,Delisted\n"
+    )
+    universe = SymbolUniverse.from_file(str(path))
+    assert len(universe) == 2
+    assert "aapl" in universe
+    assert universe.listings["SPY"].asset_type == "ETF"
+    assert universe.rejects("OLD")
+
+
+def test_plain_list_and_rejections(tmp_path):
+    path = tmp_path / "symbols.txt"
+    path.write_text("# watchlist\nAAPL\nBRK-B\n")
+    universe = SymbolUniverse.from_file(str(path))
+    assert not universe.rejects("aapl")
+    assert not universe.rejects("BRK-B")
+    assert universe.rejects("APPL")
+    assert universe.rejects("DROP TABLE")
+    # Yahoo Finance notation for indices, currencies, crypto and foreign listings is not judged
+    for symbol in ["^GSPC", "EURUSD=X", "BTC-USD", "SHOP.TO"]:
+        assert not universe.rejects(symbol)
+
+
+def test_missing_file_allows_every_symbol(tmp_path):
+    assert load_symbol_universe(None) is None
+    assert load_symbol_universe(str(tmp_path / "missing.csv")) is None
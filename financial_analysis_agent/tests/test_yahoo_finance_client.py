@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from financial_analysis_agent.clients.yahoo_finance import YahooFinanceClient, YahooFinanceAPIError
+from financial_analysis_agent.clients.yahoo_finance import YahooFinanceClient, YahooFinanceAPIError, YahooFinanceRateLimitError, YahooFinanceSymbolNotFoundError, YahooFinanceTransientError
 from financial_analysis_agent.clients.data_provider import Quote, HistoricalData
 import pandas as pd
 from datetime import datetime
@@ -46,7 +46,7 @@ async def test_get_quote_invalid_symbol(yahoo_finance_client):
         mock_ticker_instance = mock_ticker_class.return_value
         mock_ticker_instance.info = mock_info
 
-        with pytest.raises(YahooFinanceAPIError, match=re.escape("Could not retrieve quote for INVALID. Data not found or invalid symbol.")):
+        with pytest.raises(YahooFinanceSymbolNotFoundError, match=re.escape("Could not retrieve quote for INVALID. Data not found or invalid symbol.")):
             await yahoo_finance_client.get_quote("INVALID")
         mock_ticker_class.assert_called_once_with("INVALID")
 
@@ -98,7 +98,7 @@ async def test_get_historical_data_no_data(yahoo_finance_client):
         mock_ticker_instance = mock_ticker_class.return_value
         mock_ticker_instance.history.return_value = mock_hist_data
 
-        with pytest.raises(YahooFinanceAPIError, match=re.escape("No historical data found for AAPL for period 1d.")):
+        with pytest.raises(YahooFinanceSymbolNotFoundError, match=re.escape("No historical data found for AAPL for period 1d.")):
             await yahoo_finance_client.get_historical_data("AAPL", period="1d")
         mock_ticker_class.assert_called_once_with("AAPL")
         mock_ticker_instance.history.assert_called_once_with(period="1d")
@@ -109,7 +109,15 @@ async def test_get_historical_data_exception(yahoo_finance_client):
         mock_ticker_instance = mock_ticker_class.return_value
         mock_ticker_instance.history.side_effect = Exception("Network error")
 
-        with pytest.raises(YahooFinanceAPIError, match=re.escape("Error fetching historical data for GOOG (period=1mo): Network error")):
+        with pytest.raises(YahooFinanceTransientError, match=re.escape("Error fetching historical data for GOOG (period=1mo): Network error")):
             await yahoo_finance_client.get_historical_data("GOOG", period="1mo")
         mock_ticker_class.assert_called_once_with("GOOG")
         mock_ticker_instance.history.assert_called_once_with(period="1mo")
+
+@pytest.mark.asyncio
+async def test_get_quote_rate_limited(yahoo_finance_client):
+    with patch('yfinance.Ticker', autospec=True) as mock_ticker_class:
+        type(mock_ticker_class.return_value).info = property(lambda self: (_ for _ in ()).throw(Exception("Too Many Requests. Rate limited. Try after a while.")))
+
+        with pytest.raises(YahooFinanceRateLimitError, match="Too Many Requests"):
+            await yahoo_finance_client.get_quote("AAPL")
@@ -1,35 +1,63 @@
 import json
+import fnmatch
 import functools
-from typing import Callable, Any, TypeVar, ParamSpec, Coroutine, Optional, List
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Callable, Any, Dict, TypeVar, ParamSpec, Coroutine, Optional, List, Tuple, Union
 import inspect
 from redis.asyncio import Redis # Use redis.asyncio for async operations
 from pydantic import BaseModel # Import BaseModel
+from financial_analysis_agent.utils.cache_events import CacheEventBus
+from common.metrics import CACHE_REQUESTS, cache_counters, stage
 
 P = ParamSpec('P')
 R = TypeVar('R')
 
+LOCAL_MAX_ENTRIES = 10_000
+EVENT_MAX_BYTES = 256 * 1024 # Larger values are left for peers to read from Redis
+
 class CacheManager:
-    def __init__(self, redis_client: Redis, default_ttl: int = 300):
+    """
+    Redis-backed cache with an optional in-process local tier.
+
+    With `local_ttl` > 0, values are also kept in memory for at most that long (LRU-bounded),
+    so hot keys skip the Redis round trip. With an `event_bus`, fresh values and invalidations
+    are broadcast, and peers apply them to their own local tier.
+    """
+    def __init__(self, redis_client: Redis, default_ttl: int = 300, local_ttl: int = 0, event_bus: Optional[CacheEventBus] = None):
         self.redis = redis_client
         self.default_ttl = default_ttl
+        self.local_ttl = local_ttl
+        self.event_bus = event_bus
+        self._local: "OrderedDict[str, Tuple[float, Union[str, bytes]]]" = OrderedDict()
+        if event_bus is not None:
+            event_bus.add_listener(self.handle_event)
 
-    def cache(self, key_prefix: str, ttl: Optional[int] = None) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], Callable[P, Coroutine[Any, Any, R]]]:
+    def cache(self, key_prefix: str, ttl: Optional[int] = None, hash_args: bool = False) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], Callable[P, Coroutine[Any, Any, R]]]:
         """
         A decorator to cache asynchronous function results in Redis.
 
         Args:
             key_prefix: A string prefix for the Redis key.
             ttl: Time-to-live for the cache entry in seconds. Defaults to self.default_ttl.
+            hash_args: Replace the arguments in the key with their SHA-256, for arguments too long to use verbatim.
         """
         if ttl is None:
             ttl = self.default_ttl
+        hits, misses = cache_counters(key_prefix)
+        local_hits = CACHE_REQUESTS.labels(key_prefix, "local_hit")
+        get_stage = stage("cache:get", track_in_flight=False)
+        set_stage = stage("cache:set", track_in_flight=False)
 
         def decorator(func: Callable[P, Coroutine[Any, Any, R]]) -> Callable[P, Coroutine[Any, Any, R]]:
+            signature = inspect.signature(func)
+
             @functools.wraps(func)
             async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
                 # Generate cache key based on function name, prefix, and arguments
                 # We need to bind the arguments to their names for a consistent key
-                bound_args = inspect.signature(func).bind(*args, **kwargs)
+                bound_args = signature.bind(*args, **kwargs)
                 bound_args.apply_defaults()
                 cache_key_parts = [key_prefix, func.__name__]
                 for name, value in bound_args.arguments.items():
@@ -37,38 +65,109 @@ class CacheManager:
                     if name in ('self', 'cls'):
                         continue
                     cache_key_parts.append(f"{name}={value}")
+                if hash_args:
+                    arguments = ":".join(cache_key_parts[2:])
+                    cache_key_parts[2:] = [hashlib.sha256(arguments.encode()).hexdigest()]
                 cache_key = ":".join(cache_key_parts)
 
+                return_type = func.__annotations__.get('return')
+                local_data = self._local_get(cache_key)
+                if local_data is not None:
+                    local_hits.inc()
+                    return self._deserialize(local_data, return_type)
+
                 # Try to get data from cache
-                cached_data = await self.redis.get(cache_key)
+                with get_stage.time():
+                    cached_data = await self.redis.get(cache_key)
                 if cached_data:
-                    # Assuming cached data is JSON-encoded
-                    return_type = func.__annotations__.get('return')
-                    if hasattr(return_type, '__origin__') and return_type.__origin__ is list and issubclass(return_type.__args__[0], BaseModel):
-                        # Handle List[PydanticModel]
-                        item_type = return_type.__args__[0]
-                        list_of_dicts = json.loads(cached_data)
-                        return [item_type.model_validate(d) for d in list_of_dicts]
-                    elif issubclass(return_type, BaseModel): # Pydantic model
-                        return return_type.model_validate_json(cached_data)
-                    else:
-                        return json.loads(cached_data)
+                    hits.inc()
+                    self._local_set(cache_key, cached_data, ttl)
+                    return self._deserialize(cached_data, return_type)
 
                 # If not in cache, call the original function
+                misses.inc()
                 result = await func(*args, **kwargs)
 
                 # Cache the result
                 if isinstance(result, BaseModel): # Pydantic model
-                    await self.redis.setex(cache_key, ttl, result.model_dump_json())
+                    serialized = result.model_dump_json()
                 elif isinstance(result, list) and result and isinstance(result[0], BaseModel): # List of Pydantic models
-                    await self.redis.setex(cache_key, ttl, json.dumps([item.model_dump() for item in result]))
+                    serialized = json.dumps([item.model_dump() for item in result])
                 elif isinstance(result, (dict, list)):
-                    await self.redis.setex(cache_key, ttl, json.dumps(result))
+                    serialized = json.dumps(result)
                 else:
                     # For other types, convert to string or handle as appropriate
-                    await self.redis.setex(cache_key, ttl, str(result)) # Basic string conversion
+                    serialized = str(result) # Basic string conversion
+                with set_stage.time():
+                    await self.redis.setex(cache_key, ttl, serialized)
+                self._local_set(cache_key, serialized, ttl)
+                if self.event_bus is not None and len(serialized) <= EVENT_MAX_BYTES:
+                    # Peers fill their local tier from the event instead of fetching it themselves
+                    await self.event_bus.publish("set", key=cache_key, value=serialized, ttl=ttl)
 
                 return result
             return wrapper
         return decorator
 
+    async def invalidate(self, patterns: List[str]) -> int:
+        """
+        Deletes the Redis keys matching any of the glob `patterns`, drops matching local
+        entries and tells the peers to drop theirs. Returns the number of Redis keys deleted.
+        """
+        deleted = 0
+        for pattern in patterns:
+            keys = [key async for key in self.redis.scan_iter(match=pattern, count=500)]
+            if keys:
+                deleted += await self.redis.delete(*keys)
+        self._local_drop(patterns)
+        if self.event_bus is not None:
+            await self.event_bus.publish("invalidate", patterns=patterns)
+        return deleted
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        """
+        Applies a peer's cache event to the local tier.
+        """
+        if event["op"] == "set":
+            self._local_set(event["key"], event["value"], event["ttl"])
+        elif event["op"] == "invalidate":
+            self._local_drop(event["patterns"])
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+    def _local_get(self, key: str) -> Optional[Union[str, bytes]]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return data
+
+    def _local_set(self, key: str, data: Union[str, bytes], ttl: int) -> None:
+        if self.local_ttl <= 0:
+            return
+        self._local[key] = (time.monotonic() + min(ttl, self.local_ttl), data)
+        self._local.move_to_end(key)
+        if len(self._local) > LOCAL_MAX_ENTRIES:
+            self._local.popitem(last=False)
+
+    def _local_drop(self, patterns: List[str]) -> None:
+        for key in [key for key in self._local if any(fnmatch.fnmatchcase(key, pattern) for pattern in patterns)]:
+            del self._local[key]
+
+    @staticmethod
+    def _deserialize(cached_data: Union[str, bytes], return_type: Any) -> Any:
+        # Assuming cached data is JSON-encoded
+        if hasattr(return_type, '__origin__') and return_type.__origin__ is list and issubclass(return_type.__args__[0], BaseModel):
+            # Handle List[PydanticModel]
+            item_type = return_type.__args__[0]
+            list_of_dicts = json.loads(cached_data)
+            return [item_type.model_validate(d) for d in list_of_dicts]
+        elif issubclass(return_type, BaseModel): # Pydantic model
+            return return_type.model_validate_json(cached_data)
+        else:
+            return json.loads(cached_data)
@@ -0,0 +1,105 @@
+"""
+Cache event bus shared by the financial agent instances.
+
+CacheManager publishes an event when it computes a fresh value ("set", carrying the
+serialized value) and when keys are invalidated ("invalidate", carrying key patterns).
+Every instance subscribes to the same Redis pub/sub channel and applies its peers' events
+to its local tier. A value one instance fetched is then served by the others without a
+Redis or provider round trip, and invalidations reach every local copy.
+
+Pub/sub delivery is at most once. A peer that misses an event only misses a local-tier
+fill or drop, and local entries expire after a short TTL anyway.
+"""
+import asyncio
+import json
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+from prometheus_client import Counter
+
+logger = structlog.get_logger()
+
+CACHE_EVENTS_CHANNEL = os.getenv("CACHE_EVENTS_CHANNEL", "cache:events")
+
+EVENTS = Counter("cache_events_total", "Cache events published and received over the event bus.", ["direction", "op"])
+
+
+class CacheEventBus:
+    def __init__(self, redis_client, channel: str = CACHE_EVENTS_CHANNEL):
+        self.redis = redis_client
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Registers a callback for events published by other instances.
+        """
+        self._listeners.append(listener)
+
+    async def publish(self, op: str, **fields: Any) -> None:
+        """
+        Broadcasts an event to the other instances. Failures are logged, not raised: the
+        local write already happened and peers fall back to Redis.
+        """
+        try:
+            await self.redis.publish(self.channel, json.dumps({"op": op, "origin": self.instance_id, **fields}))
+            EVENTS.labels(direction="published", op=op).inc()
+        except Exception as e:
+            logger.warning("Could not publish cache event", op=op, error=str(e))
+
+    async def start(self) -> None:
+        """
+        Starts listening in the background; an unreachable Redis is retried rather than failing startup.
+        """
+        if self._task is None:
+            self._pubsub = self.redis.pubsub()
+            self._task = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        if event.get("origin") == self.instance_id:
+            return
+        EVENTS.labels(direction="received", op=event.get("op", "unknown")).inc()
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Cache event listener failed", op=event.get("op"))
+
+    async def _listen(self) -> None:
+        subscribed = False
+        while True:
+            try:
+                if not subscribed:
+                    await self._pubsub.subscribe(self.channel)
+                    subscribed = True
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache event read failed", error=str(e))
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            try:
+                event = json.loads(message["data"])
+                if not isinstance(event, dict):
+                    raise ValueError(f"expected an object, got {type(event).__name__}")
+                self.dispatch(event)
+            except Exception as e:
+                # One bad message must not stop every later invalidation from applying
+                EVENTS.labels(direction="received", op="malformed").inc()
+                logger.warning("Ignoring malformed cache event", error=str(e))
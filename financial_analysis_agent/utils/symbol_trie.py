@@ -0,0 +1,170 @@
+"""
+A compressed prefix trie over normalized keys (symbols, company names) for autocomplete.
+
+Edges carry whole substrings, so a chain of single-child nodes is stored as one edge, and
+every node keeps the best `top_k` values in its subtree. A prefix lookup is therefore a walk
+of at most len(prefix) characters with no subtree traversal. Values are integers whose
+order is their rank: a smaller value is a better match.
+"""
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _Node:
+    __slots__ = ("edges", "values", "top")
+
+    def __init__(self):
+        # First character of the edge label -> (label, child)
+        self.edges: Dict[str, Tuple[str, "_Node"]] = {}
+        self.values: Tuple[int, ...] = () # Values whose key ends here
+        self.top: Tuple[int, ...] = () # Best values in the subtree, set by freeze()
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class SymbolTrie:
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self.root = _Node()
+        self.keys = 0
+
+    def insert(self, key: str, value: int) -> None:
+        """
+        Adds `value` under `key`. Call freeze() once all keys are in.
+        """
+        node = self.root
+        rest = key
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                child = _Node()
+                node.edges[rest[0]] = (rest, child)
+                node = child
+                rest = ""
+                break
+            label, child = edge
+            common = _common_prefix_length(label, rest)
+            if common < len(label):
+                # Split the edge where the new key diverges from it
+                middle = _Node()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[rest[0]] = (label[:common], middle)
+                child = middle
+            node = child
+            rest = rest[common:]
+        if value not in node.values:
+            if not node.values:
+                self.keys += 1
+            node.values += (value,)
+
+    def freeze(self) -> "SymbolTrie":
+        """
+        Computes every node's top values, bottom-up.
+        """
+        order: List[_Node] = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(child for _, child in node.edges.values())
+        for node in reversed(order):
+            candidates = set(node.values)
+            for _, child in node.edges.values():
+                candidates.update(child.top)
+            node.top = tuple(heapq.nsmallest(self.top_k, candidates))
+        return self
+
+    def _find(self, key: str) -> Tuple[Optional[_Node], bool]:
+        """
+        The node where `key` ends (or the child of the edge it ends inside) and whether it ends exactly on it.
+        """
+        node = self.root
+        i = 0
+        while i < len(key):
+            edge = node.edges.get(key[i])
+            if edge is None:
+                return None, False
+            label, child = edge
+            common = _common_prefix_length(label, key[i:i + len(label)])
+            if common == len(label):
+                node = child
+                i += common
+            elif i + common == len(key):
+                return child, False
+            else:
+                return None, False
+        return node, True
+
+    def exact(self, key: str) -> Tuple[int, ...]:
+        node, exact = self._find(key)
+        return tuple(sorted(node.values)) if node is not None and exact else ()
+
+    def prefix(self, prefix: str) -> Tuple[int, ...]:
+        """
+        The best values of the keys starting with `prefix`.
+        """
+        node, _ = self._find(prefix)
+        return node.top if node is not None else ()
+
+    def fuzzy(self, query: str, max_distance: int, exact_prefix: int = 1, whole_keys: bool = False) -> List[Tuple[int, int]]:
+        """
+        The best values of keys that start with a string within `max_distance` edits of `query`,
+        as (distance, value) pairs sorted by distance, then rank. With `whole_keys`, the values
+        of keys that are themselves within `max_distance` edits, for lookups that must not
+        complete the query. The first `exact_prefix` characters must match exactly, which
+        prunes all but one branch at the root.
+        """
+        n = len(query)
+        unreachable = max_distance + 1
+        best: Dict[int, int] = {}
+        stack: List[Tuple[_Node, List[int], int]] = [(self.root, list(range(n + 1)), 0)]
+        while stack:
+            node, row, depth = stack.pop()
+            for label, child in node.edges.values():
+                edge_row, edge_depth = row, depth
+                for char in label:
+                    edge_depth += 1
+                    if edge_depth <= exact_prefix and (edge_depth > n or query[edge_depth - 1] != char):
+                        break
+                    # Only cells within max_distance of the diagonal can stay within max_distance
+                    previous, edge_row = edge_row, [edge_depth] + [unreachable] * n
+                    lowest = edge_depth
+                    for column in range(max(1, edge_depth - max_distance), min(n, edge_depth + max_distance) + 1):
+                        cell = previous[column - 1] if query[column - 1] == char else previous[column - 1] + 1
+                        if previous[column] < cell:
+                            cell = previous[column] + 1 if previous[column] + 1 < cell else cell
+                        if edge_row[column - 1] < cell:
+                            cell = edge_row[column - 1] + 1 if edge_row[column - 1] + 1 < cell else cell
+                        edge_row[column] = cell
+                        if cell < lowest:
+                            lowest = cell
+                    if edge_row[-1] <= max_distance and not whole_keys:
+                        # The whole query matches a prefix ending here; the subtree's best values qualify
+                        distance = edge_row[-1]
+                        for value in child.top:
+                            if distance < best.get(value, unreachable):
+                                best[value] = distance
+                    if lowest > max_distance:
+                        break
+                else:
+                    if whole_keys and child.values and edge_row[-1] <= max_distance:
+                        # A key ends at the end of this edge and is itself within reach
+                        for value in child.values:
+                            if edge_row[-1] < best.get(value, unreachable):
+                                best[value] = edge_row[-1]
+                    stack.append((child, edge_row, edge_depth))
+        return sorted((distance, value) for value, distance in best.items())
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[str, int]], top_k: int = 10) -> "SymbolTrie":
+        trie = cls(top_k=top_k)
+        for key, value in items:
+            if key:
+                trie.insert(key, value)
+        return trie.freeze()
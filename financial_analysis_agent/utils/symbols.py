@@ -0,0 +1,90 @@
+"""
+The universe of listed symbols, loaded from a local file so that validity checks need no
+provider call.
+
+The file is either Alpha Vantage's LISTING_STATUS CSV (symbol,name,exchange,assetType,...)
+or one symbol per line. Alpha Vantage lists US exchange symbols only, so symbols in Yahoo
+Finance notation for indices, currencies, crypto and foreign listings (^GSPC, EURUSD=X,
+BTC-USD, SHOP.TO) are outside what the universe can judge and are let through.
+"""
+import csv
+import re
+from typing import Dict, Iterable, NamedTuple, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9.^=-]{1,15}$")
+_YAHOO_NOTATION = re.compile(r"[.^=]|-[A-Z]{3,}$")
+
+
+def normalize_symbol(symbol: str) -> str:
+    """
+    The canonical spelling of a ticker, as used in cache keys: "aapl " -> "AAPL".
+    """
+    return symbol.strip().upper()
+
+
+class Listing(NamedTuple):
+    symbol: str
+    name: str = ""
+    exchange: str = ""
+    asset_type: str = ""
+
+
+class SymbolUniverse:
+    def __init__(self, listings: Iterable[Listing]):
+        self.listings: Dict[str, Listing] = {listing.symbol.upper(): listing for listing in listings}
+
+    @classmethod
+    def from_file(cls, path: str) -> "SymbolUniverse":
+        with open(path, newline="", encoding="utf-8") as f:
+            first_line = f.readline()
+            f.seek(0)
+            if first_line.lower().startswith("symbol,"):
+                rows = csv.DictReader(f)
+                listings = [
+                    Listing(row["symbol"].strip(), row.get("name") or "", row.get("exchange") or "", row.get("assetType") or "")
+                    for row in rows if row.get("symbol") and (row.get("status") or "Active").lower() == "active"
+                ]
+            else:
+                listings = [Listing(line.strip()) for line in f if line.strip() and not line.startswith("#")]
+        return cls(listings)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self.listings
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def covers(self, symbol: str) -> bool:
+        """
+        Whether the universe can judge `symbol`, i.e. it is a plain US exchange symbol.
+        """
+        return _YAHOO_NOTATION.search(symbol.upper()) is None
+
+    def rejects(self, symbol: str) -> bool:
+        """
+        True for symbols that cannot be valid: malformed, or plain symbols that are not listed.
+        """
+        normalized = normalize_symbol(symbol)
+        if not SYMBOL_PATTERN.match(normalized):
+            return True
+        return self.covers(normalized) and normalized not in self.listings
+
+
+def load_symbol_universe(path: Optional[str]) -> Optional[SymbolUniverse]:
+    """
+    The universe in `path`, or None (every well-formed symbol allowed) when no path is set
+    or the file cannot be read.
+    """
+    if not path:
+        return None
+    try:
+        universe = SymbolUniverse.from_file(path)
+    except (OSError, csv.Error, KeyError) as e:
+        logger.warning("Could not load the symbol universe; symbols will not be checked", path=path, error=str(e))
+        return None
+    logger.info("Symbol universe loaded", path=path, symbols=len(universe))
+    return universe
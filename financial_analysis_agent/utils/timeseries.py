@@ -0,0 +1,40 @@
+"""
+Price-history helpers shared by the projection, optimization and backtesting services.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from financial_analysis_agent.clients.data_provider import HistoricalData
+
+TRADING_DAYS = 252
+
+
+def align_closes(histories: Dict[str, Sequence[HistoricalData]], symbols: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Closing prices of `symbols` on the dates they all have, oldest first.
+
+    Returns the dates and a (dates x symbols) matrix. Providers return bars newest first,
+    and some have gaps, so series are joined on date rather than position.
+    """
+    by_symbol = [{bar.date: bar.close for bar in histories[symbol]} for symbol in symbols]
+    common = set(by_symbol[0]).intersection(*by_symbol[1:]) if by_symbol else set()
+    dates = sorted(common)
+    closes = np.array([[series[date] for series in by_symbol] for date in dates], dtype=np.float64)
+    return dates, closes.reshape(len(dates), len(symbols))
+
+
+def log_returns(closes: np.ndarray) -> np.ndarray:
+    """
+    Period log returns of a (dates x assets) price matrix; one row fewer than `closes`.
+    """
+    return np.diff(np.log(closes), axis=0)
+
+
+def annualized_moments(returns: np.ndarray, periods_per_year: int = TRADING_DAYS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Annualized mean vector and covariance matrix of (periods x assets) log returns.
+    """
+    mean = returns.mean(axis=0) * periods_per_year
+    covariance = np.atleast_2d(np.cov(returns, rowvar=False)) * periods_per_year
+    return mean, covariance
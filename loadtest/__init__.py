@@ -0,0 +1,3 @@
+"""
+End-to-end load testing of the orchestrator with local stand-ins for Gemini and market data.
+"""
@@ -0,0 +1,304 @@
+"""
+End-to-end load test of /orchestrate against local stand-ins for Gemini and market data.
+
+    python -m loadtest run --rps 20 --duration 60 [--mix mix.json] [--record traffic.jsonl]
+    python -m loadtest replay traffic.jsonl [--speed 2]
+
+Starts the fake market server, the budget agent, the financial analysis agent and the
+orchestrator as separate processes (like Cloud Run), drives /orchestrate with an open-loop
+arrival process, and reports end-to-end and per-stage latency percentiles, throughput,
+error rates and peak memory. With --agent-mode embedded the agents run inside the
+orchestrator process instead. A local Redis is started with `redis-server` if it is on
+PATH; pass --redis-url to use an existing one, or --in-memory-redis to run without Redis.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from loadtest import traffic
+from loadtest.serve import add_fault_arguments
+from loadtest.stages import summarize
+
+SERVICES = ["market", "budget", "financial", "orchestrator"]
+AGENT_SERVICES = ["budget", "financial"] # Run inside the orchestrator with --agent-mode embedded
+FAULT_OPTIONS = [
+    "gemini_latency_ms", "gemini_flash_latency_ms", "gemini_prefill_ms_per_1k_tokens", "gemini_latency_sigma", "gemini_error_rate",
+    "av_latency_ms", "av_latency_sigma", "av_error_rate", "av_rate_limit_rate",
+    "yahoo_latency_ms", "yahoo_latency_sigma", "yahoo_error_rate",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Cluster:
+    """
+    Starts and stops the services under test, each in its own process.
+    """
+    def __init__(self, args: argparse.Namespace, log_dir: str):
+        self.args = args
+        self.log_dir = log_dir
+        self.services = [s for s in SERVICES if args.agent_mode == "networked" or s not in AGENT_SERVICES]
+        self.ports = {service: _free_port() for service in self.services}
+        self.processes: List[subprocess.Popen] = []
+        self.in_memory_redis = args.in_memory_redis
+        self.redis_host, self.redis_port = "localhost", 6379
+
+    def url(self, service: str) -> str:
+        return f"http://127.0.0.1:{self.ports[service]}"
+
+    def _start_redis(self) -> None:
+        if self.args.redis_url:
+            parsed = urlparse(self.args.redis_url)
+            self.redis_host, self.redis_port = parsed.hostname or "localhost", parsed.port or 6379
+            return
+        if self.in_memory_redis:
+            return
+        if not shutil.which("redis-server"):
+            print("redis-server not found on PATH; falling back to an in-memory Redis stand-in (no cache sharing between processes).", file=sys.stderr)
+            self.in_memory_redis = True
+            return
+        self.redis_host, self.redis_port = "127.0.0.1", _free_port()
+        self._spawn("redis", ["redis-server", "--port", str(self.redis_port), "--save", "", "--appendonly", "no"], os.environ.copy())
+
+    def _spawn(self, name: str, command: List[str], env: Dict[str, str]) -> None:
+        log = open(os.path.join(self.log_dir, f"{name}.log"), "w")
+        self.processes.append(subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT))
+
+    def start(self) -> None:
+        self._start_redis()
+        env = os.environ.copy()
+        env.update({
+            "REDIS_HOST": self.redis_host,
+            "REDIS_PORT": str(self.redis_port),
+            "AGENT_MODE": self.args.agent_mode,
+            "LOADTEST_MARKET_URL": self.url("market"),
+            "GEMINI_API_KEY": "loadtest",
+            "ALPHA_VANTAGE_API_KEY": "loadtest",
+        })
+        fault_args: List[str] = []
+        for option in FAULT_OPTIONS:
+            fault_args += [f"--{option.replace('_', '-')}", str(getattr(self.args, option))]
+        if self.args.agent_mode == "networked":
+            env.update({"BUDGET_AGENT_URL": self.url("budget"), "FINANCIAL_ANALYSIS_AGENT_URL": self.url("financial")})
+        for service in self.services:
+            command = [sys.executable, "-m", "loadtest.serve", service, "--port", str(self.ports[service])] + fault_args
+            if self.in_memory_redis:
+                command.append("--in-memory-redis")
+            self._spawn(service, command, env)
+        self._wait_healthy()
+
+    def _wait_healthy(self, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        pending = set(self.services)
+        while pending:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Services did not become healthy: {', '.join(sorted(pending))}. Logs: {self.log_dir}")
+            for process in self.processes:
+                if process.poll() is not None:
+                    raise RuntimeError(f"A service exited during startup (code {process.returncode}). Logs: {self.log_dir}")
+            for service in list(pending):
+                with contextlib.suppress(httpx.HTTPError):
+                    if httpx.get(f"{self.url(service)}/health", timeout=1.0).status_code == 200:
+                        pending.discard(service)
+            time.sleep(0.2)
+
+    def stage_samples(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {service: httpx.get(f"{self.url(service)}/_loadtest/stages", timeout=10.0).json() for service in self.services}
+
+    def memory(self) -> Dict[str, float]:
+        """
+        Peak RSS in MB of each service process, leaving out the market stand-in.
+        """
+        return {
+            service: httpx.get(f"{self.url(service)}/_loadtest/memory", timeout=10.0).json()["max_rss_mb"]
+            for service in self.services if service != "market"
+        }
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def drive(orchestrator_url: str, planned: List[traffic.PlannedRequest], record_path: Optional[str] = None, timeout: float = 30.0) -> Dict[str, Any]:
+    """
+    Sends each planned request at its offset without waiting for earlier ones (open loop).
+    """
+    results: List[Dict[str, Any]] = []
+    record = open(record_path, "w") if record_path else None
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+
+    async with httpx.AsyncClient(base_url=orchestrator_url, timeout=timeout, limits=limits) as client:
+        async def send(request: traffic.PlannedRequest, scheduled_at: float):
+            start = time.perf_counter()
+            status: Any
+            try:
+                response = await client.post("/orchestrate", json={"query": request.query})
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            results.append({
+                "kind": request.kind,
+                "status": status,
+                "latency_s": time.perf_counter() - start,
+                "lag_s": start - scheduled_at,
+            })
+
+        start = time.perf_counter()
+        tasks = []
+        for request in planned:
+            scheduled_at = start + request.offset_s
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if record:
+                record.write(request.to_json() + "\n")
+            tasks.append(asyncio.create_task(send(request, scheduled_at)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    if record:
+        record.close()
+    return {"elapsed_s": elapsed, "results": results}
+
+
+def build_report(run: Dict[str, Any], stage_samples: Dict[str, Dict[str, Dict[str, Any]]], memory: Optional[Dict[str, float]] = None, agent_mode: str = "networked") -> Dict[str, Any]:
+    results = run["results"]
+    by_kind: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_kind.setdefault(result["kind"], []).append(result)
+
+    def section(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        errors = [r for r in items if r["status"] != 200]
+        summary = summarize([r["latency_s"] for r in items])
+        summary.update({
+            "errors": len(errors),
+            "error_rate": len(errors) / len(items) if items else 0.0,
+            "error_statuses": sorted({str(r["status"]) for r in errors}),
+        })
+        return summary
+
+    def stage_section(stats: Dict[str, Any]) -> Dict[str, Any]:
+        summary = summarize(stats["samples"])
+        summary.update({
+            "errors": stats["errors"],
+            "error_rate": stats["errors"] / len(stats["samples"]) if stats["samples"] else 0.0,
+        })
+        return summary
+
+    return {
+        "agent_mode": agent_mode,
+        "requests": len(results),
+        "elapsed_s": run["elapsed_s"],
+        "throughput_rps": sum(1 for r in results if r["status"] == 200) / run["elapsed_s"] if run["elapsed_s"] else 0.0,
+        "max_send_lag_ms": max((r["lag_s"] for r in results), default=0.0) * 1000,
+        "overall": section(results),
+        "by_kind": {kind: section(items) for kind, items in sorted(by_kind.items())},
+        "stages": {
+            f"{service}/{stage}": stage_section(stats)
+            for service, stages in stage_samples.items()
+            for stage, stats in sorted(stages.items())
+        },
+        "max_rss_mb": {**(memory or {}), "total": sum((memory or {}).values())},
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'':<52} {'count':>7} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9} {'max':>9} {'errors':>8}"
+
+    def line(name: str, row: Dict[str, Any]) -> str:
+        errors = f"{row['error_rate']:.1%}" if "error_rate" in row else ""
+        return (f"{name:<52} {row['count']:>7} {row['p50_ms']:>9.1f} {row['p90_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+                f"{row['p99_ms']:>9.1f} {row['max_ms']:>9.1f} {errors:>8}")
+
+    print(f"\nAgent mode: {report['agent_mode']}")
+    print(f"{report['requests']} requests in {report['elapsed_s']:.1f}s, throughput {report['throughput_rps']:.2f} successful req/s, "
+          f"max send lag {report['max_send_lag_ms']:.1f} ms (latencies in ms)\n")
+    print(header)
+    print(line("/orchestrate (all)", report["overall"]))
+    for kind, row in report["by_kind"].items():
+        print(line(f"  {kind}", row))
+        if row.get("error_statuses"):
+            print(f"{'':<54}statuses: {', '.join(row['error_statuses'])}")
+    print("\nStages")
+    print(header)
+    for stage, row in report["stages"].items():
+        print(line(f"  {stage}", row))
+    print("\nPeak RSS (MB): " + ", ".join(f"{service} {mb:.0f}" for service, mb in report["max_rss_mb"].items()))
+
+
+def _execute(args: argparse.Namespace, planned: List[traffic.PlannedRequest]) -> int:
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix="loadtest-")
+    os.makedirs(log_dir, exist_ok=True)
+    cluster = Cluster(args, log_dir)
+    try:
+        cluster.start()
+        print(f"Services up (logs in {log_dir}); sending {len(planned)} requests...")
+        run = asyncio.run(drive(cluster.url("orchestrator"), planned, record_path=getattr(args, "record", None)))
+        report = build_report(run, cluster.stage_samples(), cluster.memory(), args.agent_mode)
+    finally:
+        cluster.stop()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def main(argv=None) -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--redis-url", help="Use this Redis instead of starting redis-server.")
+    common.add_argument("--in-memory-redis", action="store_true", help="Run without Redis, using per-process in-memory caches.")
+    common.add_argument("--json", help="Also write the report as JSON to this path.")
+    common.add_argument("--agent-mode", choices=["networked", "embedded"], default="networked",
+                        help="Run the agents as separate services (networked) or inside the orchestrator (embedded).")
+    common.add_argument("--log-dir", help="Directory for service logs (default: a new temp directory).")
+    add_fault_arguments(common)
+
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description=__doc__.strip().splitlines()[0])
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", parents=[common], help="Generate traffic at a target rate.")
+    run_parser.add_argument("--rps", type=float, default=5.0, help="Target requests per second.")
+    run_parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic to generate.")
+    run_parser.add_argument("--mix", help="JSON file of query-kind weights (default: loadtest.traffic.DEFAULT_MIX).")
+    run_parser.add_argument("--uniform", action="store_true", help="Fixed inter-arrival gaps instead of Poisson arrivals.")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--record", help="Write the generated traffic to this JSON-lines file for replay.")
+
+    replay_parser = subcommands.add_parser("replay", parents=[common], help="Replay recorded traffic.")
+    replay_parser.add_argument("recording", help="JSON-lines file written by 'run --record'.")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor (2 = twice as fast).")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        mix = traffic.load_mix(args.mix) if args.mix else None
+        planned = list(traffic.generate(args.rps, args.duration, mix=mix, poisson=not args.uniform, seed=args.seed))
+    else:
+        planned = traffic.load_recording(args.recording, speed=args.speed)
+    return _execute(args, planned)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
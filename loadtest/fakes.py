@@ -0,0 +1,337 @@
+"""
+Local stand-ins for Gemini, Alpha Vantage and Yahoo Finance with injectable latency and faults.
+"""
+import asyncio
+import datetime
+import functools
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Query
+
+from financial_analysis_agent.clients.data_provider import DataProvider, Quote, HistoricalData
+from financial_analysis_agent.clients.yahoo_finance import YahooFinanceRateLimitError, YahooFinanceSymbolNotFoundError, YahooFinanceTransientError
+from loadtest.stages import StageRecorder
+
+# Symbols starting with this prefix are unknown to the fake providers
+UNKNOWN_SYMBOL_PREFIX = "ZZZ"
+
+
+@dataclass
+class LatencyModel:
+    """
+    Log-normal latency: `median_ms` scaled by exp(sigma * N(0, 1)).
+    """
+    median_ms: float = 0.0
+    sigma: float = 0.0
+
+    def sample_seconds(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * random.lognormvariate(0.0, self.sigma) / 1000.0 if self.sigma else self.median_ms / 1000.0
+
+
+@dataclass
+class FaultConfig:
+    latency: LatencyModel
+    error_rate: float = 0.0 # HTTP 500 responses
+    rate_limit_rate: float = 0.0 # Alpha Vantage "Note" responses
+
+
+# --- Gemini ---------------------------------------------------------------
+
+class _FakeUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int, cached_content_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.cached_content_token_count = cached_content_token_count
+
+
+class _FakeResponse:
+    def __init__(self, text: str, usage_metadata: Optional[_FakeUsage] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def _tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+class FakeGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel that answers intent and synthesis prompts locally.
+
+    Intents are derived from the user query with keyword rules that cover the query mix in
+    loadtest.traffic. Latency follows `latency`; the sync `generate_content` sleeps with
+    time.sleep, exactly like the blocking SDK call it replaces, and `generate_content_async`
+    (used by GeminiClient) with asyncio.sleep.
+
+    Prompt processing adds `prefill_ms_per_1k_tokens` for every prompt token that is not
+    in a context cache (`cached_prefix`). A `system_instruction` is processed on every call,
+    as on the real API. Responses carry usage_metadata with the token counts.
+    """
+    def __init__(
+        self,
+        latency: LatencyModel,
+        recorder: Optional[StageRecorder] = None,
+        error_rate: float = 0.0,
+        system_instruction: Optional[str] = None,
+        cached_prefix: Optional[str] = None,
+        prefill_ms_per_1k_tokens: float = 0.0,
+    ):
+        self.latency = latency
+        self.recorder = recorder
+        self.error_rate = error_rate
+        self.system_instruction = system_instruction or ""
+        self.cached_prefix = cached_prefix or ""
+        self.prefill_ms_per_1k_tokens = prefill_ms_per_1k_tokens
+
+    def _delay_seconds(self, prompt: str) -> float:
+        uncached_tokens = _tokens(self.system_instruction) + _tokens(prompt)
+        return self.latency.sample_seconds() + self.prefill_ms_per_1k_tokens * uncached_tokens / 1e6
+
+    def _usage(self, prompt: str, text: str) -> _FakeUsage:
+        cached = _tokens(self.cached_prefix)
+        return _FakeUsage(cached + _tokens(self.system_instruction) + _tokens(prompt), _tokens(text), cached)
+
+    def _answer(self, prompt: str) -> str:
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("429 Resource has been exhausted (fake Gemini)")
+        query_match = re.search(r'User Query: "(.*)"', prompt)
+        if query_match:
+            return "```json\n" + json.dumps(fake_intent(query_match.group(1))) + "\n```"
+        return "Here is a summary of your request based on the latest data.\n\n- Everything looks in order."
+
+    @staticmethod
+    def _stage(prompt: str) -> str:
+        return "gemini:intent" if "User Query:" in prompt else "gemini:synthesis"
+
+    def _respond(self, prompt: str, start: float) -> _FakeResponse:
+        try:
+            text = self._answer(prompt)
+            response = _FakeResponse(text, self._usage(prompt, text))
+        except Exception:
+            if self.recorder:
+                self.recorder.record(self._stage(prompt), time.perf_counter() - start, error=True)
+            raise
+        if self.recorder:
+            self.recorder.record(self._stage(prompt), time.perf_counter() - start)
+        return response
+
+    def generate_content(self, prompt: str, **kwargs) -> _FakeResponse:
+        start = time.perf_counter()
+        time.sleep(self._delay_seconds(prompt))
+        return self._respond(prompt, start)
+
+    async def generate_content_async(self, prompt: str, **kwargs) -> _FakeResponse:
+        start = time.perf_counter()
+        await asyncio.sleep(self._delay_seconds(prompt))
+        return self._respond(prompt, start)
+
+
+_TICKER = re.compile(r"\b[A-Z]{1,5}\b")
+_AMOUNT = re.compile(r"\$([\d,]+(?:\.\d+)?)")
+
+
+def fake_intent(query: str) -> Dict[str, Any]:
+    """
+    Deterministic intent recognition for the load-test query mix.
+    """
+    lowered = query.lower()
+    amounts = [float(a.replace(",", "")) for a in _AMOUNT.findall(query)]
+    tickers = [t for t in _TICKER.findall(query) if t not in {"I", "A", "MY", "VS", "ETF"}]
+    period_match = re.search(r"\b(1mo|3mo|6mo|1y|2y|5y)\b", query)
+    period = period_match.group(1) if period_match else None
+
+    if "spent" in lowered:
+        spending = [
+            {"name": name.strip(), "amount": float(amount.replace(",", ""))}
+            for amount, name in re.findall(r"\$([\d,]+(?:\.\d+)?) on ([a-z ]+?)(?: and|\.|,)", query)
+        ]
+        return {"intent": "analyze_spending", "entities": {"monthly_income": amounts[-1] if amounts else 4000, "spending": spending}}
+    if "50/30/20" in lowered or "budget" in lowered:
+        return {"intent": "get_budget_advice", "entities": {"monthly_income": amounts[0] if amounts else 4000}}
+    if "portfolio" in lowered:
+        risk = next((r for r in ("conservative", "moderate", "aggressive") if r in lowered), "moderate")
+        years = re.search(r"(\d+) years", lowered)
+        return {"intent": "recommend_portfolio", "entities": {
+            "risk_tolerance": risk,
+            "investment_amount": amounts[0] if amounts else 10000,
+            "time_horizon": int(years.group(1)) if years else 10,
+        }}
+    if "compare" in lowered and len(tickers) >= 2:
+        return {"intent": "compare_stocks", "entities": {"symbols": tickers, "period": period or "1y"}}
+    if tickers:
+        entities: Dict[str, Any] = {"symbol": tickers[0]}
+        if period:
+            entities["period"] = period
+        return {"intent": "get_stock_data", "entities": entities}
+    return {"intent": "unknown", "entities": {}}
+
+
+# --- Market data ------------------------------------------------------------
+
+@functools.lru_cache(maxsize=1024)
+def _series(symbol: str, bars: int) -> List[Dict[str, Any]]:
+    """
+    Deterministic random-walk daily bars for a symbol, most recent first.
+    """
+    rng = random.Random(symbol)
+    price = rng.uniform(20, 500)
+    last_day = datetime.date(2024, 6, 28)
+    series = []
+    day = last_day
+    while len(series) < bars:
+        if day.weekday() < 5:
+            open_price = price
+            price = max(1.0, price * (1 + rng.gauss(0.0003, 0.015)))
+            series.append({
+                "date": day.isoformat(),
+                "open": round(open_price, 4),
+                "high": round(max(open_price, price) * 1.005, 4),
+                "low": round(min(open_price, price) * 0.995, 4),
+                "close": round(price, 4),
+                "volume": rng.randint(1_000_000, 50_000_000),
+            })
+        day -= datetime.timedelta(days=1)
+    return series
+
+
+_PERIOD_BARS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "ytd": 120, "max": 5000}
+
+
+def create_market_app(alpha_vantage: FaultConfig, yahoo: FaultConfig, recorder: Optional[StageRecorder] = None) -> FastAPI:
+    """
+    FastAPI app serving an Alpha Vantage compatible `/query` endpoint and a minimal Yahoo Finance API.
+    """
+    app = FastAPI()
+
+    async def inject(faults: FaultConfig, stage: str) -> Optional[Dict[str, Any]]:
+        start = time.perf_counter()
+        await asyncio.sleep(faults.latency.sample_seconds())
+        elapsed = time.perf_counter() - start
+        if faults.error_rate and random.random() < faults.error_rate:
+            if recorder:
+                recorder.record(stage, elapsed, error=True)
+            raise HTTPException(status_code=500, detail="Injected upstream error")
+        rate_limited = bool(faults.rate_limit_rate) and random.random() < faults.rate_limit_rate
+        if recorder:
+            recorder.record(stage, elapsed, error=rate_limited)
+        if rate_limited:
+            return {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute and 500 calls per day."}
+        return None
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/query")
+    async def alpha_vantage_query(function: str, symbol: str, apikey: str, outputsize: str = "compact"):
+        injected = await inject(alpha_vantage, f"market:alpha_vantage:{function}")
+        if injected:
+            return injected
+        if symbol.upper().startswith(UNKNOWN_SYMBOL_PREFIX):
+            return {"Error Message": "Invalid API call. Please retry or visit the documentation (https://www.alphavantage.co/documentation/) for TIME_SERIES_DAILY."}
+        if function == "GLOBAL_QUOTE":
+            latest, previous = _series(symbol, 2)
+            change = latest["close"] - previous["close"]
+            return {"Global Quote": {
+                "01. symbol": symbol,
+                "02. open": f"{latest['open']:.4f}",
+                "03. high": f"{latest['high']:.4f}",
+                "04. low": f"{latest['low']:.4f}",
+                "05. price": f"{latest['close']:.4f}",
+                "06. volume": str(latest["volume"]),
+                "07. latest trading day": latest["date"],
+                "08. previous close": f"{previous['close']:.4f}",
+                "09. change": f"{change:.4f}",
+                "10. change percent": f"{change / previous['close'] * 100:.4f}%",
+            }}
+        if function == "TIME_SERIES_DAILY":
+            bars = _series(symbol, 5000 if outputsize == "full" else 100)
+            return {
+                "Meta Data": {"2. Symbol": symbol, "4. Output Size": outputsize.capitalize()},
+                "Time Series (Daily)": {
+                    bar["date"]: {
+                        "1. open": f"{bar['open']:.4f}",
+                        "2. high": f"{bar['high']:.4f}",
+                        "3. low": f"{bar['low']:.4f}",
+                        "4. close": f"{bar['close']:.4f}",
+                        "5. volume": str(bar["volume"]),
+                    }
+                    for bar in bars
+                },
+            }
+        return {"Error Message": f"Unsupported function {function}"}
+
+    @app.get("/yahoo/quote/{symbol}")
+    async def yahoo_quote(symbol: str):
+        await inject(yahoo, "market:yahoo:quote")
+        if symbol.upper().startswith(UNKNOWN_SYMBOL_PREFIX):
+            return {}
+        latest, previous = _series(symbol, 2)
+        return {
+            "symbol": symbol,
+            "regularMarketPrice": latest["close"],
+            "currency": "USD",
+            "regularMarketVolume": latest["volume"],
+            "previousClose": previous["close"],
+            "regularMarketOpen": latest["open"],
+            "regularMarketDayHigh": latest["high"],
+            "regularMarketDayLow": latest["low"],
+        }
+
+    @app.get("/yahoo/history/{symbol}")
+    async def yahoo_history(symbol: str, period: str = Query("1mo")):
+        await inject(yahoo, "market:yahoo:history")
+        if symbol.upper().startswith(UNKNOWN_SYMBOL_PREFIX):
+            return []
+        return list(reversed(_series(symbol, _PERIOD_BARS.get(period, 21))))
+
+    return app
+
+
+class HttpYahooFinanceClient(DataProvider):
+    """
+    YahooFinanceClient stand-in that reads from the fake market app over HTTP.
+    """
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.client = httpx.AsyncClient()
+
+    async def _get(self, path: str, **params) -> Any:
+        try:
+            response = await self.client.get(f"{self.base_url}{path}", params=params, timeout=5.0)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            error = YahooFinanceRateLimitError if e.response.status_code == 429 else YahooFinanceTransientError
+            raise error(f"Request to fake Yahoo Finance failed: {e}")
+        except httpx.HTTPError as e:
+            raise YahooFinanceTransientError(f"Request to fake Yahoo Finance failed: {e}")
+
+    async def get_quote(self, symbol: str) -> Quote:
+        info = await self._get(f"/yahoo/quote/{symbol}")
+        if not info or info.get("regularMarketPrice") is None:
+            raise YahooFinanceSymbolNotFoundError(f"Could not retrieve quote for {symbol}. Data not found or invalid symbol.")
+        return Quote(
+            symbol=info["symbol"],
+            price=info["regularMarketPrice"],
+            currency=info.get("currency"),
+            volume=info.get("regularMarketVolume"),
+            previous_close=info.get("previousClose"),
+            open=info.get("regularMarketOpen"),
+            high=info.get("regularMarketDayHigh"),
+            low=info.get("regularMarketDayLow"),
+        )
+
+    async def get_historical_data(self, symbol: str, period: str = "1mo") -> List[HistoricalData]:
+        bars = await self._get(f"/yahoo/history/{symbol}", period=period)
+        if not bars:
+            raise YahooFinanceSymbolNotFoundError(f"No historical data found for {symbol} for period {period}.")
+        return [HistoricalData(**bar) for bar in bars]
@@ -0,0 +1,139 @@
+"""
+Runs one service under the load-test harness, wired to the local stand-ins.
+
+    python -m loadtest.serve {market,budget,financial,orchestrator} --port PORT [options]
+
+Environment (REDIS_HOST, BUDGET_AGENT_URL, ...) is set by the harness before this module
+imports the service, exactly as on Cloud Run.
+"""
+import argparse
+import os
+
+import uvicorn
+
+from loadtest.fakes import FakeGenerativeModel, FaultConfig, HttpYahooFinanceClient, LatencyModel, create_market_app
+from loadtest.stages import StageRecorder, mount_stats, timed
+
+
+def _market_app(args: argparse.Namespace, recorder: StageRecorder):
+    return create_market_app(
+        alpha_vantage=FaultConfig(
+            latency=LatencyModel(args.av_latency_ms, args.av_latency_sigma),
+            error_rate=args.av_error_rate,
+            rate_limit_rate=args.av_rate_limit_rate,
+        ),
+        yahoo=FaultConfig(
+            latency=LatencyModel(args.yahoo_latency_ms, args.yahoo_latency_sigma),
+            error_rate=args.yahoo_error_rate,
+        ),
+        recorder=recorder,
+    )
+
+
+def _budget_app(args: argparse.Namespace, recorder: StageRecorder):
+    from budget_agent.main import app
+    return app
+
+
+def _financial_app(args: argparse.Namespace, recorder: StageRecorder):
+    from financial_analysis_agent import main
+    from financial_analysis_agent.clients.alpha_vantage import AlphaVantageClient
+
+    service = main.financial_data_service
+    service._providers["alpha_vantage"] = AlphaVantageClient(api_key="loadtest", base_url=f"{args.market_url}/query")
+    service._providers["yahoo_finance"] = HttpYahooFinanceClient(base_url=args.market_url)
+    service._active_providers = [p for p in service._provider_order if p in service._providers]
+    for name, provider in service._providers.items():
+        provider.get_quote = timed(recorder, f"provider:{name}:quote", provider.get_quote)
+        provider.get_historical_data = timed(recorder, f"provider:{name}:historical", provider.get_historical_data)
+
+    if args.in_memory_redis:
+        from benchmarks.stubs import FakeRedis
+        service.cache_manager.redis = FakeRedis()
+        service.cache_manager.event_bus.redis = service.cache_manager.redis
+        main.quote_hub.redis = service.cache_manager.redis
+    redis = service.cache_manager.redis
+    redis.get = timed(recorder, "redis:get", redis.get)
+    redis.setex = timed(recorder, "redis:setex", redis.setex)
+    return main.app
+
+
+def _orchestrator_app(args: argparse.Namespace, recorder: StageRecorder):
+    from orchestrator import main
+    from orchestrator.clients import AGENT_MODE_EMBEDDED
+
+    if main.AGENT_MODE == AGENT_MODE_EMBEDDED:
+        # The agents run in this process; wire them to the stand-ins as their own processes would be
+        _budget_app(args, recorder)
+        _financial_app(args, recorder)
+
+    def fake_model(model_name: str, system_instruction=None, cached_prefix=None) -> FakeGenerativeModel:
+        latency_ms = args.gemini_flash_latency_ms if "flash" in model_name else args.gemini_latency_ms
+        return FakeGenerativeModel(
+            latency=LatencyModel(latency_ms, args.gemini_latency_sigma),
+            recorder=recorder,
+            error_rate=args.gemini_error_rate,
+            system_instruction=system_instruction,
+            cached_prefix=cached_prefix,
+            prefill_ms_per_1k_tokens=args.gemini_prefill_ms_per_1k_tokens,
+        )
+    main.gemini_client.model_factory = fake_model
+    main.gemini_client.intent_prefix.cached_model_factory = (
+        lambda model_name, instructions, ttl_s, display_name: fake_model(model_name, cached_prefix=instructions)
+    )
+    for agent in (main.agent_clients.budget, main.agent_clients.financial_analysis):
+        post = agent.post
+
+        async def timed_post(endpoint, data, _post=post):
+            return await timed(recorder, f"agent:{endpoint}", _post)(endpoint, data)
+        agent.post = timed_post
+    if args.in_memory_redis:
+        from benchmarks.stubs import FakeRedis
+        main.response_cache.redis = FakeRedis()
+    return main.app
+
+
+APPS = {
+    "market": _market_app,
+    "budget": _budget_app,
+    "financial": _financial_app,
+    "orchestrator": _orchestrator_app,
+}
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Fake-dependency options shared by the harness CLI and this entry point.
+    """
+    group = parser.add_argument_group("stand-ins")
+    group.add_argument("--gemini-latency-ms", type=float, default=800.0, help="Median fake Gemini latency.")
+    group.add_argument("--gemini-flash-latency-ms", type=float, default=250.0, help="Median fake Gemini latency for *flash* models.")
+    group.add_argument("--gemini-prefill-ms-per-1k-tokens", type=float, default=60.0, help="Fake Gemini prompt processing time per 1000 uncached prompt tokens.")
+    group.add_argument("--gemini-latency-sigma", type=float, default=0.4, help="Log-normal sigma of fake Gemini latency.")
+    group.add_argument("--gemini-error-rate", type=float, default=0.0, help="Fraction of fake Gemini calls that raise.")
+    group.add_argument("--av-latency-ms", type=float, default=150.0, help="Median fake Alpha Vantage latency.")
+    group.add_argument("--av-latency-sigma", type=float, default=0.5)
+    group.add_argument("--av-error-rate", type=float, default=0.0, help="Fraction of Alpha Vantage calls answered with HTTP 500.")
+    group.add_argument("--av-rate-limit-rate", type=float, default=0.0, help="Fraction of Alpha Vantage calls answered with a rate-limit 'Note'.")
+    group.add_argument("--yahoo-latency-ms", type=float, default=250.0, help="Median fake Yahoo Finance latency.")
+    group.add_argument("--yahoo-latency-sigma", type=float, default=0.5)
+    group.add_argument("--yahoo-error-rate", type=float, default=0.0, help="Fraction of Yahoo Finance calls answered with HTTP 500.")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("service", choices=sorted(APPS))
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--market-url", default=os.getenv("LOADTEST_MARKET_URL", "http://127.0.0.1:8099"))
+    parser.add_argument("--in-memory-redis", action="store_true", help="Use an in-process Redis stand-in instead of REDIS_HOST.")
+    add_fault_arguments(parser)
+    args = parser.parse_args(argv)
+
+    recorder = StageRecorder()
+    app = APPS[args.service](args, recorder)
+    mount_stats(app, recorder)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+In-process stage timing for services running under the load-test harness.
+"""
+import functools
+import math
+import resource
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+from fastapi import APIRouter, FastAPI
+
+
+class StageRecorder:
+    """
+    Collects latency samples per stage name. Thread-safe; bounded per stage.
+    """
+    MAX_SAMPLES_PER_STAGE = 200_000
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            samples = self._samples.setdefault(stage, [])
+            if len(samples) < self.MAX_SAMPLES_PER_STAGE:
+                samples.append(seconds)
+            if error:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                stage: {"samples": list(samples), "errors": self._errors.get(stage, 0)}
+                for stage, samples in self._samples.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._errors.clear()
+
+
+def timed(recorder: StageRecorder, stage: str, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Wraps an async callable so each call's duration (and any exception) is recorded under `stage`.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            recorder.record(stage, time.perf_counter() - start, error=True)
+            raise
+        recorder.record(stage, time.perf_counter() - start)
+        return result
+    return wrapper
+
+
+def mount_stats(app: FastAPI, recorder: StageRecorder) -> None:
+    """
+    Adds `/_loadtest/stages` (raw samples and error counts), `/_loadtest/memory` (peak RSS)
+    and `/_loadtest/reset` to a service under test.
+    """
+    router = APIRouter()
+
+    @router.get("/_loadtest/memory")
+    async def memory():
+        return {"max_rss_mb": max_rss_mb()}
+
+    @router.get("/_loadtest/stages")
+    async def stages():
+        return recorder.snapshot()
+
+    @router.post("/_loadtest/reset")
+    async def reset():
+        recorder.reset()
+        return {"status": "ok"}
+
+    app.include_router(router)
+
+
+def max_rss_mb() -> float:
+    """
+    Peak resident set size of this process.
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux, bytes on macOS
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values.
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p90_ms": percentile(values, 0.90) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": (values[-1] if values else float("nan")) * 1000,
+    }
@@ -0,0 +1,89 @@
+"""
+Query mixes, arrival schedules and recorded traffic for the load-test driver.
+"""
+import json
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "IBM", "NFLX", "AMD"]
+PERIODS = ["1mo", "3mo", "6mo", "1y"]
+
+# Relative weights of each query kind in the default mix
+DEFAULT_MIX: Dict[str, float] = {
+    "stock_quote": 0.30,
+    "stock_history": 0.15,
+    "compare_stocks": 0.15,
+    "budget_advice": 0.15,
+    "analyze_spending": 0.15,
+    "recommend_portfolio": 0.10,
+}
+
+
+def make_query(kind: str, rng: random.Random) -> str:
+    if kind == "stock_quote":
+        return f"What's the current price of {rng.choice(SYMBOLS)}?"
+    if kind == "stock_history":
+        return f"How has {rng.choice(SYMBOLS)} performed over the last {rng.choice(PERIODS)}?"
+    if kind == "compare_stocks":
+        first, second = rng.sample(SYMBOLS, 2)
+        return f"Compare {first} and {second} over the last {rng.choice(PERIODS)}."
+    if kind == "budget_advice":
+        return f"What's the 50/30/20 budget for a ${rng.choice([3000, 4500, 6000, 9000])} monthly income?"
+    if kind == "analyze_spending":
+        return (f"I spent ${rng.randint(100, 900)} on groceries and ${rng.randint(50, 700)} on dining out. "
+                f"My income is ${rng.choice([3000, 4500, 6000])}. How am I doing?")
+    if kind == "recommend_portfolio":
+        return (f"Recommend a portfolio for a {rng.choice(['conservative', 'moderate', 'aggressive'])} investor "
+                f"with ${rng.choice([5000, 20000, 100000])} over {rng.choice([5, 10, 20])} years.")
+    raise ValueError(f"Unknown query kind '{kind}'")
+
+
+@dataclass
+class PlannedRequest:
+    offset_s: float # seconds after the start of the run
+    kind: str
+    query: str
+
+    def to_json(self) -> str:
+        return json.dumps({"offset_s": round(self.offset_s, 6), "kind": self.kind, "query": self.query})
+
+
+def generate(rps: float, duration_s: float, mix: Optional[Dict[str, float]] = None, poisson: bool = True, seed: int = 0) -> Iterator[PlannedRequest]:
+    """
+    Open-loop arrivals at `rps` for `duration_s`, with exponential (Poisson) or fixed gaps.
+    """
+    mix = mix or DEFAULT_MIX
+    kinds: List[str] = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    rng = random.Random(seed)
+    offset = 0.0
+    while True:
+        offset += rng.expovariate(rps) if poisson else 1.0 / rps
+        if offset >= duration_s:
+            return
+        kind = rng.choices(kinds, weights)[0]
+        yield PlannedRequest(offset_s=offset, kind=kind, query=make_query(kind, rng))
+
+
+def load_recording(path: str, speed: float = 1.0) -> List[PlannedRequest]:
+    """
+    Loads recorded traffic (JSON lines of offset_s, kind, query); `speed` > 1 compresses time.
+    """
+    requests = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                requests.append(PlannedRequest(offset_s=record["offset_s"] / speed, kind=record.get("kind", "recorded"), query=record["query"]))
+    requests.sort(key=lambda r: r.offset_s)
+    return requests
+
+
+def load_mix(path: str) -> Dict[str, float]:
+    with open(path) as f:
+        mix = json.load(f)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise ValueError(f"Unknown query kinds in mix: {', '.join(sorted(unknown))}")
+    return mix
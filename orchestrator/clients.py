@@ -1,19 +1,51 @@
+import inspect
+import json
 import httpx
-from typing import Dict, Any
+from contextlib import AsyncExitStack
+from typing import Dict, Any, Optional, Tuple, Callable, Type, get_type_hints
+from fastapi import FastAPI, HTTPException
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ValidationError
+from common.metrics import stage
+from common.encoding import decode_response, request_headers, to_columnar
+from common.tracing import inject_headers
+
+AGENT_MODE_NETWORKED = "networked"
+AGENT_MODE_EMBEDDED = "embedded"
+AGENT_MODES = (AGENT_MODE_NETWORKED, AGENT_MODE_EMBEDDED)
 
 class ServiceClient:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, columnar: bool = False):
         self.base_url = base_url
-        self.client = httpx.AsyncClient()
+        self._client: Optional[httpx.AsyncClient] = None
+        # Ask for MessagePack (when available) and, optionally, column-wise price histories
+        self.headers = request_headers(columnar=columnar)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Built on first use: creating the connection pool loads the TLS trust store, about 0.1 s
+        if self._client is None:
+            self._client = httpx.AsyncClient()
+        return self._client
+
+    @client.setter
+    def client(self, client: httpx.AsyncClient) -> None:
+        self._client = client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def post(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Makes a POST request to a specified endpoint on the service.
         """
         try:
-            response = await self.client.post(f"{self.base_url}{endpoint}", json=data, timeout=10.0)
-            response.raise_for_status()
-            return response.json()
+            with stage(f"agent:{endpoint}").time():
+                response = await self.client.post(f"{self.base_url}{endpoint}", json=data, headers=inject_headers(self.headers), timeout=10.0)
+                response.raise_for_status()
+                return decode_response(response.headers.get("content-type", ""), response.content)
         except httpx.HTTPStatusError as e:
             # You might want to log the error details here
             raise Exception(f"HTTP error occurred: {e.response.status_code} - {e.response.text}")
@@ -21,10 +53,88 @@ class ServiceClient:
             # You might want to log the error details here
             raise Exception(f"Request error occurred: {e}")
 
+class EmbeddedServiceClient:
+    """
+    Same interface as ServiceClient, but calls the agent's route handlers in this process:
+    the request dict is validated into the handler's input model and the returned model is
+    dumped to a dict, with no HTTP hop and no JSON encoding in between. Errors are raised
+    with the same messages the networked client produces.
+    """
+    def __init__(self, app: FastAPI, columnar: bool = False):
+        self.app = app
+        self.columnar = columnar
+        self._handlers: Dict[str, Tuple[Callable, Optional[str], Optional[Type[BaseModel]]]] = {}
+
+    def _handler(self, endpoint: str) -> Tuple[Callable, Optional[str], Optional[Type[BaseModel]]]:
+        handler = self._handlers.get(endpoint)
+        if handler is None:
+            route = next((r for r in self.app.routes if isinstance(r, APIRoute) and r.path == endpoint and "POST" in r.methods), None)
+            if route is None:
+                raise Exception(f"HTTP error occurred: 404 - {json.dumps({'detail': 'Not Found'})}")
+            hints = get_type_hints(route.endpoint)
+            parameters = list(inspect.signature(route.endpoint).parameters)
+            models = [(name, hints.get(name)) for name in parameters if isinstance(hints.get(name), type) and issubclass(hints[name], BaseModel)]
+            if len(parameters) > 1 or len(models) != len(parameters):
+                # Streaming and query-parameter routes need a real request
+                raise Exception(f"Endpoint {endpoint} cannot be called in embedded mode")
+            name, model = models[0] if models else (None, None)
+            handler = self._handlers[endpoint] = (route.endpoint, name, model)
+        return handler
+
+    async def aclose(self) -> None:
+        pass
+
+    async def post(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calls the handler of a POST endpoint of the embedded agent.
+        """
+        function, name, model = self._handler(endpoint)
+        with stage(f"agent:{endpoint}").time():
+            try:
+                result = await function(**{name: model.model_validate(data)}) if model else await function()
+            except ValidationError as e:
+                raise Exception(f"HTTP error occurred: 422 - {json.dumps({'detail': e.errors(include_url=False, include_context=False)}, default=str)}")
+            except HTTPException as e:
+                raise Exception(f"HTTP error occurred: {e.status_code} - {json.dumps({'detail': e.detail})}")
+        if isinstance(result, BaseModel):
+            result = result.model_dump()
+        return to_columnar(result) if self.columnar else result
+
+
 class AgentClients:
-    def __init__(self, budget_agent_url: str, financial_analysis_agent_url: str):
-        self.budget = ServiceClient(base_url=budget_agent_url)
-        self.financial_analysis = ServiceClient(base_url=financial_analysis_agent_url)
+    """
+    Clients of the budget and financial analysis agents. In networked mode they are HTTP
+    clients of the agent services. In embedded mode the agents run inside this process and
+    are called directly; `start()` then runs the agents' own startup.
+    """
+    def __init__(self, budget_agent_url: str, financial_analysis_agent_url: str, mode: str = AGENT_MODE_NETWORKED):
+        if mode not in AGENT_MODES:
+            raise ValueError(f"Unknown agent mode '{mode}'; expected one of {', '.join(AGENT_MODES)}.")
+        self.mode = mode
+        self._lifespans: Optional[AsyncExitStack] = None
+        if mode == AGENT_MODE_EMBEDDED:
+            # Imported only in embedded mode so the networked orchestrator does not load the agents
+            from budget_agent.main import app as budget_app
+            from financial_analysis_agent.main import app as financial_analysis_app
+            self.budget = EmbeddedServiceClient(budget_app)
+            self.financial_analysis = EmbeddedServiceClient(financial_analysis_app)
+        else:
+            self.budget = ServiceClient(base_url=budget_agent_url)
+            # Rows, as API clients get them in tool_results; the prompt copy is made columnar in main
+            self.financial_analysis = ServiceClient(base_url=financial_analysis_agent_url)
+
+    async def start(self) -> None:
+        if self.mode == AGENT_MODE_EMBEDDED and self._lifespans is None:
+            self._lifespans = AsyncExitStack()
+            for client in (self.budget, self.financial_analysis):
+                await self._lifespans.enter_async_context(client.app.router.lifespan_context(client.app))
+
+    async def aclose(self) -> None:
+        await self.budget.aclose()
+        await self.financial_analysis.aclose()
+        if self._lifespans is not None:
+            await self._lifespans.aclose()
+            self._lifespans = None
 
 # In a real application, these URLs would come from a configuration service or environment variables.
 # For example:
@@ -0,0 +1,220 @@
+"""
+Compaction of agent tool results before they are put into the synthesis prompt.
+
+Each intent has a reducer that keeps what the answer needs (period statistics, a few
+sampled points, the top spending categories) instead of the raw payload. If the result
+is still above the token budget, reducers are asked for less detail, and as a last
+resort lists are truncated. The raw tool results are left untouched and are still
+returned to API clients.
+"""
+import json
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import Histogram
+
+# Rough Gemini tokenization: about four characters of JSON per token
+CHARS_PER_TOKEN = 4
+TOOL_RESULTS_TOKEN_BUDGET = int(os.getenv("TOOL_RESULTS_TOKEN_BUDGET", "1500"))
+
+# Detail levels tried in order until the compacted results fit the budget
+SAMPLED_POINTS = (24, 12, 6, 0)
+TOP_CATEGORIES = 5
+
+TOOL_RESULT_TOKENS = Histogram(
+    "tool_result_tokens",
+    "Estimated tokens of tool results per request, before (raw) and after compaction.",
+    ["intent", "form"],
+    buckets=(50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def render_tool_results(tool_results: Any) -> str:
+    """
+    The tool-results text that goes into the synthesis prompt.
+    """
+    return json.dumps(tool_results, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+@dataclass
+class CompactionResult:
+    data: Any
+    text: str
+    reducer: str
+    tokens_before: int
+    tokens_after: int
+
+
+# --- Reducers --------------------------------------------------------------------
+
+def _columns(history: Any) -> Dict[str, List[Any]]:
+    """
+    Historical bars as oldest-first columns, from either the row or the columnar layout.
+    """
+    if isinstance(history, dict):
+        columns = history
+    else:
+        columns = {key: [row.get(key) for row in history] for key in (history[0] if history else {})}
+    dates = columns.get("date") or []
+    if len(dates) > 1 and dates[0] > dates[-1]:
+        columns = {key: list(reversed(values)) for key, values in columns.items()}
+    return columns
+
+
+def _sample(dates: List[str], closes: List[float], points: int) -> List[List[Any]]:
+    if points <= 0 or not closes:
+        return []
+    if len(closes) <= points:
+        indices = range(len(closes))
+    else:
+        step = (len(closes) - 1) / (points - 1)
+        indices = sorted({round(i * step) for i in range(points)})
+    return [[dates[i], round(closes[i], 2)] for i in indices]
+
+
+def summarize_history(history: Any, points: int) -> Optional[Dict[str, Any]]:
+    """
+    Period statistics for a price history plus `points` evenly sampled (date, close) pairs.
+    """
+    columns = _columns(history)
+    dates, closes = columns.get("date") or [], columns.get("close") or []
+    if not closes:
+        return None
+    highs = columns.get("high") or closes
+    lows = columns.get("low") or closes
+    volumes = [v for v in (columns.get("volume") or []) if v is not None]
+
+    returns = [closes[i] / closes[i - 1] - 1 for i in range(1, len(closes)) if closes[i - 1]]
+    volatility = None
+    if len(returns) > 1:
+        mean = sum(returns) / len(returns)
+        variance = sum((r - mean) ** 2 for r in returns) / (len(returns) - 1)
+        volatility = round(math.sqrt(variance) * math.sqrt(252) * 100, 2)
+    peak, max_drawdown = closes[0], 0.0
+    for close in closes:
+        peak = max(peak, close)
+        if peak:
+            max_drawdown = min(max_drawdown, close / peak - 1)
+    high_index = max(range(len(highs)), key=lambda i: highs[i])
+    low_index = min(range(len(lows)), key=lambda i: lows[i])
+
+    summary = {
+        "start_date": dates[0],
+        "end_date": dates[-1],
+        "trading_days": len(closes),
+        "start_close": round(closes[0], 2),
+        "end_close": round(closes[-1], 2),
+        "change_percent": round((closes[-1] / closes[0] - 1) * 100, 2) if closes[0] else None,
+        "period_high": {"date": dates[high_index], "price": round(highs[high_index], 2)},
+        "period_low": {"date": dates[low_index], "price": round(lows[low_index], 2)},
+        "annualized_volatility_percent": volatility,
+        "max_drawdown_percent": round(max_drawdown * 100, 2),
+        "average_volume": round(sum(volumes) / len(volumes)) if volumes else None,
+    }
+    sampled = _sample(dates, closes, points)
+    if sampled:
+        summary["sampled_closes"] = sampled
+    return summary
+
+
+def reduce_stock_data(tool_results: Dict[str, Any], points: int) -> Dict[str, Any]:
+    reduced = {key: value for key, value in tool_results.items() if key != "historical_data"}
+    if tool_results.get("historical_data"):
+        reduced["history_summary"] = summarize_history(tool_results["historical_data"], points)
+    return reduced
+
+
+def reduce_compare_stocks(tool_results: Dict[str, Any], points: int) -> Dict[str, Any]:
+    performance = sorted(tool_results.get("performance_comparison") or [], key=lambda p: p.get("change_percent", 0), reverse=True)
+    reduced = {
+        "period": tool_results.get("period"),
+        "ranked_by_change_percent": [
+            {key: round(value, 2) if isinstance(value, float) else value for key, value in p.items()}
+            for p in performance
+        ],
+    }
+    if performance:
+        reduced["best"], reduced["worst"] = performance[0].get("symbol"), performance[-1].get("symbol")
+    return reduced
+
+
+def reduce_spending(tool_results: Dict[str, Any], points: int) -> Dict[str, Any]:
+    categories = sorted((tool_results.get("spending_by_category") or {}).items(), key=lambda item: item[1], reverse=True)
+    reduced = {
+        "total_spending": tool_results.get("total_spending"),
+        "top_categories": dict(categories[:TOP_CATEGORIES]),
+        "budget_adherence": tool_results.get("budget_adherence"),
+        "recommendations": tool_results.get("recommendations"),
+        "summary": tool_results.get("summary"),
+    }
+    if len(categories) > TOP_CATEGORIES:
+        reduced["other_categories"] = {"count": len(categories) - TOP_CATEGORIES, "total": round(sum(amount for _, amount in categories[TOP_CATEGORIES:]), 2)}
+    trends = tool_results.get("trends")
+    if trends:
+        recent = trends[-points:] if points else []
+        reduced["monthly_trend"] = {"months": len(trends), "recent": recent}
+    return reduced
+
+
+def _passthrough(tool_results: Any, points: int) -> Any:
+    return tool_results
+
+
+REDUCERS: Dict[str, Callable[[Any, int], Any]] = {
+    "get_stock_data": reduce_stock_data,
+    "compare_stocks": reduce_compare_stocks,
+    "analyze_spending": reduce_spending,
+    "get_budget_advice": _passthrough,
+    "recommend_portfolio": _passthrough,
+}
+
+
+def _truncate(value: Any, max_items: int) -> Any:
+    if isinstance(value, dict):
+        return {key: _truncate(item, max_items) for key, item in value.items()}
+    if isinstance(value, list):
+        kept = [_truncate(item, max_items) for item in value[:max_items]]
+        if len(value) > max_items:
+            kept.append(f"... {len(value) - max_items} more")
+        return kept
+    return value
+
+
+# --- Entry point ---------------------------------------------------------------
+
+def compact_tool_results(intent: str, tool_results: Any, token_budget: int = TOOL_RESULTS_TOKEN_BUDGET, raw: Any = None) -> CompactionResult:
+    """
+    Reduces `tool_results` for the synthesis prompt to at most `token_budget` estimated tokens.
+    `raw` is the form the prompt used to embed, which tokens_before measures; pass it when
+    `tool_results` has already been reshaped (e.g. to columns). Defaults to `tool_results`.
+    """
+    raw_text = json.dumps(tool_results if raw is None else raw, indent=2, default=str) # What the prompt used to embed
+    tokens_before = estimate_tokens(raw_text)
+    reducer = REDUCERS.get(intent, _passthrough)
+    reducer_name = getattr(reducer, "__name__", "passthrough").lstrip("_")
+
+    data, text = tool_results, render_tool_results(tool_results)
+    if isinstance(tool_results, dict):
+        for points in SAMPLED_POINTS:
+            data = reducer(tool_results, points)
+            text = render_tool_results(data)
+            if estimate_tokens(text) <= token_budget:
+                break
+    max_items = 16
+    if estimate_tokens(text) > token_budget:
+        reducer_name = f"{reducer_name}+truncate"
+    while estimate_tokens(text) > token_budget and max_items >= 1:
+        data = _truncate(data, max_items)
+        text = render_tool_results(data)
+        max_items //= 2
+
+    tokens_after = estimate_tokens(text)
+    TOOL_RESULT_TOKENS.labels(intent, "raw").observe(tokens_before)
+    TOOL_RESULT_TOKENS.labels(intent, "compacted").observe(tokens_after)
+    return CompactionResult(data=data, text=text, reducer=reducer_name, tokens_before=tokens_before, tokens_after=tokens_after)
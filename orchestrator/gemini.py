@@ -1,52 +1,172 @@
-import google.generativeai as genai
 import os
 import json
+import time
 from pydantic import BaseModel, ValidationError
-from typing import List, Dict, Any, Optional
-from orchestrator.prompts import INTENT_RECOGNITION_PROMPT, RESPONSE_SYNTHESIS_PROMPT
+from typing import List, Dict, Any, Optional, Tuple
+from common.metrics import stage
+from orchestrator.compaction import estimate_tokens, render_tool_results
+from orchestrator.response_cache import ResponseCache
+from orchestrator.routing import ESCALATIONS, MODEL_DURATION, MODEL_OUTCOMES, ModelRouter
+from orchestrator.scheduler import TOKENS, GeminiScheduler, Priority
+from orchestrator.prompt_prefix import IntentPrefix, create_cached_model
+from orchestrator.prompts import RESPONSE_SYNTHESIS_PROMPT
 
 class RecognizedIntent(BaseModel):
     intent: str
     entities: Dict[str, Any]
 
+# Expected output size per stage, reserved from the token budget along with the prompt
+EXPECTED_RESPONSE_TOKENS = {"gemini:intent": 150, "gemini:synthesis": 600}
+
+# How long a user-facing call may take, including queueing and retries
+INTERACTIVE_DEADLINE_S = float(os.getenv("GEMINI_INTERACTIVE_DEADLINE_S", "20"))
+
+
+def _usage(response: Any) -> Optional[Tuple[int, int]]:
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return None
+    return metadata.prompt_token_count, metadata.candidates_token_count
+
+
 class GeminiClient:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+    def __init__(
+        self,
+        api_key: str,
+        scheduler: Optional[GeminiScheduler] = None,
+        response_cache: Optional[ResponseCache] = None,
+        router: Optional[ModelRouter] = None,
+    ):
+        self.api_key = api_key
+        self._configured = False
+        self.model_factory = self._generative_model
+        self._models: Dict[str, Any] = {}
+        self.scheduler = scheduler or GeminiScheduler()
+        self.response_cache = response_cache
+        self.router = router or ModelRouter.from_env()
+        # Resolved on each use so a replaced model_factory (tests, load tests) is honoured
+        self.intent_prefix = IntentPrefix(lambda *args, **kwargs: self.model_factory(*args, **kwargs), cached_model_factory=self._cached_model)
 
-    def recognize_intent(self, user_query: str) -> RecognizedIntent:
+    def _genai(self):
         """
-        Uses Gemini to recognize the intent of the user's query.
+        The SDK, configured with this client's API key. It takes over half a second to import,
+        so it is loaded when the first model or context cache is built.
         """
-        prompt = INTENT_RECOGNITION_PROMPT.format(user_query=user_query)
-        
-        try:
-            response = self.model.generate_content(prompt)
-            
-            # Extract the JSON part of the response
-            json_response = self._extract_json(response.text)
-            
-            # Parse and validate with Pydantic
-            intent_data = RecognizedIntent.parse_obj(json_response)
-            return intent_data
-            
-        except (ValueError, ValidationError) as e:
-            # Handle cases where the response is not valid JSON or doesn't match the model
-            # You might want to log this error
-            return RecognizedIntent(intent="unknown", entities={"error": str(e)})
-        except Exception as e:
-            # Handle other potential errors (e.g., API issues)
-            return RecognizedIntent(intent="unknown", entities={"error": f"An unexpected error occurred: {e}"})
+        import google.generativeai as genai
+        if not self._configured:
+            genai.configure(api_key=self.api_key)
+            self._configured = True
+        return genai
 
-    def synthesize_response(self, user_query: str, tool_results: Dict[str, Any]) -> str:
+    def _generative_model(self, *args, **kwargs):
+        return self._genai().GenerativeModel(*args, **kwargs)
+
+    def _cached_model(self, model_name: str, system_instruction: str, ttl_s: int, display_name: str):
+        self._genai()
+        return create_cached_model(model_name, system_instruction, ttl_s, display_name)
+
+    def _model(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._models[model_name] = self.model_factory(model_name)
+        return model
+
+    async def _generate(
+        self,
+        stage_name: str,
+        model_name: str,
+        prompt: str,
+        priority: Priority,
+        deadline_s: Optional[float],
+        model: Any = None,
+        extra_tokens: int = 0,
+    ):
         """
-        Synthesizes a response to the user based on the tool results.
+        Calls `model_name` (or the given `model` instance of it) through the scheduler; every
+        attempt is timed as `stage_name`. `extra_tokens` accounts for a prefix sent outside `prompt`.
         """
-        prompt = RESPONSE_SYNTHESIS_PROMPT.format(user_query=user_query, tool_results=json.dumps(tool_results, indent=2))
-        
+        model = model or self._model(model_name)
+        duration = MODEL_DURATION.labels(model_name, stage_name)
+
+        async def call():
+            start = time.perf_counter()
+            try:
+                with stage(stage_name).time(model=model_name):
+                    return await model.generate_content_async(prompt)
+            finally:
+                duration.observe(time.perf_counter() - start)
+
+        if deadline_s is None and priority == Priority.INTERACTIVE:
+            deadline_s = INTERACTIVE_DEADLINE_S
+        estimated_tokens = estimate_tokens(prompt) + extra_tokens + EXPECTED_RESPONSE_TOKENS[stage_name]
         try:
-            response = self.model.generate_content(prompt)
+            return await self.scheduler.run(call, stage_name, estimated_tokens, priority=priority, deadline_s=deadline_s, usage=_usage)
+        except Exception:
+            MODEL_OUTCOMES.labels(model_name, stage_name, "error").inc()
+            raise
+
+    async def recognize_intent(self, user_query: str, priority: Priority = Priority.INTERACTIVE, deadline_s: Optional[float] = None) -> RecognizedIntent:
+        """
+        Uses Gemini to recognize the intent of the user's query. Output that is not valid
+        intent JSON is retried once on the router's escalation model.
+        """
+        prompt = self.intent_prefix.prompt(user_query)
+        extra_tokens = 0 if self.intent_prefix.mode == "inline" else self.intent_prefix.prefix_tokens
+        models = self.router.models_for("intent")
+
+        for attempt, model_name in enumerate(models):
+            try:
+                model = await self.intent_prefix.model(model_name)
+                response = await self._generate("gemini:intent", model_name, prompt, priority, deadline_s, model=model, extra_tokens=extra_tokens)
+                cached_tokens = getattr(getattr(response, "usage_metadata", None), "cached_content_token_count", 0)
+                if cached_tokens:
+                    TOKENS.labels("gemini:intent", "cached").inc(cached_tokens)
+
+                # Extract the JSON part of the response
+                json_response = self._extract_json(response.text)
+
+                # Parse and validate with Pydantic
+                intent_data = RecognizedIntent.model_validate(json_response)
+                MODEL_OUTCOMES.labels(model_name, "gemini:intent", "ok").inc()
+                return intent_data
+
+            except (ValueError, ValidationError) as e:
+                # The response is not valid JSON or doesn't match the model
+                MODEL_OUTCOMES.labels(model_name, "gemini:intent", "invalid_output").inc()
+                if attempt + 1 < len(models):
+                    ESCALATIONS.labels("gemini:intent", model_name, models[attempt + 1]).inc()
+                    continue
+                return RecognizedIntent(intent="unknown", entities={"error": str(e)})
+            except Exception as e:
+                # Handle other potential errors (e.g., API issues)
+                return RecognizedIntent(intent="unknown", entities={"error": f"An unexpected error occurred: {e}"})
+
+    async def synthesize_response(
+        self,
+        user_query: str,
+        tool_results: Dict[str, Any],
+        intent: Optional[str] = None,
+        session_id: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline_s: Optional[float] = None,
+    ) -> str:
+        """
+        Synthesizes a response to the user based on the (compacted) tool results.
+        With an `intent` and a response cache, identical syntheses are served from the cache.
+        """
+        prompt = RESPONSE_SYNTHESIS_PROMPT.format(user_query=user_query, tool_results=render_tool_results(tool_results))
+
+        model_name = self.router.model_for("synthesis", intent)
+
+        async def generate() -> str:
+            response = await self._generate("gemini:synthesis", model_name, prompt, priority, deadline_s)
+            MODEL_OUTCOMES.labels(model_name, "gemini:synthesis", "ok").inc()
             return response.text
+
+        try:
+            if self.response_cache is None or intent is None:
+                return await generate()
+            return await self.response_cache.get_or_compute(intent, user_query, tool_results, generate, session_id=session_id)
         except Exception as e:
             return f"Sorry, I encountered an error while generating a response: {e}"
 
@@ -1,34 +1,54 @@
 from fastapi import FastAPI, HTTPException
-from orchestrator.clients import AgentClients
+from orchestrator.clients import AgentClients, AGENT_MODE_EMBEDDED, AGENT_MODE_NETWORKED
 from orchestrator.session import get_session_manager, SessionManager
 from orchestrator.gemini import GeminiClient, RecognizedIntent
+from orchestrator.compaction import compact_tool_results
+from orchestrator.response_cache import ResponseCache
+from orchestrator.symbols import resolve_symbol_entities
 import os
-from pydantic import BaseModel
-from typing import Dict, Any
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field
+from typing import Dict, Any, Optional
 import structlog
-from orchestrator.logging import configure_logging
+from common.encoding import NegotiatedResponse, install_encoding, to_columnar
+from common.metrics import instrument_app
+from common.tracing import trace_app
+from common.logging import configure_logging
 
-configure_logging()
+configure_logging(service="orchestrator")
 logger = structlog.get_logger()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Orchestrator starting up", agent_mode=AGENT_MODE)
+    await agent_clients.start()
+    yield
+    await agent_clients.aclose()
+    await session_manager.redis_client.aclose()
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Orchestrator starting up")
+app = FastAPI(default_response_class=NegotiatedResponse, lifespan=lifespan)
+install_encoding(app)
+instrument_app(app)
+trace_app(app, service="orchestrator")
 
 # In a real application, these URLs would come from a configuration service or environment variables.
 BUDGET_AGENT_URL = os.getenv("BUDGET_AGENT_URL", "http://localhost:8001")
 FINANCIAL_ANALYSIS_AGENT_URL = os.getenv("FINANCIAL_ANALYSIS_AGENT_URL", "http://localhost:8002")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# "embedded" runs the budget and financial analysis agents inside this process (single-service deployments)
+AGENT_MODE = os.getenv("AGENT_MODE", AGENT_MODE_NETWORKED)
 
 agent_clients = AgentClients(
     budget_agent_url=BUDGET_AGENT_URL,
-    financial_analysis_agent_url=FINANCIAL_ANALYSIS_AGENT_URL
+    financial_analysis_agent_url=FINANCIAL_ANALYSIS_AGENT_URL,
+    mode=AGENT_MODE,
 )
+if AGENT_MODE == AGENT_MODE_EMBEDDED:
+    configure_logging(service="orchestrator") # Importing the agents configured logging for them
 
 session_manager: SessionManager = get_session_manager()
-gemini_client = GeminiClient(api_key=GEMINI_API_KEY)
+response_cache = ResponseCache(session_manager.redis_client)
+gemini_client = GeminiClient(api_key=GEMINI_API_KEY, response_cache=response_cache)
 
 
 class SessionData(BaseModel):
@@ -37,9 +57,17 @@ class SessionData(BaseModel):
 
 class IntentQuery(BaseModel):
     query: str
+    session_id: Optional[str] = None # Responses within a session are never cached for anyone else
+
+class AutocompleteQuery(BaseModel):
+    query: str = Field(..., min_length=1, max_length=64)
+    limit: int = Field(10, ge=1, le=25)
 
 class OrchestrationResponse(BaseModel):
     response: str
+    intent: Optional[str] = None
+    tool_results: Optional[Dict[str, Any]] = None # Full agent output, before compaction
+    tool_result_tokens: Optional[Dict[str, int]] = None
 
 @app.get("/health")
 async def health_check():
@@ -50,10 +78,12 @@ async def health_check():
 async def orchestrate(query: IntentQuery):
     logger.info("Orchestrating query", user_query=query.query)
     # 1. Recognize intent
-    recognized_intent = gemini_client.recognize_intent(query.query)
+    recognized_intent = await gemini_client.recognize_intent(query.query)
     intent = recognized_intent.intent
     entities = recognized_intent.entities
     logger.info("Intent recognized", intent=intent, entities=entities)
+    # Company names and tickers are looked up in the symbol directory, not left to Gemini's guess
+    entities = await resolve_symbol_entities(agent_clients.financial_analysis, intent, entities)
 
     # 2. Delegate to the appropriate agent
     try:
@@ -73,10 +103,17 @@ async def orchestrate(query: IntentQuery):
         
         logger.info("Tool results", results=tool_results)
 
-        # 3. Synthesize the response
-        final_response = gemini_client.synthesize_response(query.query, tool_results)
+        # 3. Compact the tool results for the prompt. Only this copy takes the columnar layout, which is
+        # more compact in the prompt; API clients get the rows the agents documented. Savings are
+        # measured against the rows, which is what the prompt used to embed
+        compacted = compact_tool_results(intent, to_columnar(tool_results), raw=tool_results)
+        tool_result_tokens = {"before": compacted.tokens_before, "after": compacted.tokens_after}
+        logger.info("Tool results compacted", intent=intent, reducer=compacted.reducer, tokens_before=compacted.tokens_before, tokens_after=compacted.tokens_after)
+
+        # 4. Synthesize the response
+        final_response = await gemini_client.synthesize_response(query.query, compacted.data, intent=intent, session_id=query.session_id)
         logger.info("Response synthesized")
-        return OrchestrationResponse(response=final_response)
+        return OrchestrationResponse(response=final_response, intent=intent, tool_results=tool_results, tool_result_tokens=tool_result_tokens)
 
     except Exception as e:
         logger.exception("Error during orchestration")
@@ -87,13 +124,23 @@ async def orchestrate(query: IntentQuery):
 async def recognize_intent_endpoint(query: IntentQuery):
     logger.info("Recognizing intent via dedicated endpoint", user_query=query.query)
     try:
-        recognized_intent = gemini_client.recognize_intent(query.query)
+        recognized_intent = await gemini_client.recognize_intent(query.query)
         return recognized_intent
     except Exception as e:
         logger.exception("Error recognizing intent")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/orchestrate/autocomplete")
+async def autocomplete_endpoint(query: AutocompleteQuery):
+    # Served by the financial analysis agent's symbol directory; no Gemini call
+    try:
+        return await agent_clients.financial_analysis.post("/financial/symbols/search", data=query.model_dump())
+    except Exception as e:
+        logger.exception("Error searching symbols", user_query=query.query)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/orchestrate/budget-analysis")
 async def orchestrate_budget_analysis(income: float):
     logger.info("Orchestrating budget analysis via dedicated endpoint", income=income)
@@ -0,0 +1,127 @@
+"""
+Reuse of the static intent-recognition prefix across calls.
+
+The instructions and few-shot examples are identical on every call. Only the
+`User Query: ...` suffix changes. GEMINI_INTENT_PREFIX selects how the prefix is sent:
+
+- `inline`: the whole prompt on every call, as before.
+- `system` (default): the prefix is the model's system instruction. Each request then only
+  carries the suffix. The model still processes the prefix on every call.
+- `cache`: the prefix is uploaded once as a Gemini context cache per model. It is recreated
+  before its TTL (GEMINI_INTENT_PREFIX_TTL_S) runs out and whenever the prompt version
+  changes. Cached tokens are billed at a discount and not prefilled again. Context caches
+  have a minimum size per model. If creating one fails, that model falls back to `system`
+  until the next refresh.
+"""
+import asyncio
+import datetime
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter
+
+from orchestrator.compaction import estimate_tokens
+from orchestrator.prompts import INTENT_RECOGNITION_INSTRUCTIONS, INTENT_RECOGNITION_PROMPT_VERSION, INTENT_RECOGNITION_QUERY
+
+logger = structlog.get_logger()
+
+PREFIX_MODES = ("inline", "system", "cache")
+GEMINI_INTENT_PREFIX = os.getenv("GEMINI_INTENT_PREFIX", "system")
+GEMINI_INTENT_PREFIX_TTL_S = int(os.getenv("GEMINI_INTENT_PREFIX_TTL_S", "3600"))
+
+# A context cache is replaced once this fraction of its TTL has passed, well before it expires
+REFRESH_AT = 0.8
+
+PREFIX_REFRESHES = Counter("gemini_prefix_cache_refreshes_total", "Context cache (re)creations for the intent prefix.", ["model", "outcome"])
+
+
+def create_cached_model(model_name: str, system_instruction: str, ttl_s: int, display_name: str):
+    """
+    Uploads `system_instruction` as a context cache and returns a model bound to it. The SDK
+    must already be configured with an API key (GeminiClient does this).
+    """
+    import google.generativeai as genai
+    from google.generativeai import caching
+    cached = caching.CachedContent.create(
+        model=model_name,
+        display_name=display_name,
+        system_instruction=system_instruction,
+        ttl=datetime.timedelta(seconds=ttl_s),
+    )
+    return genai.GenerativeModel.from_cached_content(cached)
+
+
+class IntentPrefix:
+    def __init__(
+        self,
+        model_factory: Callable[..., Any],
+        mode: str = GEMINI_INTENT_PREFIX,
+        ttl_s: int = GEMINI_INTENT_PREFIX_TTL_S,
+        cached_model_factory: Callable[[str, str, int, str], Any] = create_cached_model,
+    ):
+        if mode not in PREFIX_MODES:
+            raise ValueError(f"Unknown intent prefix mode '{mode}', expected one of {PREFIX_MODES}")
+        self.model_factory = model_factory
+        self.cached_model_factory = cached_model_factory
+        self.mode = mode
+        self.ttl_s = ttl_s
+        self.instructions = INTENT_RECOGNITION_INSTRUCTIONS
+        self.version = INTENT_RECOGNITION_PROMPT_VERSION
+        self.prefix_tokens = estimate_tokens(self.instructions)
+        self._models: Dict[Tuple[str, str], Any] = {}
+        self._cached: Dict[str, Tuple[float, Any]] = {} # model name -> (refresh at, model)
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    def prompt(self, user_query: str) -> str:
+        """
+        What is sent per call: the suffix, or the whole prompt in `inline` mode.
+        """
+        suffix = INTENT_RECOGNITION_QUERY.format(user_query=user_query)
+        return self.instructions + suffix if self.mode == "inline" else suffix
+
+    def _plain_model(self, model_name: str, with_instructions: bool):
+        key = (model_name, "system" if with_instructions else "inline")
+        model = self._models.get(key)
+        if model is None:
+            if with_instructions:
+                model = self.model_factory(model_name, system_instruction=self.instructions)
+            else:
+                model = self.model_factory(model_name)
+            self._models[key] = model
+        return model
+
+    async def model(self, model_name: str):
+        """
+        The model to call for intent recognition on `model_name`, configured with the prefix.
+        """
+        if self.mode == "inline":
+            return self._plain_model(model_name, with_instructions=False)
+        if self.mode == "system":
+            return self._plain_model(model_name, with_instructions=True)
+
+        entry = self._cached.get(model_name)
+        if entry is not None and time.monotonic() < entry[0]:
+            return entry[1]
+        task = self._refreshing.get(model_name)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(model_name))
+            self._refreshing[model_name] = task
+            task.add_done_callback(lambda done: self._refreshing.pop(model_name, None))
+        return await asyncio.shield(task)
+
+    async def _refresh(self, model_name: str):
+        display_name = f"intent-prefix-{self.version}"
+        try:
+            model = await asyncio.to_thread(self.cached_model_factory, model_name, self.instructions, self.ttl_s, display_name)
+        except Exception as e:
+            # Typically a prefix below the model's minimum cacheable size; retried at the next refresh
+            PREFIX_REFRESHES.labels(model_name, "failed").inc()
+            logger.warning("Intent prefix context cache unavailable, using system instruction", model=model_name, error=str(e))
+            model = self._plain_model(model_name, with_instructions=True)
+        else:
+            PREFIX_REFRESHES.labels(model_name, "created").inc()
+            logger.info("Intent prefix context cache created", model=model_name, version=self.version, ttl_s=self.ttl_s)
+        self._cached[model_name] = (time.monotonic() + self.ttl_s * REFRESH_AT, model)
+        return model
@@ -1,6 +1,21 @@
-# Version 1.0 of the Intent Recognition Prompt
+import hashlib
 
-INTENT_RECOGNITION_PROMPT = """
+
+def prompt_version(*parts: str) -> str:
+    """
+    Content hash of a prompt's templates. Any edit to a prompt changes its version, which
+    invalidates the synthesized-response cache and the intent prefix cache.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:12]
+
+
+# The static instructions and few-shot examples. They are identical on every call, so they are
+# sent once as a system instruction or context cache (see orchestrator/prompt_prefix.py).
+INTENT_RECOGNITION_INSTRUCTIONS = """
 You are a highly intelligent financial assistant. Your role is to analyze a user's query and identify their primary intent and any associated entities.
 
 The possible intents are:
@@ -15,60 +30,62 @@ Here are some examples of how to classify queries:
 
 ---
 Query: "What's the 50/30/20 rule for a $5000 monthly income?"
-Intent: {{
+Intent: {
   "intent": "get_budget_advice",
-  "entities": {{
+  "entities": {
     "monthly_income": 5000
-  }}
-}}
+  }
+}
 ---
 Query: "I spent $200 on groceries and $100 on dining out. My income is $3000. How am I doing?"
-Intent: {{
+Intent: {
   "intent": "analyze_spending",
-  "entities": {{
+  "entities": {
     "monthly_income": 3000,
     "spending": [
-      {{"name": "groceries", "amount": 200}},
-      {{"name": "dining out", "amount": 100}}
+      {"name": "groceries", "amount": 200},
+      {"name": "dining out", "amount": 100}
     ]
-  }}
-}}
+  }
+}
 ---
 Query: "What's the current price of Apple stock?"
-Intent: {{
+Intent: {
   "intent": "get_stock_data",
-  "entities": {{
+  "entities": {
     "symbol": "AAPL"
-  }}
-}}
+  }
+}
 ---
 Query: "Can you recommend a portfolio for me? I'm a moderate risk taker."
-Intent: {{
+Intent: {
   "intent": "recommend_portfolio",
-  "entities": {{
+  "entities": {
     "risk_tolerance": "moderate",
     "investment_amount": null,
     "time_horizon": null
-  }}
-}}
+  }
+}
 ---
 Query: "How has GOOGL performed compared to MSFT over the last year?"
-Intent: {{
+Intent: {
   "intent": "compare_stocks",
-  "entities": {{
+  "entities": {
     "symbols": ["GOOGL", "MSFT"],
     "period": "1y"
-  }}
-}}
+  }
+}
 ---
 
 Now, analyze the following user query and provide the intent and entities in JSON format.
 
-User Query: "{user_query}"
+"""
+
+# The per-query suffix, the only part that changes between calls
+INTENT_RECOGNITION_QUERY = """User Query: "{user_query}"
 Intent:
 """
 
-# Version 1.0 of the Response Synthesis Prompt
 RESPONSE_SYNTHESIS_PROMPT = """
 You are a friendly and helpful financial assistant. Your task is to synthesize the results from our internal tools into a clear, concise, and easy-to-understand response for the user.
 
@@ -81,3 +98,6 @@ Here is the data we retrieved from our tools:
 
 Please provide a final response to the user based on this data. The response should be in markdown format.
 """
+
+INTENT_RECOGNITION_PROMPT_VERSION = prompt_version(INTENT_RECOGNITION_INSTRUCTIONS, INTENT_RECOGNITION_QUERY)
+RESPONSE_SYNTHESIS_PROMPT_VERSION = prompt_version(RESPONSE_SYNTHESIS_PROMPT)
@@ -0,0 +1,130 @@
+"""
+Cache of synthesized responses, so identical questions over identical data cost one Gemini call.
+
+An entry is keyed by the intent, the synthesis prompt version, a hash of the normalized
+user query and a hash of the canonical (sorted-keys) JSON of the compacted tool results.
+Two questions over the same data ("Is AAPL up today?", "Should I sell AAPL?") therefore
+get their own answers. A fresh quote changes the hash, so the cached answer can never
+outlive its data. The TTL per intent follows how long the agents
+consider that data fresh. Responses for a session are keyed by that session and never
+served to anyone else. Intents built on personal data are only cached inside a session.
+Concurrent identical requests are coalesced onto a single Gemini call.
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import structlog
+from redis.asyncio import Redis
+
+from common.metrics import CACHE_REQUESTS, cache_counters, stage
+from orchestrator.prompts import RESPONSE_SYNTHESIS_PROMPT_VERSION
+
+logger = structlog.get_logger()
+
+KEY_PREFIX = "synthesis"
+
+# Seconds a synthesized response may be served, aligned with the agent caches it is built on:
+# quotes 300s, price histories 3600s, static portfolio models and the 50/30/20 rule longer.
+INTENT_TTLS: Dict[str, int] = {
+    "get_stock_data": 300,
+    "compare_stocks": 3600,
+    "recommend_portfolio": 86400,
+    "get_budget_advice": 86400,
+    "analyze_spending": 3600,
+}
+
+# Intents whose tool results describe the user's own finances
+PERSONAL_INTENTS = {"get_budget_advice", "analyze_spending"}
+
+
+def query_digest(user_query: str) -> str:
+    """
+    Hash of the query with case and whitespace normalized, so trivially different spellings share an entry.
+    """
+    normalized = " ".join(user_query.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def tool_results_digest(tool_results: Any) -> str:
+    canonical = json.dumps(tool_results, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, redis_client: Redis, ttls: Optional[Dict[str, int]] = None):
+        self.redis = redis_client
+        self.ttls = INTENT_TTLS if ttls is None else ttls
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._hits, self._misses = cache_counters(KEY_PREFIX)
+        self._coalesced = CACHE_REQUESTS.labels(KEY_PREFIX, "coalesced")
+        self._get_stage = stage("cache:get", track_in_flight=False)
+        self._set_stage = stage("cache:set", track_in_flight=False)
+
+    def key(self, intent: str, user_query: str, tool_results: Any, session_id: Optional[str] = None) -> Optional[str]:
+        """
+        The cache key for a synthesis, or None when it must not be cached.
+        """
+        if intent not in self.ttls or (intent in PERSONAL_INTENTS and session_id is None):
+            return None
+        scope = "shared" if session_id is None else "session:" + hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        return f"{KEY_PREFIX}:{RESPONSE_SYNTHESIS_PROMPT_VERSION}:{intent}:{scope}:{query_digest(user_query)}:{tool_results_digest(tool_results)}"
+
+    async def get_or_compute(
+        self,
+        intent: str,
+        user_query: str,
+        tool_results: Any,
+        compute: Callable[[], Awaitable[str]],
+        session_id: Optional[str] = None,
+    ) -> str:
+        """
+        Returns the cached response, joins an identical synthesis already in flight, or runs
+        `compute` and caches its result. Errors raised by `compute` are never cached.
+        """
+        key = self.key(intent, user_query, tool_results, session_id)
+        if key is None:
+            return await compute()
+
+        task = self._in_flight.get(key)
+        if task is None:
+            cached = await self._get(key)
+            if cached is not None:
+                self._hits.inc()
+                return cached
+            task = self._in_flight.get(key) # Another request may have started it meanwhile
+        if task is None:
+            self._misses.inc()
+            task = asyncio.ensure_future(self._compute_and_store(key, self.ttls[intent], compute))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self._coalesced.inc()
+        # Shielded: a caller that goes away does not cancel the synthesis for the others
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            task.exception() # Retrieved here so an error nobody awaited is not reported as lost
+
+    async def _compute_and_store(self, key: str, ttl: int, compute: Callable[[], Awaitable[str]]) -> str:
+        response = await compute()
+        try:
+            with self._set_stage.time():
+                await self.redis.set(key, response, ex=ttl)
+        except Exception as e:
+            logger.warning("Could not store synthesized response", error=str(e))
+        return response
+
+    async def _get(self, key: str) -> Optional[str]:
+        try:
+            with self._get_stage.time():
+                cached = await self.redis.get(key)
+        except Exception as e:
+            logger.warning("Could not read synthesized response cache", error=str(e))
+            return None
+        if cached is None:
+            return None
+        return cached.decode("utf-8") if isinstance(cached, bytes) else cached
@@ -0,0 +1,72 @@
+"""
+Which Gemini model serves which stage.
+
+Intent recognition is a short, structured classification that a small model handles well;
+synthesis defaults to the larger model. Routes are configured with GEMINI_MODEL_ROUTES, a
+comma-separated list of `stage=model` or `stage:intent=model` entries, e.g.
+
+    GEMINI_MODEL_ROUTES="intent=gemini-1.5-flash,synthesis=gemini-pro,synthesis:get_budget_advice=gemini-1.5-flash"
+
+When the routed model's output cannot be used (intent JSON that does not parse or
+validate), the call is escalated once to GEMINI_ESCALATION_MODEL.
+"""
+import os
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+from common.metrics import LATENCY_BUCKETS
+
+DEFAULT_ROUTES: Dict[str, str] = {
+    "intent": "gemini-1.5-flash",
+    "synthesis": "gemini-pro",
+}
+DEFAULT_ESCALATION_MODEL = "gemini-pro"
+
+MODEL_DURATION = Histogram(
+    "gemini_model_duration_seconds",
+    "Duration of Gemini calls by model and stage.",
+    ["model", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+# outcome: ok, invalid_output (unusable response, escalated if possible) or error (the call raised)
+MODEL_OUTCOMES = Counter("gemini_model_outcomes_total", "Gemini call outcomes by model and stage.", ["model", "stage", "outcome"])
+ESCALATIONS = Counter("gemini_escalations_total", "Calls retried on the escalation model after unusable output.", ["stage", "from_model", "to_model"])
+
+
+def parse_routes(spec: str) -> Dict[str, str]:
+    """
+    Parses `stage=model` / `stage:intent=model` entries; malformed entries raise ValueError.
+    """
+    routes = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        target, sep, model = entry.partition("=")
+        if not sep or not target.strip() or not model.strip():
+            raise ValueError(f"Invalid model route '{entry}', expected stage[:intent]=model")
+        routes[target.strip()] = model.strip()
+    return routes
+
+
+class ModelRouter:
+    def __init__(self, routes: Optional[Dict[str, str]] = None, escalation_model: Optional[str] = None):
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.escalation_model = escalation_model or DEFAULT_ESCALATION_MODEL
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        return cls(
+            routes=parse_routes(os.getenv("GEMINI_MODEL_ROUTES", "")),
+            escalation_model=os.getenv("GEMINI_ESCALATION_MODEL"),
+        )
+
+    def model_for(self, stage: str, intent: Optional[str] = None) -> str:
+        if intent is not None and f"{stage}:{intent}" in self.routes:
+            return self.routes[f"{stage}:{intent}"]
+        return self.routes[stage]
+
+    def models_for(self, stage: str, intent: Optional[str] = None) -> List[str]:
+        """
+        The routed model followed by the escalation model, if that is a different one.
+        """
+        model = self.model_for(stage, intent)
+        return [model] if model == self.escalation_model else [model, self.escalation_model]
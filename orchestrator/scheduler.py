@@ -0,0 +1,268 @@
+"""
+Admission control for Gemini calls.
+
+Every call goes through one GeminiScheduler per process. The scheduler enforces:
+- a global concurrency limit and a tokens-per-minute budget over a sliding 60 s window.
+  Each call reserves its estimated tokens, and the reservation is corrected to the
+  reported usage when the call returns.
+- strict priority order. Interactive calls (a user is waiting) are admitted before
+  background work, and calls are FIFO within a priority.
+- retries with full-jitter exponential backoff on quota, overload and transient errors.
+- deadlines. A call that cannot be admitted, retried or answered before its deadline
+  fails fast with GeminiOverloadedError instead of queueing behind the backlog.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import re
+from collections import deque
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+from common.metrics import LATENCY_BUCKETS
+
+logger = structlog.get_logger()
+
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "250000"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+
+WINDOW_S = 60.0
+BASE_BACKOFF_S = 0.5
+MAX_BACKOFF_S = 8.0
+
+QUEUE_WAIT = Histogram(
+    "gemini_queue_wait_seconds",
+    "Time a Gemini call waited for admission (concurrency slot and token budget).",
+    ["stage", "priority"],
+    buckets=LATENCY_BUCKETS,
+)
+QUEUED = Gauge("gemini_queued_calls", "Gemini calls waiting for admission.", ["priority"])
+TOKENS = Counter("gemini_tokens_total", "Gemini tokens used, as reported by the API or estimated.", ["stage", "kind"])
+RETRIES = Counter("gemini_retries_total", "Gemini calls retried after a retryable error.", ["stage"])
+REJECTED = Counter("gemini_rejected_total", "Gemini calls failed fast because they could not finish before their deadline.", ["stage"])
+
+
+class GeminiOverloadedError(Exception):
+    """Custom exception for Gemini calls that cannot complete before their deadline."""
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# Quota (429), overload (503) and transient server errors, as raised by the SDK
+# (google.api_core.exceptions) or surfaced in the message of a wrapped error.
+_RETRYABLE_CODES = {429, 500, 503, 504}
+_RETRYABLE_NAMES = {"ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "TooManyRequests"}
+_RETRYABLE_MESSAGE = re.compile(r"\b(429|500|503|504)\b|resource has been exhausted|overloaded|unavailable", re.IGNORECASE)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if type(exc).__name__ in _RETRYABLE_NAMES:
+        return True
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and code in _RETRYABLE_CODES:
+        return True
+    return bool(_RETRYABLE_MESSAGE.search(str(exc)))
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Full-jitter exponential backoff before retry number `attempt` (0-based).
+    """
+    return random.uniform(0, min(MAX_BACKOFF_S, BASE_BACKOFF_S * 2 ** attempt))
+
+
+class _Reservation:
+    __slots__ = ("at", "tokens", "expired")
+
+    def __init__(self, at: float, tokens: int):
+        self.at = at
+        self.tokens = tokens
+        self.expired = False
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "future")
+
+    def __init__(self, priority: Priority, seq: int, tokens: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class GeminiScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        tokens_per_minute: int = GEMINI_TOKENS_PER_MINUTE,
+        max_retries: int = GEMINI_MAX_RETRIES,
+    ):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._window: Deque[_Reservation] = deque()
+        self._window_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    # --- Token window ------------------------------------------------------------
+
+    def _expire(self, now: float) -> None:
+        while self._window and now - self._window[0].at >= WINDOW_S:
+            reservation = self._window.popleft()
+            reservation.expired = True
+            self._window_tokens -= reservation.tokens
+
+    def _tokens_available_at(self, tokens: int, now: float) -> float:
+        """
+        Earliest time at which `tokens` more fit into the window. A call larger than the
+        whole budget is admitted once the window is empty rather than never.
+        """
+        self._expire(now)
+        excess = self._window_tokens + tokens - self.tokens_per_minute
+        if excess <= 0:
+            return now
+        for reservation in self._window:
+            excess -= reservation.tokens
+            if excess <= 0:
+                return reservation.at + WINDOW_S
+        return self._window[-1].at + WINDOW_S
+
+    def _settle(self, reservation: _Reservation, tokens: int) -> None:
+        if not reservation.expired:
+            self._window_tokens += tokens - reservation.tokens
+            reservation.tokens = tokens
+
+    # --- Admission ---------------------------------------------------------------
+
+    def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        while self._queue and self._in_flight < self.max_concurrency:
+            waiter = self._queue[0]
+            if waiter.future.done(): # Timed out or cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            ready_at = self._tokens_available_at(waiter.tokens, now)
+            if ready_at > now:
+                # Strict priority: lower priorities wait behind the head of the queue too
+                if self._timer is None or self._timer.when() > ready_at:
+                    if self._timer is not None:
+                        self._timer.cancel()
+                    self._timer = loop.call_at(ready_at, self._on_timer)
+                return
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            waiter.future.set_result(self._reserve(waiter.tokens, now))
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _reserve(self, tokens: int, now: float) -> _Reservation:
+        reservation = _Reservation(now, tokens)
+        self._window.append(reservation)
+        self._window_tokens += tokens
+        return reservation
+
+    async def _acquire(self, tokens: int, priority: Priority, deadline: Optional[float], stage: str) -> _Reservation:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if deadline is not None and self._tokens_available_at(tokens, now) >= deadline:
+            raise GeminiOverloadedError(f"{stage}: token budget exhausted until after the deadline")
+
+        waiter = _Waiter(priority, next(self._seq), tokens, loop.create_future())
+        heapq.heappush(self._queue, waiter)
+        queued = QUEUED.labels(priority.name.lower())
+        queued.inc()
+        try:
+            self._dispatch()
+            timeout = None if deadline is None else deadline - loop.time()
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release() # Admitted just as we gave up
+            else:
+                waiter.future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                raise GeminiOverloadedError(f"{stage}: not admitted before the deadline") from None
+            raise
+        finally:
+            queued.dec()
+            QUEUE_WAIT.labels(stage, priority.name.lower()).observe(loop.time() - now)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    # --- Calls -------------------------------------------------------------------
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        stage: str,
+        estimated_tokens: int,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline_s: Optional[float] = None,
+        usage: Optional[Callable[[Any], Optional[Tuple[int, int]]]] = None,
+    ) -> Any:
+        """
+        Runs `call` once admitted, retrying retryable errors. `usage(response)` returns the
+        (prompt, response) token counts, or None to keep the estimate.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if deadline_s is None else loop.time() + deadline_s
+        attempt = 0
+        while True:
+            try:
+                reservation = await self._acquire(estimated_tokens, priority, deadline, stage)
+            except GeminiOverloadedError:
+                REJECTED.labels(stage).inc()
+                raise
+            try:
+                timeout = None if deadline is None else deadline - loop.time()
+                response = await asyncio.wait_for(call(), timeout)
+            except asyncio.TimeoutError:
+                self._release()
+                REJECTED.labels(stage).inc()
+                raise GeminiOverloadedError(f"{stage}: no response before the deadline") from None
+            except Exception as e:
+                self._release()
+                delay = backoff_delay(attempt)
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                if deadline is not None and loop.time() + delay >= deadline:
+                    REJECTED.labels(stage).inc()
+                    raise GeminiOverloadedError(f"{stage}: no time left to retry after {e}") from e
+                RETRIES.labels(stage).inc()
+                logger.warning("Retrying Gemini call", stage=stage, attempt=attempt + 1, delay_s=round(delay, 3), error=str(e))
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException: # Cancelled, e.g. the client went away
+                self._release()
+                raise
+
+            counts = usage(response) if usage is not None else None
+            if counts is not None:
+                self._settle(reservation, sum(counts))
+                TOKENS.labels(stage, "prompt").inc(counts[0])
+                TOKENS.labels(stage, "response").inc(counts[1])
+            else:
+                TOKENS.labels(stage, "estimated").inc(estimated_tokens)
+            self._release()
+            return response
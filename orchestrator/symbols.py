@@ -0,0 +1,46 @@
+"""
+Symbol lookups through the financial analysis agent's symbol directory, in place of Gemini.
+
+Intent recognition extracts company names and tickers as the user wrote them, and Gemini's
+own guess at a ticker can be wrong ("Alphabet" -> "ALPH"). resolve_symbol_entities replaces
+each symbol entity with the listing the directory resolves it to, and leaves the entity as
+it was when the directory has no unambiguous answer or cannot be reached.
+"""
+from typing import Any, Dict, List
+
+import structlog
+
+logger = structlog.get_logger()
+
+# The entity holding the symbol(s), per intent
+SYMBOL_ENTITIES = {"get_stock_data": "symbol", "compare_stocks": "symbols"}
+
+
+async def resolve_symbol_entities(client: Any, intent: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `entities` with the symbol entity of `intent` resolved to listed tickers, in one call.
+    """
+    field = SYMBOL_ENTITIES.get(intent)
+    value = entities.get(field) if field else None
+    if isinstance(value, str):
+        names: List[str] = [value]
+    elif isinstance(value, list):
+        names = [item for item in value if isinstance(item, str)]
+    else:
+        return entities
+    names = [name for name in names if name.strip()]
+    if not names:
+        return entities
+    try:
+        resolved = (await client.post("/financial/symbols/resolve", data={"names": names}))["resolved"]
+    except Exception as e:
+        logger.warning("Could not resolve symbols; keeping the recognized entities", names=names, error=str(e))
+        return entities
+
+    def pick(name: Any) -> Any:
+        return (resolved.get(name) or name) if isinstance(name, str) else name
+
+    updated = {**entities, field: pick(value) if isinstance(value, str) else [pick(item) for item in value]}
+    if updated[field] != value:
+        logger.info("Symbols resolved", intent=intent, recognized=value, resolved=updated[field])
+    return updated
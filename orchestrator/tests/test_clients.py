@@ -0,0 +1,88 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from budget_agent.main import app as budget_app
+from financial_analysis_agent.main import app as financial_app
+from financial_analysis_agent.clients.data_provider import HistoricalData, Quote
+from orchestrator.clients import AgentClients, EmbeddedServiceClient, ServiceClient, AGENT_MODE_EMBEDDED
+
+
+def _networked(app, columnar: bool = False) -> ServiceClient:
+    client = ServiceClient(base_url="http://agent", columnar=columnar)
+    client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return client
+
+
+@pytest.fixture
+def financial_data_service():
+    service = AsyncMock()
+    service.get_quote.return_value = Quote(symbol="AAPL", price=170.0, currency="USD")
+    service.get_historical_data.return_value = [
+        HistoricalData(date="2023-01-02", open=160.0, high=161.0, low=159.0, close=160.5, volume=1000000),
+        HistoricalData(date="2023-01-03", open=160.5, high=163.0, low=160.0, close=162.5, volume=1200000),
+    ]
+    with patch("financial_analysis_agent.main.financial_data_service", new=service):
+        yield service
+
+
+@pytest.mark.asyncio
+async def test_embedded_client_returns_what_the_networked_client_returns(financial_data_service):
+    request = {"monthly_income": 5000, "unrelated_entity": "ignored"}
+    assert await EmbeddedServiceClient(budget_app).post("/budget/calculate-50-30-20", request) == \
+        await _networked(budget_app).post("/budget/calculate-50-30-20", request)
+
+    request = {"symbol": "AAPL", "period": "1mo"}
+    embedded = await EmbeddedServiceClient(financial_app, columnar=True).post("/financial/stock-data", request)
+    assert embedded == await _networked(financial_app, columnar=True).post("/financial/stock-data", request)
+    assert embedded["historical_data"]["close"] == [160.5, 162.5]
+
+
+@pytest.mark.asyncio
+async def test_embedded_client_raises_like_the_networked_client(financial_data_service):
+    financial_data_service.get_quote.side_effect = Exception("down")
+    financial_data_service.get_historical_data.side_effect = Exception("down")
+    client = EmbeddedServiceClient(financial_app)
+
+    with pytest.raises(Exception, match="HTTP error occurred: 500 - .*Failed to retrieve any data"):
+        await client.post("/financial/stock-data", {"symbol": "AAPL", "period": "1mo"})
+    with pytest.raises(Exception, match="HTTP error occurred: 422"):
+        await client.post("/financial/stock-data", {})
+    with pytest.raises(Exception, match="HTTP error occurred: 404"):
+        await client.post("/financial/unknown", {})
+    with pytest.raises(Exception, match="cannot be called in embedded mode"):
+        await EmbeddedServiceClient(budget_app).post("/budget/analyze-spending/stream", {})
+
+
+@pytest.mark.asyncio
+async def test_agent_clients_embedded_mode_runs_agent_lifespans():
+    clients = AgentClients(budget_agent_url="", financial_analysis_agent_url="", mode=AGENT_MODE_EMBEDDED)
+    assert isinstance(clients.budget, EmbeddedServiceClient)
+    events = []
+
+    def lifespan(name):
+        class Lifespan:
+            async def __aenter__(self):
+                events.append(f"{name} started")
+
+            async def __aexit__(self, *exc_info):
+                events.append(f"{name} stopped")
+        return lambda app: Lifespan()
+
+    with patch.object(budget_app.router, "lifespan_context", lifespan("budget")), \
+            patch.object(financial_app.router, "lifespan_context", lifespan("financial")):
+        await clients.start()
+        await clients.aclose()
+    assert events == ["budget started", "financial started", "financial stopped", "budget stopped"]
+
+
+def test_agent_clients_rejects_unknown_mode():
+    with pytest.raises(ValueError, match="Unknown agent mode"):
+        AgentClients(budget_agent_url="", financial_analysis_agent_url="", mode="sidecar")
+
+
+@pytest.mark.asyncio
+async def test_agent_clients_return_history_rows(financial_data_service):
+    clients = AgentClients(budget_agent_url="", financial_analysis_agent_url="", mode=AGENT_MODE_EMBEDDED)
+    result = await clients.financial_analysis.post("/financial/stock-data", {"symbol": "AAPL", "period": "1mo"})
+    assert [row["close"] for row in result["historical_data"]] == [160.5, 162.5]
+    assert "x-history-layout" not in AgentClients(budget_agent_url="", financial_analysis_agent_url="").financial_analysis.headers
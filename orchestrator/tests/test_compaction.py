@@ -0,0 +1,66 @@
+import json
+from common.encoding import columns_from_rows
+from orchestrator.compaction import compact_tool_results, estimate_tokens, summarize_history
+
+# Newest first, as the providers return them
+ROWS = [
+    {"date": f"2024-{month:02d}-{day:02d}", "open": 100.0 + i, "high": 101.0 + i, "low": 99.0 + i, "close": 100.0 + i, "volume": 1000 + i}
+    for i, (month, day) in enumerate((m, d) for m in range(1, 13) for d in range(1, 22))
+][::-1]
+
+
+def test_stock_history_is_reduced_to_period_stats_and_samples():
+    tool_results = {"quote": {"symbol": "IBM", "price": 351.0}, "historical_data": ROWS}
+    compacted = compact_tool_results("get_stock_data", tool_results, token_budget=1500)
+
+    summary = compacted.data["history_summary"]
+    assert "historical_data" not in compacted.data
+    assert compacted.data["quote"] == tool_results["quote"]
+    assert summary["start_date"] == "2024-01-01" and summary["end_date"] == "2024-12-21"
+    assert summary["start_close"] == 100.0 and summary["end_close"] == 351.0
+    assert summary["period_high"] == {"date": "2024-12-21", "price": 352.0}
+    assert summary["max_drawdown_percent"] == 0.0
+    assert summary["sampled_closes"][0] == ["2024-01-01", 100.0]
+    assert summary["sampled_closes"][-1] == ["2024-12-21", 351.0]
+    assert compacted.tokens_after <= 1500 < compacted.tokens_before
+    assert tool_results["historical_data"] is ROWS # The raw results are left intact
+
+
+def test_columnar_history_gives_the_same_summary():
+    assert summarize_history(columns_from_rows(ROWS), 12) == summarize_history(ROWS, 12)
+
+
+def test_tokens_before_are_measured_on_the_raw_rows():
+    rows = {"historical_data": ROWS}
+    columnar = {"historical_data": columns_from_rows(ROWS)}
+    compacted = compact_tool_results("get_stock_data", columnar, token_budget=1500, raw=rows)
+
+    assert compacted.tokens_before == estimate_tokens(json.dumps(rows, indent=2))
+    assert compacted.tokens_before > compact_tool_results("get_stock_data", columnar, token_budget=1500).tokens_before
+    assert compacted.data == compact_tool_results("get_stock_data", rows, token_budget=1500).data
+
+
+def test_budget_reduces_sampled_points():
+    tool_results = {"historical_data": ROWS}
+    generous = compact_tool_results("get_stock_data", tool_results, token_budget=1500)
+    tight = compact_tool_results("get_stock_data", tool_results, token_budget=200)
+
+    assert len(tight.data["history_summary"].get("sampled_closes", [])) < len(generous.data["history_summary"]["sampled_closes"])
+    assert tight.tokens_after <= 200
+
+
+def test_spending_keeps_top_categories():
+    categories = {f"category_{i}": float(i * 10) for i in range(1, 11)}
+    tool_results = {"total_spending": 550.0, "spending_by_category": categories, "recommendations": ["Cook at home"], "summary": "ok"}
+    compacted = compact_tool_results("analyze_spending", tool_results)
+
+    assert list(compacted.data["top_categories"]) == ["category_10", "category_9", "category_8", "category_7", "category_6"]
+    assert compacted.data["other_categories"] == {"count": 5, "total": 150.0}
+
+
+def test_unknown_intent_is_truncated_to_budget():
+    tool_results = {"items": [{"value": "x" * 50} for _ in range(500)]}
+    compacted = compact_tool_results("unknown", tool_results, token_budget=300)
+
+    assert compacted.reducer == "passthrough+truncate"
+    assert estimate_tokens(json.dumps(compacted.data, separators=(",", ":"))) == compacted.tokens_after <= 300
@@ -0,0 +1,87 @@
+import pytest
+from orchestrator import prompt_prefix
+from orchestrator.prompt_prefix import IntentPrefix
+from orchestrator.prompts import INTENT_RECOGNITION_INSTRUCTIONS, prompt_version
+
+
+class StubModel:
+    def __init__(self, name: str, **config):
+        self.name = name
+        self.config = config
+
+
+def test_prompt_sends_only_the_suffix():
+    prefix = IntentPrefix(StubModel, mode="system")
+    inline = IntentPrefix(StubModel, mode="inline")
+
+    assert prefix.prompt("How is AAPL doing?") == 'User Query: "How is AAPL doing?"\nIntent:\n'
+    assert inline.prompt("How is AAPL doing?") == INTENT_RECOGNITION_INSTRUCTIONS + prefix.prompt("How is AAPL doing?")
+    assert '"intent": "compare_stocks"' in INTENT_RECOGNITION_INSTRUCTIONS # Literal braces, not format escapes
+
+
+def test_version_follows_content():
+    assert prompt_version("a", "b") == prompt_version("a", "b")
+    assert prompt_version("a", "b") != prompt_version("a", "c")
+
+
+@pytest.mark.asyncio
+async def test_system_mode_configures_the_instruction_once():
+    prefix = IntentPrefix(StubModel, mode="system")
+
+    model = await prefix.model("gemini-1.5-flash")
+
+    assert model.config == {"system_instruction": INTENT_RECOGNITION_INSTRUCTIONS}
+    assert await prefix.model("gemini-1.5-flash") is model
+
+
+@pytest.mark.asyncio
+async def test_cache_mode_creates_and_refreshes_on_ttl(monkeypatch):
+    created = []
+
+    def cached_model(model_name, instructions, ttl_s, display_name):
+        created.append(display_name)
+        return StubModel(model_name, cached=instructions)
+
+    clock = [1000.0]
+    monkeypatch.setattr(prompt_prefix.time, "monotonic", lambda: clock[0])
+    prefix = IntentPrefix(StubModel, mode="cache", ttl_s=100, cached_model_factory=cached_model)
+
+    first = await prefix.model("gemini-1.5-flash")
+    assert await prefix.model("gemini-1.5-flash") is first
+    clock[0] += 81 # Past REFRESH_AT of the TTL
+    second = await prefix.model("gemini-1.5-flash")
+
+    assert second is not first
+    assert created == [f"intent-prefix-{prefix.version}"] * 2
+
+
+@pytest.mark.asyncio
+async def test_cache_mode_falls_back_to_system_instruction():
+    def unavailable(*args):
+        raise RuntimeError("400 Cached content is too small")
+
+    prefix = IntentPrefix(StubModel, mode="cache", cached_model_factory=unavailable)
+
+    model = await prefix.model("gemini-1.5-flash")
+
+    assert model.config == {"system_instruction": INTENT_RECOGNITION_INSTRUCTIONS}
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        IntentPrefix(StubModel, mode="bogus")
+
+
+def test_context_caches_are_created_with_the_client_api_key(monkeypatch):
+    import google.generativeai as genai
+    from orchestrator import gemini
+
+    configured = []
+    monkeypatch.setattr(genai, "configure", lambda api_key: configured.append(api_key))
+    monkeypatch.setattr(gemini, "create_cached_model", lambda model_name, *args: StubModel(model_name))
+    client = gemini.GeminiClient(api_key="test-key")
+
+    client.intent_prefix.cached_model_factory("gemini-1.5-flash", INTENT_RECOGNITION_INSTRUCTIONS, 60, "intent-prefix")
+    client.model_factory("gemini-1.5-flash")
+
+    assert configured == ["test-key"] # Once, before the first context cache
@@ -0,0 +1,106 @@
+import asyncio
+import time
+import pytest
+from benchmarks.stubs import FakeRedis
+from orchestrator.response_cache import ResponseCache
+
+QUERY = "How is AAPL doing today?"
+QUOTE = {"quote": {"symbol": "AAPL", "price": 190.5, "change_percent": "1.2%"}}
+
+
+def _counting(text: str = "AAPL is up 1.2% today.", delay: float = 0.0):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return text
+    return compute, calls
+
+
+@pytest.mark.asyncio
+async def test_different_questions_over_the_same_tool_results_do_not_share_an_entry():
+    cache = ResponseCache(FakeRedis())
+    compute, calls = _counting()
+
+    await cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute)
+    await cache.get_or_compute("get_stock_data", "Should I sell my AAPL shares?", QUOTE, compute)
+    assert len(calls) == 2
+    await cache.get_or_compute("get_stock_data", "  how is aapl   doing today? ", QUOTE, compute)
+    assert len(calls) == 2 # Same question up to case and whitespace
+
+
+@pytest.mark.asyncio
+async def test_identical_tool_results_hit_the_cache():
+    cache = ResponseCache(FakeRedis())
+    compute, calls = _counting()
+
+    first = await cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute)
+    reordered = {"quote": dict(reversed(list(QUOTE["quote"].items())))}
+    second = await cache.get_or_compute("get_stock_data", QUERY, reordered, compute)
+
+    assert first == second == "AAPL is up 1.2% today."
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_new_data_misses_and_ttl_follows_intent():
+    redis = FakeRedis()
+    cache = ResponseCache(redis)
+    compute, calls = _counting()
+
+    await cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute)
+    await cache.get_or_compute("get_stock_data", QUERY, {"quote": {**QUOTE["quote"], "price": 191.0}}, compute)
+
+    assert len(calls) == 2
+    assert len(redis.store) == 2
+    assert all(expires - time.monotonic() <= 300 for expires in redis.expiry.values())
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_never_shared():
+    cache = ResponseCache(FakeRedis())
+    compute, calls = _counting()
+
+    await cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute, session_id="alice")
+    await cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute, session_id="bob")
+    await cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute)
+    await cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute, session_id="alice")
+
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_personal_intents_are_only_cached_within_a_session():
+    cache = ResponseCache(FakeRedis())
+    budget = {"needs": 2500.0, "wants": 1500.0, "savings": 1000.0}
+
+    assert cache.key("get_budget_advice", QUERY, budget) is None
+    assert cache.key("get_budget_advice", QUERY, budget, session_id="alice") is not None
+    assert cache.key("unknown", QUERY, {"message": "?"}) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_are_coalesced():
+    cache = ResponseCache(FakeRedis())
+    compute, calls = _counting(delay=0.05)
+
+    responses = await asyncio.gather(*(cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute) for _ in range(5)))
+
+    assert responses == ["AAPL is up 1.2% today."] * 5
+    assert len(calls) == 1
+    assert cache._in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    cache = ResponseCache(FakeRedis())
+
+    async def failing():
+        raise RuntimeError("quota")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("get_stock_data", QUERY, QUOTE, failing)
+    compute, calls = _counting()
+    assert await cache.get_or_compute("get_stock_data", QUERY, QUOTE, compute) == "AAPL is up 1.2% today."
+    assert len(calls) == 1
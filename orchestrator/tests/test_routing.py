@@ -0,0 +1,70 @@
+import pytest
+from orchestrator.gemini import GeminiClient
+from orchestrator.routing import ModelRouter, parse_routes
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    def __init__(self, name: str, answers: dict, calls: list):
+        self.name = name
+        self.answers = answers
+        self.calls = calls
+
+    async def generate_content_async(self, prompt: str, **kwargs) -> StubResponse:
+        self.calls.append(self.name)
+        return StubResponse(self.answers[self.name])
+
+
+def _client(answers: dict, routes: dict = None):
+    calls = []
+    client = GeminiClient(api_key="test", router=ModelRouter(routes=routes, escalation_model="big"))
+    client.model_factory = lambda name, **kwargs: StubModel(name, answers, calls)
+    return client, calls
+
+
+def test_parse_routes():
+    assert parse_routes("intent=small, synthesis:get_budget_advice=small,") == {"intent": "small", "synthesis:get_budget_advice": "small"}
+    with pytest.raises(ValueError):
+        parse_routes("intent")
+
+
+def test_routes_by_stage_and_intent():
+    router = ModelRouter(routes={"intent": "small", "synthesis": "big", "synthesis:get_budget_advice": "small"}, escalation_model="big")
+    assert router.model_for("synthesis", "get_budget_advice") == "small"
+    assert router.model_for("synthesis", "get_stock_data") == "big"
+    assert router.models_for("intent") == ["small", "big"]
+    assert router.models_for("synthesis") == ["big"]
+
+
+@pytest.mark.asyncio
+async def test_intent_uses_routed_model():
+    client, calls = _client({"small": '{"intent": "get_stock_data", "entities": {"symbol": "AAPL"}}'}, routes={"intent": "small"})
+
+    recognized = await client.recognize_intent("How is AAPL doing?")
+
+    assert recognized.intent == "get_stock_data"
+    assert calls == ["small"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_intent_output_escalates():
+    client, calls = _client({"small": "I think they want stock data", "big": '```json\n{"intent": "get_stock_data", "entities": {}}\n```'}, routes={"intent": "small"})
+
+    recognized = await client.recognize_intent("How is AAPL doing?")
+
+    assert recognized.intent == "get_stock_data"
+    assert calls == ["small", "big"]
+
+
+@pytest.mark.asyncio
+async def test_escalation_failure_returns_unknown():
+    client, calls = _client({"small": "no json", "big": '{"entities": {}}'}, routes={"intent": "small"})
+
+    recognized = await client.recognize_intent("How is AAPL doing?")
+
+    assert recognized.intent == "unknown"
+    assert calls == ["small", "big"]
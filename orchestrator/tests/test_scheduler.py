@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from orchestrator import scheduler as scheduler_module
+from orchestrator.scheduler import GeminiOverloadedError, GeminiScheduler, Priority, is_retryable
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "backoff_delay", lambda attempt: 0.0)
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+def test_is_retryable():
+    assert is_retryable(ResourceExhausted("quota"))
+    assert is_retryable(RuntimeError("429 Resource has been exhausted"))
+    assert not is_retryable(ValueError("Invalid argument: prompt is empty"))
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_priority_order():
+    scheduler = GeminiScheduler(max_concurrency=1, tokens_per_minute=10_000)
+    release = asyncio.Event()
+    order = []
+
+    async def blocker():
+        await release.wait()
+        return "blocker"
+
+    def call(name):
+        async def run():
+            order.append(name)
+            return name
+        return run
+
+    first = asyncio.create_task(scheduler.run(blocker, "gemini:synthesis", 10))
+    await asyncio.sleep(0)
+    background = asyncio.create_task(scheduler.run(call("background"), "gemini:synthesis", 10, priority=Priority.BACKGROUND))
+    interactive = asyncio.create_task(scheduler.run(call("interactive"), "gemini:synthesis", 10))
+    await asyncio.sleep(0)
+    assert order == [] # Both wait for the single slot
+
+    release.set()
+    await asyncio.gather(first, background, interactive)
+    assert order == ["interactive", "background"]
+
+
+@pytest.mark.asyncio
+async def test_retries_retryable_errors():
+    scheduler = GeminiScheduler(max_retries=2)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ResourceExhausted("429 quota")
+        return "ok"
+
+    assert await scheduler.run(flaky, "gemini:intent", 10) == "ok"
+    assert len(attempts) == 3
+    assert scheduler._in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_other_errors():
+    scheduler = GeminiScheduler()
+    attempts = []
+
+    async def invalid():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await scheduler.run(invalid, "gemini:intent", 10)
+    assert len(attempts) == 1
+    assert scheduler._in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_fails_fast_when_token_budget_exhausted_past_deadline():
+    scheduler = GeminiScheduler(tokens_per_minute=100)
+
+    async def answer():
+        return "ok"
+
+    await scheduler.run(answer, "gemini:synthesis", 90)
+    with pytest.raises(GeminiOverloadedError):
+        await scheduler.run(answer, "gemini:synthesis", 50, deadline_s=1.0)
+
+
+@pytest.mark.asyncio
+async def test_reservation_is_settled_to_reported_usage():
+    scheduler = GeminiScheduler(tokens_per_minute=100)
+
+    async def answer():
+        return "ok"
+
+    await scheduler.run(answer, "gemini:synthesis", 90, usage=lambda response: (20, 10))
+    assert scheduler._window_tokens == 30
+    assert await scheduler.run(answer, "gemini:synthesis", 50, deadline_s=1.0) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_the_call():
+    scheduler = GeminiScheduler()
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(GeminiOverloadedError):
+        await scheduler.run(slow, "gemini:synthesis", 10, deadline_s=0.05)
+    assert scheduler._in_flight == 0
@@ -0,0 +1,26 @@
+import pytest
+from unittest.mock import AsyncMock
+from financial_analysis_agent.main import app as financial_app
+from orchestrator.clients import EmbeddedServiceClient
+from orchestrator.symbols import resolve_symbol_entities
+
+
+@pytest.mark.asyncio
+async def test_symbol_entities_resolved_through_the_symbol_directory():
+    client = EmbeddedServiceClient(financial_app)
+    entities = await resolve_symbol_entities(client, "compare_stocks", {"symbols": ["Apple", "msft", "Google"], "period": "1y"})
+    assert entities == {"symbols": ["AAPL", "MSFT", "Google"], "period": "1y"} # Unresolved names are left for the agent
+    assert await resolve_symbol_entities(client, "get_stock_data", {"symbol": "Tesla"}) == {"symbol": "TSLA"}
+    # Well-formed tickers the directory does not list are passed through unchanged
+    assert await resolve_symbol_entities(client, "compare_stocks", {"symbols": ["COIN", "SHAK"]}) == {"symbols": ["COIN", "SHAK"]}
+
+
+@pytest.mark.asyncio
+async def test_symbol_entities_untouched_without_symbols_or_directory():
+    client = AsyncMock()
+    assert await resolve_symbol_entities(client, "get_budget_advice", {"monthly_income": 5000}) == {"monthly_income": 5000}
+    assert await resolve_symbol_entities(client, "get_stock_data", {"symbol": 42}) == {"symbol": 42}
+    client.post.assert_not_awaited()
+
+    client.post.side_effect = Exception("HTTP error occurred: 503 - unavailable")
+    assert await resolve_symbol_entities(client, "get_stock_data", {"symbol": "Apple"}) == {"symbol": "Apple"}